@@ -4,9 +4,10 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.strategies.pairs import PairsStrategy
-from src.data_api import get_bars
-from datetime import datetime, timedelta
-import pandas as pd
+from src.market_data import load_pair
+from src.backtest import backtest
+from src.trading_calendar import history_start
+from datetime import datetime, timedelta, timezone
 
 def backtest_strategy():
     """Backtest the strategy with historical data"""
@@ -14,118 +15,58 @@ def backtest_strategy():
     
     # Strategy parameters
     stock1, stock2 = "AAPL", "MSFT"
-    lookback_days = 30
+    timeframe = "1D"  # any bar size, e.g. "5Min"; the lookback and history are counted in these bars
+    lookback_bars = 30
+    history_bars = 345
     entry_threshold = 1.5
     exit_threshold = 0.5
     initial_capital = 10000
     
     # Create strategy
-    strategy = PairsStrategy(stock1, stock2, lookback_days)
+    strategy = PairsStrategy(stock1, stock2, lookback_bars, timeframe=timeframe)
+    strategy.zscore_window = lookback_bars  # each bar against the full lookback before it, as this script always has
     strategy.entry_threshold = entry_threshold
     strategy.exit_threshold = exit_threshold
     
     # Get historical data (last 6 months)
-    end_date = datetime.now() - timedelta(days=2)  # Last trading day
-    start_date = end_date - timedelta(days=500)
+    end_date = datetime.now(timezone.utc) - timedelta(days=2)  # Last trading day
+    start_date = history_start(end_date, history_bars + lookback_bars, timeframe)
     
     print(f"📊 Getting data from {start_date.date()} to {end_date.date()}")
     
-    bars1 = get_bars([stock1], "1D", start_date, end_date)
-    bars2 = get_bars([stock2], "1D", start_date, end_date)
+    prices1, prices2 = load_pair(stock1, stock2, timeframe, start_date, end_date)
     
-    if bars1.empty or bars2.empty:
+    if prices1.empty:
         print("❌ No data available")
         return
     
-    # Extract prices
-    prices1 = bars1.xs(stock1)['close']
-    prices2 = bars2.xs(stock2)['close']
-    prices1, prices2 = prices1.align(prices2, join='inner')
+    print(f"✅ Got {len(prices1)} {timeframe} bars")
     
-    print(f"✅ Got {len(prices1)} trading days")
-    
-    # Calculate spread
-    spread = strategy.calculate_spread(prices1, prices2)
-    
-    # Backtest variables
-    capital = initial_capital
-    position = 0
-    entry_spread = None
-    entry_date = None
-    trades = []
-    
-    print(f"\n💰 Starting capital: ${capital:,.2f}")
+    print(f"\n💰 Starting capital: ${initial_capital:,.2f}")
     print("🔄 Running backtest...\n")
     
-    # Run strategy day by day
-    for i in range(lookback_days, len(spread)):
-        current_date = spread.index[i]
-        current_spread = spread.iloc[i]
-        current_price1 = prices1.iloc[i]
-        current_price2 = prices2.iloc[i]
-        
-        # Get historical spread for this day
-        historical_spread = spread.iloc[i-lookback_days:i]
-        mean_spread = historical_spread.mean()
-        std_spread = historical_spread.std()
-        
-        if std_spread == 0:
-            continue
-            
-        z_score = (current_spread - mean_spread) / std_spread
-        
-        # Check for entry signal
-        if position == 0:  # No position
-            if z_score > entry_threshold:
-                # Short stock1, long stock2
-                position = -1
-                entry_spread = current_spread
-                entry_date = current_date
-                entry_capital = capital
-                
-                # Calculate position size
-                position_value = capital * 0.02
-                shares1 = int(position_value / current_price1)
-                shares2 = int(position_value / current_price2)
-                
-                print(f"🎯 ENTRY: {current_date.date()} - SHORT {stock1}, LONG {stock2}")
-                print(f"   Spread: {current_spread:.4f}, Z-score: {z_score:.2f}")
-                print(f"   {stock1}: {shares1} shares @ ${current_price1:.2f}")
-                print(f"   {stock2}: {shares2} shares @ ${current_price2:.2f}")
-                
-        # Check for exit signal
-        elif position != 0:  # Have position
-            exit_z_score = abs(z_score)
-            if exit_z_score < exit_threshold:
-                # Calculate profit/loss
-                if position == -1:  # Short stock1, long stock2
-                    # Simplified P&L calculation
-                    pnl = (entry_spread - current_spread) / entry_spread * entry_capital * 0.02
-                else:
-                    pnl = (current_spread - entry_spread) / entry_spread * entry_capital * 0.02
-                
-                capital += pnl
-                
-                print(f"🚪 EXIT: {current_date.date()} - Spread: {current_spread:.4f}")
-                print(f"   P&L: ${pnl:+.2f}, New Capital: ${capital:,.2f}")
-                print(f"   Hold period: {(current_date - entry_date).days} days")
-                print()
-                
-                # Log trade
-                trades.append({
-                    'entry_date': entry_date.date(),
-                    'exit_date': current_date.date(),
-                    'position': position,
-                    'entry_spread': entry_spread,
-                    'exit_spread': current_spread,
-                    'pnl': pnl,
-                    'hold_days': (current_date - entry_date).days
-                })
-                
-                # Reset position
-                position = 0
-                entry_spread = None
-                entry_date = None
+    # Same signal code as the live runners, replayed over the whole history
+    result = backtest(strategy, prices1, prices2, initial_capital)
+    capital = result.final_capital
+    trades = []
+    for t in result.trades.itertuples():
+        hold_days = (t.exit_time - t.entry_time).days
+        direction = f"SHORT {stock1}, LONG {stock2}" if t.position == -1 else f"LONG {stock1}, SHORT {stock2}"
+        print(f"🎯 ENTRY: {t.entry_time.date()} - {direction}")
+        print(f"   Spread: {t.entry_spread:.4f}, Z-score: {t.entry_z:.2f}")
+        print(f"🚪 EXIT: {t.exit_time.date()} - Spread: {t.exit_spread:.4f}")
+        print(f"   P&L: ${t.pnl:+.2f}")
+        print(f"   Hold period: {hold_days} days")
+        print()
+        trades.append({
+            'entry_date': t.entry_time.date(),
+            'exit_date': t.exit_time.date(),
+            'position': t.position,
+            'entry_spread': t.entry_spread,
+            'exit_spread': t.exit_spread,
+            'pnl': t.pnl,
+            'hold_days': hold_days
+        })
     
     # Final results
     print("=" * 50)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Throughput/latency benchmarks for the strategy, data and execution hot paths.
+
+    python benchmarks/run_benchmarks.py                  # quick profile
+    python benchmarks/run_benchmarks.py --profile full   # up to 10M bars / 1,000 pairs
+    python benchmarks/run_benchmarks.py --only spread process_data -o before.json
+
+Everything runs offline on synthetic cointegrated prices: market data is
+served by a ReplayDataClient built from the synthetic bars and orders go to
+the SimulatedBroker. Results are written as JSON for release-to-release
+comparison.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src import bar_cache
+from src.backtest import backtest
+from src.replay import Recording, ReplayDataClient, ReplayStream, bars_from_frame
+from src.sim_broker import SimulatedBroker
+from src.strategies.config import PairsConfig
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from src.strategies.portfolio_runner import PortfolioRunner
+from src.strategies.realtime import RealTimeTradingStrategy, optimize_thresholds
+from src.strategies.stream_runner import StreamingPairsRunner
+from src.strategies.walk_forward import fold_bounds, walk_forward
+from src.synthetic import bars_frame, cointegrated_pair, cointegrated_universe
+import src.clients as clients
+import src.journal as journal
+
+journal.JOURNAL_PATH = ":memory:"  # synthetic trades stay out of the real journal
+
+PROFILES = {
+    "quick": {
+        "spread_bars": [1_000, 10_000, 100_000, 1_000_000],
+        "process_data_bars": [1_000, 10_000],
+        "optimize_bars": [1_000, 10_000],
+        "optimize_grids": [4, 8, 16],
+        "run_once_pairs": [1, 10, 100],
+        "stream_bars": [10_000],
+        "backtest_bars": [10_000, 100_000],
+        "walk_forward_pairs": [10, 100],
+    },
+    "full": {
+        "spread_bars": [1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+        "process_data_bars": [1_000, 10_000, 100_000, 1_000_000],
+        "optimize_bars": [1_000, 10_000, 100_000],
+        "optimize_grids": [4, 8, 16, 32],
+        "run_once_pairs": [1, 10, 100, 1_000],
+        "stream_bars": [10_000, 100_000],
+        "backtest_bars": [10_000, 100_000, 1_000_000],
+        "walk_forward_pairs": [10, 100, 500],
+    },
+}
+
+# -------- Harness --------
+
+def timed(fn, repeat: int = 3) -> float:
+    """Best wall-clock time of `repeat` calls (output suppressed)"""
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+def result(name: str, params: dict, seconds: float, ops: int, unit: str) -> dict:
+    row = {
+        "benchmark": name,
+        "params": params,
+        "seconds": seconds,
+        "ops": ops,
+        "unit": unit,
+        "ops_per_sec": ops / seconds if seconds > 0 else float("inf"),
+        "us_per_op": seconds / ops * 1e6 if ops else None,
+    }
+    print(f"  {name:<22} {json.dumps(params):<40} {row['ops_per_sec']:>14,.0f} {unit}/s  "
+          f"({seconds * 1e3:,.1f} ms)")
+    return row
+
+@contextlib.contextmanager
+def offline_backend(closes: pd.DataFrame):
+    """Serve `closes` as daily bars and fill orders in a SimulatedBroker"""
+    recording = Recording(bars={"1Day": bars_frame(closes)})
+    broker = SimulatedBroker(cash=1e9, prices=closes.iloc[-1].to_dict())
+    previous = clients._data_client, clients._trading_client, bar_cache.default_cache()
+    clients.set_data_client(ReplayDataClient(recording, shift=False))
+    clients.set_trading_client(broker)
+    bar_cache.set_default_cache(None)
+    try:
+        yield broker
+    finally:
+        clients._data_client, clients._trading_client = previous[:2]
+        bar_cache.set_default_cache(previous[2])
+
+# -------- Benchmarks --------
+
+def bench_spread(profile: dict) -> list:
+    rows = []
+    for n in profile["spread_bars"]:
+        p1, p2 = cointegrated_pair(n, seed=0)
+        strategy = PairsStrategy("Y", "X", lookback_days=30)
+        rows.append(result("calculate_spread", {"bars": n}, timed(lambda: strategy.calculate_spread(p1, p2)), n, "bars"))
+        spread = strategy.calculate_spread(p1, p2)
+        rows.append(result("generate_signals", {"bars": n}, timed(lambda: strategy.signals_from_spread(spread)), n, "bars"))
+        calls = 1_000
+        rows.append(result("find_entry_signal", {"bars": n}, timed(
+            lambda: [strategy.find_entry_signal(spread) for _ in range(calls)]), calls, "calls"))
+    return rows
+
+def bench_process_data(profile: dict) -> list:
+    rows = []
+    logging.disable(logging.CRITICAL)
+    try:
+        for n in profile["process_data_bars"]:
+            p1, p2 = cointegrated_pair(n, seed=1)
+            y, x = p1.to_numpy(), p2.to_numpy()
+            dates = p1.index.to_pydatetime()
+            spread = y - 2.0 * x
+
+            def run():
+                strat = RealTimeTradingStrategy(api=None, hedge_ratio=2.0, mean_train=float(spread.mean()),
+                                                std_train=float(spread.std()), initial_capital=1e6)
+                for i in range(n):
+                    strat.process_data(None, None, date=dates[i], y_price=y[i], x_price=x[i])
+
+            rows.append(result("process_data", {"bars": n}, timed(run, repeat=1), n, "bars"))
+    finally:
+        logging.disable(logging.NOTSET)
+    return rows
+
+def bench_optimize(profile: dict) -> list:
+    rows = []
+    for n in profile["optimize_bars"]:
+        p1, p2 = cointegrated_pair(n, seed=2)
+        spread = p1 - 2.0 * p2
+        for g in profile["optimize_grids"]:
+            entry = list(np.linspace(0.5, 3.0, g))
+            exit_ = list(np.linspace(0.0, 1.0, g))
+            points = sum(1 for e in entry for x in exit_ if x < e)
+            seconds = timed(lambda: optimize_thresholds(
+                RealTimeTradingStrategy, p1, p2, 2.0, float(spread.mean()), float(spread.std()),
+                0.0005, 1e6, entry, exit_), repeat=1)
+            rows.append(result("optimize_thresholds", {"bars": n, "grid": points}, seconds, points * n, "point-bars"))
+    return rows
+
+def bench_run_once(profile: dict) -> list:
+    rows = []
+    for n_pairs in profile["run_once_pairs"]:
+        closes, pairs = cointegrated_universe(n_pairs, 120, freq="1D", seed=3)
+        with offline_backend(closes):
+            if n_pairs == 1:
+                runner = PairsRunner(PairsStrategy(*pairs[0], lookback_days=30), check_interval=0)
+                rows.append(result("PairsRunner.run_once", {"pairs": 1}, timed(
+                    lambda: asyncio.run(runner.run_once()), repeat=5), 1, "cycles"))
+            portfolio = PortfolioRunner([PairsConfig(stock1=a, stock2=b, lookback_days=30) for a, b in pairs])
+            try:
+                seconds = timed(lambda: asyncio.run(portfolio.run_once()), repeat=3)
+            finally:
+                portfolio.stop()
+            rows.append(result("PortfolioRunner.run_once", {"pairs": n_pairs}, seconds, n_pairs, "pairs"))
+    return rows
+
+def bench_stream(profile: dict) -> list:
+    rows = []
+    for n in profile["stream_bars"]:
+        p1, p2 = cointegrated_pair(n + 100, freq="1min", seed=4)
+        history = slice(0, 100)
+        live = pd.DataFrame({"Y": p1.iloc[100:], "X": p2.iloc[100:]})
+        events = bars_from_frame(bars_frame(live))
+
+        def run():
+            strategy = PairsStrategy("Y", "X", lookback_days=30, timeframe="1Min")
+            strategy.entry_threshold = 1e9  # measure signal evaluation, not order flow
+            runner = StreamingPairsRunner(strategy, stream=ReplayStream(events))
+
+            async def go():
+                await runner.warm_up(p1.iloc[history], p2.iloc[history])
+                runner.stream.subscribe_bars(runner.on_bar, "Y", "X")
+                await runner.stream.run()
+
+            asyncio.run(go())
+
+        rows.append(result("StreamingPairsRunner", {"bars": n}, timed(run, repeat=1), n, "bars"))
+    return rows
+
+def bench_backtest(profile: dict) -> list:
+    rows = []
+    for n in profile["backtest_bars"]:
+        p1, p2 = cointegrated_pair(n, seed=5)
+        strategy = PairsStrategy("Y", "X", lookback_days=30)
+        for method in ("vectorized", "event"):
+            seconds = timed(lambda: backtest(strategy, p1, p2, method=method), repeat=1)
+            rows.append(result("backtest", {"bars": n, "method": method}, seconds, n, "bars"))
+    return rows
+
+def bench_walk_forward(profile: dict) -> list:
+    rows = []
+    for n_pairs in profile["walk_forward_pairs"]:
+        closes, pairs = cointegrated_universe(n_pairs, 1_000, freq="1D", seed=6)  # ~4 years of daily bars
+        folds = len(fold_bounds(len(closes), 252, 63))
+        seconds = timed(lambda: walk_forward(closes, pairs, initial_capital=1e6), repeat=1)
+        rows.append(result("walk_forward", {"pairs": n_pairs, "folds": folds}, seconds, n_pairs * folds, "folds"))
+    return rows
+
+BENCHMARKS = {
+    "spread": bench_spread,
+    "process_data": bench_process_data,
+    "optimize": bench_optimize,
+    "run_once": bench_run_once,
+    "stream": bench_stream,
+    "backtest": bench_backtest,
+    "walk_forward": bench_walk_forward,
+}
+
+# -------- Output --------
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="Pairs trading benchmarks")
+    p.add_argument("--profile", default="quick", choices=sorted(PROFILES))
+    p.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run a subset")
+    p.add_argument("-o", "--output", default="benchmark_results.json")
+    args = p.parse_args()
+
+    profile = PROFILES[args.profile]
+    rows = []
+    for name in args.only or BENCHMARKS:
+        print(f"▶ {name}")
+        rows.extend(BENCHMARKS[name](profile))
+
+    report = {"profile": args.profile, "environment": environment(), "results": rows}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote {len(rows)} results to {args.output}")
+
+if __name__ == "__main__":
+    main()
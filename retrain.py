@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Nightly walk-forward re-training of the pair book.
+
+    python retrain.py LLY/AMGN AAPL/MSFT --years 4 --train 252 --test 63
+
+Downloads daily closes for every leg in one batched request, re-fits hedge
+ratio, spread stats and thresholds per fold, prints each pair's out-of-sample
+result and publishes the newest parameters to STRATEGY_PARAMS_PATH, where
+running strategies pick them up on their next poll. With --store the closes
+are kept in a memory-mapped PriceStore file that later runs reuse; it is
+downloaded again when it lacks a symbol, starts after the requested history
+or ends before the last completed session.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.price_store import PriceStore, load_store
+from src.strategies.walk_forward import PARAMS_PATH, latest_params, out_of_sample, retrain
+from src.trading_calendar import last_completed_session, session_date, sessions
+
+def store_is_current(store, symbols, start, end) -> bool:
+    """True if a saved store has every symbol and every session from `start` to the last one closed by `end`"""
+    if store is None or len(store) == 0 or not set(symbols) <= set(store.symbols):
+        return False
+    index = store.index
+    return (session_date(index[0]) <= sessions(start, end)[0]
+            and session_date(index[-1]) >= last_completed_session(end))
+
+def main():
+    p = argparse.ArgumentParser(description="Walk-forward re-training of pair parameters")
+    p.add_argument("pairs", nargs="+", help="pairs as Y/X, e.g. LLY/AMGN")
+    p.add_argument("--years", type=float, default=4.0, help="history to download")
+    p.add_argument("--train", type=int, default=252, help="bars per training window")
+    p.add_argument("--test", type=int, default=63, help="bars per out-of-sample window")
+    p.add_argument("--processes", type=int, help="worker processes (default: all cores)")
+    p.add_argument("--params", default=PARAMS_PATH, help="where to publish the parameters")
+    p.add_argument("--store", help="memory-mapped price file to reuse (downloaded if missing)")
+    args = p.parse_args()
+
+    pairs = [tuple(pair.upper().split("/")) for pair in args.pairs]
+    started = time.perf_counter()
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=int(args.years * 365))
+    symbols = [s for pair in pairs for s in pair]
+    store = PriceStore.open(args.store) if args.store else None
+    if not store_is_current(store, symbols, start, end):
+        if store is not None:
+            print(f"♻️ Refreshing {args.store}")
+            symbols = list(dict.fromkeys(symbols + store.symbols))  # keep what it already held
+            store.close()
+        store = load_store(symbols, "1D", start, end, path=args.store)
+    print(f"📊 {len(store)} bars for {len(store.symbols)} symbols")
+
+    with store:
+        folds = retrain(store, pairs, args.params, train=args.train, test=args.test, processes=args.processes)
+    print(out_of_sample(folds).to_string())
+    for pair, params in latest_params(folds).items():
+        print(f"✅ {pair}: hedge={params['hedge_ratio']:.4f} entry_z={params['entry_z']} exit_z={params['exit_z']}")
+    print(f"Published to {args.params} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
 #!/usr/bin/env python3
 import asyncio
-from src.strategies.pairs import PairsStrategy
-from src.strategies.pairs_runner import PairsRunner
+from src.strategies.config import PairsConfig
+from src.strategies.portfolio_runner import PortfolioRunner
+
+# Pairs to trade; legs shared between pairs are only downloaded once per cycle
+PAIRS = [
+    PairsConfig(stock1="AAPL", stock2="MSFT", lookback_days=30, entry_threshold=1.5),
+]
 
 async def run_pairs_strategy():
-    # Create strategy for Apple vs Microsoft
-    strategy = PairsStrategy("AAPL", "MSFT", lookback_days=30)
-    
-    # Create and run the automated trader
-    runner = PairsRunner(strategy, check_interval=300)  # Check every 5 minutes
+    # Create and run the automated trader for every configured pair
+    runner = PortfolioRunner(PAIRS, check_interval=300)  # Check every 5 minutes
     
     try:
         await runner.run_forever()
@@ -0,0 +1,91 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+from . import data_api, market_data, orders
+from .clients import trading_client
+from .scheduler import ACCOUNT, request
+
+# Async facade over orders.py / data_api.py. The Alpaca SDK is synchronous,
+# so every call runs on a thread pool instead of blocking the event loop;
+# the clients keep a pooled HTTP session sized for that concurrency.
+
+DEFAULT_WORKERS = 16
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def default_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="alpaca-io")
+    return _executor
+
+async def run_blocking(fn, *args, executor: Optional[Executor] = None, **kwargs):
+    """Await a blocking call on the given executor (default: the shared I/O pool)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or default_executor(), functools.partial(fn, *args, **kwargs))
+
+# -------- Account & positions --------
+
+async def get_account(executor: Optional[Executor] = None):
+    return await run_blocking(lambda: request(trading_client(), "get_account", priority=ACCOUNT, key=("account",)),
+                              executor=executor)
+
+async def account_summary(executor: Optional[Executor] = None) -> dict:
+    return await run_blocking(orders.account_summary, executor=executor)
+
+async def list_positions(executor: Optional[Executor] = None) -> List[dict]:
+    return await run_blocking(orders.list_positions, executor=executor)
+
+# -------- Orders --------
+
+async def place_market_order(symbol: str, side: str, qty: Optional[Decimal] = None, notional: Optional[Decimal] = None,
+                             tif: str = "day", client_order_id: Optional[str] = None, client=None,
+                             executor: Optional[Executor] = None):
+    return await run_blocking(orders.place_market_order, symbol, side, qty=qty, notional=notional, tif=tif,
+                              client_order_id=client_order_id, client=client, executor=executor)
+
+async def place_limit_order(symbol: str, side: str, qty: Decimal, limit_price: Decimal, tif: str = "day",
+                            executor: Optional[Executor] = None):
+    return await run_blocking(orders.place_limit_order, symbol, side, qty, limit_price, tif=tif, executor=executor)
+
+async def get_order_by_client_id(client_order_id: str, client=None, executor: Optional[Executor] = None):
+    return await run_blocking(orders.get_order_by_client_id, client_order_id, client=client, executor=executor)
+
+async def cancel_order(order_id: str, client=None, executor: Optional[Executor] = None):
+    return await run_blocking(orders.cancel_order, order_id, client=client, executor=executor)
+
+async def submit_market_orders(legs: List[dict], executor: Optional[Executor] = None) -> list:
+    """Submit several market orders at once ({"symbol", "side", "qty"} dicts).
+
+    All legs go out concurrently so they hit the market within one round-trip
+    of each other. Returns one entry per leg: the order, or the exception
+    that leg raised.
+    """
+    return await asyncio.gather(*(
+        place_market_order(leg["symbol"], leg["side"], qty=leg["qty"], executor=executor)
+        for leg in legs
+    ), return_exceptions=True)
+
+# -------- Market data --------
+
+async def get_bars(symbols: Iterable[str], timeframe: str, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None, limit: Optional[int] = None, executor: Optional[Executor] = None):
+    return await run_blocking(data_api.get_bars, list(symbols), timeframe, start, end, limit, executor=executor)
+
+async def latest(symbol: str, executor: Optional[Executor] = None) -> dict:
+    return await run_blocking(data_api.latest, symbol, executor=executor)
+
+async def snapshots(symbols: Iterable[str], executor: Optional[Executor] = None):
+    return await run_blocking(data_api.snapshots, list(symbols), executor=executor)
+
+async def load_universe(symbols: Iterable[str], timeframe: str, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None, executor: Optional[Executor] = None, **kwargs):
+    return await run_blocking(market_data.load_universe, list(symbols), timeframe, start, end, executor=executor, **kwargs)
+
+async def load_pair(stock1: str, stock2: str, timeframe: str, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, executor: Optional[Executor] = None):
+    return await run_blocking(market_data.load_pair, stock1, stock2, timeframe, start, end, executor=executor)
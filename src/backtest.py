@@ -0,0 +1,217 @@
+import copy
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .price_store import PriceStore, as_store, attach_worker, worker_store
+from .spread_models import StaticSpread
+from .strategies.config import PairsConfig
+from .strategies.pairs import PairsStrategy
+
+# One backtest engine for PairsStrategy, with two interchangeable paths:
+#
+#   "event"       replays bars one at a time through the same calls the
+#                 runners make: spread_model.update, RollingZScore.update,
+#                 entry_signal_for / exit_signal_for / should_stop_loss and
+#                 update_position.
+#   "vectorized"  computes spreads, z-scores and entry/exit flags for the
+#                 whole history with the strategy's array methods, then only
+#                 walks the bars where something can happen.
+#
+# Both follow PairsRunner.evaluate: at most one action per bar, entries only
+# when flat, exits only when holding. P&L is the spread move relative to the
+# entry spread on risk_per_trade of the capital at entry.
+#
+# backtest_pairs() runs many pairs over one universe price matrix, with pool
+# workers reading it from a shared PriceStore.
+
+TRADE_COLUMNS = [
+    "entry_time", "exit_time", "position", "entry_spread", "exit_spread",
+    "entry_z", "exit_z", "exit_type", "pnl", "hold_bars",
+]
+
+@dataclass
+class BacktestResult:
+    trades: pd.DataFrame
+    equity: pd.Series  # realized capital after each bar
+    initial_capital: float
+
+    @property
+    def final_capital(self) -> float:
+        return float(self.equity.iloc[-1]) if len(self.equity) else self.initial_capital
+
+    @property
+    def total_return(self) -> float:
+        return self.final_capital / self.initial_capital - 1
+
+    def summary(self) -> dict:
+        n = len(self.trades)
+        wins = int((self.trades["pnl"] > 0).sum()) if n else 0
+        return {
+            "final_capital": self.final_capital,
+            "total_return": self.total_return,
+            "trades": n,
+            "profitable": wins,
+            "win_rate": wins / n if n else 0.0,
+            "avg_pnl": float(self.trades["pnl"].mean()) if n else 0.0,
+            "avg_hold_bars": float(self.trades["hold_bars"].mean()) if n else 0.0,
+        }
+
+# -------- Shared bookkeeping --------
+
+class _Ledger:
+    def __init__(self, strategy: PairsStrategy, index, initial_capital: float):
+        self.strategy = strategy
+        self.index = index
+        self.capital = float(initial_capital)
+        self.trades: List[dict] = []
+        self._open = None  # (bar, position, spread, z, capital)
+
+    def enter(self, i: int, signal: int, spread: float, z: float):
+        self._open = (i, signal, spread, z, self.capital)
+
+    def exit(self, i: int, spread: float, z: float, exit_type: str):
+        start, position, entry_spread, entry_z, entry_capital = self._open
+        move = (spread - entry_spread) if position == 1 else (entry_spread - spread)
+        pnl = move / abs(entry_spread) * entry_capital * self.strategy.risk_per_trade
+        self.capital += pnl
+        self.trades.append({
+            "entry_time": self.index[start], "exit_time": self.index[i], "position": position,
+            "entry_spread": entry_spread, "exit_spread": spread, "entry_z": entry_z, "exit_z": z,
+            "exit_type": exit_type, "pnl": pnl, "hold_bars": i - start,
+        })
+        self._open = None
+
+    def result(self, equity: np.ndarray, initial_capital: float) -> BacktestResult:
+        trades = pd.DataFrame(self.trades, columns=TRADE_COLUMNS)
+        return BacktestResult(trades, pd.Series(equity, index=self.index, name="capital"), initial_capital)
+
+# -------- Paths --------
+
+def _event(strategy: PairsStrategy, p1: np.ndarray, p2: np.ndarray, index, initial_capital: float,
+           stop_loss: bool) -> BacktestResult:
+    ledger = _Ledger(strategy, index, initial_capital)
+    model = strategy.spread_model
+    model.reset()
+    stats = strategy.rolling_stats()
+    equity = np.empty(len(p1))
+
+    for i in range(len(p1)):
+        spread = model.update(p1[i], p2[i])
+        z = stats.update(spread)
+        if strategy.position == 0:
+            if not math.isnan(z):
+                signal = strategy.entry_signal_for(z)
+                if signal:
+                    strategy.update_position(signal, spread)
+                    ledger.enter(i, signal, spread, z)
+        else:
+            exit_signal = not math.isnan(z) and strategy.exit_signal_for(z)
+            if exit_signal or (stop_loss and strategy.should_stop_loss(spread, z)):
+                ledger.exit(i, spread, z, "exit" if exit_signal else "stop_loss")
+                strategy.update_position(0)
+        equity[i] = ledger.capital
+    return ledger.result(equity, initial_capital)
+
+def _vectorized(strategy: PairsStrategy, p1: np.ndarray, p2: np.ndarray, index, initial_capital: float,
+                stop_loss: bool) -> BacktestResult:
+    ledger = _Ledger(strategy, index, initial_capital)
+    n = len(p1)
+    spread = strategy.spread_model.batch(p1, p2)
+    z = strategy.rolling_zscore(spread)
+    entries = strategy.entry_signals(z)
+    exits = strategy.exit_signals(z)
+    entry_bars = np.flatnonzero(entries)
+    exit_bars = np.flatnonzero(exits)
+    closed_at, capital_after = [], []
+
+    i = entry_bars[0] if len(entry_bars) else n
+    while i < n:
+        signal = int(entries[i])
+        strategy.update_position(signal, spread[i])
+        ledger.enter(i, signal, spread[i], z[i])
+
+        # First later exit signal, unless a stop-loss fires before it
+        k = np.searchsorted(exit_bars, i + 1)
+        j = exit_bars[k] if k < len(exit_bars) else n
+        if stop_loss:
+            stops = np.flatnonzero(strategy.stop_loss_signals(spread[i + 1:j], z[i + 1:j]))
+            if len(stops):
+                j = i + 1 + stops[0]
+        if j >= n:
+            break
+        ledger.exit(j, spread[j], z[j], "exit" if exits[j] else "stop_loss")
+        strategy.update_position(0)
+        closed_at.append(j)
+        capital_after.append(ledger.capital)
+
+        k = np.searchsorted(entry_bars, j + 1)
+        i = entry_bars[k] if k < len(entry_bars) else n
+
+    # Realized capital steps at each exit bar
+    equity = np.full(n, float(initial_capital))
+    if closed_at:
+        step = np.searchsorted(np.array(closed_at), np.arange(n), side="right") - 1
+        equity = np.where(step >= 0, np.array(capital_after)[np.maximum(step, 0)], equity)
+    return ledger.result(equity, initial_capital)
+
+def backtest(strategy: PairsStrategy, prices1: pd.Series, prices2: pd.Series, initial_capital: float = 10_000.0,
+             method: str = "vectorized", stop_loss: bool = False) -> BacktestResult:
+    """Backtest a PairsStrategy on aligned prices; both methods give identical trades.
+
+    The strategy itself is not modified (a copy is replayed), so a live
+    strategy can be backtested without touching its position or spread model.
+    """
+    if method not in ("vectorized", "event"):
+        raise ValueError(f"Unknown backtest method '{method}'")
+    prices1, prices2 = prices1.align(prices2, join="inner")
+    p1, p2 = prices1.to_numpy(dtype=float), prices2.to_numpy(dtype=float)
+    strategy = copy.deepcopy(strategy)
+    strategy.update_position(0)
+    strategy.entry_spread = None
+    model = strategy.spread_model
+    if isinstance(model, StaticSpread) and model.fixed is None:
+        # In-sample fit on the whole history, the same ratio batch() would use
+        model.fixed = model.fit_ratio(p1, p2)
+        model.reset()
+    run = _vectorized if method == "vectorized" else _event
+    return run(strategy, p1, p2, prices1.index, initial_capital, stop_loss)
+
+# -------- Many pairs over a shared PriceStore --------
+
+def _backtest_pair(store: PriceStore, config: PairsConfig, initial_capital: float, method: str,
+                   stop_loss: bool) -> dict:
+    prices1, prices2 = store.pair(config.stock1, config.stock2)
+    result = backtest(PairsStrategy.from_config(config), prices1, prices2, initial_capital, method, stop_loss)
+    return {"stock1": config.stock1.upper(), "stock2": config.stock2.upper(), **result.summary()}
+
+def _run_pair(config: PairsConfig, initial_capital: float, method: str, stop_loss: bool) -> dict:
+    return _backtest_pair(worker_store(), config, initial_capital, method, stop_loss)
+
+def backtest_pairs(prices: Union[pd.DataFrame, PriceStore], pairs: Iterable[Tuple[str, str]],
+                   config: Optional[PairsConfig] = None, initial_capital: float = 10_000.0,
+                   method: str = "vectorized", stop_loss: bool = False,
+                   processes: Optional[int] = None) -> pd.DataFrame:
+    """Backtest every (stock1, stock2) pair of a timestamp x symbol close matrix; one summary row per pair.
+
+    Each pair trades with `config`'s settings (default PairsConfig()) on the
+    bars where both legs have a price. processes=1 runs in this process.
+    """
+    config = config or PairsConfig()
+    configs = [replace(config, stock1=s1, stock2=s2) for s1, s2 in pairs]
+    processes = processes or os.cpu_count() or 1
+    with as_store(prices) as store:
+        if processes == 1 or len(configs) <= 1:
+            rows = [_backtest_pair(store, c, initial_capital, method, stop_loss) for c in configs]
+        else:
+            chunksize = max(1, len(configs) // (processes * 4))
+            with ProcessPoolExecutor(max_workers=processes, initializer=attach_worker,
+                                     initargs=(store.handle,)) as pool:
+                rows = list(pool.map(_run_pair, configs, [initial_capital] * len(configs),
+                                     [method] * len(configs), [stop_loss] * len(configs), chunksize=chunksize))
+    return pd.DataFrame(rows)
@@ -0,0 +1,353 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .data_api import fetch_bars, timeframe_delta
+
+# Bars are stored per (symbol, timeframe) as NumPy record arrays that are
+# memory-mapped on read. index.json records which time ranges have already
+# been downloaded so only the missing pieces are requested again.
+#
+# Each download is written to a new segment file instead of rewriting what is
+# already stored; a symbol's segments are compacted into one once there are
+# more than MAX_SEGMENTS. index.json is only read and written under a lock
+# file, so several processes can share one cache directory, and neither lock
+# is held while bars are being downloaded. A segment file that has gone
+# missing takes its time span out of the index, so it is downloaded again.
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume", "trade_count", "vwap")
+BAR_DTYPE = np.dtype([("timestamp", "i8")] + [(f, "f8") for f in BAR_FIELDS])
+
+Range = Tuple[int, int]  # [start_ns, end_ns], UTC epoch nanoseconds
+
+# -------- Range helpers --------
+
+def to_ns(dt) -> int:
+    ts = pd.Timestamp(dt)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")  # naive datetimes are treated as UTC, like Alpaca does
+    return int(ts.tz_convert("UTC").as_unit("ns").value)
+
+def missing_ranges(covered: List[Range], start: int, end: int) -> List[Range]:
+    """Parts of [start, end] not inside any covered range (covered must be sorted and merged)"""
+    gaps = []
+    cursor = start
+    for lo, hi in covered:
+        if hi < cursor:
+            continue
+        if lo > end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+def merge_ranges(covered: List[Range], new: Range) -> List[Range]:
+    merged = []
+    for lo, hi in sorted(list(covered) + [new]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+def subtract_range(covered: List[Range], gone: Range) -> List[Range]:
+    """Covered ranges with [gone] taken out"""
+    out = []
+    for lo, hi in covered:
+        if hi < gone[0] or lo > gone[1]:
+            out.append((lo, hi))
+            continue
+        if lo < gone[0]:
+            out.append((lo, gone[0]))
+        if hi > gone[1]:
+            out.append((gone[1], hi))
+    return out
+
+def merge_bars(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Union of two bar arrays sorted by timestamp; new bars win on duplicates"""
+    combined = np.concatenate([old, new])
+    combined = combined[np.argsort(combined["timestamp"], kind="stable")]
+    ts = combined["timestamp"]
+    keep = np.append(ts[1:] != ts[:-1], True)
+    return combined[keep]
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    """Single-symbol bars DataFrame (timestamp index) -> BAR_DTYPE array"""
+    records = np.empty(len(df), dtype=BAR_DTYPE)
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    records["timestamp"] = index.tz_convert("UTC").as_unit("ns").asi8
+    for field in BAR_FIELDS:
+        records[field] = df[field].to_numpy(dtype=float) if field in df.columns else np.nan
+    return records
+
+def records_to_frame(records: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """{symbol: BAR_DTYPE array} -> MultiIndex [symbol, timestamp] frame like get_bars"""
+    frames = []
+    for symbol, arr in records.items():
+        if len(arr) == 0:
+            continue
+        index = pd.MultiIndex.from_arrays(
+            [np.full(len(arr), symbol, dtype=object), pd.to_datetime(arr["timestamp"], unit="ns", utc=True)],
+            names=["symbol", "timestamp"],
+        )
+        frames.append(pd.DataFrame({f: arr[f] for f in BAR_FIELDS}, index=index))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames)
+
+# -------- Cache --------
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on `path` shared by every process using the cache directory"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _nbytes(entry: dict) -> int:
+    return sum(seg["nbytes"] for seg in entry["segments"])
+
+class BarCache:
+    """Size-bounded, persistent bar store in front of the Alpaca data client"""
+
+    INDEX_FILE = "index.json"
+    LOCK_FILE = "index.lock"
+    MAX_SEGMENTS = 16  # per symbol before they are compacted into one
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024, client=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._client = client
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        with self._locked():
+            pass
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Looked up per use so clients.set_data_client() (e.g. replay) takes effect
+            from .clients import data_client
+            return data_client()
+        return self._client
+
+    def get_bars(self, symbols: Iterable[str], timeframe: str, start: datetime, end: datetime) -> pd.DataFrame:
+        """Same contract as data_api.get_bars, served from disk where possible"""
+        symbols = [s.upper() for s in symbols]
+        start_ns, end_ns = to_ns(start), to_ns(end)
+        keys = [self._key(s, timeframe) for s in symbols]
+        with self._locked():
+            if self._prune(keys):
+                self._save_index()
+            groups = self._gaps(symbols, timeframe, start_ns, end_ns)
+        fetched = self._fetch(groups, timeframe)  # no lock held while waiting on the network
+        with self._locked():
+            self._prune(keys)
+            for symbol, covered, segment in fetched:
+                self._commit(symbol, timeframe, covered, segment)
+            records = {s: self._read(self._entries.get(k), start_ns, end_ns) for s, k in zip(symbols, keys)}
+            now = time.time()
+            for key in keys:
+                if key in self._entries:
+                    self._entries[key]["last_access"] = now
+            self._evict()
+            self._save_index()
+        return records_to_frame(records)
+
+    def covered(self, symbol: str, timeframe: str) -> List[Range]:
+        entry = self._entries.get(self._key(symbol.upper(), timeframe))
+        return [tuple(r) for r in entry["ranges"]] if entry else []
+
+    def total_bytes(self) -> int:
+        return sum(_nbytes(e) for e in self._entries.values())
+
+    def clear(self):
+        with self._locked():
+            for key in list(self._entries):
+                self._drop(key)
+            self._save_index()
+
+    # -------- Internals --------
+
+    @contextmanager
+    def _locked(self):
+        # Another process may have changed the index since we last looked
+        with self._lock, _file_lock(os.path.join(self.root, self.LOCK_FILE)):
+            self._entries = self._load_index()
+            yield
+
+    def _gaps(self, symbols: List[str], timeframe: str, start_ns: int, end_ns: int) -> Dict[Tuple[Range, ...], List[str]]:
+        # Symbols missing the same ranges share one multi-symbol request
+        groups: Dict[Tuple[Range, ...], List[str]] = {}
+        for symbol in symbols:
+            gaps = tuple(missing_ranges(self.covered(symbol, timeframe), start_ns, end_ns))
+            if gaps:
+                groups.setdefault(gaps, []).append(symbol)
+        return groups
+
+    def _fetch(self, groups: Dict[Tuple[Range, ...], List[str]], timeframe: str) -> List[Tuple[str, Range, Optional[dict]]]:
+        """Download the gaps into new segment files; (symbol, newly covered range, segment) per symbol and gap"""
+        # The most recent bar may still be forming; never mark it as covered
+        settled_ns = to_ns(datetime.now(timezone.utc)) - int(timeframe_delta(timeframe).total_seconds() * 1e9)
+
+        fetched = []
+        for gaps, group in groups.items():
+            for lo, hi in gaps:
+                df = fetch_bars(
+                    self.client, group, timeframe,
+                    pd.Timestamp(lo, unit="ns", tz="UTC").to_pydatetime(),
+                    pd.Timestamp(hi, unit="ns", tz="UTC").to_pydatetime(),
+                )
+                bars = {}
+                if not df.empty and isinstance(df.index, pd.MultiIndex):
+                    bars = {symbol: frame_to_records(sub.droplevel(0)) for symbol, sub in df.groupby(level=0)}
+                for symbol in group:
+                    segment = self._write_segment(symbol, timeframe, bars[symbol]) if symbol in bars else None
+                    fetched.append((symbol, (lo, min(hi, settled_ns)), segment))
+        return fetched
+
+    def _write_segment(self, symbol: str, timeframe: str, bars: np.ndarray) -> Optional[dict]:
+        """Write bars to a new file of their own; existing segments are never rewritten here"""
+        bars = merge_bars(np.empty(0, dtype=BAR_DTYPE), bars)  # sorted, no duplicates
+        if len(bars) == 0:
+            return None
+        name = os.path.join(timeframe, symbol.replace("/", "_"), f"{uuid.uuid4().hex}.npy")
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, bars)
+        os.replace(tmp, path)
+        ts = bars["timestamp"]
+        return {"file": name, "lo": int(ts[0]), "hi": int(ts[-1]), "nbytes": int(bars.nbytes)}
+
+    def _commit(self, symbol: str, timeframe: str, covered: Range, segment: Optional[dict]):
+        key = self._key(symbol, timeframe)
+        entry = self._entries.setdefault(key, {"ranges": [], "segments": [], "last_access": time.time()})
+        if segment is not None:
+            entry["segments"].append(segment)
+        if covered[1] > covered[0]:
+            entry["ranges"] = [list(r) for r in merge_ranges(self.covered(symbol, timeframe), covered)]
+        if len(entry["segments"]) > self.MAX_SEGMENTS:
+            self._compact(symbol, timeframe, entry)
+
+    def _compact(self, symbol: str, timeframe: str, entry: dict):
+        old = entry["segments"]
+        merged = self._read(entry, np.iinfo(np.int64).min, np.iinfo(np.int64).max)
+        segment = self._write_segment(symbol, timeframe, merged)
+        entry["segments"] = [segment] if segment is not None else []
+        self._remove(old)
+
+    def _prune(self, keys: List[str]) -> bool:
+        """Forget segments whose file is gone, and the time spans they covered; True if any were"""
+        pruned = False
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            for seg in [s for s in entry["segments"] if not os.path.exists(os.path.join(self.root, s["file"]))]:
+                entry["segments"].remove(seg)
+                entry["ranges"] = [list(r) for r in subtract_range([tuple(r) for r in entry["ranges"]],
+                                                                   (seg["lo"], seg["hi"]))]
+                pruned = True
+        return pruned
+
+    def _read(self, entry: Optional[dict], start_ns: int, end_ns: int) -> np.ndarray:
+        # Later segments win on duplicate timestamps, like merge_bars
+        out = np.empty(0, dtype=BAR_DTYPE)
+        for seg in entry["segments"] if entry else []:
+            if seg["hi"] < start_ns or seg["lo"] > end_ns:
+                continue
+            arr = np.load(os.path.join(self.root, seg["file"]), mmap_mode="r")
+            ts = arr["timestamp"]
+            lo = np.searchsorted(ts, start_ns, side="left")
+            hi = np.searchsorted(ts, end_ns, side="right")
+            out = merge_bars(out, np.array(arr[lo:hi]))
+            del arr
+        return out
+
+    def _evict(self):
+        # Bars just requested are already read, so even their entries go if the bound needs it
+        total = self.total_bytes()
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= _nbytes(self._entries[key])
+            self._drop(key)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._remove(entry["segments"])
+
+    def _remove(self, segments: List[dict]):
+        for seg in segments:
+            path = os.path.join(self.root, seg["file"])
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _key(self, symbol: str, timeframe: str) -> str:
+        return f"{symbol}|{timeframe}"
+
+    def _load_index(self) -> Dict[str, dict]:
+        path = os.path.join(self.root, self.INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f).get("entries", {})
+
+    def _save_index(self):
+        path = os.path.join(self.root, self.INDEX_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": 2, "entries": self._entries}, f)
+        os.replace(tmp, path)
+
+# -------- Process-wide cache --------
+
+_default_cache: Optional[BarCache] = None
+
+def default_cache() -> Optional[BarCache]:
+    """Cache used by data_api.get_bars; enabled by setting BAR_CACHE_DIR"""
+    global _default_cache
+    if _default_cache is None:
+        root = os.getenv("BAR_CACHE_DIR")
+        if root:
+            max_mb = float(os.getenv("BAR_CACHE_MAX_MB", "512"))
+            _default_cache = BarCache(root, max_bytes=int(max_mb * 1024 * 1024))
+    return _default_cache
+
+def set_default_cache(cache: Optional[BarCache]):
+    global _default_cache
+    _default_cache = cache
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .clients import trading_client
+from .scheduler import ACCOUNT, request
+
+# Account and positions shared by every strategy in a trading cycle.
+#
+# Each is fetched at most once per `ttl` seconds (one get_account, one
+# all-positions call) no matter how many pairs ask for it; concurrent callers
+# wait for the one request in flight instead of issuing their own. Our own
+# orders call invalidate(), so the next read after a fill sees fresh state.
+
+BROKER_STATE_TTL = float(os.getenv("BROKER_STATE_TTL", "5"))
+
+class _Cached:
+    __slots__ = ("value", "fetched_at", "client", "lock")
+
+    def __init__(self):
+        self.value = None
+        self.fetched_at = None
+        self.client = None  # client the value came from; a different one means refetch
+        self.lock = threading.Lock()
+
+def _position_row(p) -> dict:
+    # Same shape as orders.list_positions()
+    return {
+        "symbol": p.symbol,
+        "qty": str(p.qty),
+        "avg_entry": str(getattr(p, "avg_entry_price", "")),
+        "market_value": str(getattr(p, "market_value", "")),
+        "unrealized_pl": str(getattr(p, "unrealized_pl", "")),
+    }
+
+class BrokerState:
+    """TTL-cached account and positions snapshot.
+
+    client is an alpaca-py TradingClient (or SimulatedBroker) or a legacy
+    alpaca_trade_api REST client; None resolves clients.trading_client() on
+    every refresh, so swapping the trading backend is picked up.
+    """
+
+    def __init__(self, client=None, ttl: float = BROKER_STATE_TTL, clock=time.monotonic):
+        self.client = client
+        self.ttl = ttl
+        self.clock = clock
+        self.fetches = {"account": 0, "positions": 0}
+        self._account = _Cached()
+        self._positions = _Cached()
+
+    def _client(self):
+        return self.client if self.client is not None else trading_client()
+
+    def _get(self, entry: _Cached, kind: str, fetch):
+        client = self._client()
+        with entry.lock:
+            now = self.clock()
+            stale = (entry.fetched_at is None or entry.client is not client
+                     or now - entry.fetched_at >= self.ttl)
+            if stale:
+                entry.value = fetch(client)
+                entry.fetched_at, entry.client = self.clock(), client
+                self.fetches[kind] += 1
+            return entry.value
+
+    # -------- Reads --------
+
+    def account(self):
+        return self._get(self._account, "account", lambda c: request(c, "get_account", priority=ACCOUNT))
+
+    def equity(self) -> float:
+        return float(self.account().equity)
+
+    def _position_map(self) -> Dict[str, object]:
+        def fetch(client):
+            if hasattr(client, "get_all_positions"):
+                raw = request(client, "get_all_positions", priority=ACCOUNT)
+            else:
+                raw = request(client, "list_positions", priority=ACCOUNT)  # alpaca_trade_api REST
+            return {p.symbol.upper(): p for p in raw}
+        return self._get(self._positions, "positions", fetch)
+
+    def positions(self) -> List[dict]:
+        return [_position_row(p) for p in self._position_map().values()]
+
+    def position(self, symbol: str):
+        """Broker position object for `symbol`, or None if flat"""
+        return self._position_map().get(symbol.upper())
+
+    def position_qty(self, symbol: str) -> float:
+        """Signed quantity held in `symbol` (0 if flat)"""
+        p = self.position(symbol)
+        return float(p.qty) if p is not None else 0.0
+
+    # -------- Invalidation --------
+
+    def invalidate(self):
+        """Drop both snapshots; the next read fetches again"""
+        for entry in (self._account, self._positions):
+            with entry.lock:
+                entry.fetched_at = None
+
+    def on_trade_update(self, update):
+        """Trading-stream handler: fills change cash and positions"""
+        event = str(getattr(update, "event", "")).lower()
+        if event.endswith("fill"):  # fill, partial_fill
+            self.invalidate()
+
+_shared: Optional[BrokerState] = None
+
+def shared() -> BrokerState:
+    """Process-wide BrokerState over clients.trading_client()"""
+    global _shared
+    if _shared is None:
+        _shared = BrokerState()
+    return _shared
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+# Crash-safe snapshots of runner state for fast warm restarts.
+#
+# A checkpoint is one small JSON file holding the strategy's position and
+# entry details, its optimized parameters, the spread model and rolling
+# statistics, and (for PairsRunner) the closes held between cycles. Writes
+# go to a temporary file that is fsynced and renamed over the old one, so a
+# crash mid-write leaves the previous checkpoint intact.
+#
+# On restart a runner loads the checkpoint instead of re-downloading and
+# re-fitting, then reconciles the position with what the broker holds: the
+# broker is the source of truth whenever the two disagree.
+
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH")
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "60"))  # seconds between periodic saves
+CHECKPOINT_MAX_AGE = float(os.getenv("CHECKPOINT_MAX_AGE", str(24 * 3600)))  # older checkpoints are ignored
+
+VERSION = 1
+
+def timestamp(dt) -> Optional[str]:
+    return dt.isoformat() if dt is not None else None
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def save(path: str, state: dict):
+    """Atomically replace the checkpoint at `path`"""
+    payload = {"version": VERSION, "saved_at": time.time(), **state}
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def load(path: Optional[str], max_age: Optional[float] = CHECKPOINT_MAX_AGE) -> Optional[dict]:
+    """Checkpoint at `path`, or None if missing, unreadable or older than max_age seconds"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+    if state.get("version") != VERSION:
+        logging.warning(f"Ignoring checkpoint {path} with version {state.get('version')}")
+        return None
+    if max_age is not None and age(state) > max_age:
+        logging.info(f"Ignoring checkpoint {path} saved {age(state):.0f}s ago")
+        return None
+    return state
+
+def age(state: dict) -> float:
+    """Seconds since the checkpoint was written"""
+    return time.time() - state.get("saved_at", 0.0)
+
+def reconcile_position(position: int, qty1: float, qty2: float) -> int:
+    """Pair position to resume with, given the checkpoint's and the broker's legs.
+
+    qty1/qty2 are the signed quantities held in the first and second leg. A
+    flat account means flat; a full pair (legs on opposite sides) decides
+    the direction. Anything else (one leg left over, both legs on one side)
+    can't be read as a pair position, so the checkpoint's position stands.
+    """
+    if qty1 == 0 and qty2 == 0:
+        return 0
+    if qty1 > 0 > qty2:
+        return 1
+    if qty1 < 0 < qty2:
+        return -1
+    return position
+
+class Checkpointer:
+    """Saves a runner's state at most every `interval` seconds, or immediately when forced"""
+
+    def __init__(self, path: str, interval: float = CHECKPOINT_INTERVAL, clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.interval = interval
+        self.clock = clock
+        self.saves = 0
+        self._last: Optional[float] = None
+
+    def load(self, max_age: Optional[float] = CHECKPOINT_MAX_AGE) -> Optional[dict]:
+        return load(self.path, max_age)
+
+    def maybe_save(self, state_fn: Callable[[], dict], force: bool = False) -> bool:
+        """Save state_fn() if forced or due; failures are logged, never raised into the trading loop"""
+        now = self.clock()
+        if not force and self._last is not None and now - self._last < self.interval:
+            return False
+        try:
+            save(self.path, state_fn())
+        except Exception as e:
+            logging.error(f"Checkpoint save to {self.path} failed: {e}")
+            return False
+        self._last = now
+        self.saves += 1
+        return True
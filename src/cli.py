@@ -16,12 +16,13 @@ from .orders import (
 from .data_api import get_bars, latest, snapshots, save_bars_csv
 
 # Optional: streaming (bars/quotes/trades)
-from .clients import data_stream
+from .clients import data_stream, use_simulated_broker
 from alpaca.data.models import Bar, Quote, Trade
 
 
 def main():
     p = argparse.ArgumentParser(description="alpaca-py paper trading helper")
+    p.add_argument("--sim", action="store_true", help="trade against the in-process simulated broker")
     sub = p.add_subparsers(dest="cmd", required=True)
 
     sub.add_parser("account")
@@ -74,6 +75,8 @@ def main():
     st.add_argument("--channels", nargs="+", default=["bars"], choices=["bars","quotes","trades"])
 
     args = p.parse_args()
+    if args.sim:
+        use_simulated_broker()
 
     if args.cmd == "account":
         print(account_summary()); return
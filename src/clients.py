@@ -1,9 +1,12 @@
+import atexit
 import os
 from dataclasses import dataclass
 from typing import Optional
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 from alpaca.trading.client import TradingClient
+from alpaca.trading.stream import TradingStream
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.live import StockDataStream
 
@@ -23,10 +26,34 @@ class Settings:
             raise RuntimeError("Missing APCA_API_KEY_ID/APCA_API_SECRET_KEY in .env")
         return Settings(key, sec, True)
 
+# "alpaca" (default) or "sim" for the in-process SimulatedBroker
+TRADING_BACKEND = os.getenv("TRADING_BACKEND", "alpaca").lower()
+SIM_CASH = float(os.getenv("SIM_CASH", "100000"))
+
+# Record live market data to this file, or serve it back instead of Alpaca
+DATA_RECORD_PATH = os.getenv("DATA_RECORD_PATH")
+DATA_REPLAY_PATH = os.getenv("DATA_REPLAY_PATH")
+DATA_REPLAY_SPEED = float(os.getenv("DATA_REPLAY_SPEED", "0")) or None  # 0/unset: as fast as possible
+
+# Keep enough pooled connections for concurrent calls from the async facade
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+def _pool_connections(client):
+    session = getattr(client, "_session", None)
+    if session is not None:
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+    # 429s surface immediately; scheduler.py retries them with backoff shared by all callers
+    if hasattr(client, "_retry_codes"):
+        client._retry_codes = []
+    return client
+
 _settings: Optional[Settings] = None
 _trading_client: Optional[TradingClient] = None
 _data_client: Optional[StockHistoricalDataClient] = None
 _stream: Optional[StockDataStream] = None
+_trading_stream: Optional[TradingStream] = None
+_recording = None
 
 def settings() -> Settings:
     global _settings
@@ -36,22 +63,125 @@ def settings() -> Settings:
 
 def trading_client() -> TradingClient:
     global _trading_client
+    if _trading_client is None and TRADING_BACKEND == "sim":
+        use_simulated_broker()
     if _trading_client is None:
         s = settings()
         # paper=True ensures paper endpoint is used
-        _trading_client = TradingClient(api_key=s.key_id, secret_key=s.secret_key, paper=s.paper)
+        _trading_client = _pool_connections(TradingClient(api_key=s.key_id, secret_key=s.secret_key, paper=s.paper))
     return _trading_client
 
 def data_client() -> StockHistoricalDataClient:
     global _data_client
     if _data_client is None:
+        if DATA_REPLAY_PATH:
+            from .replay import ReplayDataClient
+            _data_client = ReplayDataClient(recording())
+            return _data_client
         s = settings()
-        _data_client = StockHistoricalDataClient(api_key=s.key_id, secret_key=s.secret_key)
+        _data_client = _pool_connections(StockHistoricalDataClient(api_key=s.key_id, secret_key=s.secret_key))
+        if DATA_RECORD_PATH:
+            from .replay import RecordingDataClient
+            _data_client = RecordingDataClient(_data_client, recording())
     return _data_client
 
 def data_stream() -> StockDataStream:
     global _stream
     if _stream is None:
+        if DATA_REPLAY_PATH:
+            from .replay import replay_stream
+            _stream = replay_stream(recording(), DATA_REPLAY_SPEED)
+            return _stream
         s = settings()
         _stream = StockDataStream(api_key=s.key_id, secret_key=s.secret_key)
-    return _stream
\ No newline at end of file
+        if DATA_RECORD_PATH:
+            from .replay import RecordingStream
+            _stream = RecordingStream(_stream, recording())
+    return _stream
+
+def trading_stream() -> TradingStream:
+    """Trade updates (order status changes and fills) for the trading client's account"""
+    global _trading_stream
+    client = trading_client()
+    if hasattr(client, "trading_stream"):
+        return client.trading_stream  # SimulatedBroker publishes its own
+    if _trading_stream is None:
+        s = settings()
+        _trading_stream = TradingStream(api_key=s.key_id, secret_key=s.secret_key, paper=s.paper)
+    return _trading_stream
+
+def recording():
+    """The session's Recording: loaded from DATA_REPLAY_PATH, or saved to DATA_RECORD_PATH at exit"""
+    global _recording
+    if _recording is None:
+        from .replay import Recording
+        if DATA_REPLAY_PATH:
+            _recording = Recording.load(DATA_REPLAY_PATH)
+        else:
+            _recording = Recording()
+            if DATA_RECORD_PATH:
+                atexit.register(_recording.save, DATA_RECORD_PATH)
+    return _recording
+
+def set_data_client(client):
+    """Route every market-data call (data_api, bar cache, loaders) to `client`"""
+    global _data_client
+    _data_client = client
+    return client
+
+def set_data_stream(stream):
+    """Use `stream` wherever data_stream() is called (e.g. a ReplayStream)"""
+    global _stream
+    _stream = stream
+    return stream
+
+def set_trading_stream(stream):
+    """Use `stream` for trade updates (when the trading client doesn't provide one)"""
+    global _trading_stream
+    _trading_stream = stream
+    return stream
+
+def set_trading_client(client):
+    """Route every trading call (orders, runners, async_api) to `client`"""
+    global _trading_client
+    _trading_client = client
+    return client
+
+class LegacyTradingClient:
+    """The TradingClient calls orders.py makes, served by an alpaca_trade_api REST client (newtester.py)"""
+
+    def __init__(self, api):
+        self._client = api  # scheduler.is_remote() finds the Alpaca client behind the wrapper
+
+    def submit_order(self, order_data):
+        qty = order_data.qty
+        if qty is not None and float(qty).is_integer():
+            qty = int(qty)  # the request model keeps floats; whole shares go out as integers
+        optional = {"qty": qty, "notional": order_data.notional, "client_order_id": order_data.client_order_id,
+                    "limit_price": getattr(order_data, "limit_price", None)}
+        return self._client.submit_order(symbol=order_data.symbol, side=order_data.side.value,
+                                         type=order_data.type.value, time_in_force=order_data.time_in_force.value,
+                                         **{k: v for k, v in optional.items() if v is not None})
+
+    def get_order_by_client_id(self, client_id: str):
+        return self._client.get_order_by_client_order_id(client_id)
+
+    def cancel_order_by_id(self, order_id: str):
+        return self._client.cancel_order(order_id)
+
+def _latest_trade_price(symbol: str) -> float:
+    from .data_api import latest
+    return float(latest(symbol)["trade"].price)
+
+def use_simulated_broker(**kwargs):
+    """Install a SimulatedBroker as the trading client and return it.
+
+    Unless prices/price_source are given, fills are priced off the latest
+    trade from the data client.
+    """
+    from .sim_broker import SimulatedBroker
+
+    kwargs.setdefault("cash", SIM_CASH)
+    if "prices" not in kwargs:
+        kwargs.setdefault("price_source", _latest_trade_price)
+    return set_trading_client(SimulatedBroker(**kwargs))
@@ -0,0 +1,369 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .price_store import PriceStore, as_store, attach_worker, worker_store
+
+# Engle-Granger pair screening over a universe price matrix.
+#
+# For every candidate pair (y, x) the cointegrating regression
+#     y_t = a + b * x_t + e_t
+# is fitted by OLS, then an ADF regression without constant is run on the
+# residuals:
+#     de_t = g * e_{t-1} + sum_k phi_k * de_{t-k} + u_t
+# and the t-statistic of g is compared with MacKinnon's Engle-Granger critical
+# values. Each leg is regressed against all of its partners with a single
+# lstsq call, and the ADF regressions for those partners are solved as one
+# stacked batch, so the per-pair Python overhead is close to zero. Pool
+# workers read the price matrix from a shared PriceStore.
+#
+# Missing bars are masked, not dropped: each pair is fitted on the rows both
+# legs have, its residuals are packed to the top of their column and the ADF
+# sums skip the padding, so ragged gaps still take one batched solve per leg.
+# Partners are solved in blocks of at most BLOCK_BYTES of prices, and the ADF
+# regressors are read as shifted views rather than stacked copies, so minute
+# histories don't multiply memory by the lag count.
+
+BLOCK_BYTES = 64 << 20  # working set of one batched solve
+
+# MacKinnon (2010), Table 3, constant, N=2 variables: cv = b0 + b1/T + b2/T^2
+EG_CRITICAL_VALUES = {
+    0.01: (-3.89644, -10.9519, -33.527),
+    0.05: (-3.33613, -6.1101, -6.823),
+    0.10: (-3.04445, -4.2412, -2.720),
+}
+
+RESULT_COLUMNS = [
+    "stock1", "stock2", "hedge_ratio", "intercept", "adf_stat", "crit_value",
+    "cointegrated", "half_life", "corr", "nobs",
+]
+
+def critical_value(nobs: int, significance: float = 0.05) -> float:
+    """Engle-Granger ADF critical value for two series at the given level"""
+    if significance not in EG_CRITICAL_VALUES:
+        raise ValueError(f"significance must be one of {sorted(EG_CRITICAL_VALUES)}")
+    b0, b1, b2 = EG_CRITICAL_VALUES[significance]
+    return b0 + b1 / nobs + b2 / nobs ** 2
+
+# -------- Batched regressions --------
+
+def hedge_ratios(x: np.ndarray, ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Regress every column of ys (T, m) on [1, x] with one lstsq call.
+
+    Returns (hedge_ratio, intercept, residuals) with residuals shaped (T, m).
+    Rows where x or a column of ys is NaN are left out of that column's fit
+    and get a NaN residual.
+    """
+    x = np.asarray(x, dtype=float)
+    ys = np.asarray(ys, dtype=float).reshape(len(x), -1)
+    valid = np.isfinite(ys) & np.isfinite(x)[:, None]
+    if valid.all():
+        design = np.column_stack([np.ones_like(x), x])
+        coef, _, _, _ = np.linalg.lstsq(design, ys, rcond=None)
+        residuals = ys - design @ coef
+        return coef[1], coef[0], residuals
+
+    # Closed-form OLS per column over its own rows, all columns at once
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = valid.sum(axis=0)
+        x0 = np.where(np.isfinite(x), x, 0.0)
+        mx = (x0 @ valid) / n
+        my = np.where(valid, ys, 0.0).sum(axis=0) / n
+        dx = np.where(valid, x0[:, None] - mx, 0.0)
+        dy = np.where(valid, ys - my, 0.0)
+        ratio = np.einsum("tm,tm->m", dx, dy) / np.einsum("tm,tm->m", dx, dx)
+        intercept = my - ratio * mx
+    residuals = np.where(valid, ys - intercept - ratio * x[:, None], np.nan)
+    return ratio, intercept, residuals
+
+def _pack(residuals: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Move each column's non-NaN rows to the top, zero below: (packed, counts), counts None if no gaps"""
+    gaps = np.isnan(residuals)
+    if not gaps.any():
+        return residuals, None
+    counts = len(gaps) - gaps.sum(axis=0)
+    packed = np.take_along_axis(residuals, np.argsort(gaps, axis=0, kind="stable"), axis=0)
+    packed[np.arange(len(gaps))[:, None] >= counts] = 0.0
+    return packed, counts
+
+def _dot(a: np.ndarray, b: np.ndarray, w: Optional[np.ndarray]) -> np.ndarray:
+    """Column-wise (weighted) dot products of two (T, m) arrays without temporaries"""
+    return np.einsum("tm,tm->m", a, b) if w is None else np.einsum("tm,tm,tm->m", a, b, w)
+
+def _row_weights(n_rows: int, counts: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    return None if counts is None else (np.arange(n_rows)[:, None] < counts).astype(float)
+
+def adf_stats(residuals: np.ndarray, lags: int = 1, counts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Union[int, np.ndarray]]:
+    """ADF t-statistics (no constant) for every residual column of (T, m).
+
+    Returns (stats, nobs) where nobs is the number of rows in the ADF
+    regression. counts gives each column's length when columns are packed
+    (only the first counts[c] rows of column c are used); nobs is then per
+    column. Flat or too-short columns give NaN.
+    """
+    e = np.asarray(residuals, dtype=float)
+    if e.ndim == 1:
+        e = e[:, None]
+    de = np.diff(e, axis=0)
+    rows = len(de) - lags
+    k = lags + 1
+    m = e.shape[1]
+    nobs = rows if counts is None else np.maximum(np.asarray(counts) - 1 - lags, 0)
+    if rows <= k:
+        return np.full(m, np.nan), (max(rows, 0) if counts is None else np.zeros(m, dtype=np.int64))
+
+    # Regressors e_{t-1}, de_{t-1}, ..., de_{t-lags} as shifted views, never stacked
+    z = [e[lags:-1]] + [de[lags - i:len(de) - i] for i in range(1, k)]
+    target = de[lags:]
+    w = _row_weights(rows, nobs if counts is not None else None)
+
+    ztz = np.empty((m, k, k))
+    for i in range(k):
+        for j in range(i, k):
+            ztz[:, i, j] = ztz[:, j, i] = _dot(z[i], z[j], w)
+    zty = np.column_stack([_dot(zi, target, w) for zi in z])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        try:
+            inv = np.linalg.inv(ztz)
+        except np.linalg.LinAlgError:
+            inv = np.linalg.pinv(ztz)
+        coef = np.einsum("mij,mj->mi", inv, zty)
+        resid = target.copy()
+        for i, zi in enumerate(z):
+            resid -= zi * coef[:, i]
+        s2 = _dot(resid, resid, w) / (nobs - k)
+        stats = coef[:, 0] / np.sqrt(s2 * inv[:, 0, 0])
+    stats[~np.isfinite(stats) | (nobs <= k)] = np.nan
+    return stats, nobs
+
+def half_lives(residuals: np.ndarray, counts: Optional[np.ndarray] = None) -> np.ndarray:
+    """Mean-reversion half-life in bars from de_t = c + lam * e_{t-1}; inf if lam >= 0.
+
+    counts limits packed columns to their first counts[c] rows, as in adf_stats.
+    """
+    e = np.asarray(residuals, dtype=float)
+    if e.ndim == 1:
+        e = e[:, None]
+    lagged, de = e[:-1], np.diff(e, axis=0)
+    w = _row_weights(len(de), None if counts is None else np.asarray(counts) - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if w is None:
+            lagged = lagged - lagged.mean(axis=0)
+            de = de - de.mean(axis=0)
+        else:
+            n = w.sum(axis=0)
+            lagged = lagged - _dot(lagged, w, None) / n
+            de = de - _dot(de, w, None) / n
+        lam = _dot(lagged, de, w) / _dot(lagged, lagged, w)
+        hl = np.where(lam < 0, -math.log(2) / lam, np.inf)
+    hl[np.isnan(lam)] = np.nan
+    return hl
+
+def engle_granger(y: pd.Series, x: pd.Series, lags: int = 1, significance: float = 0.05) -> dict:
+    """Hedge ratio, ADF statistic and half-life for one pair (y regressed on x)"""
+    pair = pd.concat([y, x], axis=1, join="inner").dropna()
+    y, x = pair.iloc[:, 0], pair.iloc[:, 1]
+    ratio, intercept, resid = hedge_ratios(x.to_numpy(dtype=float), y.to_numpy(dtype=float))
+    stats, nobs = adf_stats(resid, lags)
+    crit = critical_value(nobs, significance) if nobs > 0 else math.nan
+    return {
+        "hedge_ratio": float(ratio[0]),
+        "intercept": float(intercept[0]),
+        "adf_stat": float(stats[0]),
+        "crit_value": crit,
+        "cointegrated": bool(stats[0] < crit),
+        "half_life": float(half_lives(resid)[0]),
+        "nobs": nobs,
+    }
+
+# -------- Candidate pairs --------
+
+def correlated_pairs(prices: np.ndarray, min_corr: Optional[float] = 0.8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Index pairs (i < j) whose price correlation is at least min_corr.
+
+    This prunes the O(N^2) pair space with a few matrix products before any
+    regressions run; min_corr=None keeps every pair.
+    """
+    n = prices.shape[1]
+    corr = correlations(prices)
+    i, j = np.triu_indices(n, k=1)
+    c = corr[i, j]
+    if min_corr is not None:
+        keep = c >= min_corr
+        i, j, c = i[keep], j[keep], c[keep]
+    return i, j, c
+
+def correlations(prices: np.ndarray) -> np.ndarray:
+    """Correlation matrix of the columns, each pair over the rows both have.
+
+    Accumulated over row blocks of at most BLOCK_BYTES, so a minute-bar
+    universe is never copied whole.
+    """
+    n_rows, n = prices.shape
+    step = max(1, BLOCK_BYTES // (8 * max(n, 1)))
+    blocks = [slice(s, s + step) for s in range(0, n_rows, step)]
+    count, total = np.zeros(n), np.zeros(n)
+    for rows in blocks:
+        ok = np.isfinite(prices[rows])
+        count += ok.sum(axis=0)
+        total += np.where(ok, prices[rows], 0.0).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        center = np.where(count > 0, total / count, 0.0)
+
+    # shared[i, j]: rows both have; sx[i, j] / sxx[i, j]: sum of x_i / x_i^2 over those rows
+    shared, sx, sxx, sxy = (np.zeros((n, n)) for _ in range(4))
+    for rows in blocks:
+        ok = np.isfinite(prices[rows])
+        d = np.where(ok, prices[rows] - center, 0.0)
+        if ok.all():
+            shared += len(d)
+            sx += d.sum(axis=0)[:, None]
+            sxx += np.einsum("tn,tn->n", d, d)[:, None]
+        else:
+            w = ok.astype(float)
+            shared += w.T @ w
+            sx += d.T @ w
+            sxx += (d * d).T @ w
+        sxy += d.T @ d
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = sxx - sx * sx / shared
+        return (sxy - sx * sx.T / shared) / np.sqrt(var * var.T)
+
+# -------- Screening --------
+
+_worker: Dict[str, np.ndarray] = {}
+
+def _init_worker(prices: np.ndarray):
+    _worker["prices"] = prices
+
+def _attach_worker(handle: dict):
+    """Pool initializer: map the shared price matrix once, not per task"""
+    attach_worker(handle)
+    _init_worker(worker_store().values)
+
+def _screen_leg(x_col: int, y_cols: np.ndarray, lags: int) -> Tuple[np.ndarray, ...]:
+    """All partners regressed on one x leg: ratios, intercepts, ADF stats, half-lives, ADF rows.
+
+    Each pair uses the bars where both legs have a price.
+    """
+    prices = _worker["prices"]
+    x = prices[:, x_col]
+    m = len(y_cols)
+    out = [np.empty(m) for _ in range(4)] + [np.empty(m, dtype=np.int64)]
+    step = max(1, BLOCK_BYTES // (8 * max(len(x), 1)))
+    for s in range(0, m, step):
+        ratio, intercept, resid = hedge_ratios(x, prices[:, y_cols[s:s + step]])
+        resid, counts = _pack(resid)
+        stats, nobs = adf_stats(resid, lags, counts)
+        for column, values in zip(out, (ratio, intercept, stats, half_lives(resid, counts), nobs)):
+            column[s:s + step] = values
+    return tuple(out)
+
+def _legs(i: np.ndarray, j: np.ndarray, both_directions: bool) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    """Group the ordered (y, x) regressions by x leg: [(x, ys, pair_ids)]"""
+    pair_ids = np.arange(len(i))
+    ys, xs, ids = [i], [j], [pair_ids]
+    if both_directions:
+        ys.append(j); xs.append(i); ids.append(pair_ids)
+    ys, xs, ids = np.concatenate(ys), np.concatenate(xs), np.concatenate(ids)
+    order = np.argsort(xs, kind="stable")
+    ys, xs, ids = ys[order], xs[order], ids[order]
+    starts = np.flatnonzero(np.r_[True, xs[1:] != xs[:-1]])
+    ends = np.r_[starts[1:], len(xs)]
+    return [(int(xs[s]), ys[s:e], ids[s:e]) for s, e in zip(starts, ends)]
+
+def screen_pairs(
+    prices: Union[pd.DataFrame, PriceStore],
+    min_corr: Optional[float] = 0.8,
+    lags: int = 1,
+    significance: float = 0.05,
+    max_half_life: Optional[float] = None,
+    both_directions: bool = True,
+    only_cointegrated: bool = False,
+    processes: Optional[int] = None,
+) -> pd.DataFrame:
+    """Engle-Granger test every candidate pair of a wide price matrix.
+
+    prices is timestamp x symbol (e.g. load_universe(...)["close"] or a
+    PriceStore), NaN where a symbol has no bar; each pair is tested on the
+    bars both legs have, as load_pair aligns them. With both_directions=True each pair is
+    regressed both ways and the direction with the more negative ADF
+    statistic is kept, so stock1 is the dependent leg: spread = stock1 -
+    hedge_ratio * stock2. Results are sorted by ADF statistic, most
+    cointegrated first. processes=1 runs in this process.
+    """
+    if isinstance(prices, PriceStore):
+        symbols, matrix = prices.symbols, prices.values  # screened in place
+    else:
+        symbols = [str(c) for c in prices.columns]
+        matrix = np.ascontiguousarray(prices.to_numpy(dtype=float))
+    i, j, corr = correlated_pairs(matrix, min_corr)
+    if len(i) == 0 or len(matrix) < lags + 4:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    legs = _legs(i, j, both_directions)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(legs) == 1:
+        _init_worker(matrix)
+        try:
+            results = [_screen_leg(x, ys, lags) for x, ys, _ in legs]
+        finally:
+            _worker.clear()
+    else:
+        with as_store(prices) as store, \
+                ProcessPoolExecutor(max_workers=processes, initializer=_attach_worker, initargs=(store.handle,)) as pool:
+            chunksize = max(1, len(legs) // (processes * 4))
+            results = list(pool.map(_screen_leg, [x for x, _, _ in legs], [ys for _, ys, _ in legs],
+                                    [lags] * len(legs), chunksize=chunksize))
+
+    # Scatter the per-leg results back to ordered rows, then keep one direction per pair
+    ys = np.concatenate([leg[1] for leg in legs])
+    xs = np.concatenate([np.full(len(leg[1]), leg[0]) for leg in legs])
+    ids = np.concatenate([leg[2] for leg in legs])
+    ratio, intercept, stats, hl, nobs = (np.concatenate(col) for col in zip(*results))
+
+    rank = np.where(np.isnan(stats), np.inf, stats)
+    order = np.lexsort((rank, ids))
+    first = order[np.r_[True, ids[order][1:] != ids[order][:-1]]]
+
+    nobs = nobs[first]
+    sizes, where = np.unique(nobs, return_inverse=True)
+    crit = np.array([critical_value(n, significance) if n > 0 else np.nan for n in sizes])[where.reshape(-1)]
+    df = pd.DataFrame({
+        "stock1": np.array(symbols, dtype=object)[ys[first]],
+        "stock2": np.array(symbols, dtype=object)[xs[first]],
+        "hedge_ratio": ratio[first],
+        "intercept": intercept[first],
+        "adf_stat": stats[first],
+        "crit_value": crit,
+        "cointegrated": stats[first] < crit,
+        "half_life": hl[first],
+        "corr": corr[ids[first]],
+        "nobs": nobs,
+    })
+    if only_cointegrated:
+        df = df[df["cointegrated"]]
+    if max_half_life is not None:
+        df = df[df["half_life"] <= max_half_life]
+    return df.sort_values("adf_stat", kind="stable", na_position="last").reset_index(drop=True)
+
+def screen_universe(
+    symbols: Iterable[str],
+    timeframe: str = "1D",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Load closes for a universe in batched requests and screen every pair"""
+    from .market_data import load_universe
+    from .scheduler import RESEARCH, priority
+
+    # Research downloads yield the rate budget to live trading
+    with priority(RESEARCH):
+        closes = load_universe(symbols, timeframe, start, end, fields=("close",))["close"]
+    return screen_pairs(closes, **kwargs)
@@ -14,6 +14,7 @@ from alpaca.data.requests import (
 from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
 
 from .clients import data_client
+from .scheduler import request
 
 # -------- Timeframe helpers --------
 
@@ -42,42 +43,69 @@ def parse_timeframe(s: str) -> TimeFrame:
         return aliases[key]
     raise ValueError(f"Unrecognized timeframe '{s}'. Try 1Min, 5Min, 30Min, 1H, 1D, etc.")
 
+def timeframe_delta(timeframe: str) -> timedelta:
+    """Wall-clock length of one bar of the given timeframe"""
+    tf = parse_timeframe(timeframe)
+    unit = tf.unit
+    if unit == TimeFrameUnit.Minute:
+        return timedelta(minutes=tf.amount)
+    if unit == TimeFrameUnit.Hour:
+        return timedelta(hours=tf.amount)
+    if unit == TimeFrameUnit.Day:
+        return timedelta(days=tf.amount)
+    if unit == TimeFrameUnit.Week:
+        return timedelta(weeks=tf.amount)
+    return timedelta(days=31 * tf.amount)
+
 # -------- Historical bars --------
 
-def get_bars(symbols: Iterable[str], timeframe: str, start: Optional[datetime] = None, end: Optional[datetime] = None, limit: Optional[int] = None) -> pd.DataFrame:
-    client = data_client()
-    tf = parse_timeframe(timeframe)
+def get_bars(symbols: Iterable[str], timeframe: str, start: Optional[datetime] = None, end: Optional[datetime] = None, limit: Optional[int] = None, use_cache: bool = True) -> pd.DataFrame:
     if end is None:
         end = datetime.now(timezone.utc)
     if start is None:
         # default: last 7 days
         start = end - timedelta(days=7)
+    if use_cache and limit is None:
+        # Imported here: the cache module builds on the helpers above
+        from .bar_cache import default_cache
+        cache = default_cache()
+        if cache is not None:
+            return cache.get_bars(symbols, timeframe, start, end)
+    return fetch_bars(data_client(), symbols, timeframe, start, end, limit)
+
+def fetch_bars(client, symbols: Iterable[str], timeframe: str, start: datetime, end: datetime, limit: Optional[int] = None) -> pd.DataFrame:
+    """Request bars straight from a StockHistoricalDataClient (no caching)"""
     req = StockBarsRequest(
         symbol_or_symbols=[s.upper() for s in symbols],
-        timeframe=tf,
+        timeframe=parse_timeframe(timeframe),
         start=start,
         end=end,
         limit=limit,
     )
-    resp = client.get_stock_bars(req)
+    key = ("bars", tuple(req.symbol_or_symbols), timeframe, str(start), str(end), limit)
+    resp = request(client, "get_stock_bars", req, key=key)
     return resp.df  # MultiIndex [symbol, timestamp]
 
 # -------- Latest quote/trade --------
 
 def latest(symbol: str) -> dict:
     client = data_client()
-    q = client.get_stock_latest_quote(StockLatestQuoteRequest(symbol_or_symbols=symbol.upper()))
-    t = client.get_stock_latest_trade(StockLatestTradeRequest(symbol_or_symbols=symbol.upper()))
+    symbol = symbol.upper()
+    q = request(client, "get_stock_latest_quote", StockLatestQuoteRequest(symbol_or_symbols=symbol),
+                key=("latest_quote", symbol))
+    t = request(client, "get_stock_latest_trade", StockLatestTradeRequest(symbol_or_symbols=symbol),
+                key=("latest_trade", symbol))
     return {
-        "quote": q[symbol.upper()],
-        "trade": t[symbol.upper()],
+        "quote": q[symbol],
+        "trade": t[symbol],
     }
 
 # -------- Snapshots --------
 
 def snapshots(symbols: Iterable[str]):
-    client = data_client()
-    snaps = client.get_stock_snapshots(StockSnapshotRequest(symbol_or_symbols=[s.upper() for s in symbols]))
+    symbols = [s.upper() for s in symbols]
+    snaps = request(data_client(), "get_stock_snapshot", StockSnapshotRequest(symbol_or_symbols=symbols),
+                    key=("snapshot", tuple(symbols)))
     return snaps
 
 # -------- Convenience: save bars to CSV --------
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from . import async_api, metrics, order_book
+from .order_book import OrderBook, is_final, order_field, order_status
+
+# Two-leg order execution on top of orders.py.
+#
+# execute_pair() submits every leg at once and confirms each order from the
+# trade-updates stream (order_book.OrderBook) instead of polling get_order.
+# A leg that is rejected, cancelled or not filled within ORDER_FILL_TIMEOUT
+# gets its shortfall re-sent up to ORDER_RETRIES times. When the stream goes
+# quiet the order is cancelled and looked up by client_order_id first, so
+# only quantity the broker confirms unfilled is re-sent. If the pair still
+# isn't complete, whatever did fill is closed again, so a failed entry never
+# leaves one leg of the pair naked; a leg the broker can't confirm is left
+# alone and the execution reported "failed". Orders are tagged with their
+# owner, so the book knows exactly what each pair holds at exit time.
+#
+# Each execution reports its latency (first submit to last leg done) and
+# its naked-leg time (first leg done until the pair was complete or
+# unwound); both are exported as execution/latency and execution/naked.
+
+ORDER_FILL_TIMEOUT = float(os.getenv("ORDER_FILL_TIMEOUT", "10"))  # seconds to wait for a final status
+ORDER_RETRIES = int(os.getenv("ORDER_RETRIES", "1"))  # re-sends of a leg's unfilled quantity
+
+def new_client_order_id() -> str:
+    return f"pair-{uuid.uuid4().hex}"
+
+# -------- Pair execution --------
+
+@dataclass
+class LegFill:
+    symbol: str
+    side: str
+    qty: float
+    filled_qty: float = 0.0
+    avg_price: Optional[float] = None
+    order_ids: List[str] = field(default_factory=list)
+    error: Optional[Exception] = None
+    done_at: float = 0.0  # perf_counter time the leg stopped trading
+    unconfirmed: bool = False  # the broker's state of an order couldn't be confirmed; it may still fill
+
+    @property
+    def complete(self) -> bool:
+        return self.qty - self.filled_qty <= 1e-9
+
+    def add(self, order):
+        filled = float(order_field(order, "filled_qty") or 0)
+        price = order_field(order, "filled_avg_price")
+        if filled > 0 and price is not None:
+            total = self.filled_qty + filled
+            self.avg_price = float(price) if self.avg_price is None else (
+                (self.avg_price * self.filled_qty + float(price) * filled) / total)
+        self.filled_qty += filled
+
+@dataclass
+class PairExecution:
+    legs: List[LegFill]
+    unwinds: List[LegFill]
+    status: str  # "filled", "unwound" (flat again) or "failed" (legs left open)
+    latency: float
+    naked: float
+
+    @property
+    def filled(self) -> bool:
+        return self.status == "filled"
+
+def _qty(value: float):
+    return int(round(value)) if abs(value - round(value)) < 1e-9 else value
+
+async def _confirm(fill: LegFill, client_order_id: str, client=None, executor=None):
+    """The broker's own record of an order (None if it never accepted it); marks the leg unconfirmed on failure"""
+    try:
+        return await async_api.get_order_by_client_id(client_order_id, client=client, executor=executor)
+    except Exception as e:
+        fill.unconfirmed = True
+        fill.error = RuntimeError(f"can't confirm {fill.symbol} order {client_order_id}: {e}")
+        return None
+
+async def _fill_leg(leg: dict, book: OrderBook, owner: Optional[str], timeout: float, retries: int,
+                    client=None, executor=None) -> LegFill:
+    """Submit a leg and re-send its unfilled quantity until filled or out of retries.
+
+    Without a final trade update the order is cancelled and its state is read
+    back from the broker before anything is re-sent, so a fill the stream
+    missed is never traded twice. A leg whose state can't be confirmed stops
+    trading and is flagged unconfirmed.
+    """
+    fill = LegFill(leg["symbol"].upper(), leg["side"], float(leg["qty"]))
+    for _ in range(retries + 1):
+        if fill.complete or fill.unconfirmed:
+            break
+        client_order_id = new_client_order_id()
+        if owner is not None:
+            book.tag(client_order_id, owner)
+        try:
+            order = await async_api.place_market_order(fill.symbol, fill.side, qty=_qty(fill.qty - fill.filled_qty),
+                                                       client_order_id=client_order_id, client=client,
+                                                       executor=executor)
+            metrics.count_order(fill.side, True)
+        except Exception as e:
+            metrics.count_order(fill.side, False)
+            fill.error = e
+            # The request may have reached the broker even though it failed here
+            order = await _confirm(fill, client_order_id, client, executor)
+            if order is None:
+                continue
+        fill.order_ids.append(str(order.id))
+        final = await book.wait(client_order_id, timeout)
+        if final is None or not is_final(final):
+            # No final update in time: cancel, then take the broker's word for what filled
+            try:
+                await async_api.cancel_order(order.id, client=client, executor=executor)
+            except Exception as e:
+                logging.warning(f"Cancel of {fill.symbol} order {order.id} failed: {e}")
+            final = await book.wait(client_order_id, timeout)
+            if final is None or not is_final(final):
+                final = await _confirm(fill, client_order_id, client, executor) or final
+        book.forget(client_order_id)
+        if final is None:
+            fill.unconfirmed = True
+            fill.error = fill.error or TimeoutError(f"{fill.symbol} order {order.id} not found after submit")
+            break
+        fill.add(final)
+        if not is_final(final):
+            # Still working at the broker after the cancel: it may fill more, so stop here
+            fill.unconfirmed = True
+            status = order_status(final)
+            fill.error = RuntimeError(f"{fill.symbol} order {order.id} still "
+                                      f"{status.value if status else order_field(final, 'status')}")
+            break
+        if not fill.complete:
+            fill.error = RuntimeError(f"{fill.symbol} order {order_status(final).value}")
+    fill.done_at = time.perf_counter()
+    if fill.complete:
+        fill.error = None
+    return fill
+
+async def execute_pair(legs: List[dict], book: Optional[OrderBook] = None, owner: Optional[str] = None,
+                       timeout: float = ORDER_FILL_TIMEOUT, retries: int = ORDER_RETRIES,
+                       unwind: bool = True, client=None, executor=None) -> PairExecution:
+    """Fill all legs ({"symbol", "side", "qty"} dicts) together, or unwind the ones that filled.
+
+    Fills are credited to `owner` in the book. unwind=False (closing a pair)
+    leaves an incomplete execution as "failed" instead of re-opening legs.
+    Orders go to `client` (default: clients.trading_client()).
+    """
+    book = book or order_book.shared()
+    book.start()
+    started = time.perf_counter()
+    fills = list(await asyncio.gather(*(_fill_leg(leg, book, owner, timeout, retries, client, executor)
+                                        for leg in legs)))
+    unwinds: List[LegFill] = []
+    status = "filled"
+    unknown = [f for f in fills if f.unconfirmed]
+    if unknown:
+        # Unwinding a leg whose fills we can't see could leave the account more exposed, not less
+        status = "failed"
+        for f in unknown:
+            logging.error(f"{f.symbol} {f.side} state unknown (at least {f.filled_qty:g}/{f.qty:g} filled), "
+                          f"check the broker: {f.error}")
+    elif not all(f.complete for f in fills) and not unwind:
+        status = "failed"
+        for f in fills:
+            if not f.complete:
+                logging.error(f"{f.symbol} {f.side} filled {f.filled_qty:g}/{f.qty:g}: {f.error}")
+    elif not all(f.complete for f in fills):
+        opened = [{"symbol": f.symbol, "side": "buy" if f.side == "sell" else "sell", "qty": f.filled_qty}
+                  for f in fills if f.filled_qty > 0]
+        for f in fills:
+            if not f.complete:
+                logging.warning(f"{f.symbol} {f.side} filled {f.filled_qty:g}/{f.qty:g}: {f.error}")
+        unwinds = list(await asyncio.gather(*(_fill_leg(leg, book, owner, timeout, retries, client, executor)
+                                              for leg in opened)))
+        status = "unwound" if all(u.complete and not u.unconfirmed for u in unwinds) else "failed"
+        if status == "failed":
+            logging.error("Pair unwind incomplete, legs left open: " + ", ".join(
+                f"{u.symbol} {u.qty - u.filled_qty:g}" for u in unwinds if not u.complete))
+
+    done = max((f.done_at for f in fills + unwinds), default=started)
+    first = min((f.done_at for f in fills if f.filled_qty > 0), default=done)
+    result = PairExecution(fills, unwinds, status, latency=done - started, naked=done - first)
+    metrics.observe("execution", "latency", result.latency)
+    metrics.observe("execution", "naked", result.naked)
+    return result
@@ -0,0 +1,243 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+import pandas as pd
+
+# Append-only trade and fill journal in SQLite (WAL mode).
+#
+# record_trade()/record_fill() only put a row on a bounded queue; a writer
+# thread commits rows in batches, so the trading loop never waits on disk
+# and memory stays flat however long the process runs. Recording never
+# blocks, even from the event loop: a full queue means the disk is far
+# behind, and the row is dropped, counted in `dropped` and logged. Queries
+# run in SQL (summary() is one aggregate) and flush pending rows first.
+#
+# Times are stored as UTC epoch seconds; naive datetimes are taken to be
+# UTC already, like bar timestamps. The journal is trades.db in the
+# working directory (gitignored) unless JOURNAL_PATH says otherwise
+# (":memory:" keeps it for the process only).
+
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "trades.db")
+
+TRADE_COLUMNS = ("strategy", "entry_time", "exit_time", "position", "entry_spread", "exit_spread",
+                 "exit_type", "pnl", "hold_seconds")
+FILL_COLUMNS = ("time", "strategy", "symbol", "side", "qty", "price", "order_id")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    strategy TEXT NOT NULL,
+    entry_time REAL,
+    exit_time REAL NOT NULL,
+    position INTEGER,
+    entry_spread REAL,
+    exit_spread REAL,
+    exit_type TEXT,
+    pnl REAL,
+    hold_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS trades_strategy_exit ON trades (strategy, exit_time);
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    strategy TEXT,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    qty REAL NOT NULL,
+    price REAL,
+    order_id TEXT
+);
+CREATE INDEX IF NOT EXISTS fills_strategy_time ON fills (strategy, time);
+"""
+
+_INSERT = {
+    "trades": f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})",
+    "fills": f"INSERT INTO fills ({', '.join(FILL_COLUMNS)}) VALUES ({', '.join('?' * len(FILL_COLUMNS))})",
+}
+
+_STOP = object()
+
+def _epoch(dt) -> Optional[float]:
+    """Seconds since the epoch; naive datetimes are UTC"""
+    if dt is None:
+        return None
+    ts = pd.Timestamp(dt)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.timestamp()
+
+def _float(value) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+class TradeJournal:
+    def __init__(self, path: Optional[str] = None, batch_size: int = 512, flush_interval: float = 1.0,
+                 max_pending: int = 100_000):
+        self.path = path or JOURNAL_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db_lock = threading.Lock()
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._closed = False
+        self.dropped = 0  # rows lost to a full queue
+        self._writer = threading.Thread(target=self._write_loop, name="trade-journal", daemon=True)
+        self._writer.start()
+
+    # -------- Recording (hot path) --------
+
+    def record_trade(self, strategy: str, exit_time: datetime, entry_time: Optional[datetime] = None,
+                     position: Optional[int] = None, entry_spread: Optional[float] = None,
+                     exit_spread: Optional[float] = None, exit_type: str = "exit", pnl: Optional[float] = None):
+        """One completed round trip"""
+        entry, exit_ = _epoch(entry_time), _epoch(exit_time)
+        hold = exit_ - entry if entry is not None else None
+        self._put("trades", (strategy, entry, exit_, position, _float(entry_spread), _float(exit_spread),
+                             exit_type, _float(pnl), hold))
+
+    def record_fill(self, symbol: str, side: str, qty: float, price: Optional[float] = None,
+                    order_id: Optional[str] = None, strategy: Optional[str] = None,
+                    time: Optional[datetime] = None):
+        """One order execution (or submission at a reference price for market orders)"""
+        self._put("fills", (_epoch(time or datetime.now(timezone.utc)), strategy, symbol.upper(), str(side).lower(),
+                            float(qty), _float(price), None if order_id is None else str(order_id)))
+
+    def _put(self, table: str, row: tuple):
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logging.error(f"Trade journal: writer is behind, dropped {self.dropped} rows so far ({table})")
+
+    # -------- Writer --------
+
+    def _write_loop(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in batch if item is not _STOP]
+            try:
+                if rows:
+                    self._commit(rows)
+            except Exception as e:
+                logging.error(f"Trade journal: dropped {len(rows)} rows: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(rows) < len(batch):
+                return
+
+    def _commit(self, rows):
+        by_table = {}
+        for table, row in rows:
+            by_table.setdefault(table, []).append(row)
+        with self._db_lock:
+            self._db.execute("BEGIN")
+            try:
+                for table, table_rows in by_table.items():
+                    self._db.executemany(_INSERT[table], table_rows)
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def flush(self):
+        """Block until every recorded row is committed"""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._db_lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------- Queries --------
+
+    def _query(self, sql: str, params=()) -> pd.DataFrame:
+        self.flush()
+        with self._db_lock:
+            return pd.read_sql_query(sql, self._db, params=params)
+
+    @staticmethod
+    def _where(strategy: Optional[str], since: Optional[datetime], time_column: str):
+        clauses, params = [], []
+        if strategy is not None:
+            clauses.append("strategy = ?")
+            params.append(strategy)
+        if since is not None:
+            clauses.append(f"{time_column} >= ?")
+            params.append(_epoch(since))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def trades(self, strategy: Optional[str] = None, since: Optional[datetime] = None) -> pd.DataFrame:
+        where, params = self._where(strategy, since, "exit_time")
+        df = self._query(f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades{where} ORDER BY id", params)
+        for col in ("entry_time", "exit_time"):
+            df[col] = pd.to_datetime(df[col], unit="s", utc=True)
+        return df
+
+    def fills(self, strategy: Optional[str] = None, since: Optional[datetime] = None) -> pd.DataFrame:
+        where, params = self._where(strategy, since, "time")
+        df = self._query(f"SELECT {', '.join(FILL_COLUMNS)} FROM fills{where} ORDER BY id", params)
+        df["time"] = pd.to_datetime(df["time"], unit="s", utc=True)
+        return df
+
+    def summary(self, strategy: Optional[str] = None, since: Optional[datetime] = None) -> dict:
+        """Trade count, win rate, P&L and holding time, aggregated in SQL"""
+        where, params = self._where(strategy, since, "exit_time")
+        row = self._query(
+            "SELECT COUNT(*) AS trades, COALESCE(SUM(pnl > 0), 0) AS profitable, COUNT(pnl) AS with_pnl, "
+            f"COALESCE(SUM(pnl), 0.0) AS total_pnl, AVG(pnl) AS avg_pnl, AVG(hold_seconds) AS avg_hold_seconds "
+            f"FROM trades{where}", params,
+        ).iloc[0]
+        n, scored = int(row["trades"]), int(row["with_pnl"])
+        return {
+            "trades": n,
+            "profitable": int(row["profitable"]),
+            "win_rate": int(row["profitable"]) / scored if scored else 0.0,
+            "total_pnl": float(row["total_pnl"]),
+            "avg_pnl": float(row["avg_pnl"]) if scored else 0.0,
+            "avg_hold_seconds": float(row["avg_hold_seconds"]) if pd.notna(row["avg_hold_seconds"]) else 0.0,
+        }
+
+_shared: Optional[TradeJournal] = None
+_shared_lock = threading.Lock()
+
+def shared() -> TradeJournal:
+    """Process-wide journal at JOURNAL_PATH (flushed at exit)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = TradeJournal()
+            atexit.register(_shared.close)
+    return _shared
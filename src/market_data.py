@@ -0,0 +1,66 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .data_api import get_bars
+
+# -------- Universe loader --------
+
+def _unique_upper(symbols: Iterable[str]) -> List[str]:
+    seen = {}
+    for s in symbols:
+        seen.setdefault(s.upper(), None)
+    return list(seen)
+
+def load_universe(
+    symbols: Iterable[str],
+    timeframe: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Sequence[str] = ("close", "volume"),
+    batch_size: int = 200,
+    dropna: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """Fetch many symbols in batched requests as wide timestamp x symbol matrices.
+
+    Returns one DataFrame per field, all sharing the same index and column
+    order, with NaN where a symbol has no bar; align each pair on its own
+    (load_pair, PriceStore.pair, closes[[s1, s2]].dropna()). dropna=True keeps
+    only timestamps where every symbol traded, so one sparse symbol thins
+    every pair.
+    """
+    symbols = _unique_upper(symbols)
+    frames = []
+    for i in range(0, len(symbols), batch_size):
+        bars = get_bars(symbols[i:i + batch_size], timeframe, start, end)
+        if not bars.empty:
+            frames.append(bars)
+
+    if not frames:
+        empty = pd.DataFrame(columns=symbols, dtype=float)
+        return {field: empty.copy() for field in fields}
+
+    bars = pd.concat(frames) if len(frames) > 1 else frames[0]
+    wide = {
+        field: bars[field].unstack(level=0).reindex(columns=symbols)
+        for field in fields
+    }
+    if dropna:
+        complete = wide[fields[0]].notna().all(axis=1).to_numpy(copy=True)
+        for field in fields[1:]:
+            complete &= wide[field].notna().all(axis=1).to_numpy()
+        wide = {field: frame[complete] for field, frame in wide.items()}
+    return wide
+
+def load_pair(
+    stock1: str,
+    stock2: str,
+    timeframe: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Tuple[pd.Series, pd.Series]:
+    """Aligned close series for both legs of a pair from a single request"""
+    closes = load_universe([stock1, stock2], timeframe, start, end, fields=("close",), dropna=True)["close"]
+    return closes[stock1.upper()], closes[stock2.upper()]
@@ -0,0 +1,297 @@
+import atexit
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+
+# Stage timings and counters for the runners, exported in the Prometheus
+# text format over HTTP (METRICS_PORT) and/or to a file (METRICS_FILE).
+#
+#   with metrics.span("run_once", "fetch"):      # one timed stage
+#       ...
+#   timer = metrics.timeline("process_data")     # sequential stages
+#   timer.mark("prices"); ...; timer.mark("zscore")
+#
+# Durations land in pairs_stage_seconds{op, stage}; a stage that raises also
+# counts in pairs_stage_errors_total. Stages that wrap an Alpaca call (fetch,
+# account, submit, ...) are named separately from our own computation so a
+# slow cycle can be attributed. While disabled, span() returns a shared
+# no-op context manager and timeline() a no-op timer, so instrumented code
+# pays one function call per stage.
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) or None
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "15"))
+
+# Seconds; spans everything from an in-process signal update to a slow REST call
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# -------- Metric types --------
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+class Histogram:
+    """Bucketed observations per label set (cumulative buckets on render)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def total(self, *labels) -> float:
+        series = self._series.get(labels)
+        return series[1] if series else 0.0
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        lines = []
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {n}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self._metrics[name]
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "pairs_stage_seconds", "Wall time of one strategy stage", ("op", "stage")))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "pairs_stage_errors_total", "Stages that raised", ("op", "stage")))
+CYCLES = REGISTRY.register(Counter(
+    "pairs_cycles_total", "Strategy cycles by outcome", ("op", "outcome")))
+ORDERS = REGISTRY.register(Counter(
+    "pairs_orders_total", "Order submissions by side and outcome", ("side", "outcome")))
+
+# -------- Recording --------
+
+_enabled = bool(METRICS_PORT or METRICS_FILE or os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes"))
+_NOOP_SPAN = nullcontext()
+
+def enabled() -> bool:
+    return _enabled
+
+def enable(on: bool = True):
+    """Start (or stop, with on=False) recording spans and counters"""
+    global _enabled
+    _enabled = on
+
+class _Span:
+    __slots__ = ("key", "start")
+
+    def __init__(self, key: Tuple[str, str]):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, *self.key)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(*self.key)
+        return False
+
+def span(op: str, stage: str):
+    """Context manager timing one stage of `op` (a no-op while disabled)"""
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span((op, stage))
+
+class _Timeline:
+    __slots__ = ("op", "last")
+
+    def __init__(self, op: str):
+        self.op = op
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        """Record the time since the previous mark (or creation) as `stage`"""
+        now = time.perf_counter()
+        STAGE_SECONDS.observe(now - self.last, self.op, stage)
+        self.last = now
+
+class _NoopTimeline:
+    __slots__ = ()
+
+    def mark(self, stage: str):
+        pass
+
+_NOOP_TIMELINE = _NoopTimeline()
+
+def timeline(op: str):
+    """Timer for back-to-back stages of `op`; each mark() closes one stage"""
+    if not _enabled:
+        return _NOOP_TIMELINE
+    return _Timeline(op)
+
+def observe(op: str, stage: str, seconds: float):
+    """Record a duration measured outside a span (e.g. across several awaits)"""
+    if _enabled:
+        STAGE_SECONDS.observe(seconds, op, stage)
+
+def count_cycle(op: str, outcome: str):
+    if _enabled:
+        CYCLES.inc(op, outcome)
+
+def count_order(side: str, ok: bool):
+    if _enabled:
+        ORDERS.inc(side, "ok" if ok else "error")
+
+# -------- Export --------
+
+def render() -> str:
+    return REGISTRY.render()
+
+def write(path: str) -> str:
+    """Atomically write the current metrics to `path` (for node_exporter's textfile collector etc.)"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+    return path
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread and return the server"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_file_sink(path: str, interval: float = METRICS_FLUSH_SECONDS) -> threading.Event:
+    """Rewrite `path` every `interval` seconds and once more at exit; set the returned event to stop"""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            write(path)
+
+    threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+    atexit.register(write, path)
+    return stop
+
+_exporters_started = False
+
+def start_exporters():
+    """Start the sinks configured by METRICS_PORT / METRICS_FILE (idempotent)"""
+    global _exporters_started
+    if _exporters_started or not (METRICS_PORT or METRICS_FILE):
+        return
+    _exporters_started = True
+    enable()
+    if METRICS_PORT:
+        serve(METRICS_PORT)
+        print(f"📈 Metrics on http://localhost:{METRICS_PORT}/metrics")
+    if METRICS_FILE:
+        start_file_sink(METRICS_FILE)
+        print(f"📈 Metrics written to {METRICS_FILE}")
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from alpaca.trading.enums import OrderStatus
+
+from .clients import trading_stream
+
+# Local order and position book fed by the trading-updates stream.
+#
+# Every order update is applied as it arrives: the latest state of each order,
+# the account's position in each symbol, and the quantity each owner (a pair
+# such as "AAA/BBB") holds from the orders it tagged. Runners read positions
+# from here instead of asking the broker, so closing a pair is a dictionary
+# lookup and never sells positions that belong to something else.
+#
+# Orders are keyed by client_order_id, chosen before submitting, so an update
+# that arrives before submit_order returns isn't missed: the last
+# RECENT_ORDERS settled orders are kept for late wait() calls, while `orders`
+# only holds the ones still working. Updates may come from alpaca-py (order
+# objects) or alpaca_trade_api (order dicts) and are handled on the stream's
+# own thread.
+
+FINAL_STATUSES = {OrderStatus.FILLED, OrderStatus.CANCELED, OrderStatus.EXPIRED, OrderStatus.REJECTED,
+                  OrderStatus.DONE_FOR_DAY, OrderStatus.STOPPED, OrderStatus.SUSPENDED}
+
+def order_field(obj, name: str):
+    """A field of an alpaca-py order, or of an alpaca_trade_api order dict"""
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+def _text(value) -> str:
+    return str(getattr(value, "value", value))
+
+RECENT_ORDERS = 1000  # settled orders remembered for wait()
+
+def order_status(order) -> Optional[OrderStatus]:
+    try:
+        return OrderStatus(_text(order_field(order, "status")))
+    except ValueError:
+        return None  # a status this SDK version doesn't know
+
+def is_final(order) -> bool:
+    return order_status(order) in FINAL_STATUSES
+
+@dataclass
+class Holding:
+    qty: float  # signed: negative is short
+    avg_price: Optional[float] = None
+
+    def apply(self, qty: float, price: Optional[float]):
+        total = self.qty + qty
+        if self.qty == 0 or (total * self.qty < 0):
+            self.avg_price = price  # opened, or flipped to the other side
+        elif qty * self.qty > 0 and price is not None and self.avg_price is not None:
+            self.avg_price = (self.avg_price * self.qty + price * qty) / total
+        self.qty = total
+
+def _resolve(waiter: asyncio.Future, order):
+    if not waiter.done():
+        waiter.set_result(order)
+
+class OrderBook:
+    """Orders, positions and per-owner holdings kept current by trade updates.
+
+    start() subscribes to the book's stream (default clients.trading_stream(),
+    or e.g. newtester's alpaca_trade_api Stream) and runs it (stream.run())
+    on a daemon thread; wait() resolves as soon as an order's final update
+    arrives.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.orders: Dict[str, object] = {}  # working orders; settled ones move to _settled
+        self._settled: "OrderedDict[str, object]" = OrderedDict()
+        self.positions: Dict[str, float] = {}  # account-wide signed quantity per symbol
+        self._holdings: Dict[str, Dict[str, Holding]] = {}
+        self._owners: Dict[str, str] = {}  # client_order_id -> owner, until the order is final
+        self._filled: Dict[str, float] = {}  # client_order_id -> quantity already applied
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self._subscribed = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Make sure the stream is running and feeding this book"""
+        stream = self.stream or trading_stream()
+        with self._lock:
+            if self._subscribed is stream and self._thread is not None and self._thread.is_alive():
+                return
+            stream.subscribe_trade_updates(self.on_trade_update)
+            self._subscribed = stream
+            self._thread = threading.Thread(target=stream.run, name="trade-updates", daemon=True)
+            self._thread.start()
+
+    # -------- Updates --------
+
+    async def on_trade_update(self, update):
+        order = update.order
+        key = str(order_field(order, "client_order_id"))
+        status = order_status(order)
+        if status is None:
+            logging.warning(f"Ignoring trade update for order {key} with unknown status "
+                            f"{order_field(order, 'status')!r}")
+            return
+        final = status in FINAL_STATUSES
+        with self._lock:
+            self.orders[key] = order
+            filled = float(order_field(order, "filled_qty") or 0)
+            fill = filled - self._filled.get(key, 0.0)
+            if fill > 0:
+                self._filled[key] = filled
+                self._apply_fill(key, update, order, fill)
+            if final:
+                self._owners.pop(key, None)
+                self._filled.pop(key, None)
+                self._settle(key, self.orders.pop(key))
+            waiters = self._waiters.pop(key, []) if final else []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_resolve, waiter, order)
+
+    def _settle(self, key: str, order):
+        self._settled[key] = order
+        self._settled.move_to_end(key)
+        while len(self._settled) > RECENT_ORDERS:
+            self._settled.popitem(last=False)
+
+    def _order(self, client_order_id: str):
+        return self.orders.get(client_order_id) or self._settled.get(client_order_id)
+
+    def _apply_fill(self, key: str, update, order, fill: float):
+        symbol = str(order_field(order, "symbol")).upper()
+        qty = fill if _text(order_field(order, "side")).lower() == "buy" else -fill
+        position = getattr(update, "position_qty", None)
+        if position is not None:
+            self.positions[symbol] = float(position)  # the broker's figure after this fill
+        else:
+            self.positions[symbol] = self.positions.get(symbol, 0.0) + qty
+        owner = self._owners.get(key)
+        if owner is not None:
+            price = getattr(update, "price", None) or order_field(order, "filled_avg_price")
+            self._hold(owner, symbol, qty, float(price) if price is not None else None)
+
+    def _hold(self, owner: str, symbol: str, qty: float, price: Optional[float]):
+        held = self._holdings.setdefault(owner, {})
+        holding = held.setdefault(symbol, Holding(0.0))
+        holding.apply(qty, price)
+        if abs(holding.qty) < 1e-9:
+            del held[symbol]
+            if not held:
+                del self._holdings[owner]
+
+    # -------- Reads --------
+
+    def position(self, symbol: str) -> float:
+        """Signed quantity held in `symbol` according to the fills seen so far"""
+        return self.positions.get(symbol.upper(), 0.0)
+
+    def holdings(self, owner: str) -> Dict[str, Holding]:
+        """What `owner`'s orders have opened and not yet closed, by symbol"""
+        with self._lock:
+            return {s: Holding(h.qty, h.avg_price) for s, h in self._holdings.get(owner, {}).items()}
+
+    def set_holdings(self, owner: str, holdings: Dict[str, Holding]):
+        """Replace `owner`'s holdings, e.g. from a checkpoint or the broker after a restart"""
+        with self._lock:
+            held = {s.upper(): Holding(h.qty, h.avg_price) for s, h in holdings.items() if abs(h.qty) > 1e-9}
+            if held:
+                self._holdings[owner] = held
+            else:
+                self._holdings.pop(owner, None)
+
+    # -------- Orders --------
+
+    def tag(self, client_order_id: str, owner: str):
+        """Credit the fills of an order about to be submitted to `owner`"""
+        with self._lock:
+            self._owners[client_order_id] = owner
+
+    async def wait(self, client_order_id: str, timeout: float):
+        """The order once final, or its last known state (None if never seen) after `timeout`"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            order = self._order(client_order_id)
+            if order is not None and is_final(order):
+                return order
+            waiter = loop.create_future()
+            self._waiters.setdefault(client_order_id, []).append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return self._order(client_order_id)
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(client_order_id)
+                if waiters and waiter in waiters:
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._waiters[client_order_id]
+
+    def forget(self, client_order_id: str):
+        """Drop an order's state; late fills still reach its owner's holdings"""
+        with self._lock:
+            self.orders.pop(client_order_id, None)
+            self._settled.pop(client_order_id, None)
+
+_shared: Optional[OrderBook] = None
+
+def shared() -> OrderBook:
+    """Process-wide OrderBook over clients.trading_stream()"""
+    global _shared
+    if _shared is None:
+        _shared = OrderBook()
+    return _shared
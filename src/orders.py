@@ -11,12 +11,12 @@ from alpaca.trading.requests import (
 )
 
 from .clients import trading_client
+from .scheduler import ACCOUNT, ORDER, request
 
 # -------- Account & positions --------
 
 def account_summary() -> dict:
-    tc = trading_client()
-    acct = tc.get_account()
+    acct = request(trading_client(), "get_account", priority=ACCOUNT, key=("account",))
     return {
         "status": acct.status,
         "buying_power": str(acct.buying_power),
@@ -26,8 +26,7 @@ def account_summary() -> dict:
     }
 
 def list_positions() -> List[dict]:
-    tc = trading_client()
-    poss = tc.get_all_positions()
+    poss = request(trading_client(), "get_all_positions", priority=ACCOUNT, key=("positions",))
     return [
         {
             "symbol": p.symbol,
@@ -41,18 +40,20 @@ def list_positions() -> List[dict]:
 
 # -------- Orders --------
 
-def place_market_order(symbol: str, side: str, qty: Optional[Decimal] = None, notional: Optional[Decimal] = None, tif: str = "day"):
+def place_market_order(symbol: str, side: str, qty: Optional[Decimal] = None, notional: Optional[Decimal] = None, tif: str = "day",
+                       client_order_id: Optional[str] = None, client=None):
     if (qty is None) == (notional is None):
         raise ValueError("Provide exactly one of qty or notional for market order.")
-    tc = trading_client()
+    tc = client or trading_client()
     order = MarketOrderRequest(
         symbol=symbol.upper(),
         side=OrderSide.BUY if side.lower() == "buy" else OrderSide.SELL,
         time_in_force=TimeInForce.DAY if tif.lower() == "day" else TimeInForce.GTC,
         qty=str(qty) if qty is not None else None,
         notional=str(notional) if notional is not None else None,
+        client_order_id=client_order_id,
     )
-    return tc.submit_order(order_data=order)
+    return request(tc, "submit_order", order_data=order, priority=ORDER, idempotent=False)
 
 def place_limit_order(symbol: str, side: str, qty: Decimal, limit_price: Decimal, tif: str = "day"):
     tc = trading_client()
@@ -63,7 +64,7 @@ def place_limit_order(symbol: str, side: str, qty: Decimal, limit_price: Decimal
         limit_price=str(limit_price),
         qty=str(qty),
     )
-    return tc.submit_order(order_data=order)
+    return request(tc, "submit_order", order_data=order, priority=ORDER, idempotent=False)
 
 def place_bracket_order(symbol: str, side: str, qty: Decimal, take_profit: Decimal, stop_loss: Decimal, stop_loss_limit: Optional[Decimal] = None, tif: str = "gtc"):
     tc = trading_client()
@@ -76,19 +77,27 @@ def place_bracket_order(symbol: str, side: str, qty: Decimal, take_profit: Decim
         take_profit=TakeProfitRequest(limit_price=str(take_profit)),
         stop_loss=StopLossRequest(stop_price=str(stop_loss), limit_price=str(stop_loss_limit) if stop_loss_limit else None),
     )
-    return tc.submit_order(order_data=order)
+    return request(tc, "submit_order", order_data=order, priority=ORDER, idempotent=False)
 
 def get_order(order_id: str):
-    return trading_client().get_order_by_id(order_id)
+    return request(trading_client(), "get_order_by_id", order_id, priority=ACCOUNT, key=("order", str(order_id)))
+
+def get_order_by_client_id(client_order_id: str, client=None):
+    """Order we submitted as `client_order_id`, or None if the broker never accepted it"""
+    try:
+        return request(client or trading_client(), "get_order_by_client_id", client_order_id, priority=ORDER)
+    except Exception as e:
+        if isinstance(e, LookupError) or getattr(e, "status_code", None) == 404:
+            return None
+        raise
 
 def list_open_orders(limit: int = 50):
-    tc = trading_client()
     filt = GetOrdersRequest(status=QueryOrderStatus.OPEN, limit=limit)
-    return tc.get_orders(filter=filt)
+    return request(trading_client(), "get_orders", filter=filt, priority=ACCOUNT, key=("open_orders", limit))
 
-def cancel_order(order_id: str):
-    trading_client().cancel_order_by_id(order_id)
+def cancel_order(order_id: str, client=None):
+    request(client or trading_client(), "cancel_order_by_id", order_id, priority=ORDER)
     return {"cancelled": order_id}
 
 def cancel_all_orders():
-    return trading_client().cancel_orders()
\ No newline at end of file
+    return request(trading_client(), "cancel_orders", priority=ORDER)
\ No newline at end of file
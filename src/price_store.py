@@ -0,0 +1,200 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from . import checkpoint
+
+# Universe price matrix that process-pool workers attach to without copying.
+#
+# A PriceStore holds timestamps x symbols float64 closes in one flat block:
+#
+#     int64[n_bars]              timestamps (ns since the epoch, UTC)
+#     float64[n_symbols, n_bars] prices, one contiguous row per symbol
+#
+# The block lives in POSIX shared memory (create()) or in a file mapped with
+# np.memmap (create(path=...)), which also outlives the process so later
+# research jobs can open() it instead of re-downloading. Either way the
+# picklable `handle` is a few hundred bytes: pool initializers attach to it
+# and read prices in place, so thousands of pair tasks don't each receive a
+# pickled copy of the matrix.
+#
+# `values` is the (n_bars, n_symbols) view (column-major, so each symbol's
+# path is contiguous); `rows` is the same memory as (n_symbols, n_bars).
+# Only the creator may write: attach()ed views are read-only.
+
+_created = set()  # shared-memory blocks created (and owned) by this process
+
+class PriceStore:
+    """Timestamps x symbols float64 prices in shared memory or a memory-mapped file"""
+
+    def __init__(self, buffer, symbols: Sequence[str], n_bars: int, tz: Optional[str], unit: Optional[str],
+                 shm: Optional[shared_memory.SharedMemory] = None, path: Optional[str] = None,
+                 owner: bool = False):
+        self.symbols: List[str] = [str(s) for s in symbols]
+        self.columns = pd.Index(self.symbols)
+        self._column = {s: i for i, s in enumerate(self.symbols)}
+        self._tz = tz
+        self._unit = unit  # None: positional index
+        self._shm = shm
+        self._mmap = buffer if path is not None else None
+        self.path = path
+        self.owner = owner
+        n = len(self.symbols)
+        self._times = np.ndarray((n_bars,), dtype=np.int64, buffer=buffer)
+        self.rows = np.ndarray((n, n_bars), dtype=np.float64, buffer=buffer, offset=8 * n_bars)
+        self.values = self.rows.T
+
+    # -------- Creating and attaching --------
+
+    @classmethod
+    def create(cls, prices: pd.DataFrame, path: Optional[str] = None) -> "PriceStore":
+        """Copy a timestamp x symbol frame into a new shared-memory block (or a mapped file at `path`)"""
+        symbols = [str(c) for c in prices.columns]
+        n_bars = len(prices)
+        size = max(1, 8 * n_bars * (1 + len(symbols)))
+        if path is None:
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            _created.add(shm.name)
+            store = cls(shm.buf, symbols, n_bars, *_index_meta(prices.index), shm=shm, owner=True)
+        else:
+            buffer = np.memmap(path, dtype=np.uint8, mode="w+", shape=(size,))
+            store = cls(buffer, symbols, n_bars, *_index_meta(prices.index), path=path, owner=True)
+        store._times[:] = _index_ns(prices.index)
+        store.values[...] = prices.to_numpy(dtype=np.float64)
+        if path is not None:
+            store._mmap.flush()
+            checkpoint.save(path + ".json", store.handle)
+        return store
+
+    @classmethod
+    def attach(cls, handle: dict) -> "PriceStore":
+        """Map an existing store from its handle, read-only; prices are read in place"""
+        if handle["path"] is not None:
+            size = max(1, 8 * handle["n_bars"] * (1 + len(handle["symbols"])))
+            buffer = np.memmap(handle["path"], dtype=np.uint8, mode="r", shape=(size,))
+            return cls(buffer, handle["symbols"], handle["n_bars"], handle["tz"], handle["unit"],
+                       path=handle["path"])
+        shm = shared_memory.SharedMemory(name=handle["name"])
+        if shm.name not in _created:
+            # The creator owns the block; stop this process's tracker from unlinking it
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm.buf.toreadonly(), handle["symbols"], handle["n_bars"], handle["tz"], handle["unit"], shm=shm)
+
+    @classmethod
+    def open(cls, path: str) -> Optional["PriceStore"]:
+        """Attach to a store saved at `path`, or None if there isn't one"""
+        handle = checkpoint.load(path + ".json", max_age=None)
+        return cls.attach(handle) if handle is not None and os.path.exists(path) else None
+
+    @property
+    def handle(self) -> dict:
+        """Small picklable description other processes attach() with"""
+        return {"name": self._shm.name if self._shm is not None else None, "path": self.path,
+                "symbols": self.symbols, "n_bars": len(self._times), "tz": self._tz, "unit": self._unit}
+
+    # -------- Reading --------
+
+    @property
+    def index(self) -> pd.Index:
+        if self._unit is None:
+            return pd.RangeIndex(len(self._times))
+        index = pd.DatetimeIndex(self._times.astype("datetime64[ns]"), name="timestamp").as_unit(self._unit)
+        return index.tz_localize("UTC").tz_convert(self._tz) if self._tz else index
+
+    def column(self, symbol: str) -> int:
+        """Row of `symbol` in `rows` (column in `values`)"""
+        column = self._column.get(symbol, self._column.get(symbol.upper()))
+        if column is None:
+            raise KeyError(f"{symbol} is not in the price store")
+        return column
+
+    def prices(self, symbol: str) -> np.ndarray:
+        """One symbol's price path, without copying"""
+        return self.rows[self.column(symbol)]
+
+    def pair(self, stock1: str, stock2: str) -> Tuple[pd.Series, pd.Series]:
+        """Both legs on the bars where both have a price, like load_pair"""
+        p1, p2 = self.prices(stock1), self.prices(stock2)
+        both = np.isfinite(p1) & np.isfinite(p2)
+        index = self.index[both]
+        return (pd.Series(p1[both], index=index, name=stock1.upper()),
+                pd.Series(p2[both], index=index, name=stock2.upper()))
+
+    def frame(self, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Copy of the store (or some symbols) as a timestamp x symbol DataFrame"""
+        symbols = list(symbols) if symbols is not None else self.symbols
+        cols = [self.column(s) for s in symbols]
+        return pd.DataFrame(self.values[:, cols], index=self.index, columns=[self.symbols[c] for c in cols])
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    # -------- Lifetime --------
+
+    def close(self):
+        """Unmap this process's view; the store itself stays until the owner unlinks it"""
+        self._times = self.rows = self.values = None
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                pass  # views are still held elsewhere; the mapping goes with them
+        self._mmap = None
+
+    def unlink(self):
+        """Free a shared-memory block (mapped files are kept for later open())"""
+        if self._shm is not None and self.owner:
+            self._shm.unlink()
+            _created.discard(self._shm.name)
+            self.owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+def _index_meta(index: pd.Index) -> Tuple[Optional[str], Optional[str]]:
+    if isinstance(index, pd.DatetimeIndex):
+        return (str(index.tz) if index.tz is not None else None), index.unit
+    return None, None
+
+def _index_ns(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        utc = index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index
+        return utc.as_unit("ns").asi8
+    return np.arange(len(index), dtype=np.int64)
+
+@contextmanager
+def as_store(prices: Union[pd.DataFrame, PriceStore]):
+    """Use a PriceStore as is, or share a DataFrame in a temporary one for the duration"""
+    if isinstance(prices, PriceStore):
+        yield prices
+        return
+    with PriceStore.create(prices) as store:
+        yield store
+
+def load_store(symbols: Iterable[str], timeframe: str, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, path: Optional[str] = None) -> PriceStore:
+    """Download closes for a universe (batched, missing bars kept as NaN) into a new store"""
+    from .market_data import load_universe
+
+    closes = load_universe(symbols, timeframe, start, end, fields=("close",), dropna=False)["close"]
+    return PriceStore.create(closes, path=path)
+
+# -------- Pool workers --------
+
+_worker: Dict[str, PriceStore] = {}
+
+def attach_worker(handle: dict):
+    """Pool initializer: attach this worker to the store once"""
+    _worker["store"] = PriceStore.attach(handle)
+
+def worker_store() -> PriceStore:
+    return _worker["store"]
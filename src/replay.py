@@ -0,0 +1,283 @@
+import asyncio
+import gzip
+import os
+import pickle
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# -------- Stream events --------
+
+@dataclass
+class ReplayBar:
+    """Same attributes the handlers read from alpaca.data.models.Bar"""
+    symbol: str
+    timestamp: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    trade_count: Optional[float] = None
+    vwap: Optional[float] = None
+
+@dataclass
+class ReplayTrade:
+    """Same attributes the handlers read from alpaca.data.models.Trade"""
+    symbol: str
+    timestamp: datetime
+    price: float
+    size: float
+
+@dataclass
+class ReplayQuote:
+    """Same attributes the handlers read from alpaca.data.models.Quote"""
+    symbol: str
+    timestamp: datetime
+    bid_price: float
+    bid_size: float
+    ask_price: float
+    ask_size: float
+
+def _event_from(obj) -> object:
+    """Plain dataclass copy of an alpaca Bar/Quote/Trade (keeps recordings SDK-independent)"""
+    if isinstance(obj, (ReplayBar, ReplayQuote, ReplayTrade)):
+        return obj
+    if hasattr(obj, "close"):
+        return ReplayBar(obj.symbol, obj.timestamp, float(obj.open), float(obj.high), float(obj.low),
+                         float(obj.close), float(obj.volume), getattr(obj, "trade_count", None),
+                         getattr(obj, "vwap", None))
+    if hasattr(obj, "ask_price"):
+        return ReplayQuote(obj.symbol, obj.timestamp, float(obj.bid_price), float(obj.bid_size),
+                           float(obj.ask_price), float(obj.ask_size))
+    return ReplayTrade(obj.symbol, obj.timestamp, float(obj.price), float(obj.size))
+
+def bars_from_frame(df: pd.DataFrame) -> List[ReplayBar]:
+    """MultiIndex [symbol, timestamp] bars (as returned by get_bars) -> time-ordered events"""
+    events = []
+    for (symbol, ts), row in df.iterrows():
+        events.append(ReplayBar(
+            symbol=symbol, timestamp=ts.to_pydatetime(),
+            open=float(row["open"]), high=float(row["high"]), low=float(row["low"]),
+            close=float(row["close"]), volume=float(row["volume"]),
+            trade_count=row.get("trade_count"), vwap=row.get("vwap"),
+        ))
+    events.sort(key=lambda e: e.timestamp)
+    return events
+
+# -------- Local stream --------
+
+Handler = Callable[[object], Awaitable[None]]
+
+class ReplayStream:
+    """Offline stand-in for StockDataStream that replays recorded events.
+
+    Exposes the same subscribe_* / run / stop surface. With speed=None events
+    are delivered as fast as the handlers consume them; otherwise the gaps
+    between event timestamps are replayed in wall-clock time divided by speed.
+    """
+
+    def __init__(self, events: Iterable[object] = (), speed: Optional[float] = None):
+        self.events = sorted(events, key=lambda e: e.timestamp)
+        self.speed = speed
+        self._handlers: Dict[str, Dict[str, Handler]] = {"bars": {}, "quotes": {}, "trades": {}}
+        self._running = False
+
+    def subscribe_bars(self, handler: Handler, *symbols: str):
+        self._subscribe("bars", handler, symbols)
+
+    def subscribe_quotes(self, handler: Handler, *symbols: str):
+        self._subscribe("quotes", handler, symbols)
+
+    def subscribe_trades(self, handler: Handler, *symbols: str):
+        self._subscribe("trades", handler, symbols)
+
+    def _subscribe(self, channel: str, handler: Handler, symbols: Iterable[str]):
+        for symbol in symbols:
+            self._handlers[channel][symbol.upper()] = handler
+
+    def _channel(self, event) -> str:
+        if isinstance(event, ReplayBar) or hasattr(event, "close"):
+            return "bars"
+        if hasattr(event, "ask_price"):
+            return "quotes"
+        return "trades"
+
+    async def run(self):
+        self._running = True
+        previous = None
+        for event in self.events:
+            if not self._running:
+                break
+            if self.speed and previous is not None:
+                gap = (event.timestamp - previous).total_seconds() / self.speed
+                if gap > 0:
+                    await asyncio.sleep(gap)
+            previous = event.timestamp
+            handler = self._handlers[self._channel(event)].get(event.symbol.upper())
+            if handler is not None:
+                await handler(event)
+        self._running = False
+
+    def stop(self):
+        self._running = False
+
+# -------- Recordings --------
+
+@dataclass
+class Recording:
+    """Market data captured from the live clients, saved as one gzipped pickle.
+
+    Bars are kept per timeframe as one MultiIndex [symbol, timestamp] frame
+    (overlapping requests are merged), latest quotes/trades and snapshots per
+    symbol, and stream events in arrival order.
+    """
+    recorded_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    bars: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    latest_trades: Dict[str, ReplayTrade] = field(default_factory=dict)
+    latest_quotes: Dict[str, ReplayQuote] = field(default_factory=dict)
+    snapshots: Dict[str, Any] = field(default_factory=dict)
+    events: List[object] = field(default_factory=list)
+
+    def add_bars(self, timeframe: str, df: pd.DataFrame):
+        if df is None or df.empty:
+            return
+        old = self.bars.get(timeframe)
+        merged = df if old is None else pd.concat([old, df])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        self.bars[timeframe] = merged
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str) -> "Recording":
+        with gzip.open(path, "rb") as f:
+            return pickle.load(f)
+
+def _symbols(req) -> List[str]:
+    symbols = req.symbol_or_symbols
+    return [symbols.upper()] if isinstance(symbols, str) else [s.upper() for s in symbols]
+
+def _utc(dt) -> Optional[pd.Timestamp]:
+    # StockBarsRequest normalizes datetimes to naive UTC
+    if dt is None:
+        return None
+    ts = pd.Timestamp(dt)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+# -------- Recorder --------
+
+class RecordingDataClient:
+    """Wraps a StockHistoricalDataClient and records every response it returns"""
+
+    def __init__(self, client, recording: Optional[Recording] = None):
+        self._client = client
+        self.recording = recording or Recording()
+
+    def get_stock_bars(self, req):
+        resp = self._client.get_stock_bars(req)
+        self.recording.add_bars(req.timeframe.value, resp.df)
+        return resp
+
+    def get_stock_latest_trade(self, req):
+        resp = self._client.get_stock_latest_trade(req)
+        self.recording.latest_trades.update({s: _event_from(t) for s, t in resp.items()})
+        return resp
+
+    def get_stock_latest_quote(self, req):
+        resp = self._client.get_stock_latest_quote(req)
+        self.recording.latest_quotes.update({s: _event_from(q) for s, q in resp.items()})
+        return resp
+
+    def get_stock_snapshot(self, req):
+        resp = self._client.get_stock_snapshot(req)
+        self.recording.snapshots.update(resp)
+        return resp
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+class RecordingStream:
+    """Wraps a StockDataStream and records every bar/quote/trade it delivers"""
+
+    def __init__(self, stream, recording: Optional[Recording] = None):
+        self._stream = stream
+        self.recording = recording or Recording()
+
+    def _wrap(self, handler: Handler) -> Handler:
+        async def record(event):
+            self.recording.events.append(_event_from(event))
+            await handler(event)
+        return record
+
+    def subscribe_bars(self, handler: Handler, *symbols: str):
+        self._stream.subscribe_bars(self._wrap(handler), *symbols)
+
+    def subscribe_quotes(self, handler: Handler, *symbols: str):
+        self._stream.subscribe_quotes(self._wrap(handler), *symbols)
+
+    def subscribe_trades(self, handler: Handler, *symbols: str):
+        self._stream.subscribe_trades(self._wrap(handler), *symbols)
+
+    def __getattr__(self, name):
+        # run / _run_forever / stop go straight to the wrapped stream
+        return getattr(self._stream, name)
+
+# -------- Replay --------
+
+class ReplayDataClient:
+    """Serves a Recording through the StockHistoricalDataClient methods data_api uses.
+
+    Bar requests are answered from the recorded bars inside the requested
+    window. With shift=True, request windows are moved back by the time
+    elapsed since the recording was made, so code that asks for "the last N
+    days" gets the same bars it got while recording.
+    """
+
+    def __init__(self, recording: Recording, shift: bool = True):
+        self.recording = recording
+        self.offset = max(datetime.now(timezone.utc) - recording.recorded_at, timedelta(0)) if shift else timedelta(0)
+        self.requests = 0
+
+    def get_stock_bars(self, req):
+        self.requests += 1
+        symbols = _symbols(req)
+        bars = self.recording.bars.get(req.timeframe.value)
+        if bars is None or bars.empty:
+            return SimpleNamespace(df=pd.DataFrame())
+        bars = bars[bars.index.get_level_values(0).isin(symbols)]
+        times = bars.index.get_level_values(1)
+        start, end = _utc(req.start), _utc(req.end)
+        mask = np.ones(len(bars), dtype=bool)
+        if start is not None:
+            mask &= times >= start - self.offset
+        if end is not None:
+            mask &= times <= end - self.offset
+        df = bars[mask]
+        if req.limit:
+            df = df.groupby(level=0, group_keys=False).head(req.limit)
+        return SimpleNamespace(df=df)
+
+    def get_stock_latest_trade(self, req):
+        self.requests += 1
+        return {s: self.recording.latest_trades[s] for s in _symbols(req) if s in self.recording.latest_trades}
+
+    def get_stock_latest_quote(self, req):
+        self.requests += 1
+        return {s: self.recording.latest_quotes[s] for s in _symbols(req) if s in self.recording.latest_quotes}
+
+    def get_stock_snapshot(self, req):
+        self.requests += 1
+        return {s: self.recording.snapshots[s] for s in _symbols(req) if s in self.recording.snapshots}
+
+def replay_stream(recording: Recording, speed: Optional[float] = None) -> ReplayStream:
+    """ReplayStream over a recording's stream events (speed=100 replays at 100x)"""
+    return ReplayStream(recording.events, speed=speed)
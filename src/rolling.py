@@ -0,0 +1,142 @@
+import math
+from array import array
+from typing import Iterable, Optional
+
+class RollingZScore:
+    """Fixed-window running mean/std of a spread with O(1) updates.
+
+    Keeps the last `window` spread values in a ring buffer together with a
+    Welford mean and sum of squared deviations that are updated as values
+    enter and leave the window. score() rates a new value against the window
+    without storing it, which matches PairsStrategy's "current bar vs the
+    previous lookback - 1 bars" z-score when window = lookback - 1.
+
+    Spreads are built from a price pair with update_prices(): the price ratio
+    by default, or price1 - hedge_ratio * price2 when a hedge ratio is set.
+    """
+
+    __slots__ = ("window", "hedge_ratio", "_buf", "_head", "_count", "_mean", "_m2", "_since_resync")
+
+    # Rebuild the running sums from the buffer this often to cap float drift
+    RESYNC_EVERY = 1 << 20
+
+    def __init__(self, window: int, hedge_ratio: Optional[float] = None, values: Iterable[float] = ()):
+        if window < 2:
+            raise ValueError("RollingZScore window must be at least 2")
+        self.window = window
+        self.hedge_ratio = hedge_ratio
+        self._buf = array("d", bytes(8 * window))
+        self._head = 0  # slot the next value is written to
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._since_resync = 0
+        for value in values:
+            self.push(value)
+
+    # -------- Updates --------
+
+    def spread(self, price1: float, price2: float) -> float:
+        if self.hedge_ratio is None:
+            return price1 / price2
+        return price1 - self.hedge_ratio * price2
+
+    def push(self, value: float):
+        """Add a value, evicting the oldest once the window is full"""
+        value = float(value)
+        if self._count < self.window:
+            self._count += 1
+            delta = value - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (value - self._mean)
+        else:
+            old = self._buf[self._head]
+            new_mean = self._mean + (value - old) / self._count
+            self._m2 += (value - old) * (value - new_mean + old - self._mean)
+            self._mean = new_mean
+            if self._m2 < 0.0:
+                self._m2 = 0.0
+        self._buf[self._head] = value
+        self._head = (self._head + 1) % self.window
+
+        self._since_resync += 1
+        if self._since_resync >= self.RESYNC_EVERY:
+            self._resync()
+
+    def update(self, value: float) -> float:
+        """Z-score of value against the window, then push it"""
+        z = self.score(value)
+        self.push(value)
+        return z
+
+    def update_prices(self, price1: float, price2: float) -> float:
+        """update() for the spread of one price pair"""
+        return self.update(self.spread(price1, price2))
+
+    # -------- Reads --------
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def ready(self) -> bool:
+        return self._count == self.window
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self._count else math.nan
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation of the window (ddof=1, like pandas)"""
+        if self._count < 2:
+            return math.nan
+        return math.sqrt(self._m2 / (self._count - 1))
+
+    def score(self, value: float) -> float:
+        """Z-score of value against a full window; NaN while warming up or flat"""
+        if self._count < self.window:
+            return math.nan
+        std = self.std
+        if not std > 0.0 or std <= 1e-12 * abs(self._mean):
+            return math.nan
+        return (value - self._mean) / std
+
+    def values(self) -> list:
+        """Window contents, oldest first"""
+        if self._count < self.window:
+            return list(self._buf[:self._count])
+        return list(self._buf[self._head:]) + list(self._buf[:self._head])
+
+    # -------- Persistence --------
+
+    def _resync(self):
+        values = self.values()
+        self._count = len(values)
+        self._mean = math.fsum(values) / self._count if values else 0.0
+        self._m2 = math.fsum((v - self._mean) ** 2 for v in values)
+        self._since_resync = 0
+
+    def to_state(self) -> dict:
+        """JSON-serializable snapshot for restarts"""
+        return {"window": self.window, "hedge_ratio": self.hedge_ratio, "values": self.values()}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RollingZScore":
+        stats = cls(state["window"], state.get("hedge_ratio"))
+        values = state.get("values", [])[-stats.window:]
+        for i, value in enumerate(values):
+            stats._buf[i] = float(value)
+        stats._count = len(values)
+        stats._head = len(values) % stats.window
+        stats._resync()
+        return stats
+
+    def __getstate__(self):
+        return self.to_state()
+
+    def __setstate__(self, state):
+        restored = self.from_state(state)
+        for name in self.__slots__:
+            setattr(self, name, getattr(restored, name))
@@ -0,0 +1,232 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Hashable, Optional
+
+import requests
+
+# Every REST call to Alpaca (data_api.py, orders.py, broker state) goes
+# through one RequestScheduler:
+#
+#   budget      a token bucket sized to the account's rate limit
+#               (ALPACA_RATE_LIMIT requests/minute, bursts of ALPACA_BURST)
+#   priority    when callers queue for tokens, orders go first, then account
+#               reads, then market data, then research downloads
+#   coalescing  a call with the same key as one already in flight waits for
+#               that call's result instead of spending another token
+#   retry       429s (and 5xx / connection errors for idempotent reads) are
+#               retried with full-jitter exponential backoff, honouring
+#               Retry-After; the SDK's own fixed-delay retries are disabled
+#               in clients.py so the two don't stack
+#
+# In-process backends (SimulatedBroker, ReplayDataClient, test fakes) are
+# called directly: only requests that reach Alpaca spend budget.
+
+ORDER, ACCOUNT, DATA, RESEARCH = 0, 1, 2, 3
+
+ALPACA_RATE_LIMIT = float(os.getenv("ALPACA_RATE_LIMIT", "200"))  # requests per minute
+ALPACA_BURST = int(os.getenv("ALPACA_BURST", "10"))
+ALPACA_MAX_RETRIES = int(os.getenv("ALPACA_MAX_RETRIES", "5"))
+
+_priority: ContextVar[Optional[int]] = ContextVar("request_priority", default=None)
+
+@contextmanager
+def priority(level: int):
+    """Default priority for calls made in this block (e.g. RESEARCH for a universe screen)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status behind an alpaca-py APIError, alpaca_trade_api error or requests HTTPError"""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        response = getattr(exc, "response", None)
+        code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+_NETWORK_ERRORS = (ConnectionError, TimeoutError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`, handed out in priority order"""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("TokenBucket needs rate > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._stamp = clock()
+        self._blocked_until = 0.0
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, priority: int = DATA):
+        """Block until a token is available and no higher-priority caller is waiting"""
+        with self._cond:
+            me = (priority, next(self._seq))
+            heapq.heappush(self._waiters, me)
+            try:
+                while True:
+                    now = self.clock()
+                    self._refill(now)
+                    if self._waiters[0] == me and now >= self._blocked_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    if self._waiters[0] != me:
+                        wait = None
+                    elif now < self._blocked_until:
+                        wait = self._blocked_until - now
+                    else:
+                        wait = (1 - self._tokens) / self.rate
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(me)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def block(self, seconds: float):
+        """Hand out nothing for `seconds` (the server said we are over the limit)"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, self.clock() + seconds)
+            self._tokens = 0.0
+            self._cond.notify_all()
+
+class RequestScheduler:
+    def __init__(self, rate_per_minute: float = ALPACA_RATE_LIMIT, burst: int = ALPACA_BURST,
+                 max_retries: int = ALPACA_MAX_RETRIES, base_delay: float = 0.5, max_delay: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 rng: Optional[random.Random] = None):
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst, clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0, "rate_limited": 0}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args, priority: Optional[int] = None, key: Optional[Hashable] = None,
+             idempotent: bool = True, **kwargs):
+        """Run fn(*args, **kwargs) within the rate budget.
+
+        Calls sharing a non-None key while one is in flight get its result
+        (or exception). Non-idempotent calls (order submission) are only
+        retried on 429, which the server rejects before acting on.
+        """
+        if priority is None:
+            priority = _priority.get()
+            if priority is None:
+                priority = DATA
+        if key is None:
+            return self._run(fn, args, kwargs, priority, idempotent)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = self._run(fn, args, kwargs, priority, idempotent)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _backoff(self, attempt: int) -> float:
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _run(self, fn, args, kwargs, priority: int, idempotent: bool):
+        attempt = 0
+        while True:
+            self.bucket.acquire(priority)
+            with self._lock:
+                self.stats["requests"] += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                code = status_code(e)
+                limited = code == 429
+                transient = idempotent and (
+                    (code is not None and code >= 500) or (code is None and isinstance(e, _NETWORK_ERRORS))
+                )
+                if not (limited or transient) or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                if limited:
+                    with self._lock:
+                        self.stats["rate_limited"] += 1
+                    hint = retry_after(e)
+                    if hint is not None:
+                        delay = max(delay, hint)
+                    # Everyone waits, not just this caller
+                    self.bucket.block(delay)
+                else:
+                    self.sleep(delay)
+                with self._lock:
+                    self.stats["retries"] += 1
+                attempt += 1
+
+_scheduler: Optional[RequestScheduler] = None
+
+def scheduler() -> RequestScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler()
+    return _scheduler
+
+def set_scheduler(s: Optional[RequestScheduler]):
+    """Replace the process-wide scheduler (None: rebuild from the environment on next use)"""
+    global _scheduler
+    _scheduler = s
+    return s
+
+def is_remote(client) -> bool:
+    """True for Alpaca SDK clients, also behind a wrapper such as RecordingDataClient"""
+    while client is not None:
+        if type(client).__module__.split(".")[0] in ("alpaca", "alpaca_trade_api"):
+            return True
+        client = vars(client).get("_client") if hasattr(client, "__dict__") else None
+    return False
+
+def request(client, method: str, *args, priority: Optional[int] = None, key: Optional[Hashable] = None,
+            idempotent: bool = True, **kwargs):
+    """client.method(*args, **kwargs) through the scheduler when it goes to Alpaca"""
+    fn = getattr(client, method)
+    if not is_remote(client):
+        return fn(*args, **kwargs)
+    if key is not None:
+        key = (id(client),) + tuple(key)
+    return scheduler().call(fn, *args, priority=priority, key=key, idempotent=idempotent, **kwargs)
@@ -0,0 +1,492 @@
+import asyncio
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from alpaca.trading.enums import (
+    OrderClass,
+    OrderSide,
+    OrderStatus,
+    OrderType,
+    PositionSide,
+    QueryOrderStatus,
+    TimeInForce,
+    TradeEvent,
+)
+
+# In-process paper exchange implementing the TradingClient methods that
+# src/orders.py, async_api and the runners use. Orders are matched lazily:
+# every call (and every price update) first fills whatever has become
+# eligible, so there are no background threads and a test can drive time
+# through the clock it passes in. Order events are pushed to `trading_stream`
+# the way Alpaca's TradingStream delivers trade updates.
+
+OPEN_STATUSES = {OrderStatus.NEW, OrderStatus.ACCEPTED, OrderStatus.PARTIALLY_FILLED, OrderStatus.HELD}
+
+# -------- Models (attribute names follow alpaca.trading.models) --------
+
+@dataclass
+class SimOrder:
+    id: str
+    client_order_id: str
+    symbol: str
+    side: OrderSide
+    qty: float
+    order_type: OrderType
+    time_in_force: TimeInForce
+    submitted_at: datetime
+    limit_price: Optional[float] = None
+    stop_price: Optional[float] = None
+    order_class: OrderClass = OrderClass.SIMPLE
+    notional: Optional[float] = None
+    status: OrderStatus = OrderStatus.ACCEPTED
+    filled_qty: float = 0.0
+    filled_avg_price: Optional[float] = None
+    filled_at: Optional[datetime] = None
+    canceled_at: Optional[datetime] = None
+    legs: List["SimOrder"] = field(default_factory=list)
+    parent_id: Optional[str] = None
+    eligible_at: float = 0.0  # simulated clock time the order reaches the "exchange"
+    triggered: bool = False   # stop orders: stop price has been touched
+
+    @property
+    def type(self) -> OrderType:
+        return self.order_type
+
+    @property
+    def remaining(self) -> float:
+        return self.qty - self.filled_qty
+
+@dataclass
+class SimPosition:
+    symbol: str
+    qty: float
+    avg_entry_price: float
+    current_price: float
+
+    @property
+    def side(self) -> PositionSide:
+        return PositionSide.LONG if self.qty >= 0 else PositionSide.SHORT
+
+    @property
+    def market_value(self) -> float:
+        return self.qty * self.current_price
+
+    @property
+    def cost_basis(self) -> float:
+        return self.qty * self.avg_entry_price
+
+    @property
+    def unrealized_pl(self) -> float:
+        return self.market_value - self.cost_basis
+
+@dataclass
+class SimTradeUpdate:
+    event: TradeEvent
+    order: SimOrder  # snapshot at the time of the event
+    timestamp: datetime
+    price: Optional[float] = None
+    qty: Optional[float] = None
+    position_qty: Optional[float] = None
+    execution_id: Optional[str] = None
+
+@dataclass
+class SimAccount:
+    status: str
+    cash: float
+    equity: float
+    buying_power: float
+    multiplier: str = "1"
+    currency: str = "USD"
+
+# -------- Trade updates --------
+
+class SimTradingStream:
+    """Local stand-in for alpaca TradingStream.
+
+    publish() may be called from any thread (orders are submitted from the
+    async_api pool); updates are handed to the subscribed handler in order on
+    the event loop running _run_forever(). Updates published before the
+    stream runs are delivered once it starts.
+    """
+
+    def __init__(self):
+        self._handler: Optional[Callable] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._backlog = deque(maxlen=10_000)  # until the stream runs; oldest dropped first
+        self._lock = threading.Lock()
+
+    def subscribe_trade_updates(self, handler: Callable):
+        self._handler = handler
+
+    def publish(self, update: SimTradeUpdate):
+        with self._lock:
+            if self._loop is None:
+                self._backlog.append(update)
+                return
+            loop, queue = self._loop, self._queue
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, update)
+        except RuntimeError:  # loop closed under us
+            with self._lock:
+                self._backlog.append(update)
+
+    async def _run_forever(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not None:
+                return  # already being consumed
+            self._loop, self._queue = loop, asyncio.Queue()
+            for update in self._backlog:
+                self._queue.put_nowait(update)
+            self._backlog.clear()
+            queue = self._queue
+        try:
+            while True:
+                update = await queue.get()
+                if update is None:
+                    return
+                if self._handler is not None:
+                    await self._handler(update)
+        finally:
+            with self._lock:
+                if self._loop is loop:
+                    self._loop = self._queue = None
+
+    def run(self):
+        asyncio.run(self._run_forever())
+
+    def stop(self):
+        with self._lock:
+            loop, queue = self._loop, self._queue
+        if loop is not None:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+# -------- Broker --------
+
+class SimulatedBroker:
+    """Local stand-in for alpaca TradingClient.
+
+    Prices come from set_price()/update_prices() (e.g. fed from replayed
+    bars) or from price_source(symbol) when no price has been set. Fill
+    behaviour is configurable:
+
+    - latency: seconds (on `clock`) before a new order can fill
+    - slippage_bps: buys fill that much above the price, sells below
+    - fill_ratio: share of the remaining quantity filled per matching pass;
+      below 1 orders go through partially_filled before filled
+    """
+
+    def __init__(self, cash: float = 100_000.0, prices: Optional[Dict[str, float]] = None,
+                 price_source: Optional[Callable[[str], float]] = None, latency: float = 0.0,
+                 slippage_bps: float = 0.0, fill_ratio: float = 1.0, shortable: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        if not 0 < fill_ratio <= 1:
+            raise ValueError("fill_ratio must be in (0, 1]")
+        self.cash = float(cash)
+        self.prices: Dict[str, float] = {s.upper(): float(p) for s, p in (prices or {}).items()}
+        self.price_source = price_source
+        self.latency = latency
+        self.slippage_bps = slippage_bps
+        self.fill_ratio = fill_ratio
+        self.shortable = shortable
+        self.clock = clock
+        self.orders: Dict[str, SimOrder] = {}
+        self.positions: Dict[str, SimPosition] = {}
+        self.fills: List[dict] = []  # (order id, symbol, side, qty, price, time) per execution
+        self._open: Dict[str, SimOrder] = {}
+        self._lock = threading.RLock()
+        self.trading_stream = SimTradingStream()
+
+    # -------- Prices --------
+
+    def price(self, symbol: str) -> float:
+        symbol = symbol.upper()
+        price = self.prices.get(symbol)
+        if price is None and self.price_source is not None:
+            price = float(self.price_source(symbol))
+            self.prices[symbol] = price
+        if price is None:
+            raise ValueError(f"No price for {symbol}; call set_price() or pass price_source")
+        return price
+
+    def set_price(self, symbol: str, price: float):
+        with self._lock:
+            self.prices[symbol.upper()] = float(price)
+            self._match()
+
+    def update_prices(self, prices: Dict[str, float]):
+        with self._lock:
+            for symbol, price in prices.items():
+                self.prices[symbol.upper()] = float(price)
+            self._match()
+
+    async def on_bar(self, bar):
+        """Stream handler: mark the symbol at the bar's close"""
+        self.set_price(bar.symbol, bar.close)
+
+    # -------- Account & positions --------
+
+    def get_account(self) -> SimAccount:
+        with self._lock:
+            self._match()
+            equity = self.cash + sum(p.qty * self._mark(p) for p in self.positions.values())
+            return SimAccount(status="ACTIVE", cash=self.cash, equity=equity, buying_power=max(equity, 0.0))
+
+    def _mark(self, position: SimPosition) -> float:
+        position.current_price = self.prices.get(position.symbol, position.current_price)
+        return position.current_price
+
+    def get_all_positions(self) -> List[SimPosition]:
+        with self._lock:
+            self._match()
+            for p in self.positions.values():
+                self._mark(p)
+            return list(self.positions.values())
+
+    def get_open_position(self, symbol_or_asset_id: str) -> SimPosition:
+        with self._lock:
+            self._match()
+            position = self.positions.get(symbol_or_asset_id.upper())
+            if position is None:
+                raise ValueError(f"position does not exist: {symbol_or_asset_id}")
+            self._mark(position)
+            return position
+
+    def close_position(self, symbol_or_asset_id: str, close_options=None) -> SimOrder:
+        position = self.get_open_position(symbol_or_asset_id)
+        side = OrderSide.SELL if position.qty > 0 else OrderSide.BUY
+        return self._submit(position.symbol, side, abs(position.qty), OrderType.MARKET, TimeInForce.DAY)
+
+    def close_all_positions(self, cancel_orders: Optional[bool] = None) -> List[SimOrder]:
+        if cancel_orders:
+            self.cancel_orders()
+        return [self.close_position(symbol) for symbol in list(self.positions)]
+
+    # -------- Orders --------
+
+    def submit_order(self, order_data) -> SimOrder:
+        """Accept an alpaca-py order request (market, limit, stop, stop-limit, bracket)"""
+        side = OrderSide(order_data.side)
+        order_type = OrderType(getattr(order_data, "type", None) or OrderType.MARKET)
+        tif = TimeInForce(getattr(order_data, "time_in_force", None) or TimeInForce.DAY)
+        qty = getattr(order_data, "qty", None)
+        notional = getattr(order_data, "notional", None)
+        order_class = OrderClass(getattr(order_data, "order_class", None) or OrderClass.SIMPLE)
+        order = self._submit(
+            order_data.symbol, side, float(qty) if qty is not None else None, order_type, tif,
+            limit_price=_float(getattr(order_data, "limit_price", None)),
+            stop_price=_float(getattr(order_data, "stop_price", None)),
+            notional=_float(notional), order_class=order_class,
+            client_order_id=getattr(order_data, "client_order_id", None),
+            take_profit=getattr(order_data, "take_profit", None),
+            stop_loss=getattr(order_data, "stop_loss", None),
+        )
+        return order
+
+    def _submit(self, symbol: str, side: OrderSide, qty: Optional[float], order_type: OrderType,
+                tif: TimeInForce, limit_price: Optional[float] = None, stop_price: Optional[float] = None,
+                notional: Optional[float] = None, order_class: OrderClass = OrderClass.SIMPLE,
+                client_order_id: Optional[str] = None, take_profit=None, stop_loss=None) -> SimOrder:
+        symbol = symbol.upper()
+        if (qty is None) == (notional is None):
+            raise ValueError("Provide exactly one of qty or notional")
+        if (qty is not None and qty <= 0) or (notional is not None and notional <= 0):
+            raise ValueError("qty and notional must be positive")
+        if order_type in (OrderType.LIMIT, OrderType.STOP_LIMIT) and limit_price is None:
+            raise ValueError("limit_price is required for limit orders")
+        if order_type in (OrderType.STOP, OrderType.STOP_LIMIT) and stop_price is None:
+            raise ValueError("stop_price is required for stop orders")
+
+        with self._lock:
+            self._match()
+            if qty is None:
+                qty = notional / self.price(symbol)
+            if not self.shortable and side == OrderSide.SELL:
+                held = self.positions[symbol].qty if symbol in self.positions else 0.0
+                if qty > held + 1e-9:
+                    raise ValueError(f"insufficient qty available for order (requested: {qty}, available: {held})")
+            order_id = str(uuid.uuid4())
+            order = SimOrder(
+                id=order_id, client_order_id=client_order_id or order_id, symbol=symbol, side=side, qty=qty,
+                order_type=order_type, time_in_force=tif, submitted_at=datetime.now(timezone.utc),
+                limit_price=limit_price, stop_price=stop_price, order_class=order_class, notional=notional,
+                eligible_at=self.clock() + self.latency,
+            )
+            if order_class == OrderClass.BRACKET:
+                exit_side = OrderSide.SELL if side == OrderSide.BUY else OrderSide.BUY
+                tp = _float(getattr(take_profit, "limit_price", None))
+                sl_stop = _float(getattr(stop_loss, "stop_price", None))
+                sl_limit = _float(getattr(stop_loss, "limit_price", None))
+                if tp is not None:
+                    order.legs.append(self._child(order, exit_side, OrderType.LIMIT, limit_price=tp))
+                if sl_stop is not None:
+                    order.legs.append(self._child(order, exit_side, OrderType.STOP_LIMIT if sl_limit else OrderType.STOP,
+                                                  limit_price=sl_limit, stop_price=sl_stop))
+            self.orders[order.id] = order
+            self._open[order.id] = order
+            self._publish(TradeEvent.NEW, order)
+            self._match()
+            return order
+
+    def _child(self, parent: SimOrder, side: OrderSide, order_type: OrderType, **prices) -> SimOrder:
+        child_id = str(uuid.uuid4())
+        child = SimOrder(id=child_id, client_order_id=child_id, symbol=parent.symbol, side=side, qty=parent.qty,
+                         order_type=order_type, time_in_force=parent.time_in_force,
+                         submitted_at=parent.submitted_at, status=OrderStatus.HELD, parent_id=parent.id,
+                         eligible_at=parent.eligible_at, **prices)
+        self.orders[child.id] = child
+        return child
+
+    def get_order_by_id(self, order_id) -> SimOrder:
+        with self._lock:
+            self._match()
+            try:
+                return self.orders[str(order_id)]
+            except KeyError:
+                raise ValueError(f"order not found: {order_id}")
+
+    def get_order_by_client_id(self, client_id) -> SimOrder:
+        with self._lock:
+            self._match()
+            for order in self.orders.values():
+                if order.client_order_id == str(client_id):
+                    return order
+            raise LookupError(f"order not found: {client_id}")
+
+    def get_orders(self, filter=None) -> List[SimOrder]:
+        with self._lock:
+            self._match()
+            status = getattr(filter, "status", None) or QueryOrderStatus.OPEN
+            symbols = {s.upper() for s in (getattr(filter, "symbols", None) or [])}
+            limit = getattr(filter, "limit", None) or 50
+            found = [
+                o for o in self.orders.values()
+                if o.parent_id is None
+                and (status == QueryOrderStatus.ALL or (o.status in OPEN_STATUSES) == (status == QueryOrderStatus.OPEN))
+                and (not symbols or o.symbol in symbols)
+            ]
+            found.sort(key=lambda o: o.submitted_at, reverse=True)
+            return found[:limit]
+
+    def cancel_order_by_id(self, order_id):
+        with self._lock:
+            order = self.get_order_by_id(order_id)
+            if order.status not in OPEN_STATUSES:
+                raise ValueError(f"order is not cancelable: {order.status.value}")
+            self._cancel(order)
+            for leg in order.legs:
+                if leg.status in OPEN_STATUSES:
+                    self._cancel(leg)
+
+    def cancel_orders(self) -> List[dict]:
+        with self._lock:
+            cancelled = []
+            for order in list(self._open.values()):
+                self._cancel(order)
+                cancelled.append({"id": order.id, "status": 200})
+            return cancelled
+
+    def _cancel(self, order: SimOrder):
+        order.status = OrderStatus.CANCELED
+        order.canceled_at = datetime.now(timezone.utc)
+        self._open.pop(order.id, None)
+        self._publish(TradeEvent.CANCELED, order)
+
+    def _publish(self, event: TradeEvent, order: SimOrder, **fill):
+        self.trading_stream.publish(SimTradeUpdate(event, replace(order), datetime.now(timezone.utc), **fill))
+
+    # -------- Matching --------
+
+    def _match(self):
+        if not self._open:
+            return
+        now = self.clock()
+        for order in list(self._open.values()):
+            if order.eligible_at > now or order.status not in OPEN_STATUSES:
+                continue
+            price = self.prices.get(order.symbol)
+            if price is None:
+                if self.price_source is None:
+                    continue
+                price = self.price(order.symbol)
+            fill_price = self._fill_price(order, price)
+            if fill_price is not None:
+                self._fill(order, fill_price)
+            elif order.time_in_force in (TimeInForce.IOC, TimeInForce.FOK):
+                self._cancel(order)
+
+    def _fill_price(self, order: SimOrder, price: float) -> Optional[float]:
+        buy = order.side == OrderSide.BUY
+        slipped = price * (1 + self.slippage_bps / 1e4) if buy else price * (1 - self.slippage_bps / 1e4)
+        if order.order_type in (OrderType.STOP, OrderType.STOP_LIMIT) and not order.triggered:
+            if (buy and price < order.stop_price) or (not buy and price > order.stop_price):
+                return None
+            order.triggered = True
+        if order.order_type in (OrderType.MARKET, OrderType.STOP):
+            return slipped
+        # Limit: only marketable prices fill, never worse than the limit
+        if (buy and price > order.limit_price) or (not buy and price < order.limit_price):
+            return None
+        return min(slipped, order.limit_price) if buy else max(slipped, order.limit_price)
+
+    def _fill(self, order: SimOrder, price: float):
+        remaining = order.remaining
+        qty = remaining
+        if self.fill_ratio < 1 and order.time_in_force != TimeInForce.FOK:
+            qty = min(remaining, max(math.floor(remaining * self.fill_ratio), min(remaining, 1.0)))
+        now = datetime.now(timezone.utc)
+        total = order.filled_qty + qty
+        order.filled_avg_price = price if not order.filled_qty else (
+            (order.filled_avg_price * order.filled_qty + price * qty) / total)
+        order.filled_qty = total
+        order.filled_at = now
+        self._apply(order.symbol, qty if order.side == OrderSide.BUY else -qty, price)
+        self.fills.append({"order_id": order.id, "symbol": order.symbol, "side": order.side.value,
+                           "qty": qty, "price": price, "time": now})
+        held = self.positions[order.symbol].qty if order.symbol in self.positions else 0.0
+        fill = {"price": price, "qty": qty, "position_qty": held, "execution_id": str(uuid.uuid4())}
+
+        if order.remaining > 1e-9:
+            order.status = OrderStatus.PARTIALLY_FILLED
+            self._publish(TradeEvent.PARTIAL_FILL, order, **fill)
+            if order.time_in_force == TimeInForce.IOC:
+                self._cancel(order)
+            return
+        order.status = OrderStatus.FILLED
+        self._open.pop(order.id, None)
+        self._publish(TradeEvent.FILL, order, **fill)
+        if order.parent_id is None:
+            for leg in order.legs:  # bracket exits go live once the entry is done
+                leg.status = OrderStatus.NEW
+                self._open[leg.id] = leg
+        else:
+            for sibling in self.orders[order.parent_id].legs:  # one-cancels-other
+                if sibling is not order and sibling.status in OPEN_STATUSES:
+                    self._cancel(sibling)
+
+    def _apply(self, symbol: str, delta: float, price: float):
+        self.cash -= delta * price
+        position = self.positions.get(symbol)
+        if position is None:
+            self.positions[symbol] = SimPosition(symbol, delta, price, price)
+            return
+        new_qty = position.qty + delta
+        if abs(new_qty) < 1e-9:
+            del self.positions[symbol]
+            return
+        if position.qty * delta > 0:  # adding to the position
+            position.avg_entry_price = (position.avg_entry_price * position.qty + price * delta) / new_qty
+        elif position.qty * new_qty < 0:  # flipped through flat
+            position.avg_entry_price = price
+        position.qty = new_qty
+        position.current_price = price
+
+def _float(value) -> Optional[float]:
+    return None if value is None else float(value)
@@ -0,0 +1,321 @@
+import copy
+import math
+from array import array
+from typing import Optional
+
+import numpy as np
+
+# Pluggable spread models for a price pair (price1 = dependent leg).
+#
+# Every model exposes the same surface:
+#   update(p1, p2)   spread of a new bar using the hedge ratio known before the
+#                    bar (no look-ahead), then folds the bar in. O(1).
+#   spread(p1, p2)   spread at the current hedge ratio without updating.
+#   batch(p1, p2)    spreads for a full history from a fresh state, equal to
+#                    calling update() bar by bar; leaves this model untouched.
+#   warm_up(p1, p2)  reset, replay a history into the live state, return batch.
+#   to_state()       JSON-serializable settings + live state; restore_spread_model()
+#                    rebuilds an equal model from it.
+
+HEDGE_BLOCK = 4096  # bars per block of prefix sums in RollingOLSSpread.batch
+
+class SpreadModel:
+    """Base class: hedge-ratio spread price1 - hedge_ratio * price2"""
+
+    hedge_ratio: Optional[float] = None
+
+    def spread(self, price1: float, price2: float) -> float:
+        return price1 - self.hedge_ratio * price2
+
+    def update(self, price1: float, price2: float) -> float:
+        return self.spread(price1, price2)
+
+    def reset(self):
+        pass
+
+    def warm_up(self, prices1, prices2) -> np.ndarray:
+        self.reset()
+        prices1 = np.asarray(prices1, dtype=float)
+        prices2 = np.asarray(prices2, dtype=float)
+        return np.array([self.update(a, b) for a, b in zip(prices1.tolist(), prices2.tolist())], dtype=float)
+
+    def batch(self, prices1, prices2) -> np.ndarray:
+        return self.clone().warm_up(prices1, prices2)
+
+    def clone(self) -> "SpreadModel":
+        """Fresh copy with the same settings"""
+        model = copy.deepcopy(self)
+        model.reset()
+        return model
+
+    def to_state(self) -> dict:
+        state = {k: (list(v) if isinstance(v, (array, tuple)) else v) for k, v in vars(self).items()}
+        return {"model": _MODEL_NAMES[type(self)], "state": state}
+
+    def set_state(self, state: dict):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+class RatioSpread(SpreadModel):
+    """Plain price ratio price1 / price2 (PairsStrategy's original spread)"""
+
+    def spread(self, price1: float, price2: float) -> float:
+        return price1 / price2
+
+    def batch(self, prices1, prices2) -> np.ndarray:
+        return np.asarray(prices1, dtype=float) / np.asarray(prices2, dtype=float)
+
+    def warm_up(self, prices1, prices2) -> np.ndarray:
+        return self.batch(prices1, prices2)
+
+class StaticSpread(SpreadModel):
+    """Fixed hedge ratio; with hedge_ratio=None it is fitted by OLS on the first history seen"""
+
+    def __init__(self, hedge_ratio: Optional[float] = None):
+        self.fixed = hedge_ratio
+        self.hedge_ratio = hedge_ratio
+
+    @staticmethod
+    def fit_ratio(prices1, prices2) -> float:
+        from .cointegration_test import hedge_ratios
+
+        ratio, _, _ = hedge_ratios(np.asarray(prices2, dtype=float), np.asarray(prices1, dtype=float))
+        return float(ratio[0])
+
+    def reset(self):
+        self.hedge_ratio = self.fixed
+
+    def update(self, price1: float, price2: float) -> float:
+        if self.hedge_ratio is None:
+            raise ValueError("StaticSpread has no hedge ratio; pass one or warm it up on history")
+        return self.spread(price1, price2)
+
+    def warm_up(self, prices1, prices2) -> np.ndarray:
+        self.reset()
+        if self.hedge_ratio is None:
+            self.hedge_ratio = self.fit_ratio(prices1, prices2)
+        return np.asarray(prices1, dtype=float) - self.hedge_ratio * np.asarray(prices2, dtype=float)
+
+class RollingOLSSpread(SpreadModel):
+    """Hedge ratio = OLS slope of price1 on price2 over the previous `window` bars.
+
+    Running sums over a ring buffer make each update O(1). Until two distinct
+    price2 values are in the window the initial hedge_ratio is used.
+    """
+
+    RESYNC_EVERY = 1 << 16
+
+    def __init__(self, window: int, hedge_ratio: float = 1.0):
+        if window < 2:
+            raise ValueError("RollingOLSSpread window must be at least 2")
+        self.window = window
+        self.initial = hedge_ratio
+        self.reset()
+
+    def reset(self):
+        self.hedge_ratio = self.initial
+        self._xs = array("d", bytes(8 * self.window))
+        self._ys = array("d", bytes(8 * self.window))
+        self._head = 0
+        self._count = 0
+        self._ref = None  # (price1, price2) the sums are taken relative to
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._since_resync = 0
+
+    def _slope(self, n, sx, sy, sxx, sxy):
+        if n < 2:
+            return self.initial
+        cxx = sxx - sx * sx / n
+        if cxx <= 16 * np.finfo(float).eps * abs(sxx):
+            return self.initial
+        return (sxy - sx * sy / n) / cxx
+
+    def update(self, price1: float, price2: float) -> float:
+        price1, price2 = float(price1), float(price2)
+        spread = self.spread(price1, price2)
+        if self._ref is None:
+            self._ref = (price1, price2)
+        y, x = price1 - self._ref[0], price2 - self._ref[1]
+        if self._count == self.window:
+            oy, ox = self._ys[self._head], self._xs[self._head]
+            self._sx -= ox; self._sy -= oy
+            self._sxx -= ox * ox; self._sxy -= ox * oy
+        else:
+            self._count += 1
+        self._ys[self._head], self._xs[self._head] = y, x
+        self._head = (self._head + 1) % self.window
+        self._sx += x; self._sy += y
+        self._sxx += x * x; self._sxy += x * y
+
+        self._since_resync += 1
+        if self._since_resync >= self.RESYNC_EVERY:
+            self._resync()
+        self.hedge_ratio = self._slope(self._count, self._sx, self._sy, self._sxx, self._sxy)
+        return spread
+
+    def _resync(self):
+        n = self._count
+        # Re-anchor on the newest bar so the sums stay small however far prices drift
+        newest = (self._head - 1) % self.window
+        dy, dx = self._ys[newest], self._xs[newest]
+        self._ref = (self._ref[0] + dy, self._ref[1] + dx)
+        for i in range(n):
+            self._ys[i] -= dy
+            self._xs[i] -= dx
+        xs, ys = list(self._xs[:n]), list(self._ys[:n])
+        self._sx, self._sy = math.fsum(xs), math.fsum(ys)
+        self._sxx = math.fsum(v * v for v in xs)
+        self._sxy = math.fsum(a * b for a, b in zip(xs, ys))
+        self._since_resync = 0
+
+    def set_state(self, state: dict):
+        super().set_state(state)
+        self._xs, self._ys = array("d", self._xs), array("d", self._ys)
+        self._ref = tuple(self._ref) if self._ref is not None else None
+
+    def _hedges(self, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """Hedge ratio in force after each bar, from prefix sums.
+
+        The sums restart every HEDGE_BLOCK bars, taken relative to the first
+        bar of that block's first window, so rounding doesn't build up over a
+        long history.
+        """
+        slope = np.empty(len(y))
+        step = max(HEDGE_BLOCK, self.window)
+        for first in range(0, len(y), step):
+            last = min(first + step, len(y))
+            lo = max(first + 1 - self.window, 0)
+            slope[first:last] = self._block_hedges(y[lo:last] - y[lo], x[lo:last] - x[lo], first - lo)
+        return slope
+
+    def _block_hedges(self, y: np.ndarray, x: np.ndarray, skip: int) -> np.ndarray:
+        """Hedges after each bar of y/x from index `skip` on (earlier bars only fill the first windows)"""
+        csum = lambda v: np.concatenate(([0.0], np.cumsum(v)))
+        cx, cy, cxx, cxy = csum(x), csum(y), csum(x * x), csum(x * y)
+        end = np.arange(skip + 1, len(y) + 1)
+        start = np.maximum(end - self.window, 0)
+        cnt = (end - start).astype(float)
+        sx, sy = cx[end] - cx[start], cy[end] - cy[start]
+        sxx, sxy = cxx[end] - cxx[start], cxy[end] - cxy[start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov_xx = sxx - sx * sx / cnt
+            slope = (sxy - sx * sy / cnt) / cov_xx
+        # Anything at rounding-noise level of this block's prefix sums is a flat window
+        flat = (cnt < 2) | (cov_xx <= 16 * np.finfo(float).eps * cxx[end])
+        slope[flat] = self.initial
+        return slope
+
+    def batch(self, prices1, prices2) -> np.ndarray:
+        p1 = np.asarray(prices1, dtype=float)
+        p2 = np.asarray(prices2, dtype=float)
+        if len(p1) == 0:
+            return np.array([], dtype=float)
+        hedges = self._hedges(p1, p2)
+        # Bar t is priced with the hedge ratio from bars before it
+        prior = np.concatenate(([self.initial], hedges[:-1]))
+        return p1 - prior * p2
+
+    def warm_up(self, prices1, prices2) -> np.ndarray:
+        p1 = np.asarray(prices1, dtype=float)
+        p2 = np.asarray(prices2, dtype=float)
+        spreads = self.batch(p1, p2)
+        self.reset()
+        if len(p1):
+            self._ref = (float(p1[0]), float(p2[0]))
+            tail = slice(max(len(p1) - self.window, 0), len(p1))
+            ys, xs = (p1[tail] - p1[0]).tolist(), (p2[tail] - p2[0]).tolist()
+            self._count = len(ys)
+            for i, (y, x) in enumerate(zip(ys, xs)):
+                self._ys[i], self._xs[i] = y, x
+            self._head = self._count % self.window
+            self._resync()
+            self.hedge_ratio = self._slope(self._count, self._sx, self._sy, self._sxx, self._sxy)
+        return spreads
+
+def _kalman_step(y: float, x: float, beta: float, alpha: float, p00: float, p01: float, p11: float,
+                 vw: float, obs_var: float) -> tuple:
+    """One filter step for the bar (y, x): the new (beta, alpha, p00, p01, p11)"""
+    r00, r01, r11 = p00 + vw, p01, p11 + vw
+    rf0, rf1 = r00 * x + r01, r01 * x + r11
+    q = x * rf0 + rf1 + obs_var
+    k0, k1 = rf0 / q, rf1 / q
+    err = y - (beta * x + alpha)
+    return beta + k0 * err, alpha + k1 * err, r00 - k0 * rf0, r01 - k0 * rf1, r11 - k1 * rf1
+
+class KalmanSpread(SpreadModel):
+    """Time-varying hedge ratio and intercept from a Kalman filter.
+
+    State [beta, alpha] follows a random walk with per-bar variance delta /
+    (1 - delta); price1 = beta * price2 + alpha + noise(obs_var). Each update
+    is a handful of scalar operations on the 2x2 covariance. Histories are
+    filtered in one local-variable loop (_filter); unlike the other models the
+    recursion can't be turned into prefix sums, so it isn't numpy-vectorized.
+    """
+
+    def __init__(self, delta: float = 1e-4, obs_var: float = 1e-3, hedge_ratio: float = 1.0,
+                 initial_var: float = 1.0):
+        self.delta = delta
+        self.obs_var = obs_var
+        self.initial = hedge_ratio
+        self.initial_var = initial_var
+        self.reset()
+
+    def reset(self):
+        self.hedge_ratio = self.initial
+        self.intercept = 0.0
+        self._p00, self._p01, self._p11 = self.initial_var, 0.0, self.initial_var
+
+    def update(self, price1: float, price2: float) -> float:
+        y, x = float(price1), float(price2)
+        spread = self.spread(y, x)
+        self.hedge_ratio, self.intercept, self._p00, self._p01, self._p11 = _kalman_step(
+            y, x, self.hedge_ratio, self.intercept, self._p00, self._p01, self._p11,
+            self.delta / (1 - self.delta), self.obs_var)
+        return spread
+
+    def _filter(self, prices1: np.ndarray, prices2: np.ndarray) -> np.ndarray:
+        """Run update() over a history from the current state; returns the hedge ratio before each bar.
+
+        The covariance recursion depends on every earlier price2, so the bars
+        are filtered one after another with the same _kalman_step update()
+        uses; the state stays in locals and the spreads are left to one array
+        expression in warm_up().
+        """
+        vw, obs_var = self.delta / (1 - self.delta), self.obs_var
+        state = (self.hedge_ratio, self.intercept, self._p00, self._p01, self._p11)
+        prior = np.empty(len(prices1))
+        for i, (y, x) in enumerate(zip(prices1.tolist(), prices2.tolist())):
+            prior[i] = state[0]
+            state = _kalman_step(y, x, *state, vw, obs_var)
+        self.hedge_ratio, self.intercept, self._p00, self._p01, self._p11 = state
+        return prior
+
+    def warm_up(self, prices1, prices2) -> np.ndarray:
+        self.reset()
+        p1 = np.asarray(prices1, dtype=float)
+        p2 = np.asarray(prices2, dtype=float)
+        return p1 - self._filter(p1, p2) * p2
+
+SPREAD_MODELS = {
+    "ratio": RatioSpread,
+    "ols": StaticSpread,
+    "rolling_ols": RollingOLSSpread,
+    "kalman": KalmanSpread,
+}
+
+_MODEL_NAMES = {cls: name for name, cls in SPREAD_MODELS.items()}
+
+def restore_spread_model(state: dict) -> SpreadModel:
+    """Inverse of SpreadModel.to_state()"""
+    cls = SPREAD_MODELS[state["model"]]
+    model = cls.__new__(cls)
+    model.set_state(state["state"])
+    return model
+
+def make_spread_model(name: str = "ratio", **kwargs) -> SpreadModel:
+    """Build a spread model by name: ratio, ols, rolling_ols or kalman"""
+    try:
+        cls = SPREAD_MODELS[name]
+    except KeyError:
+        raise ValueError(f"Unknown spread model '{name}' (choose from {', '.join(SPREAD_MODELS)})")
+    return cls(**kwargs)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class PairsConfig:
@@ -7,13 +8,21 @@ class PairsConfig:
     stock2: str = "MSFT"
     
     # Strategy parameters
-    lookback_days: int = 30
+    timeframe: str = "1D"                 # bar size: 1Min, 5Min, 1H, 1D, ...
+    lookback_days: int = 30               # z-score window in bars (old name; lookback_bars wins)
+    lookback_bars: Optional[int] = None
     entry_threshold: float = 2.0
     exit_threshold: float = 0.5
     
+    # Spread model: ratio, ols, rolling_ols or kalman (see src/spread_models.py)
+    spread_model: str = "ratio"
+    hedge_ratio: Optional[float] = None   # ols: fixed ratio (None fits on history)
+    hedge_window: Optional[int] = None    # rolling_ols: bars per fit (None uses the lookback)
+    
     # Risk management
     max_position_size: float = 0.05
-    stop_loss_pct: float = 0.02
+    stop_loss_pct: float = 0.02           # ratio spread: adverse move from the entry spread
+    stop_loss_z: float = 3.0              # hedge-ratio spreads: adverse z-score
     take_profit_pct: float = 0.04
     
     # Execution
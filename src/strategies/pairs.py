@@ -1,13 +1,27 @@
 import pandas as pd
 import numpy as np
-from typing import Optional, Dict, Tuple
-from datetime import datetime
+from typing import Optional, Dict, Iterable, Tuple
+from datetime import datetime, timezone
+
+from .config import PairsConfig
+from ..checkpoint import parse_timestamp, timestamp
+from ..rolling import RollingZScore
+from ..spread_models import RatioSpread, SpreadModel, make_spread_model, restore_spread_model
+
+ZSCORE_BLOCK = 4096  # bars per block of prefix sums in rolling_zscore
 
 class PairsStrategy:
-    def __init__(self, stock1: str, stock2: str, lookback_days: int = 30):
+    def __init__(self, stock1: str, stock2: str, lookback_bars: int = 30,
+                 spread_model: Optional[SpreadModel] = None, timeframe: str = "1D",
+                 lookback_days: Optional[int] = None):
         self.stock1 = stock1.upper()
         self.stock2 = stock2.upper()
-        self.lookback_days = lookback_days
+        # Z-score window in bars of `timeframe` (lookback_days is the old name)
+        self.lookback_bars = lookback_days if lookback_days is not None else lookback_bars
+        # Prior bars each z-score is measured against; None is the live signals' lookback_bars - 1
+        self.zscore_window: Optional[int] = None
+        self.timeframe = timeframe
+        self.spread_model = spread_model or RatioSpread()
         self.position = 0  # -1: short stock1/long stock2, 0: neutral, 1: long stock1/short stock2
         self.entry_spread = None
         self.entry_time = None
@@ -17,51 +31,201 @@ class PairsStrategy:
         self.risk_per_trade = 0.02     # 2% of account per trade
         self.entry_threshold = 1.5     # Z-score threshold for entry
         self.exit_threshold = 0.5      # Z-score threshold for exit
+        self.stop_loss_pct = 0.02      # Adverse spread move that triggers a stop (ratio spread)
+        self.stop_loss_z = 3.0         # Adverse z-score that triggers a stop (hedge-ratio spreads)
     
+    @classmethod
+    def from_config(cls, config: PairsConfig) -> "PairsStrategy":
+        """Build a strategy from a PairsConfig entry"""
+        lookback = config.lookback_bars or config.lookback_days
+        if config.spread_model == "rolling_ols":
+            model = make_spread_model("rolling_ols", window=config.hedge_window or lookback)
+        elif config.spread_model == "ols":
+            model = make_spread_model("ols", hedge_ratio=config.hedge_ratio)
+        else:
+            model = make_spread_model(config.spread_model)
+        strategy = cls(config.stock1, config.stock2, lookback, model, timeframe=config.timeframe)
+        strategy.entry_threshold = config.entry_threshold
+        strategy.exit_threshold = config.exit_threshold
+        strategy.max_position_size = config.max_position_size
+        strategy.stop_loss_pct = config.stop_loss_pct
+        strategy.stop_loss_z = config.stop_loss_z
+        return strategy
+    
+    @property
+    def lookback_days(self) -> int:
+        """Old name of lookback_bars (the same thing for daily bars)"""
+        return self.lookback_bars
+
+    @lookback_days.setter
+    def lookback_days(self, bars: int):
+        self.lookback_bars = bars
+
     def calculate_spread(self, prices1: pd.Series, prices2: pd.Series) -> pd.Series:
-        """Calculate the price spread between two stocks"""
-        return prices1 / prices2
+        """Spread of a price history (or of one price pair at the current hedge ratio).
+
+        Histories are run through a fresh copy of the spread model, so this
+        never advances the live model state; use update_spread for new bars.
+        """
+        if isinstance(prices1, pd.Series):
+            prices1, prices2 = prices1.align(prices2, join="inner")
+            return pd.Series(self.spread_model.batch(prices1.to_numpy(dtype=float), prices2.to_numpy(dtype=float)),
+                             index=prices1.index)
+        if np.ndim(prices1):
+            return self.spread_model.batch(prices1, prices2)
+        return self.spread_model.spread(float(prices1), float(prices2))
+
+    def update_spread(self, price1: float, price2: float) -> float:
+        """Spread of a new bar; advances the spread model's hedge ratio"""
+        return self.spread_model.update(price1, price2)
     
-    def find_entry_signal(self, spread: pd.Series) -> Optional[int]:
-        """Find entry signals based on z-score of spread"""
-        if len(spread) < self.lookback_days:
-            return None
-            
-        current_spread = spread.iloc[-1]
-        historical_spread = spread.iloc[-self.lookback_days:-1]
-        
-        mean_spread = historical_spread.mean()
-        std_spread = historical_spread.std()
-        
-        if std_spread == 0:
-            return None
-            
-        z_score = (current_spread - mean_spread) / std_spread
-        
-        # Entry signals
-        if z_score > self.entry_threshold:
+    def window_bars(self) -> int:
+        """Prior bars in each z-score window: zscore_window, else lookback_bars - 1"""
+        return self.zscore_window or self.lookback_bars - 1
+
+    def rolling_zscore(self, spread) -> np.ndarray:
+        """Z-score of every bar against the window_bars() bars before it.
+
+        That is lookback_bars - 1 bars by default, as find_entry_signal has
+        always used; set zscore_window = lookback_bars for the full-lookback
+        window the original backtest script measured against.
+        Uses prefix sums so each bar costs O(1) regardless of the lookback.
+        The sums restart every ZSCORE_BLOCK bars from that block's first
+        window, so rounding stays at the level of one block however long the
+        series is. Bars without a full window (or with a flat window, by the
+        same rule as RollingZScore.score) are NaN.
+        """
+        values = np.asarray(spread, dtype=float)
+        n = self.window_bars()
+        z = np.full(len(values), np.nan)
+        if n < 2 or len(values) <= n:
+            return z
+        step = max(ZSCORE_BLOCK, n)
+        for first in range(n, len(values), step):
+            last = min(first + step, len(values))
+            z[first:last] = self._block_zscore(values[first - n:last], n)
+        return z
+
+    @staticmethod
+    def _block_zscore(values: np.ndarray, n: int) -> np.ndarray:
+        """Z-scores of values[n:] against the n values before each"""
+        # Shift by the first value to keep the running sums small
+        shifted = values - values[0]
+        csum = np.concatenate(([0.0], np.cumsum(shifted)))
+        csq = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+
+        # Window for bar i is [i - n, i)
+        idx = np.arange(n, len(values))
+        win_sum = csum[idx] - csum[idx - n]
+        win_sq = csq[idx] - csq[idx - n]
+        resid = win_sq - win_sum * win_sum / n
+        # Anything at rounding-noise level of this block's prefix sums is a flat window
+        resid[resid <= 16 * np.finfo(float).eps * csq[idx]] = 0.0
+
+        mean = win_sum / n
+        std = np.sqrt(resid / (n - 1))
+        flat = ~(std > 0) | (std <= 1e-12 * np.abs(values[0] + mean))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(flat, np.nan, (shifted[idx] - mean) / std)
+
+    def entry_signals(self, zscores: np.ndarray, threshold: Optional[float] = None) -> np.ndarray:
+        """Entry signal per bar: 1 long stock1/short stock2, -1 the reverse, 0 none"""
+        threshold = self.entry_threshold if threshold is None else threshold
+        zscores = np.asarray(zscores, dtype=float)
+        signals = np.zeros(len(zscores), dtype=np.int8)
+        signals[zscores > threshold] = -1
+        signals[zscores < -threshold] = 1
+        return signals
+
+    def exit_signals(self, zscores: np.ndarray, threshold: Optional[float] = None) -> np.ndarray:
+        """Exit flag per bar: True once the spread is back inside the exit band"""
+        threshold = self.exit_threshold if threshold is None else threshold
+        with np.errstate(invalid="ignore"):
+            return np.abs(np.asarray(zscores, dtype=float)) < threshold
+
+    def stop_loss_signals(self, spread, zscores=None) -> np.ndarray:
+        """Stop-loss flag per bar for the currently held position.
+
+        The price ratio stops on a stop_loss_pct move from the entry spread.
+        Hedge-ratio spreads hover around zero, where a percentage of the
+        entry spread is noise, so they stop once the z-score is past
+        stop_loss_z on the losing side; they need `zscores` for the same bars.
+        """
+        values = np.asarray(spread, dtype=float)
+        if self.position == 0 or self.entry_spread is None:
+            return np.zeros(len(values), dtype=bool)
+
+        if not isinstance(self.spread_model, RatioSpread):
+            if zscores is None:
+                raise ValueError(f"{type(self.spread_model).__name__} stops on z-scores; pass zscores")
+            with np.errstate(invalid="ignore"):
+                z = np.asarray(zscores, dtype=float)
+                return z < -self.stop_loss_z if self.position == 1 else z > self.stop_loss_z
+
+        if self.position == 1:  # Long stock1, short stock2
+            loss_pct = (self.entry_spread - values) / self.entry_spread
+        else:  # Short stock1, long stock2
+            loss_pct = (values - self.entry_spread) / self.entry_spread
+        return loss_pct > self.stop_loss_pct
+
+    def signals_from_spread(self, spread: pd.Series) -> pd.DataFrame:
+        """Z-score, entry, exit and stop-loss signals for every bar of a spread"""
+        values = np.asarray(spread, dtype=float)
+        zscores = self.rolling_zscore(values)
+        return pd.DataFrame(
+            {
+                "spread": values,
+                "zscore": zscores,
+                "entry": self.entry_signals(zscores),
+                "exit": self.exit_signals(zscores),
+                "stop_loss": self.stop_loss_signals(values, zscores),
+            },
+            index=spread.index if isinstance(spread, pd.Series) else None,
+        )
+
+    def generate_signals(self, prices1: pd.Series, prices2: pd.Series) -> pd.DataFrame:
+        """Batch signals for a full price history in one vectorized pass"""
+        return self.signals_from_spread(self.calculate_spread(prices1, prices2))
+
+    def entry_signal_for(self, z_score: float, threshold: Optional[float] = None) -> Optional[int]:
+        """Entry signal for a single z-score (None when there is no signal)"""
+        threshold = self.entry_threshold if threshold is None else threshold
+        z_score = float(z_score)
+        if z_score > threshold:
             return -1  # Short stock1, long stock2
-        elif z_score < -self.entry_threshold:
+        elif z_score < -threshold:
             return 1   # Long stock1, short stock2
-            
         return None
-    
-    def find_exit_signal(self, spread: pd.Series) -> bool:
+
+    def exit_signal_for(self, z_score: float, threshold: Optional[float] = None) -> bool:
+        """Exit signal for a single z-score"""
+        threshold = self.exit_threshold if threshold is None else threshold
+        return bool(abs(z_score) < threshold)
+
+    def rolling_stats(self, spreads: Iterable[float] = ()) -> RollingZScore:
+        """O(1)-per-bar z-score state matching rolling_zscore's window"""
+        stats = RollingZScore(max(self.window_bars(), 2))
+        for value in list(spreads)[-stats.window:]:
+            stats.push(value)
+        return stats
+
+    def find_entry_signal(self, spread: pd.Series, threshold: Optional[float] = None) -> Optional[int]:
+        """Find entry signals based on z-score of spread"""
+        n = self.window_bars() + 1
+        if len(spread) < n:
+            return None
+
+        z_score = self.rolling_zscore(spread[-n:])[-1]
+        return self.entry_signal_for(z_score, threshold)
+
+    def find_exit_signal(self, spread: pd.Series, threshold: Optional[float] = None) -> bool:
         """Find exit signal when spread returns to normal"""
-        if len(spread) < self.lookback_days:
-            return False
-            
-        current_spread = spread.iloc[-1]
-        historical_spread = spread.iloc[-self.lookback_days:-1]
-        
-        mean_spread = historical_spread.mean()
-        std_spread = historical_spread.std()
-        
-        if std_spread == 0:
+        n = self.window_bars() + 1
+        if len(spread) < n:
             return False
-            
-        z_score = abs((current_spread - mean_spread) / std_spread)
-        return z_score < self.exit_threshold
+
+        z_score = self.rolling_zscore(spread[-n:])[-1]
+        return self.exit_signal_for(z_score, threshold)
     
     def calculate_trade_details(self, signal: int, account_value: float, 
                               price1: float, price2: float) -> Dict:
@@ -103,22 +267,40 @@ class PairsStrategy:
             "price2": price2
         }
     
-    def should_stop_loss(self, current_spread: float) -> bool:
-        """Check if stop loss should trigger"""
-        if self.position == 0 or self.entry_spread is None:
-            return False
-        
-        # Calculate loss percentage
-        if self.position == 1:  # Long stock1, short stock2
-            loss_pct = (self.entry_spread - current_spread) / self.entry_spread
-        else:  # Short stock1, long stock2
-            loss_pct = (current_spread - self.entry_spread) / self.entry_spread
-        
-        return loss_pct > 0.02  # 2% stop loss
+    def should_stop_loss(self, current_spread: float, z_score: Optional[float] = None) -> bool:
+        """Check if stop loss should trigger (hedge-ratio spreads need the bar's z-score)"""
+        zscores = None if z_score is None else [z_score]
+        return bool(self.stop_loss_signals([current_spread], zscores)[0])
     
     def update_position(self, new_position: int, entry_spread: float = None):
         """Update strategy position and entry details"""
         self.position = new_position
         if entry_spread is not None:
             self.entry_spread = entry_spread
-            self.entry_time = datetime.now()
\ No newline at end of file
+            self.entry_time = datetime.now(timezone.utc)
+
+    # Settings and position written to a checkpoint; the risk limits and thresholds
+    # may have been tuned since construction, so they travel with the position
+    _STATE_FIELDS = ("lookback_bars", "position", "entry_spread", "max_position_size", "risk_per_trade",
+                     "entry_threshold", "exit_threshold", "stop_loss_pct", "zscore_window")
+
+    def to_state(self) -> dict:
+        """JSON-serializable snapshot for checkpoints"""
+        state = {name: getattr(self, name) for name in self._STATE_FIELDS}
+        if state["entry_spread"] is not None:
+            state["entry_spread"] = float(state["entry_spread"])
+        state.update(stock1=self.stock1, stock2=self.stock2, timeframe=self.timeframe, entry_time=timestamp(self.entry_time),
+                     spread_model=self.spread_model.to_state(), stop_loss_z=self.stop_loss_z)
+        return state
+
+    def restore_state(self, state: dict):
+        """Inverse of to_state() for the same pair"""
+        if (state["stock1"], state["stock2"]) != (self.stock1, self.stock2):
+            raise ValueError(f"Checkpoint is for {state['stock1']}/{state['stock2']}, not {self.stock1}/{self.stock2}")
+        if state["timeframe"] != self.timeframe:
+            raise ValueError(f"Checkpoint is for {state['timeframe']} bars, not {self.timeframe}")
+        for name in self._STATE_FIELDS:
+            setattr(self, name, state[name])
+        self.stop_loss_z = state.get("stop_loss_z", self.stop_loss_z)  # absent in older checkpoints
+        self.entry_time = parse_timestamp(state["entry_time"])
+        self.spread_model = restore_spread_model(state["spread_model"])
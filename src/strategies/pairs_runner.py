@@ -1,84 +1,161 @@
 import asyncio
-from datetime import datetime, timedelta
-from typing import Optional
+from collections import deque
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
 
 from .pairs import PairsStrategy
-from ..data_api import get_bars
-from ..orders import place_market_order, list_positions
-from ..clients import trading_client
+from .. import async_api, execution, metrics, order_book
+from ..broker_state import BrokerState, shared
+from ..checkpoint import CHECKPOINT_MAX_AGE, Checkpointer, reconcile_position
+from ..execution import PairExecution
+from ..journal import TradeJournal, shared as shared_journal
+from ..order_book import Holding, OrderBook
+from ..trading_calendar import history_start
+
+# Recent entry/exit events kept in memory; the full history is in the journal
+TRADE_HISTORY_LIMIT = 1000
 
 class PairsRunner:
-    def __init__(self, strategy: PairsStrategy, check_interval: int = 300):
+    def __init__(self, strategy: PairsStrategy, check_interval: int = 300, executor: Optional[Executor] = None,
+                 broker_state: Optional[BrokerState] = None, journal: Optional[TradeJournal] = None,
+                 checkpoint_path: Optional[str] = None, book: Optional[OrderBook] = None):
         self.strategy = strategy
         self.check_interval = check_interval
+        self.executor = executor  # Pool for blocking SDK calls; None uses the shared async_api pool
+        self.broker_state = broker_state or shared()  # account/positions shared with other runners
         self.running = False
-        self.trade_history = []
+        self.trade_history = deque(maxlen=TRADE_HISTORY_LIMIT)
+        self.journal = journal or shared_journal()
+        self.book = book or order_book.shared()  # orders and this pair's holdings, from trade updates
+        # Legs another pair in the same account also trades: the account's quantity isn't all ours
+        self.shared_symbols: Set[str] = set()
+        self._holdings_known = False  # holdings restored from a checkpoint (even if empty)
+        self._history: Optional[Tuple[pd.Series, pd.Series]] = None  # aligned closes kept across cycles
+        # Warm-restart snapshots; see src/checkpoint.py
+        self.checkpointer = Checkpointer(checkpoint_path) if checkpoint_path else None
+        self._saved_position: Optional[int] = None
         
     async def run_once(self):
         """Run one iteration of the strategy"""
         try:
-            # Get market data
-            end_time = datetime.now()
-            calendar_days_needed = int(self.strategy.lookback_days * 1.5)
-            start_time = end_time - timedelta(days=calendar_days_needed)
-            
-            print(f"📊 Getting {calendar_days_needed} calendar days of data...")
-            
-            bars1 = get_bars([self.strategy.stock1], "1D", start_time, end_time)
-            bars2 = get_bars([self.strategy.stock2], "1D", start_time, end_time)
-            
-            if bars1.empty or bars2.empty:
-                print(f"❌ No data for {self.strategy.stock1} or {self.strategy.stock2}")
-                return
-            
-            # Extract prices
-            prices1 = bars1.xs(self.strategy.stock1)['close']
-            prices2 = bars2.xs(self.strategy.stock2)['close']
-            prices1, prices2 = prices1.align(prices2, join='inner')
-            
-            if len(prices1) < self.strategy.lookback_days:
-                print(f"❌ Not enough data: {len(prices1)} days")
-                return
-            
-            print(f"✅ Got {len(prices1)} trading days")
-            
-            # Strategy does all the math
+            with metrics.span("run_once", "total"):
+                # Get market data: enough trading sessions for the lookback at this bar size
+                bars, timeframe = self.strategy.lookback_bars, self.strategy.timeframe
+                end_time = datetime.now(timezone.utc)
+                start_time = history_start(end_time, bars, timeframe)
+
+                print(f"📊 Getting {bars} {timeframe} bars since {start_time:%Y-%m-%d}...")
+
+                with metrics.span("run_once", "fetch"):
+                    prices1, prices2 = await self._load_history(start_time, end_time)
+
+                if prices1.empty:
+                    print(f"❌ No data for {self.strategy.stock1} or {self.strategy.stock2}")
+                    metrics.count_cycle("run_once", "no_data")
+                    return
+
+                print(f"✅ Got {len(prices1)} bars")
+                await self.evaluate(prices1, prices2)
+            metrics.count_cycle("run_once", "ok")
+
+        except Exception as e:
+            metrics.count_cycle("run_once", "error")
+            print(f"❌ Error in strategy execution: {e}")
+    
+    @property
+    def name(self) -> str:
+        return f"{self.strategy.stock1}/{self.strategy.stock2}"
+
+    def _journal_execution(self, result: PairExecution, prices: dict):
+        for leg in result.legs + result.unwinds:
+            if leg.filled_qty > 0:
+                self.journal.record_fill(leg.symbol, leg.side, leg.filled_qty, leg.avg_price or prices.get(leg.symbol),
+                                         ",".join(leg.order_ids), strategy=self.name)
+
+    async def _load_history(self, start_time: datetime, end_time: datetime) -> Tuple[pd.Series, pd.Series]:
+        """Aligned closes for [start_time, end_time].
+
+        The first cycle downloads the whole window; later cycles only request
+        bars from the last one held (which is re-fetched, since it may still
+        have been forming) and drop bars that fell out of the window.
+        """
+        window_start = pd.Timestamp(start_time)
+        if window_start.tzinfo is None:
+            window_start = window_start.tz_localize("UTC")  # naive datetimes are UTC to Alpaca
+        held = self._history
+        if held is not None and len(held[0]) and held[0].index[-1] >= window_start:
+            since = held[0].index[-1]
+            # Both legs in one request, already aligned on common timestamps
+            new1, new2 = await async_api.load_pair(self.strategy.stock1, self.strategy.stock2,
+                                                   self.strategy.timeframe, since, end_time, executor=self.executor)
+            prices1, prices2 = new1.combine_first(held[0]), new2.combine_first(held[1])
+        else:
+            prices1, prices2 = await async_api.load_pair(self.strategy.stock1, self.strategy.stock2,
+                                                         self.strategy.timeframe, start_time, end_time,
+                                                         executor=self.executor)
+        if len(prices1) and prices1.index[0] < window_start:
+            keep = prices1.index >= window_start
+            prices1, prices2 = prices1[keep], prices2[keep]
+        self._history = (prices1, prices2)
+        return prices1, prices2
+
+    def reset_history(self):
+        """Forget the held closes so the next cycle downloads the full window"""
+        self._history = None
+
+    async def evaluate(self, prices1: pd.Series, prices2: pd.Series,
+                       account_value: Optional[float] = None, positions: Optional[List[dict]] = None):
+        """Compute signals on aligned prices and trade on them.
+
+        account_value and positions can be supplied by a caller that already
+        fetched them for this cycle; otherwise they are looked up on demand.
+        """
+        if len(prices1) < self.strategy.lookback_bars:
+            print(f"❌ Not enough data: {len(prices1)} bars")
+            return
+        
+        # Strategy does all the math
+        with metrics.span("run_once", "signals"):
             spread = self.strategy.calculate_spread(prices1, prices2)
             entry_signal = self.strategy.find_entry_signal(spread)
             exit_signal = self.strategy.find_exit_signal(spread)
-            
-            current_spread = spread.iloc[-1]
-            print(f"📈 Current spread: {current_spread:.4f}")
-            print(f"🎯 Entry signal: {entry_signal}, Exit signal: {exit_signal}")
-            
-            # Execute trades based on strategy signals
-            if entry_signal and self.strategy.position == 0:
-                await self._execute_entry(entry_signal, current_spread)
-            elif exit_signal and self.strategy.position != 0:
-                await self._execute_exit()
-                
-        except Exception as e:
-            print(f"❌ Error in strategy execution: {e}")
+        
+        current_spread = spread.iloc[-1]
+        print(f"📈 Current spread: {current_spread:.4f}")
+        print(f"🎯 Entry signal: {entry_signal}, Exit signal: {exit_signal}")
+        
+        # Execute trades based on strategy signals, sized off the closes just evaluated
+        if entry_signal and self.strategy.position == 0:
+            prices = (float(prices1.iloc[-1]), float(prices2.iloc[-1]))
+            await self._execute_entry(entry_signal, current_spread, account_value, prices)
+        elif exit_signal and self.strategy.position != 0:
+            await self._execute_exit(positions, current_spread)
     
-    async def _execute_entry(self, signal: int, current_spread: float):
+    async def _execute_entry(self, signal: int, current_spread: float, account_value: Optional[float] = None,
+                             prices: Optional[Tuple[float, float]] = None):
         """Execute entry trade based on strategy calculations"""
         try:
             print(f"🚀 EXECUTING TRADE: Signal {signal}")
             
             # Get account info
-            tc = trading_client()
-            account = tc.get_account()
-            account_value = float(account.equity)
+            if account_value is None:
+                with metrics.span("entry", "account"):
+                    account_value = await async_api.run_blocking(self.broker_state.equity, executor=self.executor)
             
             # Get current prices
-            latest1 = get_bars([self.strategy.stock1], "1D", limit=1)
-            latest2 = get_bars([self.strategy.stock2], "1D", limit=1)
-            
-            price1 = float(latest1.xs(self.strategy.stock1)['close'].iloc[-1])
-            price2 = float(latest2.xs(self.strategy.stock2)['close'].iloc[-1])
+            if prices is None:
+                with metrics.span("entry", "prices"):
+                    latest1, latest2 = await async_api.load_pair(self.strategy.stock1, self.strategy.stock2,
+                                                                 self.strategy.timeframe, executor=self.executor)
+                prices = (float(latest1.iloc[-1]), float(latest2.iloc[-1]))
+            price1, price2 = prices
             
             # Strategy calculates all trade details
-            trade_details = self.strategy.calculate_trade_details(signal, account_value, price1, price2)
+            with metrics.span("entry", "sizing"):
+                trade_details = self.strategy.calculate_trade_details(signal, account_value, price1, price2)
             
             if not trade_details:
                 print("❌ No trade details calculated")
@@ -88,16 +165,23 @@ class PairsRunner:
             print(f"📊 {self.strategy.stock1}: {trade_details['shares1']} shares at ${price1:.2f}")
             print(f"📊 {self.strategy.stock2}: {trade_details['shares2']} shares at ${price2:.2f}")
             
-            # Execute orders
+            # Execute orders: both legs go out concurrently and are confirmed by trade updates;
+            # if the pair can't be completed the filled leg is closed again
             for order in trade_details['orders']:
-                if order['side'] == 'buy':
-                    print(f"🟢 BUYING {order['symbol']}: {order['qty']} shares")
-                    placed_order = place_market_order(order['symbol'], "buy", qty=order['qty'])
-                    print(f"✅ Order placed: {placed_order}")
-                else:  # sell
-                    print(f"🔴 SELLING {order['symbol']}: {order['qty']} shares")
-                    placed_order = place_market_order(order['symbol'], "sell", qty=order['qty'])
-                    print(f"✅ Order placed: {placed_order}")
+                icon, verb = ("🟢", "BUYING") if order['side'] == 'buy' else ("🔴", "SELLING")
+                print(f"{icon} {verb} {order['symbol']}: {order['qty']} shares")
+            with metrics.span("entry", "submit"):
+                result = await execution.execute_pair(trade_details['orders'], book=self.book, owner=self.name,
+                                                      executor=self.executor)
+            self.broker_state.invalidate()
+            for leg in result.legs:
+                if leg.complete:
+                    print(f"✅ Filled {leg.symbol}: {leg.filled_qty:g} shares")
+                else:
+                    print(f"❌ {leg.symbol} order failed: {leg.error}")
+            self._journal_execution(result, {self.strategy.stock1: price1, self.strategy.stock2: price2})
+            if not result.filled:
+                raise RuntimeError(f"pair entry {result.status}" + (" (legs left open)" if result.status == "failed" else ""))
             
             # Update strategy position
             self.strategy.update_position(signal, current_spread)
@@ -112,20 +196,51 @@ class PairsRunner:
         except Exception as e:
             print(f"❌ Trade execution error: {e}")
     
-    async def _execute_exit(self):
-        """Execute exit trade"""
+    async def _execute_exit(self, positions: Optional[List[dict]] = None, current_spread: Optional[float] = None):
+        """Close exactly what this pair opened, as recorded in the order book"""
         try:
             print(f"🚪 Exiting position: {self.strategy.position}")
             
-            # Close all positions
-            positions = list_positions()
-            for pos in positions:
-                symbol = pos['symbol']
-                qty = float(pos['qty'])
-                if qty > 0:
-                    print(f"🔴 SELLING {symbol}: {qty} shares")
-                    place_market_order(symbol, "sell", qty=qty)
-                # Note: For short positions, you'd buy to cover
+            held = self.book.holdings(self.name)
+            if not held:
+                # Nothing recorded for this pair (opened before this process): use the broker's legs,
+                # unless another pair holds the same symbol and the account's quantity isn't all ours
+                shared_legs = self.shared_symbols & {self.strategy.stock1, self.strategy.stock2}
+                if shared_legs:
+                    print(f"❌ {self.name}: holdings unknown and {', '.join(sorted(shared_legs))} is traded by "
+                          f"another pair; not exiting, close it by hand")
+                    return
+                if positions is None:
+                    with metrics.span("exit", "positions"):
+                        positions = await async_api.run_blocking(self.broker_state.positions, executor=self.executor)
+                held = self._account_holdings(positions)
+            legs = []
+            for symbol, holding in held.items():
+                side = "sell" if holding.qty > 0 else "buy"  # buy to cover shorts
+                icon, verb = ("🔴", "SELLING") if side == "sell" else ("🟢", "COVERING")
+                print(f"{icon} {verb} {symbol}: {abs(holding.qty):g} shares")
+                legs.append({"symbol": symbol, "side": side, "qty": abs(holding.qty)})
+            with metrics.span("exit", "submit"):
+                result = await execution.execute_pair(legs, book=self.book, owner=self.name, unwind=False,
+                                                      executor=self.executor)
+            self.broker_state.invalidate()
+            for leg in result.legs:
+                if not leg.complete:
+                    print(f"❌ {leg.symbol} exit order failed: {leg.error}")
+            self._journal_execution(result, {})
+            if not result.filled:
+                # The book keeps what is still open; the next exit signal closes the rest
+                raise RuntimeError("pair exit incomplete")
+
+            # Realized P&L of the closed legs against their entry prices
+            pnl = None
+            for leg in result.legs:
+                entry = held[leg.symbol].avg_price
+                if entry is not None and leg.avg_price is not None:
+                    sign = 1 if leg.side == "sell" else -1
+                    pnl = (pnl or 0.0) + sign * (leg.avg_price - entry) * leg.filled_qty
+            self.journal.record_trade(self.name, datetime.now(timezone.utc), self.strategy.entry_time, self.strategy.position,
+                                      self.strategy.entry_spread, current_spread, "exit", pnl)
             
             self.strategy.update_position(0)
             print("✅ Position closed")
@@ -139,14 +254,129 @@ class PairsRunner:
             
         except Exception as e:
             print(f"❌ Exit execution error: {e}")
+
+    def _account_holdings(self, positions: List[dict]) -> Dict[str, Holding]:
+        """This pair's legs in a broker positions list (orders.list_positions shape).
+
+        Symbols shared with another pair are left out: their account quantity
+        belongs to more than one pair.
+        """
+        pair_symbols = {self.strategy.stock1, self.strategy.stock2} - self.shared_symbols
+        held = {}
+        for pos in positions:
+            symbol, qty = pos['symbol'].upper(), float(pos['qty'])
+            if symbol in pair_symbols and qty:
+                try:
+                    price = float(pos['avg_entry'])
+                except (KeyError, TypeError, ValueError):
+                    price = None
+                held[symbol] = Holding(qty, price)
+        return held
     
+    # -------- Checkpoints --------
+
+    def checkpoint_state(self) -> dict:
+        state = {"pair": self.name, "strategy": self.strategy.to_state(), "holdings": self.holdings_state()}
+        if self._history is not None:
+            prices1, prices2 = self._history
+            state["history"] = {"index": [ts.isoformat() for ts in prices1.index],
+                                "close1": prices1.tolist(), "close2": prices2.tolist()}
+        return state
+
+    def restore_checkpoint(self, state: dict):
+        self.strategy.restore_state(state["strategy"])
+        self.restore_holdings(state.get("holdings"))
+        history = state.get("history")
+        if history is not None:
+            index = pd.to_datetime(history["index"])
+            self._history = (pd.Series(history["close1"], index=index, name=self.strategy.stock1),
+                             pd.Series(history["close2"], index=index, name=self.strategy.stock2))
+
+    def save_checkpoint(self, force: bool = False) -> bool:
+        """Checkpoint if due, and always right after the position changed"""
+        if self.checkpointer is None:
+            return False
+        position = self.strategy.position
+        saved = self.checkpointer.maybe_save(self.checkpoint_state, force or position != self._saved_position)
+        if saved:
+            self._saved_position = position
+        return saved
+
+    def holdings_state(self) -> dict:
+        return {s: [h.qty, h.avg_price] for s, h in self.book.holdings(self.name).items()}
+
+    def restore_holdings(self, state: Optional[dict]):
+        """Holdings saved by holdings_state(); None (an older checkpoint) leaves them unknown"""
+        if state is None:
+            return
+        self.book.set_holdings(self.name, {s: Holding(*h) for s, h in state.items()})
+        self._holdings_known = True
+
+    def reconcile(self, positions: List[dict]):
+        """Align the strategy's position and holdings with the broker's (orders.list_positions shape).
+
+        A leg no other pair trades is read from the account. A shared leg is
+        only known from this pair's checkpointed holdings; without them the
+        checkpoint's position stands and nothing is adopted.
+        """
+        account = {p['symbol'].upper(): float(p['qty']) for p in positions}
+        book = self.book.holdings(self.name)
+        unshared = self._account_holdings(positions)
+        legs: Dict[str, Holding] = {}
+        for symbol in (self.strategy.stock1, self.strategy.stock2):
+            if account.get(symbol, 0.0) == 0:
+                continue  # flat in the account means flat for every pair
+            if symbol not in self.shared_symbols:
+                held, known = unshared[symbol], book.get(symbol)
+                legs[symbol] = Holding(held.qty, known.avg_price if known is not None else held.avg_price)
+            elif self._holdings_known:
+                if symbol in book:
+                    legs[symbol] = book[symbol]
+            else:
+                print(f"⚠️ {self.name}: {symbol} is shared with another pair and this pair's holdings weren't "
+                      f"checkpointed; keeping position {self.strategy.position}")
+                return
+        qty1 = legs[self.strategy.stock1].qty if self.strategy.stock1 in legs else 0.0
+        qty2 = legs[self.strategy.stock2].qty if self.strategy.stock2 in legs else 0.0
+        position = reconcile_position(self.strategy.position, qty1, qty2)
+        # Exits close the book's holdings, so they follow what this pair is found to hold
+        self.book.set_holdings(self.name, legs if position != 0 else {})
+        if position != self.strategy.position:
+            print(f"⚠️ {self.name}: checkpoint position {self.strategy.position} but broker holds "
+                  f"{qty1:g}/{qty2:g}; resuming at {position}")
+            # The entry we remember doesn't describe what is held
+            self.strategy.position = position
+            self.strategy.entry_spread = None
+            self.strategy.entry_time = None
+
+    async def resume(self, max_age: Optional[float] = CHECKPOINT_MAX_AGE) -> bool:
+        """Restore the last checkpoint and reconcile it with the broker; False if there was none to use"""
+        if self.checkpointer is None:
+            return False
+        state = self.checkpointer.load(max_age)
+        if state is None or state.get("pair") != self.name:
+            return False
+        try:
+            self.restore_checkpoint(state)
+        except (KeyError, ValueError) as e:
+            print(f"❌ Ignoring checkpoint for {self.name}: {e}")
+            return False
+        positions = await async_api.run_blocking(self.broker_state.positions, executor=self.executor)
+        self.reconcile(positions)
+        self._saved_position = self.strategy.position
+        print(f"♻️ Resumed {self.name} from checkpoint: position {self.strategy.position}")
+        return True
+
     async def run_forever(self):
         """Run the strategy continuously"""
         self.running = True
+        metrics.start_exporters()
         print(f"🚀 Starting pairs strategy for {self.strategy.stock1}/{self.strategy.stock2}")
+        await self.resume()
         
         while self.running:
             await self.run_once()
+            self.save_checkpoint()
             await asyncio.sleep(self.check_interval)
     
     def stop(self):
@@ -154,15 +384,15 @@ class PairsRunner:
         self.running = False
 
     def print_performance_summary(self):
-        """Print strategy performance"""
-        if not self.trade_history:
+        """Print strategy performance from the trade journal"""
+        summary = self.journal.summary(self.name)
+        if not summary['trades']:
             print("No trades executed yet")
             return
         
-        total_trades = len(self.trade_history)
-        profitable_trades = len([t for t in self.trade_history if t.get('pnl', 0) > 0])
-        
         print(f"📊 Performance Summary:")
-        print(f"   Total trades: {total_trades}")
-        print(f"   Profitable: {profitable_trades}")
-        print(f"   Win rate: {profitable_trades/total_trades*100:.1f}%")
\ No newline at end of file
+        print(f"   Total trades: {summary['trades']}")
+        print(f"   Profitable: {summary['profitable']}")
+        print(f"   Win rate: {summary['win_rate']*100:.1f}%")
+        print(f"   Total P&L: ${summary['total_pnl']:.2f}")
+        print(f"   Avg hold: {summary['avg_hold_seconds'] / 3600:.1f}h")
\ No newline at end of file
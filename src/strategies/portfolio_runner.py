@@ -0,0 +1,198 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from .config import PairsConfig
+from .pairs import PairsStrategy
+from .pairs_runner import PairsRunner
+from .. import async_api, metrics
+from ..broker_state import BrokerState, shared
+from ..checkpoint import CHECKPOINT_MAX_AGE, CHECKPOINT_PATH, Checkpointer
+from ..journal import TradeJournal
+from ..trading_calendar import history_start
+
+class PortfolioRunner:
+    """Runs many pairs under one event loop with shared market data and account state.
+
+    Each cycle downloads every distinct symbol once (in batched requests spread
+    over a bounded thread pool), reads the account and positions once from the
+    shared BrokerState, then evaluates all pairs concurrently against that
+    snapshot. The close matrix is kept between cycles, so after the first one
+    only bars since the last held bar are downloaded.
+
+    Every pair's strategy state and order-book holdings go into one checkpoint
+    file (CHECKPOINT_PATH by default), saved after each cycle and restored on
+    start.
+    """
+
+    def __init__(self, configs: List[PairsConfig], check_interval: Optional[int] = None,
+                 max_workers: int = 8, batch_size: int = 100, timeframe: Optional[str] = None,
+                 broker_state: Optional[BrokerState] = None, journal: Optional[TradeJournal] = None,
+                 checkpoint_path: Optional[str] = CHECKPOINT_PATH):
+        if not configs:
+            raise ValueError("PortfolioRunner needs at least one PairsConfig")
+        # One close matrix per cycle, so every pair trades the same bar size
+        timeframes = {c.timeframe for c in configs}
+        if len(timeframes) > 1 or (timeframe is not None and timeframes != {timeframe}):
+            raise ValueError(f"PortfolioRunner pairs must share one timeframe, got {sorted(timeframes | {timeframe} - {None})}")
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="portfolio")
+        self.broker_state = broker_state or shared()
+        self.runners = [
+            PairsRunner(PairsStrategy.from_config(c), c.check_interval, executor=self.executor,
+                        broker_state=self.broker_state, journal=journal)
+            for c in configs
+        ]
+        # A symbol in several pairs is split between them; each pair's share is only known from its holdings
+        counts = Counter(s for r in self.runners for s in {r.strategy.stock1, r.strategy.stock2})
+        for runner in self.runners:
+            runner.shared_symbols = {s for s in (runner.strategy.stock1, runner.strategy.stock2) if counts[s] > 1}
+        self.check_interval = check_interval or min(c.check_interval for c in configs)
+        self.batch_size = batch_size
+        self.timeframe = timeframe or configs[0].timeframe
+        self.checkpointer = Checkpointer(checkpoint_path) if checkpoint_path else None
+        self._closes: Optional[pd.DataFrame] = None  # close matrix kept across cycles
+        self.running = False
+
+    @property
+    def symbols(self) -> List[str]:
+        """Distinct symbols across all pairs, in first-seen order"""
+        seen = {}
+        for runner in self.runners:
+            seen.setdefault(runner.strategy.stock1, None)
+            seen.setdefault(runner.strategy.stock2, None)
+        return list(seen)
+
+    async def _load_closes(self) -> pd.DataFrame:
+        """Close matrix (timestamp x symbol) for every distinct symbol.
+
+        Like PairsRunner's history: the first cycle downloads the whole
+        lookback; later cycles only request bars from the last one held
+        (re-fetched, since it may still have been forming) and drop bars that
+        fell out of the window.
+        """
+        end_time = datetime.now(timezone.utc)
+        lookback = max(r.strategy.lookback_bars for r in self.runners)
+        start_time = history_start(end_time, lookback, self.timeframe)
+        window_start = pd.Timestamp(start_time)
+
+        symbols = self.symbols
+        held = self._closes
+        incremental = held is not None and len(held) > 0 and held.index[-1] >= window_start
+        since = held.index[-1] if incremental else start_time
+        batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        frames = await asyncio.gather(*(
+            async_api.load_universe(batch, self.timeframe, since, end_time, executor=self.executor,
+                                    fields=("close",), dropna=False)
+            for batch in batches
+        ))
+        closes = pd.concat([f["close"] for f in frames], axis=1)
+        if incremental:
+            closes = closes.combine_first(held).reindex(columns=symbols)  # new bars win
+        closes = closes[closes.index >= window_start]
+        self._closes = closes
+        return closes
+
+    def reset_history(self):
+        """Forget the held closes so the next cycle downloads the full window"""
+        self._closes = None
+
+    @staticmethod
+    async def _timed(stage: str, awaitable):
+        with metrics.span("portfolio", stage):
+            return await awaitable
+
+    async def run_once(self):
+        """Run one cycle across every pair"""
+        with metrics.span("portfolio", "total"):
+            await self._run_once()
+
+    async def _run_once(self):
+        try:
+            closes, account_value, positions = await asyncio.gather(
+                self._timed("fetch", self._load_closes()),
+                self._timed("account", async_api.run_blocking(self.broker_state.equity, executor=self.executor)),
+                self._timed("positions", async_api.run_blocking(self.broker_state.positions, executor=self.executor)),
+            )
+        except Exception as e:
+            metrics.count_cycle("portfolio", "error")
+            print(f"❌ Error loading portfolio state: {e}")
+            return
+
+        print(f"📊 {len(self.runners)} pairs over {len(closes.columns)} symbols, {len(closes)} bars")
+
+        results = await asyncio.gather(*(
+            self._evaluate(runner, closes, account_value, positions) for runner in self.runners
+        ), return_exceptions=True)
+        for runner, result in zip(self.runners, results):
+            if isinstance(result, Exception):
+                print(f"❌ Error in {runner.strategy.stock1}/{runner.strategy.stock2}: {result}")
+        metrics.count_cycle("portfolio", "ok")
+
+    async def _evaluate(self, runner: PairsRunner, closes: pd.DataFrame,
+                        account_value: float, positions: List[dict]):
+        s1, s2 = runner.strategy.stock1, runner.strategy.stock2
+        if s1 not in closes.columns or s2 not in closes.columns:
+            print(f"❌ No data for {s1} or {s2}")
+            return
+        pair = closes[[s1, s2]].dropna()
+        await runner.evaluate(pair[s1], pair[s2], account_value, positions)
+
+    def positions_by_pair(self) -> Dict[str, int]:
+        return {f"{r.strategy.stock1}/{r.strategy.stock2}": r.strategy.position for r in self.runners}
+
+    def checkpoint_state(self) -> dict:
+        return {"pairs": {runner.name: runner.strategy.to_state() for runner in self.runners},
+                "holdings": {runner.name: runner.holdings_state() for runner in self.runners}}
+
+    def save_checkpoint(self, force: bool = False) -> bool:
+        if self.checkpointer is None:
+            return False
+        return self.checkpointer.maybe_save(self.checkpoint_state, force)
+
+    async def resume(self, max_age: Optional[float] = CHECKPOINT_MAX_AGE) -> int:
+        """Restore checkpointed pairs and reconcile them with one positions snapshot; returns how many"""
+        state = self.checkpointer.load(max_age) if self.checkpointer is not None else None
+        if state is None:
+            return 0
+        restored = []
+        holdings = state.get("holdings")  # absent in checkpoints written before holdings were saved
+        for runner in self.runners:
+            pair_state = state["pairs"].get(runner.name)
+            if pair_state is None:
+                continue
+            try:
+                runner.strategy.restore_state(pair_state)
+                runner.restore_holdings(holdings.get(runner.name, {}) if holdings is not None else None)
+            except (KeyError, ValueError) as e:
+                print(f"❌ Ignoring checkpoint for {runner.name}: {e}")
+                continue
+            restored.append(runner)
+        if restored:
+            positions = await async_api.run_blocking(self.broker_state.positions, executor=self.executor)
+            for runner in restored:
+                runner.reconcile(positions)
+            print(f"♻️ Resumed {len(restored)} of {len(self.runners)} pairs from checkpoint")
+        return len(restored)
+
+    async def run_forever(self):
+        """Run all pairs continuously"""
+        self.running = True
+        metrics.start_exporters()
+        print(f"🚀 Starting portfolio of {len(self.runners)} pairs")
+        await self.resume()
+
+        while self.running:
+            await self.run_once()
+            self.save_checkpoint(force=True)
+            await asyncio.sleep(self.check_interval)
+
+    def stop(self):
+        """Stop the portfolio and release the thread pool once in-flight orders and journal rows are done"""
+        self.running = False
+        self.executor.shutdown(wait=True)
+        for journal in {id(r.journal): r.journal for r in self.runners}.values():
+            journal.flush()
@@ -0,0 +1,527 @@
+import asyncio
+import logging
+import itertools
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .. import metrics, order_book
+from ..broker_state import BrokerState
+from ..checkpoint import parse_timestamp, reconcile_position, timestamp
+from ..clients import LegacyTradingClient
+from ..execution import execute_pair
+from ..journal import TradeJournal, shared as shared_journal
+from ..order_book import OrderBook
+from ..scheduler import request
+from ..rolling import RollingZScore
+from ..spread_models import SpreadModel, StaticSpread, restore_spread_model
+
+def _utc(dt: datetime) -> datetime:
+    # Naive times (backtest dates, older checkpoints) are UTC, as in the journal
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+# ──────────────────────────────────────────────────────────────────────────────
+# STRATEGY CLASS (from backtester)
+# ──────────────────────────────────────────────────────────────────────────────
+class RealTimeTradingStrategy:
+    def __init__(
+        self,
+        api,  # alpaca_trade_api REST client, or None to simulate fills
+        hedge_ratio: float,
+        mean_train: float,
+        std_train: float,
+        entry_z: float = 1.0,
+        exit_z: float = 0.9,
+        slippage_pct: float = 0.0005,
+        stop_loss_pct: float = 0.05,
+        initial_capital: float = 1_000.0,
+        rolling_window: Optional[int] = None,
+        rolling_seed: Iterable[float] = (),
+        spread_model: Optional[SpreadModel] = None,
+        broker_state: Optional[BrokerState] = None,
+        journal: Optional[TradeJournal] = None,
+        book: Optional[OrderBook] = None,
+    ):
+        self.api = api
+        # Account/positions snapshot; pass one BrokerState to share it between strategies
+        self.broker_state = broker_state or (BrokerState(api) if api is not None else None)
+        self.hedge_ratio = hedge_ratio
+        self.mean_train = mean_train
+        self.std_train = std_train
+        self.entry_z = entry_z
+        self.exit_z = exit_z
+        self.slippage_pct = slippage_pct
+        self.capital = initial_capital
+        self.stop_loss_pct = stop_loss_pct
+        self.stop_price_y = None
+        self.stop_price_x = None
+        self.position = 0
+        # Orders go through execution.execute_pair on the api's account and are confirmed by the book's
+        # trade updates (see newtester.py); exits close what the book says this pair holds
+        self._orders = LegacyTradingClient(api) if api is not None else None
+        self.book = book or (order_book.shared() if api is not None else None)
+        self.open_qty = {}  # signed quantities ordered at entry, by symbol
+        self.entry_price_y = 0
+        self.entry_price_x = 0
+        self.entry_time = None
+        # Live sessions journal every trade and fill and keep only recent trades in memory;
+        # simulations (api=None) keep the full in-memory log unless given a journal
+        self.journal = journal or (shared_journal() if api is not None else None)
+        self.trade_log = deque(maxlen=1000) if self.journal is not None else []
+        # Hedge ratio source; the default keeps hedge_ratio fixed for the session
+        self.spread_model = spread_model or StaticSpread(hedge_ratio)
+        if self.spread_model.hedge_ratio is None:
+            raise ValueError("RealTimeTradingStrategy needs a spread model with a hedge ratio")
+        # Optional O(1) rolling spread stats that replace mean_train/std_train once full
+        self.rolling = RollingZScore(rolling_window, hedge_ratio, rolling_seed) if rolling_window else None
+        self._pending_hedge = None  # re-trained hedge ratio waiting for the position to close
+        logging.info(f"Strategy initialized: entry_z={entry_z}, exit_z={exit_z}, capital={initial_capital}")
+
+    def get_latest_prices(self, symbol: str) -> float:
+        if self.api is None:
+            logging.error("API not initialized—cannot fetch real-time prices.")
+            return None
+        try:
+            # Try SIP feed first (premium); rate limits are retried by the scheduler, not by switching feed
+            trade = request(self.api, "get_latest_trade", symbol, feed='sip', key=("latest_trade", symbol, "sip"))
+            price = getattr(trade, "price", None)
+            if price is None:
+                price = getattr(trade, "p", None)
+            return price
+        except Exception as e:
+            logging.warning(f"SIP feed failed for {symbol}: {e}")
+            try:
+                # Fallback to free IEX feed
+                trade = request(self.api, "get_latest_trade", symbol, feed='iex', key=("latest_trade", symbol, "iex"))
+                price = getattr(trade, "price", None)
+                if price is None:
+                    price = getattr(trade, "p", None)
+                logging.info(f"Using IEX feed for {symbol}: ${price}")
+                return price
+            except Exception as e2:
+                logging.error(f"Both SIP and IEX feeds failed for {symbol}: {e2}")
+                return None
+
+    def _log_trade(self, trade_details: dict, y_symbol: str, x_symbol: str):
+        self.trade_log.append(trade_details)
+        if self.journal is not None:
+            self.journal.record_trade(
+                f"{y_symbol}/{x_symbol}", trade_details["Exit"], trade_details["Entry"],
+                1 if trade_details["Dir"] == "LONG" else -1,
+                exit_type=trade_details.get("ExitType", "exit"), pnl=trade_details["Scaled"],
+            )
+
+    def _trade(self, legs: List[Tuple[str, int, str, float]], owner: str, unwind: bool = True) -> bool:
+        """Fill (symbol, qty, side, price) legs together via execution.execute_pair; True once all filled.
+
+        Entries unwind a leg that filled alone; exits pass unwind=False so a
+        failed close is never re-opened. Simulations (api=None) fill at once.
+        """
+        if self.api is None:
+            for symbol, qty, side, _ in legs:
+                logging.info(f"Simulated {side} {qty}@{symbol}")
+            return True
+        orders = [{"symbol": symbol, "side": side, "qty": qty} for symbol, qty, side, _ in legs]
+        result = asyncio.run(execute_pair(orders, book=self.book, owner=owner, unwind=unwind, client=self._orders))
+        self.broker_state.invalidate()
+        if self.journal is not None:
+            prices = {symbol.upper(): price for symbol, _, _, price in legs}
+            for leg in result.legs + result.unwinds:
+                if leg.filled_qty > 0:
+                    self.journal.record_fill(leg.symbol, leg.side, leg.filled_qty,
+                                             leg.avg_price or prices.get(leg.symbol), ",".join(leg.order_ids),
+                                             strategy=owner)
+        return result.filled
+
+    def _held(self, pair: str, symbol: str) -> int:
+        """Shares of `symbol` this pair has open: the book's fills, else (e.g. after a restart) open_qty"""
+        held = self.book.holdings(pair) if self.book is not None else {}
+        if held:
+            holding = held.get(symbol.upper())
+            return abs(int(holding.qty)) if holding is not None else 0  # a leg already closed
+        return abs(int(self.open_qty.get(symbol, 0)))
+
+    def _close(self, pair: str, y_symbol: str, x_symbol: str, y_price: float, x_price: float) -> bool:
+        """Flatten exactly what this pair opened, from the local book (no broker round-trip)"""
+        y_side, x_side = ("sell", "buy") if self.position == 1 else ("buy", "sell")
+        legs = [(y_symbol, self._held(pair, y_symbol), y_side, y_price),
+                (x_symbol, self._held(pair, x_symbol), x_side, x_price)]
+        return self._trade([leg for leg in legs if leg[1] > 0], owner=pair, unwind=False)
+
+    def process_data(
+        self,
+        y_symbol: str,
+        x_symbol: str,
+        date: datetime = None,
+        y_price: float = None,
+        x_price: float = None,
+    ):
+        action = "HOLD"
+        trade_details = None
+        zscore = None
+        now = date or datetime.now(timezone.utc)
+        pair = f"{y_symbol}/{x_symbol}"
+        timer = metrics.timeline("process_data")
+
+        # 1) fetch or receive prices
+        if y_price is None or x_price is None:
+            if self.api is None:
+                logging.error(f"{now}: No prices & no API.")
+                return action, trade_details, self.capital, zscore
+            y_price = self.get_latest_prices(y_symbol)
+            x_price = self.get_latest_prices(x_symbol)
+            timer.mark("prices")
+
+        # 2) validate
+
+        # 2a) Make sure std_train is non‐zero
+        if self.std_train == 0:
+          logging.error(f"{now}: std_train=0, cannot compute z-score.")
+          return action, trade_details, self.capital, zscore
+
+        # 2b) Make sure we've got valid price scalars
+        if y_price is None or x_price is None:
+          logging.warning(f"{now}: missing price data.")
+          return action, trade_details, self.capital, zscore
+
+        # 2c) Guard against zero or negative prices
+        if y_price <= 0 or x_price <= 0:
+          logging.warning(f"{now}: non-positive price Y={y_price}, X={x_price}")
+          return action, trade_details, self.capital, zscore
+
+
+        # 3) compute z-score
+        if self._pending_hedge is not None and self.position == 0:
+            self._apply_pending_hedge()
+        hedge = self.spread_model.hedge_ratio
+        spread = self.spread_model.update(y_price, x_price)
+        if self.position == 0:
+            # Open positions keep the ratio they were sized with
+            self.hedge_ratio = hedge
+        if self.rolling is not None and self.rolling.ready:
+            zscore = self.rolling.update(spread)
+        else:
+            zscore = (spread - self.mean_train) / self.std_train
+            if self.rolling is not None:
+                self.rolling.push(spread)
+        timer.mark("zscore")
+
+        # 4) update capital (real-time)
+        if self.api:
+            try:
+                self.capital = self.broker_state.equity()
+            except Exception as e:
+                logging.error(f"{now}: account fetch error: {e}")
+            timer.mark("account")
+
+        # ─── 4.5) STOP‑LOSS CHECK (live AND backtest) ───────────────────────────
+        if self.position != 0:
+            # LONG stop‑loss
+            if self.position == 1 and (y_price <= self.stop_price_y or x_price >= self.stop_price_x):
+                action = "STOP_LOSS_LONG"
+            # SHORT stop‑loss
+            elif self.position == -1 and (y_price >= self.stop_price_y or x_price <= self.stop_price_x):
+                action = "STOP_LOSS_SHORT"
+            else:
+                action = None
+
+            if action:
+                # exit exactly like your normal exit code but tag it as STOP_LOSS
+                closed = self._close(pair, y_symbol, x_symbol, y_price, x_price)
+                timer.mark("orders")
+                if not closed:
+                    logging.error(f"{now}: {action} close not confirmed; still in position")
+                    return "HOLD", trade_details, self.capital, zscore
+                exit_y = y_price * (1 + self.slippage_pct) if self.position==1 else y_price * (1 - self.slippage_pct)
+                exit_x = x_price * (1 - self.slippage_pct) if self.position==1 else x_price * (1 + self.slippage_pct)
+                pnl_y = (exit_y - self.entry_price_y) if self.position==1 else (self.entry_price_y - exit_y)
+                pnl_x = (self.entry_price_x - exit_x) if self.position==1 else (exit_x - self.entry_price_x)
+                gross = pnl_y - self.hedge_ratio * pnl_x if self.position==1 else pnl_y + self.hedge_ratio * pnl_x
+                notional = abs(self.entry_price_y) + abs(self.hedge_ratio * self.entry_price_x)
+                scaled = gross * (self.capital * 0.01 / notional if notional else 0)
+                cap_before = self.capital
+                self.capital += scaled
+
+                trade_details = {
+                    "Entry":    self.entry_time,
+                    "Exit":     now,
+                    "Dir":       "LONG" if self.position==1 else "SHORT",
+                    "ExitType":  action,
+                    "GrossPnL":  round(gross, 4),
+                    "Scaled":    round(scaled, 2),
+                    "CapBefore": round(cap_before, 2),
+                    "CapAfter":  round(self.capital, 2),
+                    "DurDays":   (_utc(now) - _utc(self.entry_time)).days,
+                }
+                self._log_trade(trade_details, y_symbol, x_symbol)
+                self.position = 0
+                self.open_qty = {}
+                logging.warning(f"{now}: {action} triggered at z={zscore:.2f}")
+                return action, trade_details, self.capital, zscore
+
+        # 5) ENTRY
+        if self.position == 0:
+            if zscore > self.entry_z:
+                action = "SHORT"
+                trade_amount = self.capital * 0.01
+                qty_y = int(trade_amount / y_price / (1 + self.slippage_pct))
+                qty_x = int(trade_amount / x_price / (1 - self.slippage_pct) * self.hedge_ratio)
+                if qty_y and qty_x:
+                    entered = self._trade([(y_symbol, qty_y, "sell", y_price), (x_symbol, qty_x, "buy", x_price)],
+                                           owner=pair)
+                    timer.mark("orders")
+                    if entered:
+                        self.position = -1
+                        self.open_qty = {y_symbol: -qty_y, x_symbol: qty_x}
+                        self.entry_time = now
+                        self.entry_price_y, self.entry_price_x = y_price, x_price
+                        # ← STOP‐LOSS levels for SHORT: lose if Y up  stop_loss_pct or X down stop_loss_pct
+                        self.stop_price_y = self.entry_price_y * (1 + self.stop_loss_pct)  # ← stop‐loss
+                        self.stop_price_x = self.entry_price_x * (1 - self.stop_loss_pct)  # ← stop‐loss
+                        logging.info(f"{now}: ENTER SHORT z={zscore:.2f}")
+
+            elif zscore < -self.entry_z:
+                action = "LONG"
+                trade_amount = self.capital * 0.01
+                qty_y = int(trade_amount / y_price / (1 - self.slippage_pct))
+                qty_x = int(trade_amount / x_price / (1 + self.slippage_pct) * self.hedge_ratio)
+                if qty_y and qty_x:
+                    entered = self._trade([(y_symbol, qty_y, "buy", y_price), (x_symbol, qty_x, "sell", x_price)],
+                                           owner=pair)
+                    timer.mark("orders")
+                    if entered:
+                        self.position = 1
+                        self.open_qty = {y_symbol: qty_y, x_symbol: -qty_x}
+                        self.entry_time = now
+                        self.entry_price_y, self.entry_price_x = y_price, x_price
+                        # ← STOP‐LOSS levels for LONG: lose if Y down  stop_loss_pct or X up stop_loss_pct
+                        self.stop_price_y = self.entry_price_y * (1 - self.stop_loss_pct)  # ← stop‐loss
+                        self.stop_price_x = self.entry_price_x * (1 + self.stop_loss_pct)  # ← stop‐loss
+                        logging.info(f"{now}: ENTER LONG  z={zscore:.2f}")
+
+
+        # 6) EXIT (live + backtest)
+        elif self.position != 0:
+            # compute exit + send orders for LONG (long Y, short X)
+            if self.position == 1 and zscore > -self.exit_z:
+                action = "CLOSE_LONG"
+
+                # send opposite orders to flatten; state stays until the close is confirmed
+                closed = self._close(pair, y_symbol, x_symbol, y_price, x_price)
+                timer.mark("orders")
+                if not closed:
+                    logging.error(f"{now}: {action} close not confirmed; still in position")
+                    return "HOLD", trade_details, self.capital, zscore
+
+                # PnL calc (kept from your code)
+                exit_y = y_price * (1 + self.slippage_pct)
+                exit_x = x_price * (1 - self.slippage_pct)
+                pnl_y = exit_y - self.entry_price_y
+                pnl_x = self.entry_price_x - exit_x
+                gross = pnl_y - self.hedge_ratio * pnl_x
+                notional = abs(self.entry_price_y) + abs(self.hedge_ratio * self.entry_price_x)
+                trade_amount = self.capital * 0.01
+                scaled = gross * (trade_amount / notional if notional else 0)
+                cap_before = self.capital
+                self.capital += scaled
+                trade_details = {
+                    "Entry":    self.entry_time,
+                    "Exit":     now,
+                    "Dir":      "LONG",
+                    "GrossPnL": round(gross, 4),
+                    "Scaled":   round(scaled, 2),
+                    "CapBefore":round(cap_before, 2),
+                    "CapAfter": round(self.capital, 2),
+                    "DurDays":  (_utc(now) - _utc(self.entry_time)).days,
+                }
+                self._log_trade(trade_details, y_symbol, x_symbol)
+                self.position = 0
+                self.open_qty = {}
+                logging.info(f"{now}: EXIT LONG  z={zscore:.2f} PnL={scaled:.2f}")
+
+            # compute exit + send orders for SHORT (short Y, long X)
+            elif self.position == -1 and zscore < self.exit_z:
+                action = "CLOSE_SHORT"
+
+                # send opposite orders to flatten; state stays until the close is confirmed
+                closed = self._close(pair, y_symbol, x_symbol, y_price, x_price)
+                timer.mark("orders")
+                if not closed:
+                    logging.error(f"{now}: {action} close not confirmed; still in position")
+                    return "HOLD", trade_details, self.capital, zscore
+
+                # PnL calc (kept from your code)
+                exit_y = y_price * (1 - self.slippage_pct)
+                exit_x = x_price * (1 + self.slippage_pct)
+                pnl_y = self.entry_price_y - exit_y
+                pnl_x = exit_x - self.entry_price_x
+                gross = pnl_y + self.hedge_ratio * pnl_x
+                notional = abs(self.entry_price_y) + abs(self.hedge_ratio * self.entry_price_x)
+                trade_amount = self.capital * 0.01
+                scaled = gross * (trade_amount / notional if notional else 0)
+                cap_before = self.capital
+                self.capital += scaled
+                trade_details = {
+                    "Entry":    self.entry_time,
+                    "Exit":     now,
+                    "Dir":      "SHORT",
+                    "GrossPnL": round(gross, 4),
+                    "Scaled":   round(scaled, 2),
+                    "CapBefore":round(cap_before, 2),
+                    "CapAfter": round(self.capital, 2),
+                    "DurDays":  (_utc(now) - _utc(self.entry_time)).days,
+                }
+                self._log_trade(trade_details, y_symbol, x_symbol)
+                self.position = 0
+                self.open_qty = {}
+                logging.info(f"{now}: EXIT SHORT z={zscore:.2f} PnL={scaled:.2f}")
+
+        return action, trade_details, self.capital, zscore
+
+
+    def get_trade_log(self) -> pd.DataFrame:
+        return pd.DataFrame(self.trade_log)
+
+    def apply_params(self, params: dict):
+        """Adopt re-trained parameters (walk_forward.latest_params) between bars.
+
+        Thresholds and spread stats apply at once. A new hedge ratio waits
+        until the position is flat, since open legs were sized with the old
+        one; rolling stats built on the old ratio are dropped.
+        """
+        for name in ("mean_train", "std_train", "entry_z", "exit_z", "stop_loss_pct", "slippage_pct"):
+            if name in params:
+                setattr(self, name, float(params[name]))
+        hedge = params.get("hedge_ratio")
+        if hedge is not None and isinstance(self.spread_model, StaticSpread):
+            self._pending_hedge = float(hedge)
+            if self.position == 0:
+                self._apply_pending_hedge()
+        logging.info(f"Parameters updated: hedge={self.hedge_ratio}, entry_z={self.entry_z}, exit_z={self.exit_z}, "
+                     f"mean={self.mean_train:.4f}, std={self.std_train:.4f}")
+
+    def _apply_pending_hedge(self):
+        hedge, self._pending_hedge = self._pending_hedge, None
+        if hedge == self.spread_model.hedge_ratio:
+            return
+        self.spread_model = StaticSpread(hedge)
+        self.hedge_ratio = hedge
+        if self.rolling is not None:
+            self.rolling = RollingZScore(self.rolling.window, hedge)
+
+    # -------- Checkpoints --------
+
+    _STATE_FIELDS = ("hedge_ratio", "mean_train", "std_train", "entry_z", "exit_z", "slippage_pct", "stop_loss_pct",
+                     "capital", "position", "entry_price_y", "entry_price_x", "stop_price_y", "stop_price_x",
+                     "open_qty")
+
+    def to_state(self) -> dict:
+        """Optimized parameters, open position and spread state, JSON-serializable"""
+        state = {name: getattr(self, name) for name in self._STATE_FIELDS}
+        state = {k: float(v) if isinstance(v, float) else v for k, v in state.items()}  # numpy scalars
+        state.update(
+            entry_time=timestamp(self.entry_time),
+            spread_model=self.spread_model.to_state(),
+            rolling=self.rolling.to_state() if self.rolling is not None else None,
+        )
+        return state
+
+    @classmethod
+    def from_state(cls, state: dict, api, broker_state: Optional[BrokerState] = None,
+                   journal: Optional[TradeJournal] = None, book: Optional[OrderBook] = None) -> "RealTimeTradingStrategy":
+        """Rebuild a strategy from to_state() without re-fitting it"""
+        strat = cls(api, state["hedge_ratio"], state["mean_train"], state["std_train"],
+                    spread_model=restore_spread_model(state["spread_model"]),
+                    broker_state=broker_state, journal=journal, book=book)
+        for name in cls._STATE_FIELDS:
+            setattr(strat, name, state.get(name, {}) if name == "open_qty" else state[name])
+        strat.entry_time = parse_timestamp(state["entry_time"])
+        if state["rolling"] is not None:
+            strat.rolling = RollingZScore.from_state(state["rolling"])
+        return strat
+
+    def reconcile(self, y_symbol: str, x_symbol: str) -> int:
+        """Align the position with the broker's Y/X holdings (the broker wins) and return it"""
+        if self.broker_state is None:
+            return self.position
+        pos_y, pos_x = self.broker_state.position(y_symbol), self.broker_state.position(x_symbol)
+        qty_y = float(pos_y.qty) if pos_y is not None else 0.0
+        qty_x = float(pos_x.qty) if pos_x is not None else 0.0
+        position = reconcile_position(self.position, qty_y, qty_x)
+        if position != 0 and (position != self.position or not self.open_qty):
+            self.open_qty = {y_symbol: qty_y, x_symbol: qty_x}  # exits close what the broker holds
+        elif position == 0:
+            self.open_qty = {}
+        if position == self.position:
+            return position
+        logging.warning(f"Checkpoint position {self.position} but broker holds {y_symbol}={qty_y:g}, "
+                        f"{x_symbol}={qty_x:g}; resuming at {position}")
+        self.position = position
+        if position != 0:
+            # Adopted from the broker: its entry prices stand in for ours
+            self.entry_price_y = float(pos_y.avg_entry_price)
+            self.entry_price_x = float(pos_x.avg_entry_price)
+            self.entry_time = datetime.now(timezone.utc)
+            sign = 1 if position == 1 else -1
+            self.stop_price_y = self.entry_price_y * (1 - sign * self.stop_loss_pct)
+            self.stop_price_x = self.entry_price_x * (1 + sign * self.stop_loss_pct)
+        return position
+
+# ──────────────────────────────────────────────────────────────────────────────
+# BACKTEST & OPTIMIZATION HELPERS
+# ──────────────────────────────────────────────────────────────────────────────
+def run_backtest(
+    StrategyClass,
+    y_series: pd.Series,
+    x_series: pd.Series,
+    hedge_ratio, mean_train, std_train,
+    entry_z, exit_z, slippage_pct, initial_capital
+):
+    strat = StrategyClass(
+        api=None,
+        hedge_ratio=hedge_ratio,
+        mean_train=mean_train,
+        std_train=std_train,
+        entry_z=entry_z,
+        exit_z=exit_z,
+        slippage_pct=slippage_pct,
+        initial_capital=initial_capital
+    )
+    for t in y_series.index:
+        strat.process_data(None, None, date=t, y_price=y_series.loc[t], x_price=x_series.loc[t])
+    total_return = (strat.capital - initial_capital) / initial_capital
+    return {
+        "entry_z": entry_z,
+        "exit_z": exit_z,
+        "return": total_return,
+        "trades": len(strat.trade_log),
+    }
+
+def optimize_thresholds(
+    StrategyClass, y_series, x_series,
+    hedge_ratio, mean_train, std_train,
+    slippage_pct, initial_capital,
+    entry_grid, exit_grid
+):
+    if StrategyClass is RealTimeTradingStrategy:
+        # Same rules, scored for the whole grid in one vectorized pass
+        from .sweep import sweep_thresholds
+        return sweep_thresholds(
+            y_series, x_series, hedge_ratio, mean_train, std_train,
+            entry_grid, exit_grid, slippage_grid=(slippage_pct,),
+            initial_capital=initial_capital, processes=1,
+        )
+    results = []
+    for e, x in itertools.product(entry_grid, exit_grid):
+        if x >= e:
+            continue
+        stats = run_backtest(
+            StrategyClass, y_series, x_series,
+            hedge_ratio, mean_train, std_train,
+            e, x, slippage_pct, initial_capital
+        )
+        results.append(stats)
+    df = pd.DataFrame(results)
+    return df.sort_values("return", ascending=False).reset_index(drop=True)
@@ -0,0 +1,219 @@
+import asyncio
+import math
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .pairs import PairsStrategy
+from .pairs_runner import PairsRunner
+from .. import async_api, metrics
+from ..rolling import RollingZScore
+from ..data_api import timeframe_delta
+from ..clients import data_stream
+from ..trading_calendar import MARKET_TZ, history_start
+
+ONE_MINUTE = pd.Timedelta(minutes=1)
+ONE_DAY = pd.Timedelta(days=1)
+
+def _on_loop(loop: asyncio.AbstractEventLoop, handler):
+    """Stream handler that runs `handler` on `loop` and waits for it"""
+    async def forward(event):
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(handler(event), loop))
+    return forward
+
+class StreamingPairsRunner(PairsRunner):
+    """Event-driven PairsRunner fed by StockDataStream bars (and optionally trades).
+
+    History is downloaded once to warm up a RollingZScore spread window; after
+    that every completed bar pair pushes one spread and re-evaluates the
+    signals in O(1), so no REST history requests are made while streaming.
+    The strategy's lookback is counted in bars of the runner's timeframe (the
+    strategy's own unless one is given); the stream's 1-minute bars are
+    rolled up to that size before they are scored. Daily and longer bars
+    are stamped at New York midnight, as Alpaca's REST bars are. A daily
+    strategy therefore re-scores once a day; pass an intraday timeframe (and
+    size lookback_bars for it) or use_trades=True to react within the session.
+
+    With a checkpoint_path, a restart restores the spread window from the
+    checkpoint and only downloads the bars completed since, instead of the
+    whole warm-up history.
+    """
+
+    def __init__(self, strategy: PairsStrategy, stream=None, timeframe: Optional[str] = None,
+                 use_trades: bool = False, executor: Optional[Executor] = None,
+                 checkpoint_path: Optional[str] = None):
+        super().__init__(strategy, check_interval=0, executor=executor, checkpoint_path=checkpoint_path)
+        self.stream = stream
+        self.timeframe = timeframe = timeframe or strategy.timeframe
+        strategy.timeframe = timeframe  # the lookback counts these bars
+        self._bar_size = pd.Timedelta(timeframe_delta(timeframe))
+        if self._bar_size >= ONE_DAY and not use_trades:
+            print(f"ℹ️ Streaming {timeframe} bars: signals are re-evaluated once per bar")
+        self._buckets: Dict[str, Tuple[pd.Timestamp, float]] = {}  # forming bar per leg when rolling up
+        self.use_trades = use_trades
+        self.stats = strategy.rolling_stats()
+        self.last_prices: Dict[str, float] = {}
+        self._pending: Dict[str, Tuple[datetime, float]] = {}  # latest unpaired bar per leg
+        self._last_bar: Optional[pd.Timestamp] = None  # timestamp of the last bar pushed into stats
+        self._trading = asyncio.Lock()
+
+    async def warm_up(self, prices1: Optional[pd.Series] = None, prices2: Optional[pd.Series] = None):
+        """Seed the spread window from history (downloaded unless given)"""
+        if prices1 is None or prices2 is None:
+            end = datetime.now(timezone.utc)
+            start = history_start(end, self.strategy.lookback_bars, self.timeframe)
+            prices1, prices2 = await async_api.load_pair(self.strategy.stock1, self.strategy.stock2,
+                                                         self.timeframe, start, end, executor=self.executor)
+        spread = self.strategy.spread_model.warm_up(prices1.to_numpy(dtype=float), prices2.to_numpy(dtype=float))
+        self.stats = self.strategy.rolling_stats(np.asarray(spread, dtype=float))
+        if len(prices1):
+            self.last_prices[self.strategy.stock1] = float(prices1.iloc[-1])
+            self.last_prices[self.strategy.stock2] = float(prices2.iloc[-1])
+            self._last_bar = pd.Timestamp(prices1.index[-1])
+        print(f"✅ Warmed up {self.strategy.stock1}/{self.strategy.stock2} with {self.stats.count} bars")
+
+    def _roll_up(self, symbol: str, timestamp, close: float) -> List[Tuple[pd.Timestamp, float]]:
+        """Fold a 1-minute bar into the forming bar of the runner's size; returns the bars it completes, oldest first.
+
+        A bar completes on its last minute, or when a minute of a later bar
+        arrives if the last minute had no trades. That minute can complete
+        its own bar too (e.g. after a gap), so up to two bars come back.
+        """
+        ts = pd.Timestamp(timestamp)
+        if self._bar_size <= ONE_MINUTE:
+            return [(ts, close)]
+        start = self._bar_start(ts)
+        forming = self._buckets.pop(symbol, None)
+        completed = [forming] if forming is not None and forming[0] != start else []
+        if ts + ONE_MINUTE >= start + self._bar_size:
+            completed.append((start, close))
+        else:
+            self._buckets[symbol] = (start, close)
+        return completed
+
+    def _bar_start(self, ts: pd.Timestamp) -> pd.Timestamp:
+        """Start of the bar `ts` falls in, stamped like the REST bars of the same size"""
+        ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts
+        if self._bar_size < ONE_DAY:
+            return ts.floor(self._bar_size)
+        local = ts.tz_convert(MARKET_TZ).tz_localize(None).floor(self._bar_size)
+        return local.tz_localize(MARKET_TZ).tz_convert(ts.tz)
+
+    async def on_bar(self, bar):
+        """Pair up bars from both legs by timestamp and evaluate each completed bar"""
+        symbol = bar.symbol.upper()
+        close = float(bar.close)
+        self.last_prices[symbol] = close
+        for completed in self._roll_up(symbol, bar.timestamp, close):
+            await self._on_completed(symbol, completed)
+
+    async def _on_completed(self, symbol: str, completed: Tuple[pd.Timestamp, float]):
+        self._pending[symbol] = completed
+
+        s1, s2 = self.strategy.stock1, self.strategy.stock2
+        if s1 not in self._pending or s2 not in self._pending:
+            return
+        (ts1, p1), (ts2, p2) = self._pending[s1], self._pending[s2]
+        if ts1 != ts2:
+            return
+        self._pending.clear()
+        with metrics.span("on_bar", "signals"):
+            spread = float(self.strategy.update_spread(p1, p2))
+            z_score = self.stats.update(spread)
+        self._last_bar = pd.Timestamp(ts1)
+        await self._evaluate(z_score, spread, (p1, p2))
+        self.save_checkpoint()
+
+    async def on_trade(self, trade):
+        """Re-check signals on every trade against the last completed bars"""
+        symbol = trade.symbol.upper()
+        self.last_prices[symbol] = float(trade.price)
+        s1, s2 = self.strategy.stock1, self.strategy.stock2
+        if s1 not in self.last_prices or s2 not in self.last_prices:
+            return
+        p1, p2 = self.last_prices[s1], self.last_prices[s2]
+        # The newest trade spread stands in for the still-forming bar
+        spread = float(self.strategy.calculate_spread(p1, p2))
+        await self._evaluate(self.stats.score(spread), spread, (p1, p2))
+
+    async def _evaluate(self, z_score: float, current_spread: float, prices: Tuple[float, float]):
+        if math.isnan(z_score) or self._trading.locked():
+            return
+        async with self._trading:
+            if self.strategy.position == 0:
+                entry_signal = self.strategy.entry_signal_for(z_score)
+                if entry_signal:
+                    print(f"🎯 Entry signal {entry_signal} at z-score {z_score:.2f}")
+                    await self._execute_entry(entry_signal, current_spread, prices=prices)
+            elif self.strategy.exit_signal_for(z_score):
+                print(f"🎯 Exit signal at z-score {z_score:.2f}")
+                await self._execute_exit(current_spread=current_spread)
+
+    # -------- Checkpoints --------
+
+    def checkpoint_state(self) -> dict:
+        state = super().checkpoint_state()
+        state.update(timeframe=self.timeframe, stats=self.stats.to_state(), last_prices=self.last_prices,
+                     last_bar=self._last_bar.isoformat() if self._last_bar is not None else None)
+        return state
+
+    def restore_checkpoint(self, state: dict):
+        if state.get("timeframe") != self.timeframe:
+            raise ValueError(f"Checkpoint is for {state.get('timeframe')} bars, not {self.timeframe}")
+        super().restore_checkpoint(state)
+        self.stats = RollingZScore.from_state(state["stats"])
+        self.last_prices = dict(state["last_prices"])
+        self._last_bar = pd.Timestamp(state["last_bar"]) if state["last_bar"] else None
+
+    async def catch_up(self) -> int:
+        """Push the bars completed since the last one seen (e.g. while restarting); returns how many"""
+        if self._last_bar is None:
+            return 0
+        end = datetime.now(timezone.utc)
+        prices1, prices2 = await async_api.load_pair(self.strategy.stock1, self.strategy.stock2, self.timeframe,
+                                                     self._last_bar.to_pydatetime(), end, executor=self.executor)
+        new = prices1.index > self._last_bar
+        for p1, p2 in zip(prices1[new].to_numpy(dtype=float), prices2[new].to_numpy(dtype=float)):
+            self.stats.push(float(self.strategy.update_spread(p1, p2)))
+        if new.any():
+            self._last_bar = pd.Timestamp(prices1.index[-1])
+            self.last_prices[self.strategy.stock1] = float(prices1.iloc[-1])
+            self.last_prices[self.strategy.stock2] = float(prices2.iloc[-1])
+        return int(new.sum())
+
+    async def run_forever(self):
+        """Warm up (or resume from a checkpoint), subscribe both legs and trade on streamed bars"""
+        self.running = True
+        metrics.start_exporters()
+        stream = self.stream = self.stream or data_stream()
+        print(f"🚀 Streaming pairs strategy for {self.strategy.stock1}/{self.strategy.stock2}")
+
+        if await self.resume():
+            print(f"✅ Caught up {await self.catch_up()} bars since the checkpoint")
+        else:
+            await self.warm_up()
+
+        if asyncio.iscoroutinefunction(stream.run):
+            on_bar, on_trade = self.on_bar, self.on_trade  # ReplayStream runs in this loop
+        else:
+            # StockDataStream.run() blocks in its own event loop, so it gets a thread
+            # and hands each event back to this loop
+            loop = asyncio.get_running_loop()
+            on_bar, on_trade = _on_loop(loop, self.on_bar), _on_loop(loop, self.on_trade)
+        stream.subscribe_bars(on_bar, self.strategy.stock1, self.strategy.stock2)
+        if self.use_trades:
+            stream.subscribe_trades(on_trade, self.strategy.stock1, self.strategy.stock2)
+
+        if asyncio.iscoroutinefunction(stream.run):
+            await stream.run()
+        else:
+            await asyncio.to_thread(stream.run)
+
+    def stop(self):
+        """Stop the strategy and the stream"""
+        self.running = False
+        if self.stream is not None:
+            self.stream.stop()
@@ -0,0 +1,178 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..price_store import PriceStore, attach_worker, worker_store
+
+# Parameter sweep for RealTimeTradingStrategy thresholds.
+#
+# backtest_grid() replays the exact process_data() rules (api=None) for many
+# (entry_z, exit_z, stop_loss_pct, slippage_pct) points at once: one Python
+# pass over the bars, with every grid point's state held in NumPy arrays.
+# sweep_thresholds() splits the grid over a process pool whose workers read
+# the price path from a shared PriceStore instead of receiving a pickled copy.
+
+GRID_FIELDS = ("entry_z", "exit_z", "stop_loss_pct", "slippage_pct")
+
+# -------- Grid --------
+
+def threshold_grid(entry_grid: Iterable[float], exit_grid: Iterable[float],
+                   stop_loss_grid: Iterable[float] = (0.05,),
+                   slippage_grid: Iterable[float] = (0.0005,)) -> Dict[str, np.ndarray]:
+    """Cartesian product of the grids, skipping exit_z >= entry_z like optimize_thresholds"""
+    points = [
+        p for p in itertools.product(entry_grid, exit_grid, stop_loss_grid, slippage_grid)
+        if p[1] < p[0]
+    ]
+    arr = np.array(points, dtype=float).reshape(-1, 4)
+    return {field: arr[:, i].copy() for i, field in enumerate(GRID_FIELDS)}
+
+# -------- Vectorized engine --------
+
+def backtest_grid(y: np.ndarray, x: np.ndarray, hedge_ratio: float, mean_train: float, std_train: float,
+                  entry_z: np.ndarray, exit_z: np.ndarray, stop_loss_pct: np.ndarray, slippage_pct: np.ndarray,
+                  initial_capital: float) -> Dict[str, np.ndarray]:
+    """Final capital and trade count for every grid point in one pass over the bars"""
+    entry_z, exit_z = np.asarray(entry_z, float), np.asarray(exit_z, float)
+    stop_loss_pct, slip = np.asarray(stop_loss_pct, float), np.asarray(slippage_pct, float)
+    g = len(entry_z)
+    capital = np.full(g, float(initial_capital))
+    trades = np.zeros(g, dtype=np.int64)
+    if std_train == 0 or g == 0:
+        return {"capital": capital, "trades": trades}
+
+    position = np.zeros(g, dtype=np.int8)
+    entry_y = np.zeros(g)
+    entry_x = np.zeros(g)
+    stop_y = np.zeros(g)
+    stop_x = np.zeros(g)
+    up, down = 1 + slip, 1 - slip
+
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    with np.errstate(invalid="ignore"):
+        valid = (y > 0) & (x > 0)
+        zscores = (y - hedge_ratio * x - mean_train) / std_train
+    h = hedge_ratio
+
+    for t in np.flatnonzero(valid):
+        yt, xt, zt = y[t], x[t], zscores[t]
+        long_, short = position == 1, position == -1
+        flat = ~(long_ | short)
+
+        # Exits: stop-loss first, otherwise the z-score exit band
+        if not flat.all():
+            stopped = (long_ & ((yt <= stop_y) | (xt >= stop_x))) | (short & ((yt >= stop_y) | (xt <= stop_x)))
+            closing = stopped | (long_ & (zt > -exit_z)) | (short & (zt < exit_z))
+            if closing.any():
+                idx = np.flatnonzero(closing)
+                is_long = long_[idx]
+                s_up, s_down = up[idx], down[idx]
+                exit_y = np.where(is_long, yt * s_up, yt * s_down)
+                exit_x = np.where(is_long, xt * s_down, xt * s_up)
+                ey, ex = entry_y[idx], entry_x[idx]
+                pnl_y = np.where(is_long, exit_y - ey, ey - exit_y)
+                pnl_x = np.where(is_long, ex - exit_x, exit_x - ex)
+                gross = np.where(is_long, pnl_y - h * pnl_x, pnl_y + h * pnl_x)
+                notional = np.abs(ey) + np.abs(h * ex)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    scale = np.where(notional != 0, capital[idx] * 0.01 / notional, 0.0)
+                capital[idx] += gross * scale
+                trades[idx] += 1
+                position[idx] = 0
+
+        # Entries only for points that were flat when the bar arrived
+        if zt > entry_z.min() or zt < -entry_z.min():
+            go_short = flat & (zt > entry_z)
+            go_long = flat & (zt < -entry_z) & ~go_short
+            if go_short.any() or go_long.any():
+                trade_amount = capital * 0.01
+                qty_y = np.where(go_short, np.trunc(trade_amount / yt / up), np.trunc(trade_amount / yt / down))
+                qty_x = np.where(go_short, np.trunc(trade_amount / xt / down * h), np.trunc(trade_amount / xt / up * h))
+                sized = (qty_y != 0) & (qty_x != 0)
+                go_short &= sized
+                go_long &= sized
+                opening = go_short | go_long
+                position[go_short] = -1
+                position[go_long] = 1
+                entry_y[opening] = yt
+                entry_x[opening] = xt
+                sl = stop_loss_pct
+                stop_y[go_short] = yt * (1 + sl[go_short])
+                stop_x[go_short] = xt * (1 - sl[go_short])
+                stop_y[go_long] = yt * (1 - sl[go_long])
+                stop_x[go_long] = xt * (1 + sl[go_long])
+
+    return {"capital": capital, "trades": trades}
+
+# -------- Process pool over a shared PriceStore --------
+
+def _run_chunk(chunk: Dict[str, np.ndarray], params: dict, method: str) -> Dict[str, np.ndarray]:
+    prices = worker_store().rows
+    return _run_local(prices[0], prices[1], chunk, params, method)
+
+def _run_local(y: np.ndarray, x: np.ndarray, chunk: Dict[str, np.ndarray], params: dict, method: str):
+    if method == "vectorized":
+        return backtest_grid(y, x, entry_z=chunk["entry_z"], exit_z=chunk["exit_z"],
+                             stop_loss_pct=chunk["stop_loss_pct"], slippage_pct=chunk["slippage_pct"], **params)
+    return _event_grid(y, x, chunk, params)
+
+def _event_grid(y: np.ndarray, x: np.ndarray, chunk: Dict[str, np.ndarray], params: dict):
+    """Reference path: one RealTimeTradingStrategy per grid point, bar by bar"""
+    from .realtime import RealTimeTradingStrategy
+
+    capital, trades = [], []
+    for e, xz, sl, slip in zip(*(chunk[f] for f in GRID_FIELDS)):
+        strat = RealTimeTradingStrategy(
+            api=None, hedge_ratio=params["hedge_ratio"], mean_train=params["mean_train"],
+            std_train=params["std_train"], entry_z=e, exit_z=xz, slippage_pct=slip,
+            stop_loss_pct=sl, initial_capital=params["initial_capital"],
+        )
+        for i in range(len(y)):
+            strat.process_data(None, None, date=pd.Timestamp(i, unit="D"), y_price=y[i], x_price=x[i])
+        capital.append(strat.capital)
+        trades.append(len(strat.trade_log))
+    return {"capital": np.array(capital, dtype=float), "trades": np.array(trades, dtype=np.int64)}
+
+def sweep_thresholds(y_series: pd.Series, x_series: pd.Series, hedge_ratio: float, mean_train: float,
+                     std_train: float, entry_grid: Iterable[float], exit_grid: Iterable[float],
+                     stop_loss_grid: Iterable[float] = (0.05,), slippage_grid: Iterable[float] = (0.0005,),
+                     initial_capital: float = 1_000.0, processes: Optional[int] = None,
+                     chunks_per_process: int = 4, method: str = "vectorized") -> pd.DataFrame:
+    """Score every grid point; returns one row per point sorted by return.
+
+    method="vectorized" evaluates each chunk of the grid in a single pass over
+    the bars; method="event" runs RealTimeTradingStrategy per point (slow,
+    kept as the reference). processes=1 runs in this process.
+    """
+    if method not in ("vectorized", "event"):
+        raise ValueError(f"Unknown sweep method '{method}'")
+    y_series, x_series = y_series.align(x_series, join="inner")
+    grid = threshold_grid(entry_grid, exit_grid, stop_loss_grid, slippage_grid)
+    params = {"hedge_ratio": hedge_ratio, "mean_train": mean_train, "std_train": std_train,
+              "initial_capital": initial_capital}
+    n_points = len(grid["entry_z"])
+    processes = processes or os.cpu_count() or 1
+    n_chunks = max(1, min(n_points, processes * chunks_per_process))
+    bounds = np.linspace(0, n_points, n_chunks + 1).astype(int)
+    chunks = [{f: grid[f][lo:hi] for f in GRID_FIELDS} for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+    y = y_series.to_numpy(dtype=float)
+    x = x_series.to_numpy(dtype=float)
+    if processes == 1 or len(chunks) <= 1:
+        results = [_run_local(y, x, chunk, params, method) for chunk in chunks]
+    else:
+        with PriceStore.create(pd.DataFrame({"y": y, "x": x})) as store, \
+                ProcessPoolExecutor(max_workers=processes, initializer=attach_worker, initargs=(store.handle,)) as pool:
+            results = list(pool.map(_run_chunk, chunks, [params] * len(chunks), [method] * len(chunks)))
+
+    capital = np.concatenate([r["capital"] for r in results]) if results else np.array([])
+    trades = np.concatenate([r["trades"] for r in results]) if results else np.array([], dtype=np.int64)
+    df = pd.DataFrame({f: grid[f] for f in GRID_FIELDS})
+    df["return"] = (capital - initial_capital) / initial_capital
+    df["trades"] = trades
+    return df.sort_values("return", ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,238 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .. import checkpoint
+from ..price_store import PriceStore, as_store, attach_worker, worker_store
+from .sweep import GRID_FIELDS, backtest_grid, threshold_grid
+
+# Walk-forward re-training of RealTimeTradingStrategy parameters.
+#
+# Each pair's history is cut into rolling folds: `train` bars to fit on,
+# followed by `test` bars the fitted parameters are scored on without having
+# seen them. A fold re-estimates the hedge ratio (OLS of y on x), the spread's
+# mean/std and the entry/exit thresholds (grid search on the train bars only).
+# The last fold trains on the newest bars and has no test range: its
+# parameters are the ones to trade.
+#
+# Folds overlap heavily, so the regressions and spread moments come from
+# prefix sums built once per pair (O(1) per fold). Threshold searches are
+# spread over a process pool reading the closes from a shared PriceStore;
+# pass one in to re-train many pairs without copying the universe at all.
+#
+# publish() writes the latest parameters atomically to PARAMS_PATH;
+# ParameterFeed lets a running strategy pick them up without a restart.
+
+PARAMS_PATH = os.getenv("STRATEGY_PARAMS_PATH", "strategy_params.json")
+
+FOLD_COLUMNS = ["pair", "fold", "train_start", "train_end", "test_start", "test_end", "hedge_ratio",
+                "mean_train", "std_train", *GRID_FIELDS, "train_return", "test_return", "test_trades"]
+
+PARAM_FIELDS = ("hedge_ratio", "mean_train", "std_train", "entry_z", "exit_z", "stop_loss_pct", "slippage_pct")
+
+def fold_bounds(n: int, train: int, test: int, step: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
+    """(train_lo, train_hi, test_lo, test_hi) bar ranges, oldest first.
+
+    Folds advance by `step` bars (default: `test`, so test ranges tile the
+    history). The last entry trains on the final `train` bars with an empty
+    test range.
+    """
+    if train < 3 or test < 1:
+        raise ValueError("walk-forward needs train >= 3 and test >= 1 bars")
+    step = step or test
+    bounds = [(lo, lo + train, lo + train, lo + train + test) for lo in range(0, n - train - test + 1, step)]
+    if n >= train:
+        bounds.append((n - train, n, n, n))
+    return bounds
+
+class WindowStats:
+    """OLS hedge ratio and spread mean/std of any bar window from shared prefix sums.
+
+    Bars where either price is missing or non-positive are left out, the
+    same bars backtest_grid skips.
+    """
+
+    def __init__(self, y: np.ndarray, x: np.ndarray):
+        y, x = np.asarray(y, dtype=float), np.asarray(x, dtype=float)
+        with np.errstate(invalid="ignore"):
+            valid = np.isfinite(y) & np.isfinite(x) & (y > 0) & (x > 0)
+        first = np.flatnonzero(valid)[:1]
+        # Shift by the first valid prices to keep the running sums small
+        self._oy = float(y[first[0]]) if len(first) else 0.0
+        self._ox = float(x[first[0]]) if len(first) else 0.0
+        dy, dx = np.where(valid, y - self._oy, 0.0), np.where(valid, x - self._ox, 0.0)
+
+        def prefix(values):
+            return np.concatenate(([0.0], np.cumsum(values)))
+
+        self._n = prefix(valid.astype(float))
+        self._sy, self._sx = prefix(dy), prefix(dx)
+        self._syy, self._sxx, self._sxy = prefix(dy * dy), prefix(dx * dx), prefix(dx * dy)
+
+    def fit(self, lo, hi) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(hedge_ratio, mean, std) of the spread y - hedge_ratio * x over bars [lo, hi); vectorized"""
+        lo, hi = np.asarray(lo), np.asarray(hi)
+
+        def window(prefix):
+            return prefix[hi] - prefix[lo]
+
+        n = window(self._n)
+        sy, sx = window(self._sy), window(self._sx)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cxx = window(self._sxx) - sx * sx / n
+            cxy = window(self._sxy) - sx * sy / n
+            cyy = window(self._syy) - sy * sy / n
+            hedge = cxy / cxx
+            mean = self._oy + sy / n - hedge * (self._ox + sx / n)
+            resid = np.maximum(cyy - hedge * cxy, 0.0)
+            std = np.sqrt(resid / (n - 1))
+        return hedge, mean, std
+
+# -------- Fold evaluation (runs in pool workers) --------
+
+def _score_fold(y: np.ndarray, x: np.ndarray, task: dict) -> dict:
+    lo, hi, test_lo, test_hi = task["bounds"]
+    params = {"hedge_ratio": task["hedge_ratio"], "mean_train": task["mean_train"], "std_train": task["std_train"],
+              "initial_capital": task["initial_capital"]}
+    grid = task["grid"]
+    train = backtest_grid(y[lo:hi], x[lo:hi], **grid, **params)
+    train_return = (train["capital"] - task["initial_capital"]) / task["initial_capital"]
+    best = int(np.argmax(train_return)) if len(train_return) else None
+    result = {"train_return": float(train_return[best]) if best is not None else np.nan,
+              "test_return": np.nan, "test_trades": 0}
+    result.update({f: float(grid[f][best]) if best is not None else np.nan for f in GRID_FIELDS})
+    if best is not None and test_hi > test_lo:
+        point = {f: grid[f][best:best + 1] for f in GRID_FIELDS}
+        test = backtest_grid(y[test_lo:test_hi], x[test_lo:test_hi], **point, **params)
+        result["test_return"] = float((test["capital"][0] - task["initial_capital"]) / task["initial_capital"])
+        result["test_trades"] = int(test["trades"][0])
+    return result
+
+def _run_fold(task: dict) -> dict:
+    prices = worker_store().rows
+    iy, ix = task["columns"]
+    return _score_fold(prices[iy], prices[ix], task)
+
+# -------- Pipeline --------
+
+def walk_forward(closes: Union[pd.DataFrame, PriceStore], pairs: Iterable[Tuple[str, str]], train: int = 252, test: int = 63,
+                 step: Optional[int] = None, entry_grid: Iterable[float] = (0.5, 1.0, 1.5, 2.0),
+                 exit_grid: Iterable[float] = (0.25, 0.5, 0.75, 0.9), stop_loss_grid: Iterable[float] = (0.05,),
+                 slippage_grid: Iterable[float] = (0.0005,), initial_capital: float = 1_000.0,
+                 processes: Optional[int] = None) -> pd.DataFrame:
+    """Fit and score every walk-forward fold of every (y, x) pair in a timestamp x symbol close matrix or store.
+
+    One row per fold (FOLD_COLUMNS); the newest fold of each pair has NaT test
+    bounds and NaN test_return. processes=1 runs in this process.
+    """
+    pairs = [(y.upper(), x.upper()) for y, x in pairs]
+    symbols = list(dict.fromkeys(s for pair in pairs for s in pair))
+    missing = [s for s in symbols if s not in closes.columns]
+    if missing:
+        raise ValueError(f"No closes for {', '.join(missing)}")
+    if isinstance(closes, PriceStore):
+        column, matrix = {s: closes.column(s) for s in symbols}, closes.rows
+    else:
+        column = {s: i for i, s in enumerate(symbols)}
+        matrix = closes[symbols].to_numpy(dtype=float).T  # one contiguous row per symbol
+    grid = threshold_grid(entry_grid, exit_grid, stop_loss_grid, slippage_grid)
+    index = closes.index
+    bounds = fold_bounds(len(index), train, test, step)
+
+    tasks, rows = [], []
+    lo, hi = np.array([b[0] for b in bounds], dtype=int), np.array([b[1] for b in bounds], dtype=int)
+    for y, x in pairs:
+        iy, ix = column[y], column[x]
+        hedge, mean, std = WindowStats(matrix[iy], matrix[ix]).fit(lo, hi)
+        for i, b in enumerate(bounds):
+            fitted = np.isfinite(hedge[i]) and np.isfinite(std[i]) and std[i] > 0
+            rows.append({"pair": f"{y}/{x}", "fold": i, "hedge_ratio": hedge[i], "mean_train": mean[i],
+                         "std_train": std[i], **_fold_times(index, b)})
+            tasks.append({"columns": (iy, ix), "bounds": b, "hedge_ratio": float(hedge[i]),
+                          "mean_train": float(mean[i]), "std_train": float(std[i]) if fitted else 0.0,
+                          "grid": grid, "initial_capital": initial_capital})
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) <= 1:
+        results = [_score_fold(matrix[t["columns"][0]], matrix[t["columns"][1]], t) for t in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (processes * 4))
+        with as_store(closes if isinstance(closes, PriceStore) else closes[symbols]) as store, \
+                ProcessPoolExecutor(max_workers=processes, initializer=attach_worker, initargs=(store.handle,)) as pool:
+            results = list(pool.map(_run_fold, tasks, chunksize=chunksize))
+
+    for row, result in zip(rows, results):
+        row.update(result)
+    return pd.DataFrame(rows, columns=FOLD_COLUMNS)
+
+def _fold_times(index: pd.Index, bounds: Tuple[int, int, int, int]) -> dict:
+    lo, hi, test_lo, test_hi = bounds
+    has_test = test_hi > test_lo
+    return {"train_start": index[lo], "train_end": index[hi - 1],
+            "test_start": index[test_lo] if has_test else pd.NaT,
+            "test_end": index[test_hi - 1] if has_test else pd.NaT}
+
+def out_of_sample(folds: pd.DataFrame) -> pd.DataFrame:
+    """Per pair: compounded test-range return, total test trades and folds scored"""
+    scored = folds.dropna(subset=["test_return"])
+    return scored.groupby("pair").agg(
+        folds=("fold", "count"),
+        test_return=("test_return", lambda r: float(np.prod(1 + r) - 1)),
+        test_trades=("test_trades", "sum"),
+    )
+
+def latest_params(folds: pd.DataFrame) -> Dict[str, dict]:
+    """Parameters of each pair's newest fold, keyed "Y/X" (pairs that couldn't be fitted are left out)"""
+    latest = folds.sort_values("fold").groupby("pair").tail(1)
+    params = {}
+    for row in latest.itertuples(index=False):
+        values = {f: float(getattr(row, f)) for f in PARAM_FIELDS}
+        if all(np.isfinite(v) for v in values.values()) and values["std_train"] > 0:
+            params[row.pair] = {**values, "trained_through": row.train_end.isoformat()}
+    return params
+
+# -------- Publishing --------
+
+def publish(params: Dict[str, dict], path: str = PARAMS_PATH):
+    """Atomically replace the published parameters (merging with pairs already there)"""
+    current = checkpoint.load(path, max_age=None)
+    pairs = dict(current["pairs"]) if current else {}
+    pairs.update(params)
+    checkpoint.save(path, {"pairs": pairs, "published_at": datetime.now(timezone.utc).isoformat()})
+
+class ParameterFeed:
+    """Polls a published parameter file; poll() returns the pairs only when the file changed"""
+
+    def __init__(self, path: str = PARAMS_PATH):
+        self.path = path
+        self._seen: Optional[Tuple[int, int]] = None
+
+    def poll(self) -> Optional[Dict[str, dict]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        version = (st.st_mtime_ns, st.st_ino)  # publish() renames a new file into place
+        if version == self._seen:
+            return None
+        state = checkpoint.load(self.path, max_age=None)
+        if state is None:
+            return None
+        self._seen = version
+        return state["pairs"]
+
+def retrain(closes: Union[pd.DataFrame, PriceStore], pairs: Sequence[Tuple[str, str]], path: str = PARAMS_PATH,
+            **kwargs) -> pd.DataFrame:
+    """Walk-forward every pair, publish the newest parameters and return the fold table"""
+    folds = walk_forward(closes, pairs, **kwargs)
+    params = latest_params(folds)
+    publish(params, path)
+    skipped = sorted({f"{y.upper()}/{x.upper()}" for y, x in pairs} - set(params))
+    if skipped:
+        logging.warning(f"Walk-forward: no usable fit for {', '.join(skipped)}")
+    return folds
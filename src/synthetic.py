@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Synthetic cointegrated prices for benchmarks and offline runs.
+#
+# Each pair is  price2 = random walk,  price1 = hedge_ratio * price2 + c + e
+# with e an AR(1) process (phi < 1), so the spread price1 - hedge_ratio *
+# price2 mean-reverts with half-life log(0.5) / log(phi) bars.
+
+_BLOCK = 256  # AR(1) is evaluated in closed form over blocks at most this long
+
+def ar1(n: int, phi: float, sigma: float, rng: np.random.Generator) -> np.ndarray:
+    """AR(1) path e_t = phi * e_{t-1} + u_t without a per-bar Python loop"""
+    shocks = rng.normal(0.0, sigma, n)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    if phi == 0:
+        return shocks
+    # Within a block: e_t = phi^t * (e_0 + sum_k u_k phi^-k); blocks stay
+    # short enough that phi^-k never exceeds ~1e12
+    size = _BLOCK if abs(phi) >= 1 else max(1, min(_BLOCK, int(27.0 / -np.log(abs(phi)))))
+    k = np.arange(size)
+    up, down = phi ** k, phi ** -k.astype(float)
+    last = 0.0
+    for lo in range(0, n, size):
+        hi = min(lo + size, n)
+        m = hi - lo
+        block = up[:m] * (phi * last + np.cumsum(shocks[lo:hi] * down[:m]))
+        out[lo:hi] = block
+        last = block[-1]
+    return out
+
+def bar_index(n: int, freq: str = "1min", end: Optional[datetime] = None) -> pd.DatetimeIndex:
+    """n UTC timestamps at freq ending at `end` (default: now, floored to freq)"""
+    end = pd.Timestamp(end or datetime.now(timezone.utc))
+    end = end.tz_localize("UTC") if end.tzinfo is None else end.tz_convert("UTC")
+    return pd.date_range(end=end.floor(freq), periods=n, freq=freq)
+
+def cointegrated_pair(n: int, hedge_ratio: float = 2.0, phi: float = 0.95, spread_sigma: float = 0.5,
+                      step_sigma: float = 0.2, start_price: float = 100.0, freq: str = "1min",
+                      end: Optional[datetime] = None, seed: Optional[int] = None) -> Tuple[pd.Series, pd.Series]:
+    """One cointegrated (price1, price2) pair of n bars"""
+    rng = np.random.default_rng(seed)
+    price2 = start_price + np.cumsum(rng.normal(0.0, step_sigma, n))
+    # Keep the base leg positive without changing its dynamics much
+    price2 += max(0.0, 1.0 - price2.min())
+    price1 = hedge_ratio * price2 + 10.0 + ar1(n, phi, spread_sigma, rng)
+    price1 += max(0.0, 1.0 - price1.min())
+    index = bar_index(n, freq, end)
+    return pd.Series(price1, index=index, name="close"), pd.Series(price2, index=index, name="close")
+
+def cointegrated_universe(n_pairs: int, n_bars: int, freq: str = "1D", end: Optional[datetime] = None,
+                          seed: Optional[int] = None, **kwargs) -> Tuple[pd.DataFrame, List[Tuple[str, str]]]:
+    """Wide timestamp x symbol closes for n_pairs independent pairs (Y0/X0, Y1/X1, ...)"""
+    rng = np.random.default_rng(seed)
+    columns, pairs = {}, []
+    for i in range(n_pairs):
+        hedge = float(rng.uniform(0.5, 3.0))
+        p1, p2 = cointegrated_pair(n_bars, hedge_ratio=hedge, freq=freq, end=end,
+                                   seed=int(rng.integers(2**32)), **kwargs)
+        columns[f"Y{i}"], columns[f"X{i}"] = p1.to_numpy(), p2.to_numpy()
+        pairs.append((f"Y{i}", f"X{i}"))
+    index = bar_index(n_bars, freq, end)
+    return pd.DataFrame(columns, index=index), pairs
+
+def bars_frame(closes: pd.DataFrame) -> pd.DataFrame:
+    """Wide closes -> MultiIndex [symbol, timestamp] OHLCV bars like BarSet.df"""
+    long = closes.stack()
+    long.index = long.index.set_names(["timestamp", "symbol"])
+    long = long.swaplevel().sort_index()
+    close = long.to_numpy(dtype=float)
+    return pd.DataFrame(
+        {"open": close, "high": close, "low": close, "close": close,
+         "volume": 1000.0, "trade_count": 10.0, "vwap": close},
+        index=long.index,
+    )
@@ -0,0 +1,92 @@
+import math
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+from alpaca.data.timeframe import TimeFrameUnit
+from pandas.tseries.holiday import (AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr,
+                                    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday,
+                                    sunday_to_monday)
+from pandas.tseries.offsets import CustomBusinessDay
+
+from .data_api import parse_timeframe
+
+# NYSE sessions, used to turn "N bars of timeframe T" into a request start.
+#
+# A lookback in bars covers a different stretch of wall-clock time depending
+# on weekends, holidays and the 6.5-hour regular session, so history_start()
+# walks back whole sessions instead of guessing with a calendar-day factor.
+# Regular-session bar counts are a lower bound: Alpaca's intraday bars also
+# include extended hours, so a request sized this way returns at least the
+# bars asked for. Unscheduled closures are covered by the spare session.
+
+MARKET_TZ = "America/New_York"
+SESSION_MINUTES = 390  # 9:30-16:00
+SESSION_CLOSE_MINUTE = 16 * 60
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),  # not moved to a Friday
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-06-19", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+SESSION = CustomBusinessDay(calendar=NYSEHolidayCalendar())
+
+def is_session(day) -> bool:
+    """True if the exchange trades on this date"""
+    return SESSION.is_on_offset(pd.Timestamp(day).normalize().tz_localize(None))
+
+def sessions(start, end) -> pd.DatetimeIndex:
+    """Trading dates in [start, end]"""
+    return pd.date_range(pd.Timestamp(start).normalize().tz_localize(None),
+                         pd.Timestamp(end).normalize().tz_localize(None), freq=SESSION)
+
+def session_date(ts) -> pd.Timestamp:
+    """New York calendar date of a timestamp (naive timestamps are UTC)"""
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts
+    return ts.tz_convert(MARKET_TZ).normalize().tz_localize(None)
+
+def last_completed_session(now: Optional[datetime] = None) -> pd.Timestamp:
+    """Date of the latest session that had closed by `now` (default: the current time)"""
+    ts = pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz="UTC")
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts
+    local = ts.tz_convert(MARKET_TZ)
+    day = session_date(ts)
+    if is_session(day) and local.hour * 60 + local.minute >= SESSION_CLOSE_MINUTE:
+        return day
+    return SESSION.rollback(day - pd.Timedelta(days=1))
+
+def bars_per_session(timeframe: str) -> float:
+    """Regular-session bars of `timeframe` in one trading day (fractional above a day)"""
+    tf = parse_timeframe(timeframe)
+    if tf.unit == TimeFrameUnit.Minute:
+        return math.ceil(SESSION_MINUTES / tf.amount)
+    if tf.unit == TimeFrameUnit.Hour:
+        return math.ceil(SESSION_MINUTES / (60 * tf.amount))
+    if tf.unit == TimeFrameUnit.Day:
+        return 1 / tf.amount
+    if tf.unit == TimeFrameUnit.Week:
+        return 1 / (5 * tf.amount)
+    return 1 / (21 * tf.amount)
+
+def history_start(end: datetime, bars: int, timeframe: str, spare_sessions: int = 1) -> datetime:
+    """UTC start of a request ending at `end` that covers at least `bars` bars of `timeframe`.
+
+    Counts back whole trading sessions (the session `end` falls in may still
+    be open, hence the spare one) and starts at midnight New York time.
+    """
+    ts = pd.Timestamp(end)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts  # naive datetimes are UTC, as for Alpaca
+    day = ts.tz_convert(MARKET_TZ).normalize().tz_localize(None)
+    n = math.ceil(bars / bars_per_session(timeframe)) + spare_sessions
+    start = SESSION.rollforward(day) - n * SESSION
+    return start.tz_localize(MARKET_TZ).tz_convert("UTC").to_pydatetime()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Offline stand-ins for the Alpaca clients shared by the tests"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+from alpaca.data.timeframe import TimeFrameUnit
+from alpaca.trading.enums import OrderStatus, TradeEvent
+
+import src.clients as clients
+import src.journal as journal
+import src.order_book as order_book
+from src.sim_broker import SimTradeUpdate, SimTradingStream
+
+journal.JOURNAL_PATH = ":memory:"  # tests never write a trades.db
+
+
+@contextmanager
+def use_fake_clients(data=None, trading=None):
+    """Temporarily install fakes behind clients.data_client()/trading_client()"""
+    previous = clients._data_client, clients._trading_client, order_book._shared
+    clients._data_client = data or previous[0]
+    clients._trading_client = trading or previous[1]
+    if trading is not None:
+        order_book._shared = None  # a new account starts with an empty book
+    try:
+        yield
+    finally:
+        clients._data_client, clients._trading_client, order_book._shared = previous
+
+
+def offline_data_client():
+    """FakeDataClient unless live credentials or a DATA_REPLAY_PATH recording are configured"""
+    if os.getenv("DATA_REPLAY_PATH") or os.getenv("APCA_API_KEY_ID"):
+        return None
+    return FakeDataClient()
+
+
+def _as_utc(dt) -> pd.Timestamp:
+    # StockBarsRequest normalizes datetimes to naive UTC
+    ts = pd.Timestamp(dt)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts
+
+
+def _bar_freq(timeframe) -> str:
+    # pandas frequency of an alpaca TimeFrame (daily when the request has none)
+    if timeframe is None:
+        return "D"
+    units = {TimeFrameUnit.Minute: "min", TimeFrameUnit.Hour: "h", TimeFrameUnit.Day: "D"}
+    return f"{timeframe.amount}{units.get(timeframe.unit, 'D')}"
+
+
+class FakeDataClient:
+    """Offline stand-in for StockHistoricalDataClient serving round-the-clock bars of the requested timeframe"""
+
+    def __init__(self, drop_every: dict = None, delay: float = 0.0):
+        self.requests = []
+        self.delay = delay  # seconds each request blocks, like a network round-trip
+        # {symbol: n} leaves out every n-th bar of that symbol
+        self.drop_every = drop_every or {}
+
+    def get_stock_bars(self, req):
+        symbols = list(req.symbol_or_symbols)
+        start, end = _as_utc(req.start), _as_utc(req.end)
+        self.requests.append((symbols, start, end))
+        time.sleep(self.delay)
+        freq = _bar_freq(getattr(req, "timeframe", None))
+        days = pd.date_range(start.ceil(freq), end, freq=freq)
+        frames = []
+        for symbol in symbols:
+            base = 100.0 + sum(ord(c) for c in symbol)
+            minute = (days.hour * 60 + days.minute).to_numpy(dtype=float)
+            close = base + days.dayofyear.to_numpy(dtype=float) + minute / 1e4
+            index = pd.MultiIndex.from_arrays([[symbol] * len(days), days], names=["symbol", "timestamp"])
+            frame = pd.DataFrame(
+                {"open": close, "high": close + 1, "low": close - 1, "close": close,
+                 "volume": 1000.0, "trade_count": 10.0, "vwap": close},
+                index=index,
+            )
+            step = self.drop_every.get(symbol)
+            if step:
+                frame = frame[(pd.RangeIndex(len(frame)) % step != 0)]
+            frames.append(frame)
+        df = pd.concat(frames) if frames else pd.DataFrame()
+        return SimpleNamespace(df=df)
+
+    def get_stock_latest_trade(self, req):
+        now = pd.Timestamp.now(tz="UTC")
+        return {s: SimpleNamespace(symbol=s, timestamp=now, price=100.0 + sum(ord(c) for c in s), size=100.0)
+                for s in _request_symbols(req)}
+
+    def get_stock_latest_quote(self, req):
+        now = pd.Timestamp.now(tz="UTC")
+        quotes = {}
+        for s in _request_symbols(req):
+            mid = 100.0 + sum(ord(c) for c in s)
+            quotes[s] = SimpleNamespace(symbol=s, timestamp=now, bid_price=mid - 0.01, bid_size=1.0,
+                                        ask_price=mid + 0.01, ask_size=1.0)
+        return quotes
+
+
+def _request_symbols(req):
+    symbols = req.symbol_or_symbols
+    return [symbols] if isinstance(symbols, str) else list(symbols)
+
+
+class FakeTradingClient:
+    """Offline stand-in for TradingClient that records every call.
+
+    Orders fill at once (reported on `trading_stream`) unless their symbol is
+    in `reject`, in which case submit_order raises.
+    """
+
+    def __init__(self, equity: float = 100_000.0, positions: list = None, delay: float = 0.0, reject=()):
+        self.equity = equity
+        self.delay = delay
+        self.positions = positions or []
+        self.reject = {s.upper() for s in reject}
+        self.calls = []
+        self.orders = []
+        self._filled = {}  # client_order_id -> filled order
+        self.trading_stream = SimTradingStream()
+
+    def get_account(self):
+        self.calls.append("get_account")
+        return SimpleNamespace(status="ACTIVE", equity=self.equity, buying_power=self.equity,
+                               cash=self.equity, multiplier="1")
+
+    def get_all_positions(self):
+        self.calls.append("get_all_positions")
+        return list(self.positions)
+
+    def submit_order(self, order_data):
+        self.calls.append("submit_order")
+        time.sleep(self.delay)
+        if order_data.symbol.upper() in self.reject:
+            raise RuntimeError(f"order rejected: {order_data.symbol}")
+        self.orders.append(order_data)
+        order = SimpleNamespace(id=f"order-{len(self.orders)}", client_order_id=order_data.client_order_id,
+                                symbol=order_data.symbol, side=order_data.side, qty=order_data.qty,
+                                status=OrderStatus.ACCEPTED, filled_qty=0, filled_avg_price=None)
+        filled = SimpleNamespace(**{**vars(order), "status": OrderStatus.FILLED, "filled_qty": order_data.qty})
+        self._filled[order_data.client_order_id] = filled
+        self.trading_stream.publish(SimTradeUpdate(TradeEvent.FILL, filled, pd.Timestamp.now(tz="UTC")))
+        return order
+
+    def get_order_by_client_id(self, client_id):
+        self.calls.append("get_order_by_client_id")
+        if client_id not in self._filled:
+            raise LookupError(f"order not found: {client_id}")
+        return self._filled[client_id]
+
+
+class FakeLegacyREST:
+    """Offline stand-in for newtester's alpaca_trade_api REST client.
+
+    Orders fill at once at `price`, reported as order dicts on
+    `trading_stream` like the legacy Stream does, unless their symbol is in
+    `reject`, in which case submit_order raises.
+    """
+
+    def __init__(self, equity: float = 100_000.0, price: float = 100.0, reject=()):
+        self.equity = equity
+        self.price = price
+        self.reject = {s.upper() for s in reject}
+        self.calls = []
+        self.orders = []  # (symbol, qty, side, client_order_id)
+        self._filled = {}  # client_order_id -> filled order dict
+        self.trading_stream = SimTradingStream()
+
+    def get_account(self):
+        self.calls.append("get_account")
+        return SimpleNamespace(status="ACTIVE", equity=str(self.equity), buying_power=str(self.equity),
+                               cash=str(self.equity), multiplier="1")
+
+    def get_position(self, symbol):
+        self.calls.append("get_position")
+        raise AssertionError("exits must not query positions")
+
+    def submit_order(self, symbol, qty, side, type, time_in_force, client_order_id=None, **kwargs):
+        self.calls.append("submit_order")
+        if symbol.upper() in self.reject:
+            raise RuntimeError("insufficient buying power")
+        self.orders.append((symbol, qty, side, client_order_id))
+        filled = {"id": f"o{len(self.orders)}", "client_order_id": client_order_id, "symbol": symbol, "side": side,
+                  "qty": str(qty), "filled_qty": str(qty), "filled_avg_price": str(self.price), "status": "filled"}
+        self._filled[client_order_id] = filled
+        self.trading_stream.publish(SimpleNamespace(event="fill", order=filled))
+        return SimpleNamespace(id=filled["id"], client_order_id=client_order_id, status="accepted")
+
+    def get_order_by_client_order_id(self, client_order_id):
+        self.calls.append("get_order_by_client_order_id")
+        if client_order_id not in self._filled:
+            raise LookupError(f"order not found: {client_order_id}")
+        return SimpleNamespace(**self._filled[client_order_id])
+
+    def cancel_order(self, order_id):
+        self.calls.append("cancel_order")
+
+
+class FakeAlpacaServer:
+    """Local HTTP server speaking enough of Alpaca's market-data API for
+    StockHistoricalDataClient(url_override=server.url).
+
+    At most `limit` requests are served per sliding `window` seconds; the
+    rest get 429 with a Retry-After header, like the real API.
+    """
+
+    def __init__(self, limit: int = 5, window: float = 1.0):
+        self.limit = limit
+        self.window = window
+        self.log = []  # (path, status, monotonic time)
+        self._served = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body, headers = server._handle(self.path)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _handle(self, path: str):
+        now = time.monotonic()
+        with self._lock:
+            self._served = [t for t in self._served if now - t < self.window]
+            if len(self._served) >= self.limit:
+                self.log.append((path, 429, now))
+                wait = self.window - (now - self._served[0])
+                return 429, {"code": 42910000, "message": "rate limit exceeded"}, {"Retry-After": f"{wait:.3f}"}
+            self._served.append(now)
+            self.log.append((path, 200, now))
+
+        url = urlparse(path)
+        if url.path != "/v2/stocks/bars":
+            return 404, {"code": 40410000, "message": "not found"}, {}
+        symbols = parse_qs(url.query)["symbols"][0].split(",")
+        days = pd.date_range("2024-01-02", periods=5, freq="D", tz="UTC")
+        bars = {
+            s: [{"t": d.strftime("%Y-%m-%dT%H:%M:%SZ"), "o": 10.0 + i, "h": 11.0 + i, "l": 9.0 + i,
+                 "c": 10.0 + i, "v": 100, "n": 1, "vw": 10.0 + i} for i, d in enumerate(days)]
+            for s in symbols
+        }
+        return 200, {"bars": bars, "next_page_token": None}, {}
+
+    def statuses(self) -> list:
+        return [status for _, status, _ in self.log]
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
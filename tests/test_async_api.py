@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src import async_api
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from fakes import FakeDataClient, FakeTradingClient, use_fake_clients
+
+
+def test_both_legs_submitted_concurrently():
+    """Two legs take one round-trip, not two"""
+    trading = FakeTradingClient(delay=0.2)
+    legs = [{"symbol": "AAA", "side": "buy", "qty": 10}, {"symbol": "BBB", "side": "sell", "qty": 5}]
+
+    with use_fake_clients(trading=trading):
+        started = time.perf_counter()
+        results = asyncio.run(async_api.submit_market_orders(legs))
+        elapsed = time.perf_counter() - started
+
+    assert [r.symbol for r in results] == ["AAA", "BBB"]
+    assert elapsed < 0.35
+
+
+def test_failed_leg_is_reported_not_raised():
+    """A failing leg comes back as its exception so the caller sees both outcomes"""
+    trading = FakeTradingClient()
+    legs = [{"symbol": "AAA", "side": "buy", "qty": 10}, {"symbol": "BBB", "side": "buy", "qty": None}]
+
+    with use_fake_clients(trading=trading):
+        results = asyncio.run(async_api.submit_market_orders(legs))
+
+    assert results[0].symbol == "AAA"
+    assert isinstance(results[1], ValueError)
+
+
+def test_runner_does_not_block_event_loop():
+    """Other coroutines keep running while the runner waits on market data"""
+    data = FakeDataClient(delay=0.3)
+    runner = PairsRunner(PairsStrategy("AAA", "BBB", lookback_days=30))
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await asyncio.gather(runner.run_once(), ticker())
+
+    with use_fake_clients(data=data, trading=FakeTradingClient()):
+        started = time.perf_counter()
+        asyncio.run(main())
+
+    assert len(ticks) == 5
+    assert ticks[-1] - started < 0.3  # ticker finished while the fetch was in flight
+
+
+if __name__ == "__main__":
+    test_both_legs_submitted_concurrently()
+    test_failed_leg_is_reported_not_raised()
+    test_runner_does_not_block_event_loop()
+    print("✅ Async API tests passed!")
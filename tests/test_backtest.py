@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import backtest
+from src.spread_models import KalmanSpread, RollingOLSSpread, StaticSpread
+from src.strategies.pairs import PairsStrategy
+
+
+def _prices(n=750, seed=0):
+    """Mean-reverting ratio around 2 on a random-walk base"""
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2022-01-03", periods=n, freq="B")
+    p2 = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    noise = np.zeros(n)
+    for i in range(1, n):
+        noise[i] = 0.9 * noise[i - 1] + rng.normal(0, 0.01)
+    p1 = 2 * p2 * np.exp(noise)
+    return pd.Series(p1, index=idx), pd.Series(p2, index=idx)
+
+
+def _strategy(model=None):
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=20, spread_model=model)
+    strategy.entry_threshold = 1.5
+    strategy.exit_threshold = 0.5
+    return strategy
+
+
+def test_paths_produce_identical_trades():
+    prices1, prices2 = _prices()
+    for model in (None, StaticSpread(), RollingOLSSpread(40, hedge_ratio=2.0), KalmanSpread(hedge_ratio=2.0)):
+        for stop_loss in (False, True):
+            strategy = _strategy(model)
+            fast = backtest(strategy, prices1, prices2, method="vectorized", stop_loss=stop_loss)
+            slow = backtest(strategy, prices1, prices2, method="event", stop_loss=stop_loss)
+            assert len(fast.trades) > 5
+            pd.testing.assert_frame_equal(fast.trades, slow.trades, rtol=1e-9)
+            pd.testing.assert_series_equal(fast.equity, slow.equity, rtol=1e-9)
+
+
+def test_trades_follow_signal_rules():
+    prices1, prices2 = _prices(seed=1)
+    strategy = _strategy()
+    result = backtest(strategy, prices1, prices2, stop_loss=True)
+    trades = result.trades
+    assert (trades["exit_time"] > trades["entry_time"]).all()
+    assert (trades["entry_time"].iloc[1:].to_numpy() > trades["exit_time"].iloc[:-1].to_numpy()).all()
+    assert (trades["entry_z"].abs() > strategy.entry_threshold).all()
+    assert (np.sign(trades["entry_z"]) == -trades["position"]).all()
+    normal = trades[trades["exit_type"] == "exit"]
+    assert (normal["exit_z"].abs() < strategy.exit_threshold).all()
+    assert abs(result.final_capital - (10_000 + trades["pnl"].sum())) < 1e-6
+    assert strategy.position == 0  # the caller's strategy is untouched
+
+
+if __name__ == "__main__":
+    test_paths_produce_identical_trades()
+    test_trades_follow_signal_rules()
+    print("✅ Backtest engine tests passed!")
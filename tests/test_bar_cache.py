@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from src.bar_cache import BarCache, missing_ranges, merge_ranges
+from fakes import FakeDataClient
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_range_helpers():
+    """Gaps are the parts of the request outside covered ranges"""
+    covered = [(10, 20), (30, 40)]
+    assert missing_ranges(covered, 0, 50) == [(0, 10), (20, 30), (40, 50)]
+    assert missing_ranges(covered, 12, 18) == []
+    assert merge_ranges(covered, (15, 35)) == [(10, 40)]
+
+
+def test_cache_fetches_only_missing_ranges():
+    """Second call is served from disk; extending the window fetches only the tail"""
+    with tempfile.TemporaryDirectory() as root:
+        client = FakeDataClient()
+        cache = BarCache(root, client=client)
+
+        first = cache.get_bars(["AAPL", "MSFT"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1))
+        assert len(client.requests) == 1  # both symbols in one request
+        assert set(first.index.get_level_values(0)) == {"AAPL", "MSFT"}
+
+        again = cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 5), _utc(2024, 1, 20))
+        assert len(client.requests) == 1
+        pd.testing.assert_frame_equal(again, first.loc[["AAPL"]].loc[(slice(None), slice(_utc(2024, 1, 5), _utc(2024, 1, 20))), :])
+
+        cache.get_bars(["AAPL", "MSFT"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 15))
+        assert len(client.requests) == 2
+        _, start, end = client.requests[-1]
+        assert start == pd.Timestamp(_utc(2024, 2, 1))
+
+        # A fresh instance reads the persisted index and data
+        reopened = BarCache(root, client=client)
+        bars = reopened.get_bars(["MSFT"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 15))
+        assert len(client.requests) == 2
+        assert bars.index.get_level_values(1).is_monotonic_increasing
+        assert not bars.index.duplicated().any()
+
+
+def test_recent_bars_are_refetched():
+    """A window ending now is never fully marked as covered"""
+    with tempfile.TemporaryDirectory() as root:
+        client = FakeDataClient()
+        cache = BarCache(root, client=client)
+        end = datetime.now(timezone.utc)
+        cache.get_bars(["AAPL"], "1D", end - timedelta(days=10), end)
+        cache.get_bars(["AAPL"], "1D", end - timedelta(days=10), end)
+        assert len(client.requests) == 2
+        _, start, _ = client.requests[-1]
+        assert start >= pd.Timestamp(end - timedelta(days=2))
+
+
+def test_eviction_keeps_cache_under_budget():
+    """Least recently used symbols are evicted once the size bound is exceeded"""
+    with tempfile.TemporaryDirectory() as root:
+        client = FakeDataClient()
+        per_symbol = 32 * 64  # ~32 daily bars of 64 bytes each
+        cache = BarCache(root, max_bytes=2 * per_symbol, client=client)
+        for symbol in ["AAA", "BBB", "CCC"]:
+            cache.get_bars([symbol], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1))
+
+        assert cache.total_bytes() <= 2 * per_symbol
+        assert cache.covered("AAA", "1D") == []
+        assert cache.covered("CCC", "1D") != []
+        assert not os.path.exists(os.path.join(root, "1D", "AAA")) or os.listdir(os.path.join(root, "1D", "AAA")) == []
+
+
+def test_oversized_request_is_evicted_too():
+    """A request larger than the whole budget is served but not kept"""
+    with tempfile.TemporaryDirectory() as root:
+        cache = BarCache(root, max_bytes=32 * 64, client=FakeDataClient())
+        bars = cache.get_bars(["AAA", "BBB"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1))
+        assert len(bars) == 64
+        assert cache.total_bytes() <= 32 * 64
+        assert cache.covered("AAA", "1D") == []  # the older access goes first
+
+
+def test_missing_segment_is_refetched():
+    """A segment file deleted behind the cache's back drops its range and is downloaded again"""
+    with tempfile.TemporaryDirectory() as root:
+        client = FakeDataClient()
+        cache = BarCache(root, client=client)
+        cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1))
+        cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024, 3, 1))
+        os.remove(os.path.join(root, cache._entries["AAPL|1D"]["segments"][0]["file"]))  # January
+
+        bars = cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024, 3, 1))
+        assert len(bars) == 61 and len(client.requests) == 3
+        _, start, end = client.requests[-1]
+        assert start <= pd.Timestamp(_utc(2024, 1, 1)) and end >= pd.Timestamp(_utc(2024, 2, 1))
+        assert len(cache.covered("AAPL", "1D")) == 1
+
+
+def test_downloads_are_appended_as_segments():
+    """Extending a window adds a file; stored segments are left untouched until compaction"""
+    with tempfile.TemporaryDirectory() as root:
+        cache = BarCache(root, client=FakeDataClient())
+        folder = os.path.join(root, "1D", "AAPL")
+        cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1))
+        (first,) = os.listdir(folder)
+        stamp = os.stat(os.path.join(folder, first)).st_mtime_ns
+        cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024, 3, 1))
+        assert len(os.listdir(folder)) == 2
+        assert os.stat(os.path.join(folder, first)).st_mtime_ns == stamp
+
+        for month in range(4, 3 + BarCache.MAX_SEGMENTS):  # one past MAX_SEGMENTS
+            cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024 + month // 12, month % 12 + 1, 1))
+        assert len(os.listdir(folder)) == 1
+        bars = cache.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2025, 1, 1))
+        assert len(bars) == 367 and bars.index.get_level_values(1).is_monotonic_increasing
+
+
+def test_fetch_runs_outside_the_lock():
+    """A slow download doesn't hold up cached reads, and instances sharing a directory see each other's data"""
+    with tempfile.TemporaryDirectory() as root:
+        BarCache(root, client=FakeDataClient()).get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1))
+        slow = BarCache(root, client=FakeDataClient(delay=0.5))
+        other = BarCache(root, client=FakeDataClient())  # e.g. another process
+
+        thread = threading.Thread(target=slow.get_bars, args=(["MSFT"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1)))
+        thread.start()
+        time.sleep(0.1)
+        began = time.perf_counter()
+        bars = slow.get_bars(["AAPL"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1))
+        assert time.perf_counter() - began < 0.3 and len(bars) == 32
+        thread.join()
+
+        assert other.get_bars(["MSFT"], "1D", _utc(2024, 1, 1), _utc(2024, 2, 1)).shape[0] == 32
+        assert other.client.requests == []
+
+
+if __name__ == "__main__":
+    test_range_helpers()
+    test_cache_fetches_only_missing_ranges()
+    test_recent_bars_are_refetched()
+    test_eviction_keeps_cache_under_budget()
+    test_oversized_request_is_evicted_too()
+    test_missing_segment_is_refetched()
+    test_downloads_are_appended_as_segments()
+    test_fetch_runs_outside_the_lock()
+    print("✅ Bar cache tests passed!")
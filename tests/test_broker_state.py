@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.broker_state import BrokerState
+from src.strategies.realtime import RealTimeTradingStrategy
+from fakes import FakeTradingClient, use_fake_clients
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LegacyREST:
+    """alpaca_trade_api-style client: list_positions / get_position / submit_order(**kw)"""
+
+    def __init__(self, positions=None):
+        self.calls = []
+        self.positions = positions or {}
+
+    def get_account(self):
+        self.calls.append("get_account")
+        time.sleep(0.05)
+        return SimpleNamespace(equity="50000")
+
+    def list_positions(self):
+        self.calls.append("list_positions")
+        return [SimpleNamespace(symbol=s, qty=str(q)) for s, q in self.positions.items()]
+
+    def get_position(self, symbol):
+        self.calls.append("get_position")
+        return SimpleNamespace(symbol=symbol, qty=str(self.positions[symbol]))
+
+    def submit_order(self, **kwargs):
+        self.calls.append("submit_order")
+        return SimpleNamespace(id="order-1")
+
+
+def test_ttl_and_invalidation():
+    """Reads within the TTL share one fetch; expiry, invalidate() and fills refetch"""
+    clock = FakeClock()
+    trading = FakeTradingClient(positions=[SimpleNamespace(symbol="AAA", qty=-7, avg_entry_price=1,
+                                                           market_value=1, unrealized_pl=0)])
+    state = BrokerState(ttl=5.0, clock=clock)
+
+    with use_fake_clients(trading=trading):
+        for _ in range(10):
+            assert state.equity() == 100_000.0
+            assert state.position_qty("aaa") == -7
+            assert state.position_qty("BBB") == 0
+        assert trading.calls == ["get_account", "get_all_positions"]
+
+        clock.now = 5.0
+        state.equity()
+        assert trading.calls.count("get_account") == 2
+
+        state.invalidate()
+        state.positions()
+        assert trading.calls.count("get_all_positions") == 2
+
+        state.on_trade_update(SimpleNamespace(event="partial_fill"))
+        state.on_trade_update(SimpleNamespace(event="new"))
+        state.equity()
+        assert trading.calls.count("get_account") == 3
+
+    # A different trading client never sees the previous client's snapshot
+    other = FakeTradingClient(equity=5.0)
+    with use_fake_clients(trading=other):
+        assert state.equity() == 5.0
+
+
+def test_concurrent_readers_share_one_request():
+    """Pairs asking at the same moment wait for the request in flight"""
+    api = LegacyREST()
+    state = BrokerState(api)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: state.equity(), range(32)))
+    assert values == [50_000.0] * 32
+    assert api.calls == ["get_account"]
+
+
+def test_realtime_strategy_reads_snapshot():
+    """process_data polls reuse the account and never ask the broker for positions"""
+    api = LegacyREST(positions={"Y": 10, "X": -10})
+    strat = RealTimeTradingStrategy(api=api, hedge_ratio=1.0, mean_train=0.0, std_train=1.0,
+                                    entry_z=1.0, exit_z=0.5)
+    # Pretend we are already short the spread so polls run the exit check
+    strat.position, strat.entry_time = -1, None
+    strat.entry_price_y = strat.entry_price_x = 100.0
+    strat.stop_price_y, strat.stop_price_x = 1e9, 0.0
+
+    for _ in range(3):
+        strat.process_data("Y", "X", y_price=120.0, x_price=100.0)  # z = 20: stay short
+    assert api.calls == ["get_account"]
+
+
+if __name__ == "__main__":
+    test_ttl_and_invalidation()
+    test_concurrent_readers_share_one_request()
+    test_realtime_strategy_reads_snapshot()
+    print("✅ Broker state tests passed!")
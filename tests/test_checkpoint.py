@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from src import checkpoint
+from src.broker_state import BrokerState
+from src.checkpoint import Checkpointer, reconcile_position
+from src.journal import TradeJournal
+from src.market_data import load_pair
+from src.sim_broker import SimulatedBroker
+from src.spread_models import make_spread_model
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from src.strategies.realtime import RealTimeTradingStrategy
+from src.strategies.stream_runner import StreamingPairsRunner
+from fakes import FakeDataClient, use_fake_clients
+
+
+def test_atomic_save_and_load():
+    """Saves replace the file whole; stale, foreign-version and corrupt files are ignored"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "state.json")
+        assert checkpoint.load(path) is None
+        checkpoint.save(path, {"pair": "AAA/BBB"})
+        assert checkpoint.load(path)["pair"] == "AAA/BBB"
+        assert os.listdir(tmp) == ["state.json"]  # no temp files left behind
+
+        state = json.load(open(path))
+        state["saved_at"] = time.time() - 7200
+        json.dump(state, open(path, "w"))
+        assert checkpoint.load(path, max_age=3600) is None
+        assert checkpoint.load(path, max_age=None)["pair"] == "AAA/BBB"
+
+        open(path, "w").write('{"version": 1, "pair": ')  # torn write from before atomic saves
+        assert checkpoint.load(path) is None
+
+        clock = [0.0]
+        saver = Checkpointer(path, interval=60, clock=lambda: clock[0])
+        assert saver.maybe_save(lambda: {"n": 1})
+        clock[0] = 30.0
+        assert not saver.maybe_save(lambda: {"n": 2})
+        assert saver.maybe_save(lambda: {"n": 3}, force=True)
+        assert checkpoint.load(path)["n"] == 3 and saver.saves == 2
+
+
+def test_reconcile_position():
+    """The broker decides when it is flat or holds a full pair; leftovers keep the checkpoint's view"""
+    assert reconcile_position(1, 0, 0) == 0
+    assert reconcile_position(0, 10, -5) == 1
+    assert reconcile_position(1, -10, 5) == -1
+    assert reconcile_position(-1, 0, 5) == -1
+    assert reconcile_position(0, 0, -5) == 0
+
+
+def test_pairs_runner_warm_restart():
+    """A restarted runner resumes its position and history and only fetches new bars"""
+    broker = SimulatedBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0})
+    with tempfile.TemporaryDirectory() as tmp, TradeJournal() as journal, \
+            use_fake_clients(data=FakeDataClient(), trading=broker):
+        path = os.path.join(tmp, "pairs.json")
+        strategy = PairsStrategy("AAA", "BBB", lookback_days=20, spread_model=make_spread_model("rolling_ols", window=10))
+        strategy.entry_threshold = 1e9  # only the forced entry below trades
+        runner = PairsRunner(strategy, journal=journal, broker_state=BrokerState(broker), checkpoint_path=path)
+        asyncio.run(runner.run_once())
+        asyncio.run(runner._execute_entry(1, 2.0, prices=(100.0, 50.0)))
+        assert runner.save_checkpoint()
+        assert not runner.save_checkpoint()  # nothing changed, not due yet
+
+        data = FakeDataClient()
+        with use_fake_clients(data=data):
+            restarted = PairsRunner(PairsStrategy("AAA", "BBB"), journal=journal, broker_state=BrokerState(broker),
+                                    checkpoint_path=path)
+            assert asyncio.run(restarted.resume())
+            assert restarted.strategy.position == 1 and restarted.strategy.entry_spread == 2.0
+            assert restarted.strategy.lookback_days == 20 and restarted.strategy.entry_threshold == 1e9
+            assert restarted.strategy.spread_model.to_state() == strategy.spread_model.to_state()
+            assert restarted._history[0].equals(runner._history[0])
+            asyncio.run(restarted.run_once())
+        (_, start, _), = data.requests
+        assert start == runner._history[0].index[-1]  # incremental, not the whole window
+
+        # The broker was flattened while we were down
+        flat = PairsRunner(PairsStrategy("AAA", "BBB"), journal=journal,
+                           broker_state=BrokerState(SimulatedBroker(cash=100_000)), checkpoint_path=path)
+        assert asyncio.run(flat.resume())
+        assert flat.strategy.position == 0 and flat.strategy.entry_spread is None
+
+        # Another pair's checkpoint isn't used
+        other = PairsRunner(PairsStrategy("CCC", "DDD"), journal=journal, checkpoint_path=path)
+        assert not asyncio.run(other.resume())
+
+
+def test_stream_runner_catches_up_from_checkpoint():
+    """Restoring the spread window and replaying the missed bars matches a full warm-up"""
+    with tempfile.TemporaryDirectory() as tmp, \
+            use_fake_clients(data=FakeDataClient(), trading=SimulatedBroker(cash=100_000)):
+        path = os.path.join(tmp, "stream.json")
+        end = datetime.now(timezone.utc)
+        p1, p2 = load_pair("AAA", "BBB", "1D", end - timedelta(days=60), end - timedelta(days=3))
+        before = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_days=20), timeframe="1D",
+                                      checkpoint_path=path)
+        asyncio.run(before.warm_up(p1, p2))
+        assert before.save_checkpoint()
+
+        data = FakeDataClient()
+        with use_fake_clients(data=data):
+            after = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_days=20), timeframe="1D",
+                                         checkpoint_path=path)
+            assert asyncio.run(after.resume())
+            assert asyncio.run(after.catch_up()) == 3
+        assert len(data.requests) == 1
+
+        full = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_days=20), timeframe="1D")
+        asyncio.run(full.warm_up())
+        assert np.allclose(after.stats.values(), full.stats.values())
+        assert after.last_prices == full.last_prices
+
+        # A checkpoint taken at a different bar size can't seed this runner
+        minutes = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_days=20), timeframe="1Min",
+                                       checkpoint_path=path)
+        assert not asyncio.run(minutes.resume())
+
+
+def test_realtime_strategy_round_trip():
+    """Optimized parameters, open position and rolling stats survive a restart; the broker wins on conflict"""
+    strat = RealTimeTradingStrategy(api=None, hedge_ratio=1.0, mean_train=0.0, std_train=1.0, entry_z=1.0,
+                                    exit_z=0.5, initial_capital=1e6, rolling_window=5, rolling_seed=[0.0, 1.0, -1.0])
+    strat.process_data("Y", "X", date=datetime(2024, 1, 2), y_price=110.0, x_price=100.0)  # SHORT
+    state = json.loads(json.dumps(strat.to_state()))
+
+    restored = RealTimeTradingStrategy.from_state(state, api=None)
+    for name in RealTimeTradingStrategy._STATE_FIELDS:
+        assert getattr(restored, name) == getattr(strat, name), name
+    assert restored.entry_time == datetime(2024, 1, 2)
+    assert restored.rolling.values() == strat.rolling.values()
+    assert restored.process_data("Y", "X", y_price=100.0, x_price=100.0)[0] == "CLOSE_SHORT"
+
+    # Broker holds the opposite pair: adopt it with the broker's entry prices
+    broker = SimulatedBroker(cash=100_000, prices={"Y": 120.0, "X": 90.0})
+    broker._apply("Y", 10, 120.0)
+    broker._apply("X", -10, 90.0)
+    adopted = RealTimeTradingStrategy.from_state(state, api=None, broker_state=BrokerState(broker))
+    assert adopted.reconcile("Y", "X") == 1
+    assert adopted.entry_price_y == 120.0 and adopted.entry_price_x == 90.0
+    assert adopted.stop_price_y < 120.0 and adopted.stop_price_x > 90.0
+
+
+if __name__ == "__main__":
+    test_atomic_save_and_load()
+    test_reconcile_position()
+    test_pairs_runner_warm_restart()
+    test_stream_runner_catches_up_from_checkpoint()
+    test_realtime_strategy_round_trip()
+    print("✅ Checkpoint tests passed!")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+import src.cointegration_test as cointegration_test
+from src.cointegration_test import adf_stats, correlations, engle_granger, hedge_ratios, screen_pairs
+
+
+def _universe(n_walks=8, T=500, seed=0):
+    """Independent random walks plus one pair with COINT = 3 * BASE + 10 + AR(1) noise"""
+    rng = np.random.default_rng(seed)
+    walks = 100 + np.cumsum(rng.normal(0, 1, (T, n_walks)), axis=0)
+    noise = np.zeros(T)
+    for t in range(1, T):
+        noise[t] = 0.8 * noise[t - 1] + rng.normal(0, 1)
+    df = pd.DataFrame(walks, columns=[f"W{i}" for i in range(n_walks)])
+    df["BASE"] = 100 + np.cumsum(rng.normal(0, 1, T))
+    df["COINT"] = 3 * df["BASE"] + 10 + noise
+    return df
+
+
+def test_adf_matches_single_regression():
+    """Batched ADF t-stat equals a plain per-series lstsq"""
+    df = _universe()
+    _, _, resid = hedge_ratios(df["BASE"].to_numpy(), df[["COINT", "W0"]].to_numpy())
+    batched, _ = adf_stats(resid, lags=2)
+    for col in range(2):
+        e = resid[:, col]
+        de = np.diff(e)
+        z = np.column_stack([e[2:-1], de[1:-1], de[:-2]])
+        coef, *_ = np.linalg.lstsq(z, de[2:], rcond=None)
+        r = de[2:] - z @ coef
+        se = np.sqrt(r @ r / (len(r) - 3) * np.linalg.inv(z.T @ z)[0, 0])
+        assert abs(batched[col] - coef[0] / se) < 1e-9
+
+
+def test_engle_granger_pair():
+    df = _universe()
+    result = engle_granger(df["COINT"], df["BASE"])
+    assert abs(result["hedge_ratio"] - 3.0) < 0.1
+    assert result["cointegrated"]
+    assert 1 < result["half_life"] < 10
+
+
+def test_screen_ranks_cointegrated_pair_first():
+    df = _universe()
+    results = screen_pairs(df, min_corr=None, processes=1)
+    assert len(results) == 10 * 9 // 2
+    top = results.iloc[0]
+    assert {top.stock1, top.stock2} == {"COINT", "BASE"}
+    assert top.cointegrated
+    if top.stock1 == "COINT":
+        assert abs(top.hedge_ratio - 3.0) < 0.1
+
+
+def test_correlation_prefilter_and_pool():
+    df = _universe()
+    everything = screen_pairs(df, min_corr=None, processes=1)
+    filtered = screen_pairs(df, min_corr=0.9, processes=1)
+    assert 0 < len(filtered) < len(everything)
+    assert (filtered["corr"] >= 0.9).all()
+
+    pooled = screen_pairs(df, min_corr=None, processes=2)
+    pd.testing.assert_frame_equal(everything, pooled)
+
+
+def test_missing_bars_only_affect_their_pairs():
+    """A gappy symbol is tested on its own bars and leaves the other pairs' rows alone"""
+    df = _universe()
+    gappy = df.copy()
+    gappy.loc[gappy.index[::7], "W0"] = np.nan
+    full = screen_pairs(df, min_corr=None, processes=1).set_index(["stock1", "stock2"])
+    results = screen_pairs(gappy, min_corr=None, processes=1).set_index(["stock1", "stock2"])
+
+    assert len(results) == len(full)
+    has_w0 = np.array([("W0" in key) for key in results.index])
+    assert (results["nobs"][~has_w0] == len(df) - 2).all()
+    assert (results["nobs"][has_w0] < len(df) - 2).all()
+    untouched = full.loc[results.index[~has_w0]]
+    pd.testing.assert_series_equal(results["adf_stat"][~has_w0], untouched["adf_stat"])
+
+    # The gappy pair matches engle_granger on that pair's own aligned rows
+    (y, x), row = next((key, r) for key, r in results.iterrows() if "W0" in key)
+    aligned = gappy[[y, x]].dropna()
+    expected = engle_granger(aligned[y], aligned[x])
+    assert abs(row.hedge_ratio - expected["hedge_ratio"]) < 1e-9
+    assert abs(row.adf_stat - expected["adf_stat"]) < 1e-9
+
+    pooled = screen_pairs(gappy, min_corr=None, processes=2)
+    pd.testing.assert_frame_equal(results.reset_index(), pooled)
+
+
+def test_blocked_screen_matches_whole_matrix():
+    """Partner and row blocks change memory use, not results"""
+    df = _universe()
+    rng = np.random.default_rng(1)
+    for col in df.columns:
+        df.loc[df.index[rng.integers(0, len(df), 3)], col] = np.nan
+    whole = screen_pairs(df, min_corr=None, processes=1)
+    np.testing.assert_allclose(correlations(df.to_numpy()), df.corr().to_numpy(), atol=1e-12)
+
+    previous = cointegration_test.BLOCK_BYTES
+    cointegration_test.BLOCK_BYTES = 8 * len(df) * 3  # three partners / rows at a time
+    try:
+        blocked = screen_pairs(df, min_corr=None, processes=1)
+    finally:
+        cointegration_test.BLOCK_BYTES = previous
+    pd.testing.assert_frame_equal(whole, blocked, check_exact=False, rtol=1e-10)
+
+
+if __name__ == "__main__":
+    test_adf_matches_single_regression()
+    test_engle_granger_pair()
+    test_screen_ranks_cointegrated_pair_first()
+    test_correlation_prefilter_and_pool()
+    test_missing_bars_only_affect_their_pairs()
+    test_blocked_screen_matches_whole_matrix()
+    print("✅ Cointegration screening tests passed!")
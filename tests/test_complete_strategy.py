@@ -4,29 +4,42 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+from src.market_data import load_pair
+from src.sim_broker import SimulatedBroker
 from src.strategies.pairs import PairsStrategy
 from src.strategies.pairs_runner import PairsRunner
+from tests.fakes import FakeDataClient, use_fake_clients
 
-async def test_complete_strategy():
-    """Test the complete strategy with trading execution"""
-    print("�� Testing Complete Pairs Strategy...")
+async def run_complete_strategy():
+    """Run the complete strategy, orders included, against the simulated broker"""
+    print("🧪 Testing Complete Pairs Strategy...")
     
-    # Use AAPL vs MSFT since we know it has a signal
     strategy = PairsStrategy("AAPL", "MSFT", lookback_days=30)
+    strategy.entry_threshold = 1.0
     runner = PairsRunner(strategy, check_interval=60)
+    data = FakeDataClient()
+    broker = SimulatedBroker(cash=100_000, slippage_bps=1)
     
-    print("⏰ Running for 2 iterations...")
-    
-    for i in range(2):
-        print(f"\n🔄 Iteration {i+1}/2")
-        await runner.run_once()
+    with use_fake_clients(data=data, trading=broker):
+        prices1, prices2 = await asyncio.to_thread(load_pair, "AAPL", "MSFT", "1D")
+        broker.update_prices({"AAPL": prices1.iloc[-1], "MSFT": prices2.iloc[-1]})
         
-        if i < 1:
-            print("⏳ Waiting 1 minute...")
-            await asyncio.sleep(60)
+        print("⏰ Running for 2 iterations...")
+        for i in range(2):
+            print(f"\n🔄 Iteration {i+1}/2")
+            await runner.run_once()
     
     print(f"\n📊 Final position: {strategy.position}")
     print("✅ Test completed!")
+    return strategy, broker
+
+def test_complete_strategy():
+    strategy, broker = asyncio.run(run_complete_strategy())
+    assert strategy.position != 0
+    sides = {p.symbol: p.qty > 0 for p in broker.get_all_positions()}
+    assert set(sides) == {"AAPL", "MSFT"}
+    assert sides["AAPL"] == (strategy.position == 1)
+    assert sides["AAPL"] != sides["MSFT"]
 
 if __name__ == "__main__":
-    asyncio.run(test_complete_strategy())
+    asyncio.run(run_complete_strategy())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.broker_state import BrokerState
+from src.execution import execute_pair
+from src.order_book import OrderBook
+from src.journal import TradeJournal
+from src.sim_broker import SimulatedBroker
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from src.strategies.realtime import RealTimeTradingStrategy
+from fakes import FakeLegacyREST, FakeTradingClient, use_fake_clients
+
+LEGS = [{"symbol": "AAA", "side": "buy", "qty": 10}, {"symbol": "BBB", "side": "sell", "qty": 20}]
+
+
+class FlakyBroker(SimulatedBroker):
+    """Rejects the first `failures` orders for one symbol"""
+
+    def __init__(self, symbol: str, failures: int, **kwargs):
+        super().__init__(**kwargs)
+        self.flaky_symbol, self.failures = symbol, failures
+
+    def submit_order(self, order_data):
+        if order_data.symbol == self.flaky_symbol and self.failures:
+            self.failures -= 1
+            raise RuntimeError("503 Service Unavailable")
+        return super().submit_order(order_data)
+
+    def get_order_by_id(self, order_id):
+        raise AssertionError("order status must come from trade updates, not polling")
+
+
+def test_both_legs_fill_from_trade_updates():
+    """Legs are confirmed by streamed updates; prices and timings are reported"""
+    broker = FlakyBroker("BBB", 0, cash=100_000, prices={"AAA": 100.0, "BBB": 50.0}, slippage_bps=10)
+    with use_fake_clients(trading=broker):
+        result = asyncio.run(execute_pair(LEGS, book=OrderBook()))
+    assert result.filled and result.unwinds == []
+    aaa, bbb = result.legs
+    assert (aaa.filled_qty, bbb.filled_qty) == (10, 20)
+    assert abs(aaa.avg_price - 100.1) < 1e-9 and abs(bbb.avg_price - 49.95) < 1e-9
+    assert 0 <= result.naked <= result.latency
+    assert broker.positions["AAA"].qty == 10 and broker.positions["BBB"].qty == -20
+
+
+def test_failed_leg_is_retried():
+    """A transient rejection re-sends the leg instead of abandoning the pair"""
+    broker = FlakyBroker("BBB", 1, cash=100_000, prices={"AAA": 100.0, "BBB": 50.0})
+    with use_fake_clients(trading=broker):
+        result = asyncio.run(execute_pair(LEGS, book=OrderBook(), retries=1))
+    assert result.filled
+    assert len(result.legs[1].order_ids) == 1 and result.legs[1].error is None
+
+
+def test_unfillable_leg_is_unwound():
+    """When one leg can't trade the other is closed again, leaving the account flat"""
+    broker = SimulatedBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0}, shortable=False)
+    with use_fake_clients(trading=broker):
+        result = asyncio.run(execute_pair(LEGS, book=OrderBook(), retries=1))
+    assert result.status == "unwound"
+    assert result.legs[0].complete and result.legs[1].filled_qty == 0
+    (unwind,) = result.unwinds
+    assert (unwind.symbol, unwind.side, unwind.filled_qty) == ("AAA", "sell", 10)
+    assert broker.positions == {}
+
+    # Orders that never get a final update are cancelled after the timeout
+    clock = [0.0]
+    stalled = SimulatedBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0}, latency=60, clock=lambda: clock[0])
+    with use_fake_clients(trading=stalled):
+        result = asyncio.run(execute_pair(LEGS, book=OrderBook(), timeout=0.05, retries=0))
+    assert result.status == "unwound" and result.unwinds == []
+    assert all(o.status.value == "canceled" for o in stalled.orders.values())
+
+
+class SilentStreamBroker(SimulatedBroker):
+    """Fills orders but its trade updates never arrive, like a dropped websocket"""
+
+    def __init__(self, lookups_fail: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.lookups_fail = lookups_fail
+        self.trading_stream.publish = lambda update: None
+
+    def get_order_by_client_id(self, client_id):
+        if self.lookups_fail:
+            raise RuntimeError("503 Service Unavailable")
+        return super().get_order_by_client_id(client_id)
+
+
+def test_missed_updates_are_confirmed_before_retrying():
+    """A fill the stream never reported isn't traded again; only the confirmed shortfall is re-sent"""
+    broker = SilentStreamBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0})
+    with use_fake_clients(trading=broker):
+        result = asyncio.run(execute_pair(LEGS, book=OrderBook(), timeout=0.02))
+    assert result.filled and len(broker.orders) == 2
+    assert broker.positions["AAA"].qty == 10 and broker.positions["BBB"].qty == -20
+
+    # Partial fills: each retry asks for what is still missing, and the result matches the broker
+    broker = SilentStreamBroker(cash=100_000, prices={"AAA": 100.0}, fill_ratio=0.5)
+    with use_fake_clients(trading=broker):
+        result = asyncio.run(execute_pair([LEGS[0]], book=OrderBook(), timeout=0.02, retries=1))
+    first, second = [o for o in broker.orders.values() if o.side.value == "buy"]
+    assert first.qty == 10 and second.qty == 10 - first.filled_qty
+    (leg,) = result.legs
+    assert leg.filled_qty == first.filled_qty + second.filled_qty and not leg.complete
+    opened = leg.filled_qty - sum(u.filled_qty for u in result.unwinds)
+    assert broker.positions["AAA"].qty == opened
+    assert result.status == ("unwound" if opened == 0 else "failed")
+
+
+def test_unconfirmed_leg_is_not_unwound():
+    """When the broker can't be asked either, nothing more is traded and the pair is reported failed"""
+    broker = SilentStreamBroker(lookups_fail=True, cash=100_000, prices={"AAA": 100.0, "BBB": 50.0})
+    with use_fake_clients(trading=broker):
+        result = asyncio.run(execute_pair(LEGS, book=OrderBook(), timeout=0.02, retries=2))
+    assert result.status == "failed" and result.unwinds == []
+    assert all(leg.unconfirmed for leg in result.legs)
+    assert len(broker.orders) == 2  # no re-sends on top of fills we couldn't see
+
+
+def test_runner_entry_never_leaves_a_naked_leg():
+    """PairsRunner only takes the position when both legs filled"""
+    trading = FakeTradingClient(reject={"BBB"})
+    with TradeJournal() as journal, use_fake_clients(trading=trading):
+        runner = PairsRunner(PairsStrategy("AAA", "BBB"), journal=journal, broker_state=BrokerState(trading))
+        asyncio.run(runner._execute_entry(1, 2.0, account_value=100_000, prices=(100.0, 50.0)))
+        assert runner.strategy.position == 0
+        assert [(o.symbol, o.side.value) for o in trading.orders] == [("AAA", "buy"), ("AAA", "sell")]
+        journal.flush()
+        assert list(journal.fills()["side"]) == ["buy", "sell"]
+
+    trading = FakeTradingClient()
+    with TradeJournal() as journal, use_fake_clients(trading=trading):
+        runner = PairsRunner(PairsStrategy("AAA", "BBB"), journal=journal, broker_state=BrokerState(trading))
+        asyncio.run(runner._execute_entry(1, 2.0, account_value=100_000, prices=(100.0, 50.0)))
+        assert runner.strategy.position == 1 and len(trading.orders) == 2
+
+
+def test_realtime_strategy_unwinds_lone_leg():
+    """newtester's strategy confirms legs from trade updates and closes the one that filled alone"""
+    api = FakeLegacyREST(reject=["X"])
+    book = OrderBook(api.trading_stream)
+    with TradeJournal() as journal:
+        strat = RealTimeTradingStrategy(api=api, hedge_ratio=1.0, mean_train=0.0, std_train=1.0, entry_z=1.0,
+                                        exit_z=0.5, initial_capital=1e6, journal=journal, book=book)
+        strat.broker_state.equity = lambda: 1e6
+        action = strat.process_data("Y", "X", y_price=110.0, x_price=100.0)[0]
+        journal.flush()
+        assert list(journal.fills()["side"]) == ["sell", "buy"]
+    assert action == "SHORT" and strat.position == 0
+    assert [(s, side) for s, _, side, _ in api.orders] == [("Y", "sell"), ("Y", "buy")]
+    assert book.holdings("Y/X") == {}
+
+
+if __name__ == "__main__":
+    test_both_legs_fill_from_trade_updates()
+    test_failed_leg_is_retried()
+    test_unfillable_leg_is_unwound()
+    test_missed_updates_are_confirmed_before_retrying()
+    test_unconfirmed_leg_is_not_unwound()
+    test_runner_entry_never_leaves_a_naked_leg()
+    test_realtime_strategy_unwinds_lone_leg()
+    print("✅ Execution tests passed!")
@@ -4,7 +4,9 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.strategies.pairs import PairsStrategy
-from src.data_api import get_bars
+from src.market_data import load_pair
+from src.backtest import backtest
+from tests.fakes import offline_data_client, use_fake_clients
 from datetime import datetime, timedelta
 
 def test_historical_signals():
@@ -16,47 +18,37 @@ def test_historical_signals():
     start_date = end_date - timedelta(days=60)
     
     strategy = PairsStrategy("AAPL", "MSFT", lookback_days=30)
+    strategy.zscore_window = 30  # z-score of each day against the 30 days before it
     
-    # Get historical data
-    bars1 = get_bars(["AAPL"], "1D", start_date, end_date)
-    bars2 = get_bars(["MSFT"], "1D", start_date, end_date)
+    # Get historical data (synthetic bars when there are no credentials or recording)
+    with use_fake_clients(data=offline_data_client()):
+        prices1, prices2 = load_pair("AAPL", "MSFT", "1D", start_date, end_date)
     
-    if bars1.empty or bars2.empty:
+    if prices1.empty:
         print("❌ No historical data available")
         return
     
-    # Extract prices
-    prices1 = bars1.xs("AAPL")['close']
-    prices2 = bars2.xs("MSFT")['close']
-    prices1, prices2 = prices1.align(prices2, join='inner')
-    
     print(f"✅ Got {len(prices1)} trading days")
     
-    # Calculate spread for each day
-    spread = strategy.calculate_spread(prices1, prices2)
+    # Calculate spread, z-scores and entry signals for every day at once
+    signals = strategy.generate_signals(prices1, prices2)
+    spread = signals['spread']
     
     # Check for signals over time
     signals_found = 0
-    for i in range(30, len(spread)):
-        historical_spread = spread.iloc[i-30:i]
-        current_spread = spread.iloc[i]
-        date = spread.index[i]
-        
-        # Calculate z-score
-        mean_spread = historical_spread.mean()
-        std_spread = historical_spread.std()
-        
-        if std_spread > 0:
-            z_score = (current_spread - mean_spread) / std_spread
-            
-            # Check for entry signals
-            if abs(z_score) > 1.5:
-                signal_type = "LONG AAPL/SHORT MSFT" if z_score < -1.5 else "SHORT AAPL/LONG MSFT"
-                print(f"🎯 Signal on {date.date()}: {signal_type} (Z-score: {z_score:.2f})")
-                signals_found += 1
+    for date, row in signals[signals['entry'] != 0].iterrows():
+        signal_type = "LONG AAPL/SHORT MSFT" if row['entry'] == 1 else "SHORT AAPL/LONG MSFT"
+        print(f"🎯 Signal on {date.date()}: {signal_type} (Z-score: {row['zscore']:.2f})")
+        signals_found += 1
     
     print(f"\n📊 Total signals found: {signals_found}")
     print(f"📈 Current spread: {spread.iloc[-1]:.4f}")
+    
+    # Trades those signals would have produced under the runner's rules
+    result = backtest(strategy, prices1, prices2)
+    for trade in result.trades.itertuples():
+        print(f"💼 {trade.entry_time.date()} → {trade.exit_time.date()}: P&L ${trade.pnl:+.2f}")
+    print(f"🔄 Trades: {len(result.trades)}, return {result.total_return * 100:+.2f}%")
 
 if __name__ == "__main__":
     test_historical_signals()
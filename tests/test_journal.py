@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import pandas as pd
+
+from src.broker_state import BrokerState
+from src.journal import TradeJournal
+from src.sim_broker import SimulatedBroker
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from src.strategies.realtime import RealTimeTradingStrategy
+from fakes import FakeDataClient, use_fake_clients
+
+
+def test_summary_and_filters():
+    """P&L, win rate and holding time come back from SQL; trades and fills filter by strategy and time"""
+    start = datetime(2024, 1, 2, 15, 0)
+    with TradeJournal() as journal:
+        for i, pnl in enumerate([10.0, -4.0, 6.0, None]):
+            journal.record_trade("AAA/BBB", start + timedelta(hours=i + 1), start + timedelta(hours=i),
+                                 position=1, entry_spread=1.0, exit_spread=1.1, pnl=pnl)
+        journal.record_trade("CCC/DDD", start + timedelta(days=1), start, position=-1, pnl=-1.0)
+        journal.record_fill("aaa", "buy", 10, 101.5, "order-1", strategy="AAA/BBB", time=start)
+
+        summary = journal.summary("AAA/BBB")
+        assert summary["trades"] == 4
+        assert summary["profitable"] == 2
+        assert abs(summary["win_rate"] - 2 / 3) < 1e-12  # the trade without P&L isn't scored
+        assert summary["total_pnl"] == 12.0
+        assert summary["avg_hold_seconds"] == 3600.0
+        assert journal.summary()["trades"] == 5
+
+        trades = journal.trades("AAA/BBB", since=start + timedelta(hours=3))
+        assert len(trades) == 2
+        assert str(trades["exit_time"].dt.tz) == "UTC"
+        fills = journal.fills()
+        assert fills.iloc[0]["symbol"] == "AAA" and fills.iloc[0]["price"] == 101.5
+
+
+def test_durable_across_restarts():
+    """A file journal survives close/reopen and runs in WAL mode"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trades.db")
+        with TradeJournal(path) as journal:
+            journal.record_trade("AAA/BBB", datetime(2024, 1, 3), datetime(2024, 1, 2), pnl=5.0)
+        with TradeJournal(path) as journal:
+            assert journal.summary()["total_pnl"] == 5.0
+            mode = journal._db.execute("PRAGMA journal_mode").fetchone()[0]
+            assert mode == "wal"
+
+
+def test_recording_stays_off_the_hot_path():
+    """Recording is a queue put; batches are committed by the writer thread"""
+    n = 50_000
+    with TradeJournal() as journal:
+        exit_time = datetime(2024, 1, 2)
+        started = time.perf_counter()
+        for i in range(n):
+            journal.record_fill("AAA", "buy", 1, 100.0 + i % 7, time=exit_time)
+        elapsed = time.perf_counter() - started
+        assert len(journal.fills()) == n and journal.dropped == 0
+    assert elapsed / n < 100e-6
+
+    # A stalled writer never blocks the caller; the overflow is counted
+    with TradeJournal(max_pending=10) as journal:
+        with journal._db_lock:
+            started = time.perf_counter()
+            for _ in range(30):
+                journal.record_fill("AAA", "buy", 1, 100.0)
+            assert time.perf_counter() - started < 0.1
+        journal.flush()
+        assert journal.dropped > 0 and len(journal.fills()) + journal.dropped == 30
+
+
+def test_times_are_stored_as_utc():
+    """Naive datetimes are UTC; aware ones keep their instant"""
+    naive = datetime(2024, 1, 2, 15, 0)
+    aware = datetime(2024, 1, 2, 10, 0, tzinfo=timezone(timedelta(hours=-5)))
+    with TradeJournal() as journal:
+        journal.record_fill("AAA", "buy", 1, time=naive)
+        journal.record_fill("AAA", "buy", 1, time=aware)
+        times = journal.fills()["time"]
+    assert times.iloc[0] == times.iloc[1] == pd.Timestamp("2024-01-02 15:00", tz="UTC")
+    assert journal.path == ":memory:"  # tests run with JOURNAL_PATH=":memory:"
+
+
+def test_runner_journals_round_trip():
+    """PairsRunner records entry and exit fills and the closed trade's P&L"""
+    broker = SimulatedBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0})
+    with TradeJournal() as journal, use_fake_clients(data=FakeDataClient(), trading=broker):
+        runner = PairsRunner(PairsStrategy("AAA", "BBB", lookback_days=20), journal=journal,
+                             broker_state=BrokerState(broker))
+        asyncio.run(runner._execute_entry(-1, 2.0, prices=(100.0, 50.0)))  # short AAA, long BBB
+        assert runner.strategy.position == -1
+        broker.update_prices({"AAA": 100.0, "BBB": 55.0})
+        asyncio.run(runner._execute_exit(current_spread=1.8))
+
+        fills = journal.fills("AAA/BBB")
+        assert list(fills["side"][:2]) == ["sell", "buy"]
+        assert sorted(fills["side"][2:]) == ["buy", "sell"]  # the exit covers the short and sells the long
+        trades = journal.trades("AAA/BBB")
+        assert len(trades) == 1
+        assert trades.iloc[0]["position"] == -1 and trades.iloc[0]["exit_spread"] == 1.8
+        assert trades.iloc[0]["pnl"] > 0  # long BBB gained
+        runner.print_performance_summary()
+
+
+def test_realtime_strategy_journals_trades():
+    """Journaled RealTimeTradingStrategy keeps a bounded in-memory log"""
+    with TradeJournal() as journal:
+        strat = RealTimeTradingStrategy(api=None, hedge_ratio=1.0, mean_train=0.0, std_train=1.0,
+                                        entry_z=1.0, exit_z=0.5, initial_capital=1e6, journal=journal)
+        strat.process_data("Y", "X", y_price=110.0, x_price=100.0)  # SHORT
+        strat.process_data("Y", "X", y_price=100.0, x_price=100.0)  # CLOSE_SHORT
+        trades = journal.trades("Y/X")
+        assert len(trades) == 1 and trades.iloc[0]["position"] == -1
+        assert trades.iloc[0]["pnl"] == strat.trade_log[-1]["Scaled"]
+        assert strat.trade_log.maxlen == 1000
+
+
+if __name__ == "__main__":
+    test_summary_and_filters()
+    test_durable_across_restarts()
+    test_recording_stays_off_the_hot_path()
+    test_times_are_stored_as_utc()
+    test_runner_journals_round_trip()
+    test_realtime_strategy_journals_trades()
+    print("✅ Journal tests passed!")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from datetime import datetime, timezone
+
+from src.market_data import load_pair, load_universe
+from fakes import FakeDataClient, use_fake_clients
+
+
+def test_load_universe_batches_and_aligns():
+    """N symbols cost ceil(N / batch_size) requests and share one index, gaps kept as NaN"""
+    fake = FakeDataClient(drop_every={"CCC": 5})
+    symbols = ["AAA", "BBB", "CCC", "DDD", "EEE"]
+    start, end = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+    with use_fake_clients(data=fake):
+        wide = load_universe(symbols, "1D", start, end, batch_size=2)
+        inner = load_universe(symbols, "1D", start, end, batch_size=2, dropna=True)
+
+    assert len(fake.requests) == 6
+    # Only CCC is missing bars; every other symbol keeps all of its rows
+    close = wide["close"]
+    assert len(close) == 61
+    assert close["CCC"].isna().sum() == 13
+    assert not close.drop(columns="CCC").isna().any().any()
+
+    close, volume = inner["close"], inner["volume"]
+    assert list(close.columns) == symbols
+    assert close.index.equals(volume.index)
+    assert not close.isna().any().any()
+    # dropna=True drops every 5th timestamp (CCC's gaps) for everyone
+    assert len(close) == 61 - 13
+
+
+def test_load_pair_single_request():
+    """Both legs of a pair come from one request"""
+    fake = FakeDataClient(drop_every={"MSFT": 4})
+    start, end = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+    with use_fake_clients(data=fake):
+        prices1, prices2 = load_pair("aapl", "msft", "1D", start, end)
+
+    assert len(fake.requests) == 1
+    assert prices1.index.equals(prices2.index)
+    assert prices1.name == "AAPL" and prices2.name == "MSFT"
+    assert len(prices1) == 32 - 8
+
+
+if __name__ == "__main__":
+    test_load_universe_batches_and_aligns()
+    test_load_pair_single_request()
+    print("✅ Market data tests passed!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import sys
+import tempfile
+import urllib.request
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src import metrics
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from src.strategies.realtime import RealTimeTradingStrategy
+from fakes import FakeDataClient, FakeTradingClient, use_fake_clients
+
+
+def _recording():
+    metrics.REGISTRY.reset()
+    metrics.enable()
+
+
+def test_disabled_records_nothing():
+    """While disabled, spans and timelines are shared no-ops"""
+    metrics.REGISTRY.reset()
+    metrics.enable(False)
+    assert metrics.span("run_once", "fetch") is metrics.span("exit", "submit")
+    with metrics.span("run_once", "fetch"):
+        pass
+    metrics.timeline("process_data").mark("zscore")
+    metrics.count_cycle("run_once", "ok")
+    assert metrics.STAGE_SECONDS.count("run_once", "fetch") == 0
+    assert metrics.CYCLES.value("run_once", "ok") == 0
+
+
+def test_run_once_stages():
+    """A trading cycle times data fetch, signals, sizing and order submission separately"""
+    _recording()
+    try:
+        strategy = PairsStrategy("AAA", "BBB", lookback_days=20)
+        strategy.entry_threshold = 0.0  # any non-zero z-score enters
+        runner = PairsRunner(strategy)
+        with use_fake_clients(data=FakeDataClient(), trading=FakeTradingClient()):
+            asyncio.run(runner.run_once())
+        assert strategy.position != 0
+
+        for op, stage in [("run_once", "total"), ("run_once", "fetch"), ("run_once", "signals"),
+                          ("entry", "account"), ("entry", "sizing"), ("entry", "submit")]:
+            assert metrics.STAGE_SECONDS.count(op, stage) == 1, (op, stage)
+        assert metrics.STAGE_SECONDS.total("run_once", "total") >= metrics.STAGE_SECONDS.total("run_once", "fetch")
+        assert metrics.CYCLES.value("run_once", "ok") == 1
+        assert metrics.ORDERS.value("buy", "ok") + metrics.ORDERS.value("sell", "ok") == 2
+    finally:
+        metrics.enable(False)
+
+
+def test_process_data_stages_and_errors():
+    """process_data marks its stages; a raising span counts as an error"""
+    _recording()
+    try:
+        strat = RealTimeTradingStrategy(api=None, hedge_ratio=1.0, mean_train=0.0, std_train=1.0,
+                                        entry_z=1.0, initial_capital=1e6)
+        strat.process_data("Y", "X", y_price=110.0, x_price=100.0)   # z = 10 -> SHORT
+        strat.process_data("Y", "X", y_price=100.0, x_price=100.0)   # z = 0  -> CLOSE_SHORT
+        assert metrics.STAGE_SECONDS.count("process_data", "zscore") == 2
+        assert metrics.STAGE_SECONDS.count("process_data", "orders") == 2
+        assert metrics.STAGE_SECONDS.count("process_data", "positions") == 0  # exits read the local book
+
+        try:
+            with metrics.span("exit", "submit"):
+                raise RuntimeError("rejected")
+        except RuntimeError:
+            pass
+        assert metrics.STAGE_ERRORS.value("exit", "submit") == 1
+    finally:
+        metrics.enable(False)
+
+
+def test_prometheus_export():
+    """Text format has cumulative buckets, sum and count; served over HTTP and written to file"""
+    _recording()
+    try:
+        for value in (0.0002, 0.003, 0.003, 7.0):
+            metrics.STAGE_SECONDS.observe(value, "run_once", "fetch")
+        text = metrics.render()
+        assert "# TYPE pairs_stage_seconds histogram" in text
+        assert 'pairs_stage_seconds_bucket{op="run_once",stage="fetch",le="0.0025"} 1' in text
+        assert 'pairs_stage_seconds_bucket{op="run_once",stage="fetch",le="0.005"} 3' in text
+        assert 'pairs_stage_seconds_bucket{op="run_once",stage="fetch",le="+Inf"} 4' in text
+        assert 'pairs_stage_seconds_count{op="run_once",stage="fetch"} 4' in text
+
+        server = metrics.serve(0, host="127.0.0.1")
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            assert urllib.request.urlopen(url, timeout=5).read().decode() == metrics.render()
+        finally:
+            server.shutdown()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = metrics.write(os.path.join(tmp, "pairs.prom"))
+            with open(path) as f:
+                assert f.read() == metrics.render()
+    finally:
+        metrics.enable(False)
+
+
+if __name__ == "__main__":
+    test_disabled_records_nothing()
+    test_run_once_stages()
+    test_process_data_stages_and_errors()
+    test_prometheus_export()
+    print("✅ Metrics tests passed!")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+import threading
+from types import SimpleNamespace
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from alpaca.trading.enums import OrderSide, TimeInForce
+from alpaca.trading.requests import MarketOrderRequest
+
+from src.broker_state import BrokerState
+from src.execution import execute_pair
+from src.journal import TradeJournal
+import src.order_book as order_book
+from src.order_book import Holding, OrderBook
+from src.sim_broker import SimulatedBroker
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from src.strategies.realtime import RealTimeTradingStrategy
+from fakes import FakeLegacyREST, use_fake_clients
+
+
+class CountingBroker(SimulatedBroker):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.position_reads = 0
+
+    def get_all_positions(self):
+        self.position_reads += 1
+        return super().get_all_positions()
+
+
+def test_book_tracks_owned_fills():
+    """Fills are credited to the pair that tagged the order; the account position is kept too"""
+    broker = SimulatedBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0})
+    book = OrderBook()
+    legs = [{"symbol": "AAA", "side": "buy", "qty": 10}, {"symbol": "BBB", "side": "sell", "qty": 20}]
+
+    async def main():
+        await execute_pair(legs, book=book, owner="AAA/BBB")
+        await execute_pair([{"symbol": "AAA", "side": "buy", "qty": 4}], book=book, owner="AAA/CCC")
+
+    with use_fake_clients(trading=broker):
+        asyncio.run(main())
+    held = book.holdings("AAA/BBB")
+    assert held == {"AAA": Holding(10, 100.0), "BBB": Holding(-20, 50.0)}
+    assert book.holdings("AAA/CCC") == {"AAA": Holding(4, 100.0)}
+    assert book.position("AAA") == broker.positions["AAA"].qty == 14
+    assert book.position("bbb") == -20
+
+
+def test_legacy_updates_from_stream_thread():
+    """alpaca_trade_api updates (order dicts, string fields) arrive on the stream's own thread"""
+    book = OrderBook()
+    book.tag("c1", "Y/X")
+
+    def update(event, filled, status, price):
+        order = {"client_order_id": "c1", "symbol": "Y", "side": "sell", "qty": "9",
+                 "filled_qty": filled, "filled_avg_price": price, "status": status}
+        return SimpleNamespace(event=event, order=order, price=price, position_qty=None)
+
+    async def stream():
+        await book.on_trade_update(update("partial_fill", "4", "partially_filled", "10.0"))
+        await book.on_trade_update(update("fill", "9", "filled", "12.0"))
+
+    async def main():
+        waiter = asyncio.ensure_future(book.wait("c1", timeout=5))
+        await asyncio.sleep(0)
+        thread = threading.Thread(target=asyncio.run, args=(stream(),))
+        thread.start()
+        order = await waiter
+        thread.join()
+        return order
+
+    order = asyncio.run(main())
+    assert order["status"] == "filled"
+    assert book.holdings("Y/X") == {"Y": Holding(-9, (4 * 10.0 + 5 * 12.0) / 9)}
+    assert book.position("Y") == -9
+
+
+def test_exit_closes_only_the_pair():
+    """The runner's exit covers the short and sells the long it opened, leaving other holdings alone"""
+    broker = CountingBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0, "CCC": 20.0})
+    with TradeJournal() as journal, use_fake_clients(trading=broker):
+        broker.submit_order(MarketOrderRequest(symbol="BBB", qty=7, side=OrderSide.BUY, time_in_force=TimeInForce.DAY))
+        broker.submit_order(MarketOrderRequest(symbol="CCC", qty=5, side=OrderSide.BUY, time_in_force=TimeInForce.DAY))
+        runner = PairsRunner(PairsStrategy("AAA", "BBB"), journal=journal, broker_state=BrokerState(broker))
+        asyncio.run(runner._execute_entry(-1, 2.0, account_value=100_000, prices=(100.0, 50.0)))
+        assert runner.strategy.position == -1
+        opened = runner.book.holdings(runner.name)
+        assert opened["AAA"].qty < 0 < opened["BBB"].qty
+
+        broker.update_prices({"AAA": 95.0, "BBB": 50.0})
+        asyncio.run(runner._execute_exit(current_spread=1.0))
+        assert runner.strategy.position == 0 and runner.book.holdings(runner.name) == {}
+        assert broker.position_reads == 0
+        assert {s: p.qty for s, p in broker.positions.items()} == {"BBB": 7, "CCC": 5}
+        journal.flush()
+        trade = journal.trades(runner.name).iloc[0]
+        assert abs(trade["pnl"] - 5.0 * -opened["AAA"].qty) < 1e-6
+
+    # A warm restart carries the holdings over in the checkpoint
+    runner.book.set_holdings(runner.name, {"AAA": Holding(-3, 100.0)})
+    state = runner.checkpoint_state()
+    restored = PairsRunner(PairsStrategy("AAA", "BBB"), journal=TradeJournal(), book=OrderBook())
+    restored.restore_checkpoint(state)
+    assert restored.book.holdings("AAA/BBB") == {"AAA": Holding(-3, 100.0)}
+
+
+def test_settled_orders_are_bounded_and_unknown_statuses_ignored():
+    """Only working orders stay in `orders`; settled ones are kept for wait() up to RECENT_ORDERS"""
+    book = OrderBook()
+
+    def update(coid, status, filled="0"):
+        order = {"client_order_id": coid, "symbol": "AAA", "side": "buy", "qty": "1",
+                 "filled_qty": filled, "filled_avg_price": "10.0", "status": status}
+        return SimpleNamespace(event=status, order=order, position_qty=None)
+
+    async def main():
+        await book.on_trade_update(update("odd", "awaiting_clearing"))  # logged and skipped
+        await book.on_trade_update(update("live", "new"))
+        for i in range(order_book.RECENT_ORDERS + 5):
+            await book.on_trade_update(update(f"c{i}", "filled", "1"))
+        return await book.wait("c4", timeout=0), await book.wait(f"c{order_book.RECENT_ORDERS + 4}", timeout=0)
+
+    old, recent = asyncio.run(main())
+    assert list(book.orders) == ["live"]
+    assert old is None and recent["status"] == "filled"
+    assert len(book._settled) == order_book.RECENT_ORDERS
+    assert book.position("AAA") == order_book.RECENT_ORDERS + 5
+
+
+def test_realtime_exit_closes_book_quantities():
+    """newtester's strategy exits with the quantities its trade updates reported for the pair"""
+    api = FakeLegacyREST()
+    book = OrderBook(api.trading_stream)
+    with TradeJournal() as journal:
+        strat = RealTimeTradingStrategy(api=api, hedge_ratio=1.0, mean_train=0.0, std_train=1.0, entry_z=1.0,
+                                        exit_z=0.5, initial_capital=1e6, journal=journal, book=book)
+        strat.broker_state.equity = lambda: 1e6
+        assert strat.process_data("Y", "X", y_price=110.0, x_price=100.0)[0] == "SHORT"
+        (_, qty_y, _, id_y), (_, qty_x, _, id_x) = sorted(api.orders)[::-1]
+        assert id_y and id_x
+        assert book.holdings("Y/X") == {"Y": Holding(-qty_y, 100.0), "X": Holding(qty_x, 100.0)}
+
+        # Another strategy's fill in Y isn't this pair's to close
+        other = {"client_order_id": "other", "symbol": "Y", "side": "buy", "filled_qty": "7",
+                 "filled_avg_price": "100.0", "status": "filled"}
+        asyncio.run(book.on_trade_update(SimpleNamespace(event="fill", order=other)))
+
+        api.orders.clear()
+        assert strat.process_data("Y", "X", y_price=100.0, x_price=100.0)[0] == "CLOSE_SHORT"
+    assert sorted(o[:3] for o in api.orders) == [("X", qty_x, "sell"), ("Y", qty_y, "buy")]
+    assert "get_position" not in api.calls and strat.open_qty == {}
+    assert book.holdings("Y/X") == {} and book.position("Y") == 7
+
+
+def test_realtime_stop_loss_closes_and_waits_for_confirmation():
+    """A stop sends the pair's closing orders; state is only cleared once they fill"""
+    api = FakeLegacyREST()
+    book = OrderBook(api.trading_stream)
+    with TradeJournal() as journal:
+        strat = RealTimeTradingStrategy(api=api, hedge_ratio=1.0, mean_train=0.0, std_train=1.0, entry_z=1.0,
+                                        exit_z=0.5, initial_capital=1e6, journal=journal, book=book)
+        strat.broker_state.equity = lambda: 1e6
+        assert strat.process_data("Y", "X", y_price=110.0, x_price=100.0)[0] == "SHORT"
+        qty_y, qty_x = -book.holdings("Y/X")["Y"].qty, book.holdings("Y/X")["X"].qty
+
+        # Y rallies through the stop but the X close is rejected: only Y is flat
+        api.orders.clear()
+        api.reject = {"X"}
+        assert strat.process_data("Y", "X", y_price=120.0, x_price=100.0)[0] == "HOLD"
+        assert [o[:3] for o in api.orders] == [("Y", qty_y, "buy")]
+        assert strat.position == -1 and strat.open_qty and book.holdings("Y/X") == {"X": Holding(qty_x, 100.0)}
+
+        # The next poll closes what is left
+        api.orders.clear()
+        api.reject = set()
+        action, details, _, _ = strat.process_data("Y", "X", y_price=120.0, x_price=100.0)
+    assert action == "STOP_LOSS_SHORT" and details["ExitType"] == action
+    assert [o[:3] for o in api.orders] == [("X", qty_x, "sell")]
+    assert strat.position == 0 and strat.open_qty == {} and book.holdings("Y/X") == {}
+
+
+if __name__ == "__main__":
+    test_book_tracks_owned_fills()
+    test_legacy_updates_from_stream_thread()
+    test_exit_closes_only_the_pair()
+    test_settled_orders_are_bounded_and_unknown_statuses_ignored()
+    test_realtime_exit_closes_book_quantities()
+    test_realtime_stop_loss_closes_and_waits_for_confirmation()
+    print("✅ Order book tests passed!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import pandas as pd
+
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from fakes import FakeDataClient, FakeTradingClient, use_fake_clients
+
+
+def test_later_cycles_fetch_only_new_bars():
+    """After the first cycle only bars from the last held one are requested"""
+    data = FakeDataClient()
+    runner = PairsRunner(PairsStrategy("AAA", "BBB", lookback_days=30))
+    runner.strategy.entry_threshold = 1e9  # never trade
+
+    with use_fake_clients(data=data, trading=FakeTradingClient()):
+        asyncio.run(runner.run_once())
+        first = runner._history[0]
+        asyncio.run(runner.run_once())
+
+    assert len(data.requests) == 2
+    (_, start1, _), (_, start2, _) = data.requests
+    assert (start2 - start1) > timedelta(days=30)
+    assert start2 == first.index[-1]
+    held1, held2 = runner._history
+    assert held1.index.equals(held2.index)
+    assert held1.index.is_monotonic_increasing and held1.index.is_unique
+
+    # Same window a fresh full download gives
+    with use_fake_clients(data=FakeDataClient(), trading=FakeTradingClient()):
+        fresh = PairsRunner(PairsStrategy("AAA", "BBB", lookback_days=30))
+        end = datetime.now()
+        full1, _ = asyncio.run(fresh._load_history(end - timedelta(days=45), end))
+    assert held1.index.equals(full1.index)
+    assert (held1 == full1).all()
+
+
+def test_window_is_trimmed_and_stale_history_refetched():
+    """Bars older than the window are dropped; history older than the window is downloaded again"""
+    runner = PairsRunner(PairsStrategy("AAA", "BBB", lookback_days=30))
+    end = datetime(2024, 6, 1)
+    with use_fake_clients(data=FakeDataClient(), trading=FakeTradingClient()):
+        asyncio.run(runner._load_history(end - timedelta(days=45), end))
+        p1, _ = asyncio.run(runner._load_history(end - timedelta(days=40), end + timedelta(days=5)))
+        assert p1.index[0] >= pd.Timestamp(end - timedelta(days=40), tz="UTC")
+        assert p1.index[-1] == pd.Timestamp(end + timedelta(days=5), tz="UTC")
+
+        data = FakeDataClient()
+        with use_fake_clients(data=data):
+            asyncio.run(runner._load_history(end + timedelta(days=100), end + timedelta(days=145)))
+    assert data.requests[0][1] == pd.Timestamp(end + timedelta(days=100), tz="UTC")
+
+
+def test_entry_sizes_from_held_prices():
+    """An entry uses the cycle's closes: no extra market-data requests"""
+    data = FakeDataClient()
+    trading = FakeTradingClient()
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=30)
+    strategy.entry_threshold = 0.0  # any non-zero z-score enters
+    runner = PairsRunner(strategy)
+
+    with use_fake_clients(data=data, trading=trading):
+        asyncio.run(runner.run_once())
+
+    assert strategy.position != 0
+    assert len(data.requests) == 1
+    assert trading.calls.count("submit_order") == 2
+
+
+if __name__ == "__main__":
+    test_later_cycles_fetch_only_new_bars()
+    test_window_is_trimmed_and_stale_history_refetched()
+    test_entry_sizes_from_held_prices()
+    print("✅ Pairs runner tests passed!")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import pandas as pd
+
+from src.broker_state import BrokerState
+from src.order_book import Holding
+from src.sim_broker import SimulatedBroker
+from src.strategies.config import PairsConfig
+from src.strategies.portfolio_runner import PortfolioRunner
+from fakes import FakeDataClient, FakeTradingClient, use_fake_clients
+
+
+def _configs():
+    # Thresholds out of reach so the cycle never trades
+    pairs = [("AAA", "BBB"), ("BBB", "CCC"), ("AAA", "CCC"), ("DDD", "EEE")]
+    return [PairsConfig(stock1=a, stock2=b, entry_threshold=1e9, exit_threshold=-1.0) for a, b in pairs]
+
+
+def test_cycle_cost_scales_with_symbols_not_pairs():
+    """One cycle: one data request per symbol batch, one account and one positions lookup"""
+    data, trading = FakeDataClient(), FakeTradingClient()
+    runner = PortfolioRunner(_configs(), batch_size=2)
+
+    assert runner.symbols == ["AAA", "BBB", "CCC", "DDD", "EEE"]
+    with use_fake_clients(data=data, trading=trading):
+        asyncio.run(runner.run_once())
+    runner.stop()
+
+    assert len(data.requests) == 3
+    assert sorted(trading.calls) == ["get_account", "get_all_positions"]
+    assert all(position == 0 for position in runner.positions_by_pair().values())
+
+
+def test_later_cycles_fetch_only_new_bars():
+    """The close matrix is kept between cycles: only bars since the last held one are requested"""
+    data = FakeDataClient()
+    runner = PortfolioRunner(_configs(), batch_size=5)
+    with use_fake_clients(data=data, trading=FakeTradingClient()):
+        asyncio.run(runner.run_once())
+        first = runner._closes
+        asyncio.run(runner.run_once())
+
+        fresh = PortfolioRunner(_configs(), batch_size=5)
+        asyncio.run(fresh.run_once())
+    runner.stop()
+    fresh.stop()
+
+    (_, start1, _), (_, start2, _), _ = data.requests
+    assert start2 == first.index[-1]
+    held = runner._closes
+    assert list(held.columns) == runner.symbols
+    assert held.index.is_monotonic_increasing and held.index.is_unique
+    assert held.index[0] >= fresh._closes.index[0]
+    pd.testing.assert_frame_equal(held, fresh._closes.loc[held.index[0]:], check_freq=False)
+
+
+def test_entry_uses_shared_account_snapshot():
+    """Pairs entering in the same cycle reuse the cycle's account lookup"""
+    data, trading = FakeDataClient(), FakeTradingClient()
+    configs = _configs()[:2]
+    for config in configs:
+        config.entry_threshold = 0.0  # any non-zero z-score enters
+    runner = PortfolioRunner(configs)
+
+    with use_fake_clients(data=data, trading=trading):
+        asyncio.run(runner.run_once())
+    runner.stop()
+
+    assert trading.calls.count("get_account") == 1
+    assert trading.calls.count("submit_order") == 4
+    assert all(position != 0 for position in runner.positions_by_pair().values())
+
+
+def test_shared_symbol_exits_only_its_share():
+    """Two pairs long the same symbol: a restart restores each pair's share and an exit sells only that"""
+    broker = SimulatedBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0, "CCC": 20.0})
+    for symbol, qty in (("AAA", 30), ("BBB", -5), ("CCC", -8)):
+        broker._apply(symbol, qty, broker.prices[symbol])
+    configs = [PairsConfig(stock1="AAA", stock2=other) for other in ("BBB", "CCC")]
+
+    with tempfile.TemporaryDirectory() as tmp, use_fake_clients(trading=broker):
+        path = os.path.join(tmp, "portfolio.json")
+        before = PortfolioRunner(configs, broker_state=BrokerState(broker), checkpoint_path=path)
+        assert before.runners[0].shared_symbols == {"AAA"}
+        for runner, (aaa, other, qty) in zip(before.runners, (("AAA", "BBB", 10), ("AAA", "CCC", 20))):
+            runner.strategy.update_position(1, 2.0)
+            runner.book.set_holdings(runner.name, {aaa: Holding(qty, 100.0), other: Holding(broker.positions[other].qty)})
+        assert before.save_checkpoint(force=True)
+        before.stop()
+
+        # Forget the live book, as after a crash
+        for runner in before.runners:
+            runner.book.set_holdings(runner.name, {})
+        after = PortfolioRunner(configs, broker_state=BrokerState(broker), checkpoint_path=path)
+        assert asyncio.run(after.resume()) == 2
+        first, second = after.runners
+        assert first.book.holdings(first.name)["AAA"].qty == 10
+        assert second.book.holdings(second.name)["AAA"].qty == 20
+        asyncio.run(first._execute_exit(current_spread=0.0))
+        after.stop()
+    assert broker.positions["AAA"].qty == 20 and "BBB" not in broker.positions
+    assert first.strategy.position == 0 and second.strategy.position == 1
+
+
+def test_shared_symbol_without_holdings_is_not_exited():
+    """Without per-pair holdings a pair never claims the account's whole quantity of a shared symbol"""
+    broker = SimulatedBroker(cash=100_000, prices={"AAA": 100.0, "BBB": 50.0, "CCC": 20.0})
+    for symbol, qty in (("AAA", 30), ("BBB", -5), ("CCC", -8)):
+        broker._apply(symbol, qty, broker.prices[symbol])
+    configs = [PairsConfig(stock1="AAA", stock2=other) for other in ("BBB", "CCC")]
+    with use_fake_clients(trading=broker):
+        portfolio = PortfolioRunner(configs, broker_state=BrokerState(broker), checkpoint_path=None)
+        first = portfolio.runners[0]
+        first.strategy.update_position(1, 2.0)
+        first.reconcile(BrokerState(broker).positions())  # no checkpointed holdings: position kept, nothing adopted
+        assert first.strategy.position == 1 and first.book.holdings(first.name) == {}
+        asyncio.run(first._execute_exit(current_spread=0.0))
+        portfolio.stop()
+    assert first.strategy.position == 1 and not broker.orders
+    assert broker.positions["AAA"].qty == 30
+
+
+if __name__ == "__main__":
+    test_cycle_cost_scales_with_symbols_not_pairs()
+    test_later_cycles_fetch_only_new_bars()
+    test_entry_uses_shared_account_snapshot()
+    test_shared_symbol_exits_only_its_share()
+    test_shared_symbol_without_holdings_is_not_exited()
+    print("✅ Portfolio runner tests passed!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+import sys
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import backtest, backtest_pairs
+from src.cointegration_test import screen_pairs
+from src.price_store import PriceStore, attach_worker, load_store, worker_store
+from src.strategies.config import PairsConfig
+from src.strategies.pairs import PairsStrategy
+from src.strategies.walk_forward import walk_forward
+from src.synthetic import cointegrated_universe
+from fakes import FakeDataClient, use_fake_clients
+
+
+def _worker_sum(symbol):
+    store = worker_store()
+    return float(np.nansum(store.prices(symbol))), store.index[-1]
+
+
+def test_store_round_trip():
+    """Prices, timestamps and missing bars survive; workers read the same block"""
+    closes, _ = cointegrated_universe(4, 50, seed=1)
+    closes.iloc[3, 1] = np.nan
+    with PriceStore.create(closes) as store:
+        pd.testing.assert_frame_equal(store.frame(), closes, check_names=False, check_freq=False)
+        assert store.values.shape == closes.shape and store.prices(closes.columns[0]).flags.c_contiguous
+        y, x = store.pair(closes.columns[0], closes.columns[1])
+        assert len(y) == len(x) == 49 and closes.index[3] not in y.index
+
+        other = PriceStore.attach(store.handle)
+        assert np.shares_memory(other.values, other.rows)
+        store.values[0, 0] = -1.0
+        assert other.values[0, 0] == -1.0  # same memory, not a copy
+        try:
+            other.values[0, 0] = 0.0
+            assert False, "attached stores are read-only"
+        except ValueError:
+            pass
+        other.close()
+
+        with ProcessPoolExecutor(max_workers=2, initializer=attach_worker, initargs=(store.handle,)) as pool:
+            results = list(pool.map(_worker_sum, store.symbols))
+        assert [r[0] for r in results] == [float(np.nansum(store.prices(s))) for s in store.symbols]
+        assert results[0][1] == closes.index[-1]
+
+
+def test_memory_mapped_store_reopens():
+    """A store saved to a file is opened again by later runs without downloading"""
+    end = pd.Timestamp("2024-06-01", tz="UTC")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "closes.bin")
+        assert PriceStore.open(path) is None
+        data = FakeDataClient()
+        with use_fake_clients(data=data):
+            with load_store(["aaa", "bbb"], "1D", end - pd.Timedelta(days=30), end, path=path) as store:
+                expected = store.frame()
+        assert len(data.requests) == 1
+
+        with PriceStore.open(path) as reopened:
+            assert reopened.symbols == ["AAA", "BBB"]
+            pd.testing.assert_frame_equal(reopened.frame(), expected)
+            assert not reopened.rows.flags.writeable
+
+
+def test_research_paths_accept_a_store():
+    """Screening, walk-forward and multi-pair backtests give the same results from a store as from a frame"""
+    closes, pairs = cointegrated_universe(3, 300, seed=4)
+    with PriceStore.create(closes) as store:
+        pd.testing.assert_frame_equal(screen_pairs(store, min_corr=None, processes=2),
+                                      screen_pairs(closes, min_corr=None, processes=1))
+        pd.testing.assert_frame_equal(walk_forward(store, pairs, train=150, test=50, processes=2),
+                                      walk_forward(closes, pairs, train=150, test=50, processes=1))
+
+        config = PairsConfig(lookback_bars=20, entry_threshold=1.0, spread_model="ols")
+        pooled = backtest_pairs(store, pairs, config, processes=2)
+        assert list(zip(pooled.stock1, pooled.stock2)) == pairs
+        for row, (y, x) in zip(pooled.itertuples(), pairs):
+            single = backtest(PairsStrategy.from_config(PairsConfig(y, x, lookback_bars=20, entry_threshold=1.0,
+                                                                    spread_model="ols")),
+                              closes[y], closes[x])
+            assert row.trades == single.summary()["trades"]
+            assert np.isclose(row.final_capital, single.final_capital)
+
+
+if __name__ == "__main__":
+    test_store_round_trip()
+    test_memory_mapped_store_reopens()
+    test_research_paths_accept_a_store()
+    print("✅ Price store tests passed!")
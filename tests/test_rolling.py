@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import json
+import math
+import pickle
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from src.rolling import RollingZScore
+from src.strategies.pairs import PairsStrategy
+from src.strategies.realtime import RealTimeTradingStrategy
+
+
+def test_matches_numpy_window():
+    """Running mean/std track the exact window statistics"""
+    rng = np.random.default_rng(1)
+    values = 1e4 + rng.normal(0, 1, 5000)  # large offset stresses cancellation
+    stats = RollingZScore(50)
+    for i, value in enumerate(values):
+        if i >= 50:
+            window = values[i - 50:i]
+            expected = (value - window.mean()) / window.std(ddof=1)
+            assert abs(stats.score(value) - expected) < 1e-6
+        stats.push(value)
+    assert stats.ready
+    assert np.allclose(stats.values(), values[-50:])
+
+
+def test_matches_strategy_zscores():
+    """update() reproduces PairsStrategy.rolling_zscore bar for bar"""
+    rng = np.random.default_rng(2)
+    spread = 1.5 + np.cumsum(rng.normal(0, 0.01, 300))
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=25)
+    stats = strategy.rolling_stats()
+
+    streamed = np.array([stats.update(v) for v in spread])
+    assert np.allclose(streamed, strategy.rolling_zscore(spread), equal_nan=True)
+
+
+def test_flat_window_scores_nan():
+    stats = RollingZScore(5, values=[2.0] * 5)
+    assert stats.std == 0.0
+    assert math.isnan(stats.score(3.0))
+
+
+def test_state_round_trip():
+    """Snapshots survive JSON and pickle and resume identically"""
+    stats = RollingZScore(10, hedge_ratio=2.0)
+    for i in range(23):
+        stats.update_prices(100 + i, 50 + 0.3 * i * (-1) ** i)
+
+    restored = RollingZScore.from_state(json.loads(json.dumps(stats.to_state())))
+    pickled = pickle.loads(pickle.dumps(stats))
+    for copy in (restored, pickled):
+        assert copy.values() == stats.values()
+        assert abs(copy.mean - stats.mean) < 1e-12
+        assert abs(copy.update_prices(130, 60) - stats.score(copy.spread(130, 60))) < 1e-9
+
+
+def test_realtime_strategy_rolling_mode():
+    """Once seeded, RealTimeTradingStrategy scores against the rolling window"""
+    seed = [0.0, 1.0, -1.0, 0.5, -0.5]
+    strat = RealTimeTradingStrategy(api=None, hedge_ratio=1.0, mean_train=100.0, std_train=1.0,
+                                    entry_z=1.0, exit_z=0.5, rolling_window=5, rolling_seed=seed)
+    expected = RollingZScore(5, values=seed).score(3.0)
+
+    action, _, _, zscore = strat.process_data(None, None, y_price=13.0, x_price=10.0)
+    assert abs(zscore - expected) < 1e-12
+    assert action == "SHORT"
+    assert strat.rolling.values()[-1] == 3.0
+
+
+if __name__ == "__main__":
+    test_matches_numpy_window()
+    test_matches_strategy_zscores()
+    test_flat_window_scores_nan()
+    test_state_round_trip()
+    test_realtime_strategy_rolling_mode()
+    print("✅ Rolling statistics tests passed!")
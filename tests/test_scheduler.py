@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from alpaca.data.historical import StockHistoricalDataClient
+
+from src import scheduler
+from src.clients import _pool_connections
+from src.data_api import fetch_bars
+from src.scheduler import DATA, ORDER, RequestScheduler
+from fakes import FakeAlpacaServer
+
+
+class HTTPFailure(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+
+
+def test_token_bucket_spends_budget():
+    """After the burst, calls go out at the configured rate"""
+    s = RequestScheduler(rate_per_minute=600, burst=5)  # 10/s
+    started = time.perf_counter()
+    for _ in range(15):
+        s.call(lambda: None)
+    elapsed = time.perf_counter() - started
+    assert 0.9 <= elapsed < 2.0
+    assert s.stats["requests"] == 15
+
+
+def test_orders_jump_the_queue():
+    """An order arriving behind queued data requests gets the next token"""
+    s = RequestScheduler(rate_per_minute=1200, burst=1)  # one token every 50ms
+    s.call(lambda: None)  # drain the burst
+    done = []
+
+    def run(name, priority):
+        s.call(lambda: done.append(name), priority=priority)
+
+    threads = [threading.Thread(target=run, args=(f"data{i}", DATA)) for i in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.01)
+    order = threading.Thread(target=run, args=("order", ORDER))
+    order.start()
+    for t in threads + [order]:
+        t.join()
+    assert done[0] == "order"
+    assert sorted(done[1:]) == ["data0", "data1", "data2"]
+
+
+def test_identical_requests_coalesce():
+    """Concurrent calls with one key share a single request and its result"""
+    s = RequestScheduler(rate_per_minute=6000, burst=100)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return SimpleNamespace(value=42)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: s.call(slow, key=("bars", "AAA")), range(8)))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert s.stats["coalesced"] == 7
+
+
+def test_retries_only_what_is_safe():
+    """Reads retry 5xx; orders only retry 429 (the server never acted on it)"""
+    s = RequestScheduler(rate_per_minute=6000, burst=100, base_delay=0.001)
+    failures = [HTTPFailure(503), HTTPFailure(429)]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    assert s.call(flaky) == "ok"
+    assert s.stats["retries"] == 2
+
+    attempts = []
+
+    def submit():
+        attempts.append(1)
+        raise HTTPFailure(500)
+
+    try:
+        s.call(submit, priority=ORDER, idempotent=False)
+        assert False, "order was retried"
+    except HTTPFailure:
+        pass
+    assert len(attempts) == 1
+
+
+def test_against_rate_limited_server():
+    """Real SDK client against a local server enforcing 4 requests / 0.5s: every call succeeds"""
+    server = FakeAlpacaServer(limit=4, window=0.5)
+    # Our budget is looser than the server's, so the server pushes back with 429s
+    s = scheduler.set_scheduler(RequestScheduler(rate_per_minute=6000, burst=20, base_delay=0.05))
+    try:
+        client = _pool_connections(StockHistoricalDataClient("key", "secret", url_override=server.url))
+        start, end = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 10, tzinfo=timezone.utc)
+        symbols = [f"S{i}" for i in range(12)]
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            frames = list(pool.map(lambda sym: fetch_bars(client, [sym], "1D", start, end), symbols))
+    finally:
+        scheduler.set_scheduler(None)
+        server.close()
+
+    assert [f.index.get_level_values(0)[0] for f in frames] == symbols
+    assert all(len(f) == 5 for f in frames)
+    statuses = server.statuses()
+    assert statuses.count(200) == 12
+    assert statuses.count(429) == s.stats["rate_limited"] > 0
+
+
+if __name__ == "__main__":
+    test_token_bucket_spends_budget()
+    test_orders_jump_the_queue()
+    test_identical_requests_coalesce()
+    test_retries_only_what_is_safe()
+    test_against_rate_limited_server()
+    print("✅ Scheduler tests passed!")
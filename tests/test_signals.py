@@ -4,7 +4,8 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.strategies.pairs import PairsStrategy
-from src.data_api import get_bars
+from src.market_data import load_pair
+from tests.fakes import offline_data_client, use_fake_clients
 from datetime import datetime, timedelta
 
 def test_signal_generation():
@@ -30,18 +31,13 @@ def test_signal_generation():
             end_time = datetime.now()
             start_time = end_time - timedelta(days=60)  # Get more data
             
-            bars1 = get_bars([stock1], "1D", start_time, end_time)
-            bars2 = get_bars([stock2], "1D", start_time, end_time)
+            with use_fake_clients(data=offline_data_client()):
+                prices1, prices2 = load_pair(stock1, stock2, "1D", start_time, end_time)
             
-            if bars1.empty or bars2.empty:
+            if prices1.empty:
                 print(f"   ❌ No data for {stock1} or {stock2}")
                 continue
             
-            # Extract prices
-            prices1 = bars1.xs(stock1)['close']
-            prices2 = bars2.xs(stock2)['close']
-            prices1, prices2 = prices1.align(prices2, join='inner')
-            
             print(f"   ✅ Got {len(prices1)} trading days")
             
             # Calculate spread
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from alpaca.trading.enums import OrderSide, OrderStatus
+
+from src import async_api, orders
+from src.sim_broker import SimulatedBroker
+from tests.fakes import use_fake_clients
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_market_orders_and_account():
+    broker = SimulatedBroker(cash=10_000, prices={"AAA": 100.0, "BBB": 50.0}, slippage_bps=10)
+    with use_fake_clients(trading=broker):
+        buy = orders.place_market_order("AAA", "buy", qty=10)
+        short = orders.place_market_order("BBB", "sell", qty=20)
+        assert buy.status == OrderStatus.FILLED and abs(buy.filled_avg_price - 100.1) < 1e-9
+        assert abs(short.filled_avg_price - 49.95) < 1e-9
+
+        broker.update_prices({"AAA": 110.0, "BBB": 45.0})
+        positions = {p["symbol"]: p for p in orders.list_positions()}
+        assert float(positions["AAA"]["qty"]) == 10 and float(positions["BBB"]["qty"]) == -20
+        assert abs(float(positions["BBB"]["unrealized_pl"]) - 20 * 4.95) < 1e-9
+
+        summary = orders.account_summary()
+        expected = 10_000 - 10 * 100.1 + 20 * 49.95 + 10 * 110 - 20 * 45
+        assert abs(float(summary["equity"]) - expected) < 1e-6
+
+
+def test_latency_partial_fills_and_limits():
+    clock = Clock()
+    broker = SimulatedBroker(prices={"AAA": 100.0}, latency=0.5, fill_ratio=0.5, clock=clock)
+    with use_fake_clients(trading=broker):
+        order = orders.place_market_order("AAA", "buy", qty=10)
+        assert order.status == OrderStatus.ACCEPTED and order.filled_qty == 0
+        clock.now = 1.0
+        broker.set_price("AAA", 100.0)
+        assert order.status == OrderStatus.PARTIALLY_FILLED and order.filled_qty == 5
+        broker.set_price("AAA", 100.0)
+        broker.set_price("AAA", 100.0)
+        assert order.status == OrderStatus.PARTIALLY_FILLED and order.filled_qty == 8  # 5 + 2 + 1
+        broker.set_price("AAA", 100.0)
+        broker.set_price("AAA", 100.0)
+        assert order.status == OrderStatus.FILLED and broker.get_open_position("AAA").qty == 10
+
+        limit = orders.place_limit_order("AAA", "sell", qty=4, limit_price=105)
+        clock.now = 2.0
+        broker.set_price("AAA", 104.0)
+        assert limit.filled_qty == 0
+        assert [o.id for o in orders.list_open_orders()] == [limit.id]
+        orders.cancel_order(limit.id)
+        assert limit.status == OrderStatus.CANCELED and not orders.list_open_orders()
+
+
+def test_bracket_exits_are_one_cancels_other():
+    broker = SimulatedBroker(prices={"AAA": 100.0})
+    with use_fake_clients(trading=broker):
+        parent = orders.place_bracket_order("AAA", "buy", qty=5, take_profit=110, stop_loss=95)
+        take_profit, stop = parent.legs
+        assert parent.status == OrderStatus.FILLED
+        broker.set_price("AAA", 96.0)
+        assert take_profit.status == OrderStatus.NEW and stop.status == OrderStatus.NEW
+        broker.set_price("AAA", 94.0)
+        assert stop.status == OrderStatus.FILLED and take_profit.status == OrderStatus.CANCELED
+        assert not broker.get_all_positions()
+
+
+def test_runner_path_throughput():
+    """Concurrent legs through async_api at thousands of orders per second"""
+    broker = SimulatedBroker(cash=1e9, prices={"AAA": 100.0, "BBB": 50.0})
+    legs = [{"symbol": "AAA", "side": "buy", "qty": 1}, {"symbol": "BBB", "side": "sell", "qty": 2}] * 1000
+    with use_fake_clients(trading=broker):
+        start = time.perf_counter()
+        results = asyncio.run(async_api.submit_market_orders(legs))
+        elapsed = time.perf_counter() - start
+    assert not [r for r in results if isinstance(r, Exception)]
+    assert broker.get_open_position("AAA").qty == 1000 and broker.get_open_position("BBB").qty == -2000
+    print(f"⚡ {len(legs) / elapsed:,.0f} orders/s")
+
+
+if __name__ == "__main__":
+    test_market_orders_and_account()
+    test_latency_partial_fills_and_limits()
+    test_bracket_exits_are_one_cancels_other()
+    test_runner_path_throughput()
+    print("✅ Simulated broker tests passed!")
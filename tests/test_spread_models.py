@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src.spread_models import KalmanSpread, RatioSpread, RollingOLSSpread, StaticSpread, make_spread_model
+from src.strategies.config import PairsConfig
+from src.strategies.pairs import PairsStrategy
+from src.strategies.realtime import RealTimeTradingStrategy
+
+
+def _prices(n=400, beta=2.5, seed=0):
+    """price1 = beta * price2 + 5 + noise"""
+    rng = np.random.default_rng(seed)
+    p2 = 50 + np.cumsum(rng.normal(0, 0.5, n))
+    p1 = beta * p2 + 5 + rng.normal(0, 0.3, n)
+    return p1, p2
+
+
+def test_batch_matches_streaming_updates():
+    """batch() equals bar-by-bar update() from a fresh model, for every model"""
+    p1, p2 = _prices()
+    for model in (RatioSpread(), StaticSpread(2.0), RollingOLSSpread(30), KalmanSpread()):
+        streamed = np.array([model.update(a, b) for a, b in zip(p1, p2)])
+        assert np.allclose(model.batch(p1, p2), streamed, rtol=1e-9, atol=1e-9), type(model).__name__
+
+
+def test_rolling_ols_tracks_window_fit():
+    p1, p2 = _prices()
+    model = RollingOLSSpread(50)
+    for a, b in zip(p1, p2):
+        model.update(a, b)
+    expected = np.polyfit(p2[-50:], p1[-50:], 1)[0]
+    assert abs(model.hedge_ratio - expected) < 1e-9
+
+
+def test_rolling_ols_stays_exact_on_long_series():
+    """Batch sums restart per block, so a late window fits like a fresh regression"""
+    rng = np.random.default_rng(5)
+    n = 200_000
+    p2 = 1e4 + np.cumsum(rng.normal(0, 1, n))
+    p1 = 2.5 * p2 + rng.normal(0, 1, n)
+    model = RollingOLSSpread(30)
+    spreads = model.batch(p1, p2)
+    for i in rng.integers(31, n, 100).tolist() + [n - 1]:
+        slope = np.polyfit(p2[i - 30:i], p1[i - 30:i], 1)[0]
+        assert abs((p1[i] - spreads[i]) / p2[i] - slope) < 1e-9
+
+    streamed = RollingOLSSpread(30)
+    streamed.RESYNC_EVERY = 1000
+    for a, b in zip(p1[:5000].tolist(), p2[:5000].tolist()):
+        streamed.update(a, b)
+    assert abs(streamed.hedge_ratio - np.polyfit(p2[4970:5000], p1[4970:5000], 1)[0]) < 1e-9
+
+
+def test_warm_up_continues_like_streaming():
+    """warm_up() on history leaves the same live state as streaming it"""
+    p1, p2 = _prices()
+    for name, kwargs in (("rolling_ols", {"window": 40}), ("kalman", {})):
+        warmed, streamed = make_spread_model(name, **kwargs), make_spread_model(name, **kwargs)
+        warmed.warm_up(p1[:300], p2[:300])
+        for a, b in zip(p1[:300], p2[:300]):
+            streamed.update(a, b)
+        assert abs(warmed.update(p1[300], p2[300]) - streamed.update(p1[300], p2[300])) < 1e-9
+        assert abs(warmed.hedge_ratio - streamed.hedge_ratio) < 1e-9
+
+
+def test_kalman_converges_to_hedge_ratio():
+    p1, p2 = _prices(n=2000)
+    model = KalmanSpread(delta=1e-5, obs_var=0.1)
+    model.warm_up(p1, p2)
+    assert abs(model.hedge_ratio - 2.5) < 0.1
+
+
+def test_static_fits_on_history():
+    p1, p2 = _prices()
+    model = StaticSpread()
+    model.warm_up(p1, p2)
+    assert abs(model.hedge_ratio - 2.5) < 0.05
+
+
+def test_strategy_uses_configured_model():
+    p1, p2 = _prices()
+    idx = pd.date_range("2024-01-01", periods=len(p1), freq="D")
+    config = PairsConfig(stock1="AAA", stock2="BBB", spread_model="rolling_ols", hedge_window=20)
+    strategy = PairsStrategy.from_config(config)
+    spread = strategy.calculate_spread(pd.Series(p1, index=idx), pd.Series(p2, index=idx))
+    assert np.allclose(spread.to_numpy(), RollingOLSSpread(20).batch(p1, p2))
+    assert strategy.spread_model.hedge_ratio == 1.0  # history runs never touch the live model
+
+    ratio = PairsStrategy("AAA", "BBB").calculate_spread(pd.Series(p1, index=idx), pd.Series(p2, index=idx))
+    assert np.allclose(ratio.to_numpy(), p1 / p2)
+
+
+def test_realtime_locks_hedge_ratio_while_in_position():
+    p1, p2 = _prices()
+    model = RollingOLSSpread(20, hedge_ratio=2.5)
+    strat = RealTimeTradingStrategy(api=None, hedge_ratio=2.5, mean_train=5.0, std_train=0.3,
+                                    entry_z=1.0, exit_z=0.0, initial_capital=1e6, spread_model=model)
+    for i, (a, b) in enumerate(zip(p1, p2)):
+        before = strat.position
+        hedge = strat.hedge_ratio
+        strat.process_data(None, None, date=pd.Timestamp(i, unit="D"), y_price=a, x_price=b)
+        if before != 0:
+            assert strat.hedge_ratio == hedge
+    assert strat.trade_log
+
+
+if __name__ == "__main__":
+    test_batch_matches_streaming_updates()
+    test_rolling_ols_tracks_window_fit()
+    test_rolling_ols_stays_exact_on_long_series()
+    test_warm_up_continues_like_streaming()
+    test_kalman_converges_to_hedge_ratio()
+    test_static_fits_on_history()
+    test_strategy_uses_configured_model()
+    test_realtime_locks_hedge_ratio_while_in_position()
+    print("✅ Spread model tests passed!")
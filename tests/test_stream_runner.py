@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import threading
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src.replay import ReplayBar, ReplayStream, ReplayTrade
+from src.strategies.pairs import PairsStrategy
+from src.strategies.stream_runner import StreamingPairsRunner
+from fakes import FakeDataClient, FakeTradingClient, use_fake_clients
+
+
+def _mean_reverting_prices(n: int = 400, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-02 14:30", periods=n, freq="min", tz="UTC")
+    prices2 = 100 + np.cumsum(rng.normal(0, 0.05, n))
+    ratio = np.empty(n)
+    ratio[0] = 1.5
+    for i in range(1, n):
+        ratio[i] = 1.5 + 0.8 * (ratio[i - 1] - 1.5) + rng.normal(0, 0.01)
+    return pd.Series(prices2 * ratio, index=index), pd.Series(prices2, index=index)
+
+
+def _bars(prices1, prices2):
+    events = []
+    for symbol, prices in (("AAA", prices1), ("BBB", prices2)):
+        for ts, close in prices.items():
+            events.append(ReplayBar(symbol, ts.to_pydatetime(), close, close, close, close, 100.0))
+    return sorted(events, key=lambda e: e.timestamp)
+
+
+def test_stream_trades_without_rest_history():
+    """Replayed bars drive entries and exits; no bar requests after warm-up"""
+    prices1, prices2 = _mean_reverting_prices()
+    data, trading = FakeDataClient(), FakeTradingClient()
+    stream = ReplayStream(_bars(prices1.iloc[50:], prices2.iloc[50:]))
+    runner = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_days=30, timeframe="1Min"), stream=stream)
+
+    async def main():
+        await runner.warm_up(prices1.iloc[:50], prices2.iloc[:50])
+        stream.subscribe_bars(runner.on_bar, "AAA", "BBB")
+        await stream.run()
+
+    with use_fake_clients(data=data, trading=trading):
+        asyncio.run(main())
+
+    entries = [t for t in runner.trade_history if t['action'] == 'entry']
+    exits = [t for t in runner.trade_history if t['action'] == 'exit']
+    assert entries and exits
+    assert data.requests == []
+    assert "get_all_positions" not in trading.calls  # exits close the book's holdings
+
+
+def test_signals_match_batch_computation():
+    """Streaming spreads reproduce the batch z-scores bar for bar"""
+    prices1, prices2 = _mean_reverting_prices(n=120)
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=20, timeframe="1Min")
+    strategy.entry_threshold = 1e9  # observe only
+    runner = StreamingPairsRunner(strategy, stream=ReplayStream())
+    batch = strategy.generate_signals(prices1, prices2)
+
+    async def main():
+        await runner.warm_up(prices1.iloc[:20], prices2.iloc[:20])
+        for bar in _bars(prices1.iloc[20:], prices2.iloc[20:]):
+            await runner.on_bar(bar)
+
+    asyncio.run(main())
+    window = np.array(runner.stats.values())
+    assert np.allclose(window, batch['spread'].to_numpy()[-19:])
+    assert np.isclose(runner.stats.mean, window.mean())
+    assert np.isclose(runner.stats.std, window.std(ddof=1))
+    assert runner.timeframe == "1Min"  # the strategy's timeframe unless one is given
+
+
+def test_trades_trigger_between_bars():
+    """With trade updates enabled a tick can trigger an entry before the bar closes"""
+    prices1, prices2 = _mean_reverting_prices(n=60)
+    runner = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_days=30, timeframe="1Min"), use_trades=True)
+    last = prices1.index[-1].to_pydatetime()
+
+    async def main():
+        await runner.warm_up(prices1, prices2)
+        # AAA trades far above its recent range
+        await runner.on_trade(ReplayTrade("AAA", last, float(prices1.iloc[-1]) * 1.2, 100))
+
+    with use_fake_clients(data=FakeDataClient(), trading=FakeTradingClient()):
+        asyncio.run(main())
+
+    assert runner.strategy.position == -1
+
+
+class BlockingStream(ReplayStream):
+    """Like StockDataStream: run() blocks and drives the handlers in its own event loop"""
+
+    def run(self):
+        asyncio.run(ReplayStream.run(self))
+
+
+def test_run_forever_hands_blocking_stream_events_to_its_loop():
+    """A stream with a blocking public run() is run on a thread; handlers still run on the runner's loop"""
+    prices1, prices2 = _mean_reverting_prices()
+    stream = BlockingStream(_bars(prices1.iloc[-20:], prices2.iloc[-20:]))
+    runner = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_days=30, timeframe="1Min"), stream=stream)
+    runner.strategy.entry_threshold = 1e9  # observe only
+    threads = set()
+    on_bar = runner.on_bar
+
+    async def record(bar):
+        threads.add(threading.get_ident())
+        await on_bar(bar)
+    runner.on_bar = record
+
+    with use_fake_clients(data=FakeDataClient(), trading=FakeTradingClient()):
+        asyncio.run(asyncio.wait_for(runner.run_forever(), 10))
+    assert threads == {threading.get_ident()}
+    assert runner._last_bar == prices1.index[-1]
+
+
+if __name__ == "__main__":
+    test_stream_trades_without_rest_history()
+    test_signals_match_batch_computation()
+    test_trades_trigger_between_bars()
+    test_run_forever_hands_blocking_stream_events_to_its_loop()
+    print("✅ Streaming runner tests passed!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import logging
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src.strategies.realtime import RealTimeTradingStrategy, run_backtest, optimize_thresholds
+from src.strategies.sweep import sweep_thresholds, threshold_grid
+
+logging.getLogger().setLevel(logging.ERROR)  # process_data logs every fill
+
+ENTRY = [0.5, 1.0, 1.5, 2.0]
+EXIT = [0.25, 0.5, 0.9]
+
+
+def _pair(n=400, seed=0):
+    """Cointegrated y = 2x + 50 + AR(1) noise"""
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2022-01-01", periods=n, freq="D")
+    x = 100 + np.cumsum(rng.normal(0, 1, n))
+    noise = np.zeros(n)
+    for i in range(1, n):
+        noise[i] = 0.9 * noise[i - 1] + rng.normal(0, 3)
+    y = pd.Series(2 * x + 50 + noise, index=idx)
+    x = pd.Series(x, index=idx)
+    spread = y - 2 * x
+    return y, x, float(spread.mean()), float(spread.std())
+
+
+def _by_point(df):
+    return df.sort_values(["entry_z", "exit_z", "stop_loss_pct", "slippage_pct"]).reset_index(drop=True)
+
+
+def test_grid_skips_inverted_bands():
+    grid = threshold_grid([1.0, 2.0], [0.5, 1.5], stop_loss_grid=[0.02, 0.05])
+    assert len(grid["entry_z"]) == 6
+    assert (grid["exit_z"] < grid["entry_z"]).all()
+
+
+def test_vectorized_matches_event_path():
+    """Grid engine reproduces RealTimeTradingStrategy point for point"""
+    y, x, mean, std = _pair()
+    kwargs = dict(stop_loss_grid=[0.01, 0.05], slippage_grid=[0.0, 0.001],
+                  initial_capital=100_000, processes=1)
+    fast = _by_point(sweep_thresholds(y, x, 2.0, mean, std, ENTRY, EXIT, **kwargs))
+    slow = _by_point(sweep_thresholds(y, x, 2.0, mean, std, ENTRY, EXIT, method="event", **kwargs))
+    assert (fast["trades"] == slow["trades"]).all()
+    assert fast["trades"].sum() > 0
+    assert np.allclose(fast["return"], slow["return"], rtol=0, atol=1e-12)
+
+
+def test_optimize_thresholds_matches_run_backtest():
+    y, x, mean, std = _pair(seed=3)
+    results = optimize_thresholds(RealTimeTradingStrategy, y, x, 2.0, mean, std,
+                                  0.0005, 10_000, ENTRY, EXIT)
+    best = results.iloc[0]
+    expected = run_backtest(RealTimeTradingStrategy, y, x, 2.0, mean, std,
+                            best.entry_z, best.exit_z, 0.0005, 10_000)
+    assert abs(best["return"] - expected["return"]) < 1e-12
+    assert best["trades"] == expected["trades"]
+    assert results["return"].is_monotonic_decreasing
+
+
+def test_process_pool_matches_in_process():
+    y, x, mean, std = _pair(seed=5)
+    kwargs = dict(stop_loss_grid=[0.02, 0.05], initial_capital=50_000)
+    local = _by_point(sweep_thresholds(y, x, 2.0, mean, std, ENTRY, EXIT, processes=1, **kwargs))
+    pooled = _by_point(sweep_thresholds(y, x, 2.0, mean, std, ENTRY, EXIT, processes=2, **kwargs))
+    pd.testing.assert_frame_equal(local, pooled)
+
+
+if __name__ == "__main__":
+    test_grid_skips_inverted_bands()
+    test_vectorized_matches_event_path()
+    test_optimize_thresholds_matches_run_backtest()
+    test_process_pool_matches_in_process()
+    print("✅ Parameter sweep tests passed!")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from src.cointegration_test import engle_granger
+from src.synthetic import ar1, bars_frame, cointegrated_pair, cointegrated_universe
+
+
+def test_ar1_matches_recursion():
+    for phi in (0.95, 0.3, -0.6):
+        fast = ar1(2_000, phi, 1.0, np.random.default_rng(7))
+        shocks = np.random.default_rng(7).normal(0.0, 1.0, 2_000)
+        slow, last = np.empty(2_000), 0.0
+        for i, u in enumerate(shocks):
+            last = phi * last + u
+            slow[i] = last
+        assert np.allclose(fast, slow, atol=1e-9)
+
+
+def test_pair_is_cointegrated():
+    p1, p2 = cointegrated_pair(2_000, hedge_ratio=1.7, step_sigma=1.0, freq="1D", seed=3)
+    assert p1.index.equals(p2.index) and p1.index.is_monotonic_increasing
+    result = engle_granger(p1, p2)
+    assert result["cointegrated"]
+    assert abs(result["hedge_ratio"] - 1.7) < 0.05
+
+
+def test_universe_bars_frame():
+    closes, pairs = cointegrated_universe(3, 50, seed=1)
+    assert pairs == [("Y0", "X0"), ("Y1", "X1"), ("Y2", "X2")]
+    bars = bars_frame(closes)
+    assert bars.index.names == ["symbol", "timestamp"]
+    assert len(bars) == 6 * 50
+    assert np.allclose(bars.loc["Y1", "close"].to_numpy(), closes["Y1"].to_numpy())
+
+
+if __name__ == "__main__":
+    test_ar1_matches_recursion()
+    test_pair_is_cointegrated()
+    test_universe_bars_frame()
+    print("✅ Synthetic data tests passed!")
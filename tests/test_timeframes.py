@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src import async_api
+from src.replay import ReplayBar, ReplayStream
+from src.strategies.config import PairsConfig
+from src.strategies.pairs import PairsStrategy
+from src.strategies.pairs_runner import PairsRunner
+from src.strategies.portfolio_runner import PortfolioRunner
+from src.strategies.stream_runner import StreamingPairsRunner
+from src.trading_calendar import bars_per_session, history_start, is_session, last_completed_session, sessions
+from fakes import FakeDataClient, FakeTradingClient, use_fake_clients
+
+
+def test_trading_calendar():
+    """NYSE holidays are skipped, with weekend observances"""
+    assert len(sessions("2024-01-01", "2024-12-31")) == 252
+    assert not is_session("2024-03-29")  # Good Friday
+    assert not is_session("2024-07-04") and is_session("2024-07-05")
+    assert not is_session("2022-06-20")  # Juneteenth observed on the Monday
+    assert is_session("2021-12-31")  # New Year's on a Saturday isn't moved back
+    assert bars_per_session("1Min") == 390 and bars_per_session("5Min") == 78 and bars_per_session("1H") == 7
+
+    # The latest closed session: today's only after 16:00 New York time
+    assert last_completed_session(datetime(2024, 7, 8, 19, 59, tzinfo=timezone.utc)) == pd.Timestamp("2024-07-05")
+    assert last_completed_session(datetime(2024, 7, 8, 20, 0, tzinfo=timezone.utc)) == pd.Timestamp("2024-07-08")
+    assert last_completed_session(datetime(2024, 7, 6, 12, 0, tzinfo=timezone.utc)) == pd.Timestamp("2024-07-05")
+
+
+def test_history_start_counts_sessions():
+    """Requests reach back whole sessions (plus a spare), skipping weekends and holidays"""
+    end = datetime(2024, 7, 8, 15, 0, tzinfo=timezone.utc)  # Monday after July 4th
+    assert history_start(end, 3, "1D") == datetime(2024, 7, 1, 4, 0, tzinfo=timezone.utc)
+    assert history_start(end, 2 * 390, "1Min") == datetime(2024, 7, 2, 4, 0, tzinfo=timezone.utc)
+    assert history_start(end, 30, "5Min") == datetime(2024, 7, 3, 4, 0, tzinfo=timezone.utc)
+
+
+def test_runner_requests_intraday_bars():
+    """A 5Min strategy downloads a few sessions of 5Min bars, not a calendar-day multiple"""
+    data = FakeDataClient()
+    strategy = PairsStrategy("AAA", "BBB", lookback_bars=30, timeframe="5Min")
+    strategy.entry_threshold = 1e9  # never trade
+    runner = PairsRunner(strategy)
+    with use_fake_clients(data=data, trading=FakeTradingClient()):
+        asyncio.run(runner.run_once())
+
+    (_, start, end), = data.requests
+    assert end - start < timedelta(days=6)
+    held, _ = runner._history
+    assert len(held) >= 30
+    assert (held.index.to_series().diff().dropna() == pd.Timedelta(minutes=5)).all()
+
+
+def test_stream_rolls_minutes_up_to_bars():
+    """1-minute stream bars are scored as 5-minute bars, matching a batch run on resampled closes"""
+    index = pd.date_range("2024-01-02 14:30", periods=100, freq="min", tz="UTC")
+    rng = np.random.default_rng(7)
+    prices2 = pd.Series(100 + np.cumsum(rng.normal(0, 0.05, 100)), index=index)
+    prices1 = 1.5 * prices2 + rng.normal(0, 0.05, 100)
+    gap = index[4::5][::3]  # some bars miss their last minute
+    prices1, prices2 = prices1.drop(gap), prices2.drop(gap)
+    bars1, bars2 = prices1.resample("5min").last(), prices2.resample("5min").last()
+
+    strategy = PairsStrategy("AAA", "BBB", lookback_bars=10)
+    strategy.entry_threshold = 1e9  # observe only
+    runner = StreamingPairsRunner(strategy, stream=ReplayStream(), timeframe="5Min")
+    assert strategy.timeframe == "5Min"
+    events = sorted((ReplayBar(symbol, ts.to_pydatetime(), close, close, close, close, 100.0)
+                     for symbol, prices in (("AAA", prices1), ("BBB", prices2))
+                     for ts, close in prices[prices.index >= bars1.index[5]].items()),
+                    key=lambda e: e.timestamp)
+
+    async def main():
+        await runner.warm_up(bars1.iloc[:5], bars2.iloc[:5])
+        for bar in events:
+            await runner.on_bar(bar)
+
+    asyncio.run(main())
+    batch = strategy.generate_signals(bars1, bars2)['spread'].to_numpy()
+    window = np.array(runner.stats.values())
+    assert len(window) > 5
+    assert np.allclose(window, batch[-len(window):])
+    assert runner._last_bar == bars1.index[-1]
+
+
+
+def test_roll_up_emits_the_bar_before_a_gap():
+    """A minute that completes its own bar straight away still emits the unfinished bar before it"""
+    runner = StreamingPairsRunner(PairsStrategy("AAA", "BBB", timeframe="5Min"), stream=ReplayStream())
+    t = pd.Timestamp("2024-01-02 14:30", tz="UTC")
+    assert runner._roll_up("AAA", t, 1.0) == []
+    assert runner._roll_up("AAA", t + pd.Timedelta(minutes=2), 2.0) == []
+    # Nothing until 14:44, the last minute of the 14:40 bar: both bars complete
+    assert runner._roll_up("AAA", t + pd.Timedelta(minutes=14), 3.0) == [(t, 2.0), (t + pd.Timedelta(minutes=10), 3.0)]
+    assert runner._buckets == {}
+
+def test_streamed_daily_bar_matches_rest_stamps():
+    """A rolled-up daily bar carries the REST stamp (New York midnight), so catch_up doesn't push it again"""
+    days = pd.DatetimeIndex(["2024-01-09 05:00", "2024-01-10 05:00", "2024-01-11 05:00"], tz="UTC")
+    runner = StreamingPairsRunner(PairsStrategy("AAA", "BBB", lookback_bars=10), stream=ReplayStream())
+    assert runner.timeframe == "1D"
+
+    async def main():
+        await runner.warm_up(pd.Series([10.0, 11.0, 12.0], index=days), pd.Series([5.0, 5.5, 6.0], index=days))
+        for ts in pd.date_range("2024-01-12 14:30", "2024-01-12 20:59", freq="min", tz="UTC"):
+            for symbol in ("AAA", "BBB"):
+                await runner.on_bar(ReplayBar(symbol, ts.to_pydatetime(), 1, 1, 1, 13.0, 100.0))
+        assert runner.stats.count == 3
+        # The first pre-market minute of the next session completes Friday's bar
+        monday = datetime(2024, 1, 16, 9, 0, tzinfo=timezone.utc)
+        for symbol in ("AAA", "BBB"):
+            await runner.on_bar(ReplayBar(symbol, monday, 1, 1, 1, 14.0, 100.0))
+        assert runner.stats.count == 4
+        assert runner._last_bar == pd.Timestamp("2024-01-12 05:00", tz="UTC")
+
+        rest = pd.DatetimeIndex(["2024-01-12 05:00", "2024-01-16 05:00"], tz="UTC")
+        async def load_pair(*args, **kwargs):
+            return pd.Series([13.0, 14.0], index=rest), pd.Series([6.5, 7.0], index=rest)
+        previous, async_api.load_pair = async_api.load_pair, load_pair
+        try:
+            assert await runner.catch_up() == 1
+        finally:
+            async_api.load_pair = previous
+        assert runner.stats.count == 5
+
+    asyncio.run(main())
+
+
+def test_lookback_and_timeframe_config():
+    """lookback_days still works as an alias; configs carry the timeframe through"""
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=15)
+    assert strategy.lookback_bars == 15 and strategy.timeframe == "1D"
+    strategy.lookback_days = 20
+    assert strategy.lookback_bars == 20
+
+    config = PairsConfig(stock1="AAA", stock2="BBB", timeframe="15Min", lookback_bars=40)
+    strategy = PairsStrategy.from_config(config)
+    assert (strategy.lookback_bars, strategy.timeframe) == (40, "15Min")
+    assert PortfolioRunner([config]).timeframe == "15Min"
+    try:
+        PortfolioRunner([config, PairsConfig(stock1="CCC", stock2="DDD")])
+        assert False, "mixed timeframes should be rejected"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_trading_calendar()
+    test_history_start_counts_sessions()
+    test_runner_requests_intraday_bars()
+    test_stream_rolls_minutes_up_to_bars()
+    test_roll_up_emits_the_bar_before_a_gap()
+    test_streamed_daily_bar_matches_rest_stamps()
+    test_lookback_and_timeframe_config()
+    print("✅ Timeframe tests passed!")
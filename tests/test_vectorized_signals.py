@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src.spread_models import StaticSpread
+from src.strategies.pairs import PairsStrategy
+
+
+def _synthetic_prices(n: int = 500, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=n, freq="D")
+    prices2 = pd.Series(100 + np.cumsum(rng.normal(0, 1, n)), index=index)
+    prices1 = prices2 * 1.5 + rng.normal(0, 2, n)
+    return prices1, prices2
+
+
+def test_rolling_zscore_matches_pandas_window():
+    """Batch z-scores should match the original per-bar slice computation"""
+    prices1, prices2 = _synthetic_prices()
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=30)
+    spread = strategy.calculate_spread(prices1, prices2)
+
+    zscores = strategy.rolling_zscore(spread)
+
+    for i in range(len(spread)):
+        if i + 1 < strategy.lookback_days:
+            assert np.isnan(zscores[i])
+            continue
+        historical = spread.iloc[i - strategy.lookback_days + 1:i]
+        expected = (spread.iloc[i] - historical.mean()) / historical.std()
+        assert abs(zscores[i] - expected) < 1e-9
+
+
+    # zscore_window widens the window to the full lookback before each bar
+    strategy.zscore_window = strategy.lookback_days
+    zscores = strategy.rolling_zscore(spread)
+    assert np.isnan(zscores[:30]).all()
+    for i in range(30, len(spread)):
+        historical = spread.iloc[i - 30:i]
+        expected = (spread.iloc[i] - historical.mean()) / historical.std()
+        assert abs(zscores[i] - expected) < 1e-9
+    window = spread.iloc[:31]
+    assert (strategy.find_entry_signal(window) or 0) == strategy.entry_signals(zscores[:31])[-1]
+
+def test_rolling_zscore_stays_exact_on_long_series():
+    """Prefix sums restart per block, so late bars are as exact as early ones"""
+    rng = np.random.default_rng(11)
+    n = 300_000
+    spread = pd.Series(1e4 + np.cumsum(rng.normal(0, 1, n)) + rng.normal(0, 5, n))
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=30)
+    zscores = strategy.rolling_zscore(spread)
+    values = spread.to_numpy()
+    for i in rng.integers(29, n, 200).tolist() + [n - 1]:
+        window = values[i - 29:i]
+        expected = (values[i] - window.mean()) / window.std(ddof=1)
+        assert abs(zscores[i] - expected) < 1e-10
+
+    # A flat window after a volatile stretch is NaN, as RollingZScore.score has it
+    spread = np.concatenate([rng.normal(1e3, 50, 10_000), np.full(40, 1.25)])
+    assert np.isnan(strategy.rolling_zscore(spread)[-1])
+
+    strategy.zscore_window = 30
+    restored = PairsStrategy("AAA", "BBB")
+    restored.restore_state(strategy.to_state())
+    assert restored.zscore_window == 30
+
+
+def test_per_bar_methods_agree_with_batch():
+    """find_entry_signal / find_exit_signal are wrappers over the batch signals"""
+    prices1, prices2 = _synthetic_prices()
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=20)
+    signals = strategy.generate_signals(prices1, prices2)
+    spread = signals['spread']
+
+    for i in range(len(spread)):
+        window = spread.iloc[:i + 1]
+        entry = strategy.find_entry_signal(window)
+        assert (entry or 0) == signals['entry'].iloc[i]
+        assert strategy.find_exit_signal(window) == signals['exit'].iloc[i]
+
+
+def test_flat_spread_has_no_signals():
+    """A constant spread has zero std and must never signal"""
+    strategy = PairsStrategy("AAA", "BBB", lookback_days=10)
+    spread = pd.Series([1.25] * 50)
+
+    assert strategy.find_entry_signal(spread) is None
+    assert strategy.find_exit_signal(spread) is False
+    assert np.isnan(strategy.rolling_zscore(spread)).all()
+
+
+def test_stop_loss_signals_follow_position():
+    """Stop-loss array uses the held position and entry spread"""
+    strategy = PairsStrategy("AAA", "BBB")
+    spread = np.array([1.00, 0.99, 0.97, 1.03])
+
+    assert not strategy.stop_loss_signals(spread).any()
+
+    strategy.update_position(1, entry_spread=1.0)
+    assert strategy.stop_loss_signals(spread).tolist() == [False, False, True, False]
+
+    strategy.update_position(-1, entry_spread=1.0)
+    assert strategy.stop_loss_signals(spread).tolist() == [False, False, False, True]
+    assert strategy.should_stop_loss(1.03)
+
+
+def test_hedge_spreads_stop_on_zscore():
+    """Spreads near zero don't stop on every tick; the z-score past stop_loss_z does"""
+    strategy = PairsStrategy("AAA", "BBB", spread_model=StaticSpread(2.0))
+    strategy.update_position(1, entry_spread=0.001)
+    spread = np.array([0.0005, -0.002, -0.5, 0.3])
+    zscores = np.array([-2.0, -2.5, -3.5, np.nan])
+    assert strategy.stop_loss_signals(spread, zscores).tolist() == [False, False, True, False]
+    strategy.update_position(-1, entry_spread=0.001)
+    assert strategy.should_stop_loss(0.5, 3.2) and not strategy.should_stop_loss(0.5, 2.9)
+    try:
+        strategy.should_stop_loss(0.5)
+        assert False, "hedge-ratio spreads need a z-score"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_rolling_zscore_matches_pandas_window()
+    test_rolling_zscore_stays_exact_on_long_series()
+    test_per_bar_methods_agree_with_batch()
+    test_flat_spread_has_no_signals()
+    test_stop_loss_signals_follow_position()
+    test_hedge_spreads_stop_on_zscore()
+    print("✅ Vectorized signal tests passed!")
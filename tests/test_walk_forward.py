@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+import pandas as pd
+
+from src.strategies.realtime import RealTimeTradingStrategy
+from src.strategies.sweep import sweep_thresholds
+from src.strategies.walk_forward import (ParameterFeed, WindowStats, fold_bounds, latest_params, out_of_sample,
+                                         retrain, walk_forward)
+from src.synthetic import cointegrated_universe
+
+
+def test_fold_bounds():
+    """Test ranges tile the history after the first train window; the last fold is the live fit"""
+    bounds = fold_bounds(100, train=50, test=20)
+    assert bounds == [(0, 50, 50, 70), (20, 70, 70, 90), (50, 100, 100, 100)]
+    assert fold_bounds(40, train=50, test=20) == []
+
+
+def test_window_stats_match_direct_fit():
+    """Prefix-sum fits equal an OLS + spread std on each window, skipping missing bars"""
+    rng = np.random.default_rng(3)
+    x = 50 + rng.normal(0, 1, 400).cumsum()
+    y = 2.5 * x + 10 + rng.normal(0, 0.5, 400)
+    y[[7, 150]] = np.nan
+    stats = WindowStats(y, x)
+    lo, hi = np.array([0, 100, 200]), np.array([250, 300, 400])
+    hedge, mean, std = stats.fit(lo, hi)
+    for i in range(3):
+        yy, xx = y[lo[i]:hi[i]], x[lo[i]:hi[i]]
+        ok = np.isfinite(yy)
+        b = np.polyfit(xx[ok], yy[ok], 1)[0]
+        spread = pd.Series(yy[ok] - b * xx[ok])
+        assert abs(hedge[i] - b) < 1e-9
+        assert abs(mean[i] - spread.mean()) < 1e-8
+        assert abs(std[i] - spread.std()) < 1e-8
+
+
+def test_walk_forward_folds():
+    """Each fold's thresholds are the train-window optimum; pool and in-process runs agree"""
+    closes, pairs = cointegrated_universe(3, 600, seed=11)
+    folds = walk_forward(closes, pairs, train=250, test=100, initial_capital=1e6, processes=1)
+    assert len(folds) == 3 * 4  # three scored folds and the live fit per pair
+    assert folds.groupby("pair")["test_return"].apply(lambda r: r.isna().sum()).eq(1).all()
+    assert folds["test_trades"].sum() > 0
+
+    row = folds.iloc[1]
+    y, x = closes[pairs[0][0]], closes[pairs[0][1]]
+    lo = closes.index.get_loc(row.train_start)
+    hi = closes.index.get_loc(row.train_end) + 1
+    best = sweep_thresholds(y.iloc[lo:hi], x.iloc[lo:hi], row.hedge_ratio, row.mean_train, row.std_train,
+                            (0.5, 1.0, 1.5, 2.0), (0.25, 0.5, 0.75, 0.9), initial_capital=1e6,
+                            processes=1).iloc[0]
+    assert (best.entry_z, best.exit_z) == (row.entry_z, row.exit_z)
+    assert abs(best["return"] - row.train_return) < 1e-12
+
+    pooled = walk_forward(closes, pairs, train=250, test=100, initial_capital=1e6, processes=2)
+    pd.testing.assert_frame_equal(folds, pooled)
+    assert set(out_of_sample(folds).index) == {f"{y}/{x}" for y, x in pairs}
+
+
+def test_published_params_reach_live_strategy():
+    """retrain() publishes the newest fit; a running strategy adopts it, deferring the hedge while in a trade"""
+    closes, pairs = cointegrated_universe(2, 400, seed=5)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "params.json")
+        feed = ParameterFeed(path)
+        assert feed.poll() is None
+        folds = retrain(closes, pairs[:1], path, train=200, test=100, processes=1)
+        published = feed.poll()
+        assert published == latest_params(folds)
+        assert feed.poll() is None  # unchanged since the last poll
+        retrain(closes, pairs[1:], path, train=200, test=100, processes=1)
+        assert set(feed.poll()) == {f"{y}/{x}" for y, x in pairs}  # merged, not replaced
+
+    params = published[f"{pairs[0][0]}/{pairs[0][1]}"]
+    strat = RealTimeTradingStrategy(api=None, hedge_ratio=1.0, mean_train=0.0, std_train=1.0,
+                                    entry_z=1.0, exit_z=0.5, initial_capital=1e6)
+    strat.process_data("Y", "X", y_price=110.0, x_price=100.0)  # SHORT at hedge 1.0
+    strat.apply_params(params)
+    assert (strat.entry_z, strat.exit_z, strat.std_train) == (params["entry_z"], params["exit_z"], params["std_train"])
+    assert strat.hedge_ratio == 1.0  # the open trade keeps its ratio
+    strat.position = 0
+    strat.process_data("Y", "X", y_price=100.0, x_price=50.0)
+    assert strat.hedge_ratio == params["hedge_ratio"]
+
+
+if __name__ == "__main__":
+    test_fold_bounds()
+    test_window_stats_match_direct_fit()
+    test_walk_forward_folds()
+    test_published_params_reach_live_strategy()
+    print("✅ Walk-forward tests passed!")